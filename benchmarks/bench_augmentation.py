@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+数据增强吞吐量基准测试
+对比逐图片、逐变换的参考实现、批量增强器（单进程）和多进程增强池
+"""
+
+import argparse
+import math
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data.augmentation import AugmentationPool, BatchAugmenter, batch_rng  # noqa: E402
+from src.data.preprocess import PAD_VALUE  # noqa: E402
+
+
+def make_batches(num_batches, batch_size, num_boxes=20, seed=0):
+    """
+    生成模拟的训练批次（尺寸不一的图片和YOLO格式标注）
+
+    Args:
+        num_batches: 批次数量
+        batch_size: 每批图片数量
+        num_boxes: 每张图片的标注框数量
+        seed: 随机种子
+
+    Returns:
+        [(图片列表, (M, 6) 标注), ...]
+    """
+    rng = np.random.default_rng(seed)
+    sizes = [(480, 640), (720, 1280), (1080, 1920), (600, 800)]
+    batches = []
+    for _ in range(num_batches):
+        images, labels = [], []
+        for i in range(batch_size):
+            height, width = sizes[rng.integers(len(sizes))]
+            images.append(rng.integers(0, 255, (height, width, 3), dtype=np.uint8))
+            boxes = np.empty((num_boxes, 6), dtype=np.float32)
+            boxes[:, 0] = i
+            boxes[:, 1] = rng.integers(0, 5, num_boxes)
+            boxes[:, 2:4] = rng.uniform(0.2, 0.8, (num_boxes, 2))
+            boxes[:, 4:6] = rng.uniform(0.02, 0.1, (num_boxes, 2))
+            labels.append(boxes)
+        batches.append((images, np.concatenate(labels)))
+    return batches
+
+
+def reference_augment(images, labels, augmenter, rng):
+    """
+    参考实现：每张图片依次执行letterbox、缩放、旋转、翻转、亮度，
+    每个标注框在Python循环中逐个变换
+
+    Args:
+        images: 图片列表
+        labels: (M, 6) 标注
+        augmenter: 提供输出尺寸和增强范围的 BatchAugmenter
+        rng: 随机数生成器
+
+    Returns:
+        (输出图片列表, 标注列表)
+    """
+    out_h, out_w = augmenter.height, augmenter.width
+    results, new_labels = [], []
+    for i, image in enumerate(images):
+        height, width = image.shape[:2]
+        scale = min(out_h / height, out_w / width)
+        resized = cv2.resize(image, (round(width * scale), round(height * scale)))
+        top = (out_h - resized.shape[0]) // 2
+        left = (out_w - resized.shape[1]) // 2
+        canvas = cv2.copyMakeBorder(
+            resized, top, out_h - resized.shape[0] - top, left, out_w - resized.shape[1] - left,
+            cv2.BORDER_CONSTANT, value=(PAD_VALUE, PAD_VALUE, PAD_VALUE))
+
+        angle = rng.uniform(-augmenter.rotation_range, augmenter.rotation_range)
+        zoom = rng.uniform(*augmenter.zoom_range)
+        rotation = cv2.getRotationMatrix2D((out_w / 2, out_h / 2), angle, 1.0)
+        canvas = cv2.warpAffine(canvas, rotation, (out_w, out_h),
+                                borderValue=(PAD_VALUE, PAD_VALUE, PAD_VALUE))
+        zoomed = cv2.resize(canvas, None, fx=zoom, fy=zoom)
+        zoom_matrix = np.float32([[1, 0, (out_w - zoomed.shape[1]) / 2], [0, 1, (out_h - zoomed.shape[0]) / 2]])
+        canvas = cv2.warpAffine(zoomed, zoom_matrix, (out_w, out_h),
+                                borderValue=(PAD_VALUE, PAD_VALUE, PAD_VALUE))
+        flip = augmenter.horizontal_flip and rng.random() < 0.5
+        if flip:
+            canvas = cv2.flip(canvas, 1)
+        brightness = rng.uniform(*augmenter.brightness_range)
+        canvas = np.clip(canvas.astype(np.float32) * brightness, 0, 255).astype(np.uint8)
+        results.append(canvas)
+
+        cos, sin = math.cos(math.radians(angle)) * zoom, math.sin(math.radians(angle)) * zoom
+        for row in labels[labels[:, 0] == i]:
+            cx = row[2] * width * scale + left - out_w / 2
+            cy = row[3] * height * scale + top - out_h / 2
+            w, h = row[4] * width * scale, row[5] * height * scale
+            xs, ys = [], []
+            for dx, dy in ((-w / 2, -h / 2), (w / 2, -h / 2), (w / 2, h / 2), (-w / 2, h / 2)):
+                x, y = cx + dx, cy + dy
+                xs.append(cos * x + sin * y + out_w / 2)
+                ys.append(-sin * x + cos * y + out_h / 2)
+            x1, x2 = max(min(xs), 0), min(max(xs), out_w)
+            y1, y2 = max(min(ys), 0), min(max(ys), out_h)
+            if flip:
+                x1, x2 = out_w - x2, out_w - x1
+            if x2 - x1 > 2 and y2 - y1 > 2:
+                new_labels.append([i, row[1], (x1 + x2) / 2 / out_w, (y1 + y2) / 2 / out_h,
+                                   (x2 - x1) / out_w, (y2 - y1) / out_h])
+    return results, new_labels
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="数据增强吞吐量基准测试")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--batches", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=None, help="增强进程数，默认读取 training_config.workers")
+    args = parser.parse_args()
+
+    batches = make_batches(args.batches, args.batch_size)
+    images = args.batches * args.batch_size
+    augmenter = BatchAugmenter()
+
+    start = time.perf_counter()
+    for index, (batch_images, labels) in enumerate(batches):
+        reference_augment(batch_images, labels, augmenter, batch_rng(0, 0, index))
+    ref_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for index, (batch_images, labels) in enumerate(batches):
+        augmenter(batch_images, labels, batch_rng(0, 0, index))
+    batch_s = time.perf_counter() - start
+
+    with AugmentationPool(augmenter, workers=args.workers) as pool:
+        # 预热：启动工作进程
+        list(pool.map(batches[:pool.workers]))
+        start = time.perf_counter()
+        for _ in pool.map(batches):
+            pass
+        pool_s = time.perf_counter() - start
+        workers = pool.workers
+
+    print(f"批大小: {args.batch_size}, 批次数: {args.batches}, 输出尺寸: {augmenter.height}x{augmenter.width}")
+    print(f"参考实现:         {images / ref_s:8.1f} 张/秒")
+    print(f"批量增强(单进程): {images / batch_s:8.1f} 张/秒  (加速 {ref_s / batch_s:.1f}x)")
+    print(f"增强池({workers} 进程):  {images / pool_s:8.1f} 张/秒  (加速 {ref_s / pool_s:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+推理后端对比
+在验证集上评估 torch / onnx / onnx_int8 三种后端的 mAP 与吞吐量，
+并在合成批次上测量纯前向延迟；以 torch 为参照输出 mAP 差值和加速比，
+结果保存到 data/results/backend_comparison.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.models.backends import BACKENDS  # noqa: E402
+from src.models.detector import HardwareDetector  # noqa: E402
+from src.models.evaluator import evaluate_detector  # noqa: E402
+from src.utils.config_loader import config  # noqa: E402
+
+RESULTS_FILE = PROJECT_ROOT / "data" / "results" / "backend_comparison.json"
+
+
+def forward_latency(detector, batch_size, repeat):
+    """合成批次上的纯前向延迟（毫秒，取中位数）"""
+    model = detector.load_model()
+    height, width = detector.input_size
+    batch = np.random.default_rng(0).random((batch_size, 3, height, width), dtype=np.float32)
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model(batch)
+        durations.append(time.perf_counter() - start)
+    return float(np.median(durations) * 1000.0)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="推理后端精度与速度对比")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--split", default="val", help="评估使用的数据集划分")
+    parser.add_argument("--batch-size", type=int, default=None, help="推理批大小")
+    parser.add_argument("--repeat", type=int, default=10, help="前向延迟测量次数")
+    parser.add_argument("--max-map-drop", type=float, default=0.02,
+                        help="相对torch允许的mAP@0.5下降，超出时返回非零")
+    args = parser.parse_args()
+
+    results = {}
+    for backend in args.backends:
+        detector = HardwareDetector(config, batch_size=args.batch_size, backend=backend)
+        try:
+            latency_ms = forward_latency(detector, detector.batch_size, args.repeat)
+        except (ImportError, FileNotFoundError) as e:
+            results[backend] = {'skipped': str(e)}
+            print(f"- {backend}: 跳过 ({e})")
+            continue
+
+        item = {'model_version': detector.model_version,
+                'batch_size': detector.batch_size,
+                'forward_ms': latency_ms}
+        try:
+            metrics = evaluate_detector(detector, args.split, config)
+            item.update(map50=metrics['map50'], map50_95=metrics['map50_95'],
+                        images_per_second=metrics['images_per_second'])
+        except ValueError as e:
+            print(f"- {backend}: 无法评估精度 ({e})，只比较速度")
+        results[backend] = item
+
+    reference = results.get('torch', {})
+    failed = False
+    print(f"\n{'后端':<10} {'版本':<24} {'前向(ms)':>10} {'加速':>7} {'张/秒':>8} {'mAP50':>8} {'ΔmAP50':>8}")
+    for backend, item in results.items():
+        if 'skipped' in item:
+            continue
+        speedup = (reference['forward_ms'] / item['forward_ms']) if 'forward_ms' in reference else float('nan')
+        item['speedup'] = speedup
+        line = (f"{backend:<10} {item['model_version']:<24} {item['forward_ms']:10.1f} {speedup:6.2f}x "
+                f"{item.get('images_per_second', float('nan')):8.1f} {item.get('map50', float('nan')):8.4f}")
+        if 'map50' in item and 'map50' in reference:
+            item['map50_delta'] = item['map50'] - reference['map50']
+            line += f" {item['map50_delta']:+8.4f}"
+            if -item['map50_delta'] > args.max_map_drop:
+                line = "❌ " + line
+                failed = True
+        print(line)
+
+    RESULTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(RESULTS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存: {RESULTS_FILE}")
+
+    if failed:
+        print(f"❌ mAP@0.5 下降超过 {args.max_map_drop}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+评估匹配微基准测试
+对比逐轮向量化的COCO贪心匹配与逐候选对Python循环的参考实现，
+测量 DetectionEvaluator.update（10个IoU阈值 + 混淆矩阵）的总耗时及其中的匹配耗时
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.models import evaluator as evaluator_module  # noqa: E402
+from src.models.evaluator import DetectionEvaluator  # noqa: E402
+
+
+def make_tray_batch(num_images, num_parts, duplicates=3, num_classes=5, seed=0):
+    """
+    生成托盘场景的预测和真值
+
+    每个零件有若干抖动后的重复预测框（模拟NMS后残留的重复框），另有同样数量的随机误检。
+
+    Args:
+        num_images: 图片数量
+        num_parts: 每张图片的零件数量
+        duplicates: 每个零件的预测框数量
+        num_classes: 类别数量
+        seed: 随机种子
+
+    Returns:
+        (预测列表, 真值列表)，格式与 DetectionEvaluator.update 的输入一致
+    """
+    rng = np.random.default_rng(seed)
+    predictions, targets = [], []
+    for _ in range(num_images):
+        corners = rng.uniform(0, 1200, (num_parts, 2))
+        sizes = rng.uniform(20, 60, (num_parts, 2))
+        classes = rng.integers(0, num_classes, num_parts)
+        gt = np.column_stack([classes, corners, corners + sizes]).astype(np.float32)
+
+        boxes = np.repeat(gt[:, 1:5], duplicates, axis=0) + rng.normal(0, 3, (num_parts * duplicates, 4))
+        labels = np.repeat(classes, duplicates)
+        noise_corners = rng.uniform(0, 1200, (num_parts, 2))
+        noise = np.column_stack([noise_corners, noise_corners + rng.uniform(20, 60, (num_parts, 2))])
+        boxes = np.concatenate([boxes, noise])
+        labels = np.concatenate([labels, rng.integers(0, num_classes, num_parts)])
+        scores = rng.uniform(0.05, 1.0, len(boxes))
+        predictions.append(np.column_stack([boxes, scores, labels]).astype(np.float32))
+        targets.append(gt)
+    return predictions, targets
+
+
+def reference_greedy_matches(pair_pred, pair_gt):
+    """参考实现：按优先级顺序逐个候选对检查预测框和真值是否已被匹配"""
+    matched_pred, matched_gt = [], []
+    used_pred, used_gt = set(), set()
+    for p, g in zip(pair_pred.tolist(), pair_gt.tolist()):
+        if p in used_pred or g in used_gt:
+            continue
+        used_pred.add(p)
+        used_gt.add(g)
+        matched_pred.append(p)
+        matched_gt.append(g)
+    return np.asarray(matched_pred, dtype=np.int64), np.asarray(matched_gt, dtype=np.int64)
+
+
+def timed_update(matcher, predictions, targets, num_classes, chunk):
+    """
+    用指定的匹配函数分块调用 update
+
+    Returns:
+        (评估器, update总耗时毫秒, 其中匹配耗时毫秒)
+    """
+    matching = [0.0]
+
+    def wrapper(pair_pred, pair_gt):
+        start = time.perf_counter()
+        result = matcher(pair_pred, pair_gt)
+        matching[0] += time.perf_counter() - start
+        return result
+
+    original = evaluator_module._greedy_matches
+    evaluator_module._greedy_matches = wrapper
+    try:
+        evaluator = DetectionEvaluator(class_names=[f"c{i}" for i in range(num_classes)],
+                                       confidence_threshold=0.25)
+        start = time.perf_counter()
+        for offset in range(0, len(predictions), chunk):
+            evaluator.update(predictions[offset:offset + chunk], targets[offset:offset + chunk])
+        total = time.perf_counter() - start
+    finally:
+        evaluator_module._greedy_matches = original
+    return evaluator, total * 1000.0, matching[0] * 1000.0
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="评估匹配微基准测试")
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--parts", type=int, default=100, help="每张图片的零件数量")
+    parser.add_argument("--duplicates", type=int, default=3, help="每个零件的预测框数量")
+    parser.add_argument("--chunk", type=int, default=50, help="每次 update 的图片数")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    num_classes = 5
+    predictions, targets = make_tray_batch(args.images, args.parts, args.duplicates, num_classes)
+
+    matcher = evaluator_module._greedy_matches
+    vectorized, vec_ms, vec_match_ms = min(
+        (timed_update(matcher, predictions, targets, num_classes, args.chunk) for _ in range(args.repeat)),
+        key=lambda result: result[1],
+    )
+    reference, ref_ms, ref_match_ms = timed_update(
+        reference_greedy_matches, predictions, targets, num_classes, args.chunk)
+
+    # 校验两种实现结果一致
+    if not np.array_equal(vectorized._compact()[0], reference._compact()[0]) or \
+            not np.array_equal(vectorized.confusion, reference.confusion):
+        print("❌ 向量化匹配与参考实现结果不一致")
+        return 1
+
+    num_preds = sum(len(p) for p in predictions)
+    print(f"图片数: {args.images}, 每张零件数: {args.parts}, 预测框数: {num_preds}")
+    print(f"参考实现:   update {ref_ms:10.2f} ms, 其中匹配 {ref_match_ms:10.2f} ms")
+    print(f"向量化实现: update {vec_ms:10.2f} ms, 其中匹配 {vec_match_ms:10.2f} ms  "
+          f"(匹配加速 {ref_match_ms / vec_match_ms:.1f}x)")
+    print(f"向量化吞吐量: {args.images / vec_ms * 1000.0:.0f} 张/秒")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+NMS微基准测试
+对比向量化NMS与逐框Python循环的参考实现
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.models.nms import non_max_suppression, xywh_to_xyxy  # noqa: E402
+
+
+def make_tray_predictions(batch_size, num_parts, num_classes=5, num_anchors=8400, seed=0):
+    """
+    生成模拟托盘场景的YOLOv8原始输出
+
+    每个零件周围有若干抖动后的重复框，其余锚点为低分背景。
+
+    Args:
+        batch_size: 图片数量
+        num_parts: 每张图片的零件数量
+        num_classes: 类别数量
+        num_anchors: 锚点数量
+        seed: 随机种子
+
+    Returns:
+        形状为 (B, 4 + num_classes, num_anchors) 的float32数组
+    """
+    rng = np.random.default_rng(seed)
+    predictions = np.zeros((batch_size, 4 + num_classes, num_anchors), dtype=np.float32)
+    predictions[:, 0:2, :] = rng.uniform(0, 640, size=(batch_size, 2, num_anchors))
+    predictions[:, 2:4, :] = rng.uniform(4, 30, size=(batch_size, 2, num_anchors))
+    predictions[:, 4:, :] = rng.uniform(0, 0.3, size=(batch_size, num_classes, num_anchors))
+
+    duplicates = num_anchors // num_parts
+    for b in range(batch_size):
+        centers = rng.uniform(20, 620, size=(num_parts, 2))
+        sizes = rng.uniform(8, 24, size=(num_parts, 2))
+        classes = rng.integers(0, num_classes, size=num_parts)
+        for p in range(num_parts):
+            anchors = slice(p * duplicates, p * duplicates + min(duplicates, 8))
+            count = anchors.stop - anchors.start
+            predictions[b, 0:2, anchors] = (centers[p] + rng.normal(0, 1.0, (count, 2))).T
+            predictions[b, 2:4, anchors] = (sizes[p] + rng.normal(0, 0.5, (count, 2))).T
+            predictions[b, 4 + classes[p], anchors] = rng.uniform(0.5, 0.99, count)
+    return predictions
+
+
+def reference_nms(predictions, confidence_threshold, iou_threshold, max_detections):
+    """
+    参考实现：逐图片、逐类别、逐框对比的Python循环NMS
+
+    Args:
+        predictions: 模型原始输出
+        confidence_threshold: 置信度阈值
+        iou_threshold: IoU阈值
+        max_detections: 每张图片最多保留的框数
+
+    Returns:
+        每张图片的检测列表 [(x1, y1, x2, y2, score, cls), ...]
+    """
+    results = []
+    for image in predictions:
+        candidates = []
+        for anchor in range(image.shape[1]):
+            scores = image[4:, anchor]
+            cls = int(np.argmax(scores))
+            score = float(scores[cls])
+            if score > confidence_threshold:
+                box = xywh_to_xyxy(image[:4, anchor].astype(np.float64))
+                candidates.append((score, cls, [float(v) for v in box]))
+        candidates.sort(key=lambda item: -item[0])
+
+        kept = []
+        for score, cls, box in candidates:
+            suppressed = False
+            for k_score, k_cls, k_box in kept:
+                if k_cls != cls:
+                    continue
+                ix1, iy1 = max(box[0], k_box[0]), max(box[1], k_box[1])
+                ix2, iy2 = min(box[2], k_box[2]), min(box[3], k_box[3])
+                inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+                area = (box[2] - box[0]) * (box[3] - box[1])
+                k_area = (k_box[2] - k_box[0]) * (k_box[3] - k_box[1])
+                if inter / (area + k_area - inter) > iou_threshold:
+                    suppressed = True
+                    break
+            if not suppressed:
+                kept.append((score, cls, box))
+                if len(kept) >= max_detections:
+                    break
+        results.append([(*box, score, cls) for score, cls, box in kept])
+    return results
+
+
+def time_call(func, repeat):
+    """返回多次调用中的最短耗时（毫秒）和最后一次结果"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000.0, result
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="NMS微基准测试")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--parts", type=int, default=300, help="每张图片的零件数量")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--confidence", type=float, default=0.5)
+    parser.add_argument("--iou", type=float, default=0.45)
+    parser.add_argument("--max-detections", type=int, default=1000)
+    args = parser.parse_args()
+
+    predictions = make_tray_predictions(args.batch_size, args.parts)
+
+    vec_ms, vec_result = time_call(
+        lambda: non_max_suppression(predictions, args.confidence, args.iou, args.max_detections),
+        args.repeat,
+    )
+    ref_ms, ref_result = time_call(
+        lambda: reference_nms(predictions, args.confidence, args.iou, args.max_detections),
+        1,
+    )
+
+    # 校验两种实现结果一致
+    for vec, ref in zip(vec_result, ref_result):
+        ref = np.asarray(ref, dtype=np.float32).reshape(-1, 6)
+        if vec.shape != ref.shape or not np.allclose(vec, ref, atol=1e-3):
+            print("❌ 向量化NMS与参考实现结果不一致")
+            return 1
+
+    kept = sum(len(r) for r in vec_result)
+    print(f"批大小: {args.batch_size}, 每张零件数: {args.parts}, 保留框数: {kept}")
+    print(f"参考实现:   {ref_ms:10.2f} ms")
+    print(f"向量化实现: {vec_ms:10.2f} ms  (加速 {ref_ms / vec_ms:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
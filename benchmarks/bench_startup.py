@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+冷启动时间基准测试
+测量 main.py 和 src.utils 的启动耗时（扣除空解释器启动时间），
+与保存的基线对比，超出容差或导入了重量级依赖时返回非零退出码；
+基线只在指定 --update-baseline 时写入，基线中没有的场景报告为跳过
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+BASELINE_FILE = PROJECT_ROOT / "data" / "results" / "startup_baseline.json"
+
+# 场景名称 -> (命令行参数, 启动时不允许导入的模块)
+HEAVY_MODULES = ('torch', 'ultralytics', 'cv2', 'pandas', 'numpy')
+SCENARIOS = {
+    'import src.utils': (['-c', 'import src.utils; src.utils.config; src.utils.path_manager'], HEAVY_MODULES),
+    'import src.data, src.models': (['-c', 'import src.data, src.models'], HEAVY_MODULES),
+    'main.py --help': (['main.py', '--help'], HEAVY_MODULES),
+    'main.py': (['main.py'], HEAVY_MODULES),
+}
+
+
+def run_once(args):
+    """运行一次子进程，返回耗时（毫秒）"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], cwd=PROJECT_ROOT, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - start) * 1000.0
+
+
+def imported_modules(args):
+    """
+    使用 -X importtime 获取一次启动中导入的所有顶层模块
+
+    Args:
+        args: 命令行参数
+
+    Returns:
+        顶层模块名集合
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=PROJECT_ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            name = line.rsplit('|', 1)[1].strip()
+            modules.add(name.split('.')[0])
+    return modules
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="冷启动时间基准测试")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许超出基线的比例")
+    parser.add_argument("--slack-ms", type=float, default=20.0, help="允许超出基线的绝对时间（毫秒）")
+    parser.add_argument("--update-baseline", action="store_true", help="将本次结果保存为基线")
+    args = parser.parse_args()
+
+    # 空解释器启动时间作为参照，各场景只比较额外开销
+    interpreter_ms = statistics.median(run_once(['-c', 'pass']) for _ in range(args.repeat))
+
+    results = {}
+    failed = False
+    for name, (command, forbidden) in SCENARIOS.items():
+        run_once(command)  # 预热文件系统缓存和 __pycache__
+        samples = [run_once(command) for _ in range(args.repeat)]
+        results[name] = max(statistics.median(samples) - interpreter_ms, 0.0)
+
+        heavy = sorted(imported_modules(command) & set(forbidden))
+        if heavy:
+            print(f"❌ {name}: 启动时导入了 {', '.join(heavy)}")
+            failed = True
+
+    baseline = {}
+    if BASELINE_FILE.exists():
+        with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    if not baseline and not args.update_baseline:
+        print(f"⚠️ 基线不存在: {BASELINE_FILE}，使用 --update-baseline 生成")
+
+    print(f"空解释器启动: {interpreter_ms:.1f} ms")
+    skipped = []
+    for name, overhead_ms in results.items():
+        line = f"{name:<30} {overhead_ms:8.1f} ms"
+        if name in baseline:
+            limit = baseline[name] * (1 + args.tolerance) + args.slack_ms
+            line += f"  (基线 {baseline[name]:.1f} ms, 上限 {limit:.1f} ms)"
+            if overhead_ms > limit:
+                line = "❌ " + line
+                failed = True
+        elif not args.update_baseline:
+            line = "⚠️ " + line + "  (基线中没有该场景，已跳过)"
+            skipped.append(name)
+        print(line)
+
+    if args.update_baseline:
+        BASELINE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"基线已保存: {BASELINE_FILE}")
+
+    if failed:
+        print("❌ 冷启动性能回退")
+        return 1
+    if skipped:
+        print(f"⚠️ 未发现冷启动回退，{len(skipped)} 个场景没有基线、未对比")
+        return 0
+    print("✅ 冷启动性能正常")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
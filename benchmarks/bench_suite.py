@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+离线性能基准测试套件
+使用合成的五金配件图片（已知标注框）测量预处理、推理、NMS、结果写入和数据集索引
+在不同批大小和线程数下的吞吐量与延迟；结果保存到 data/results/benchmark_results.json，
+并与保存的基线对比，吞吐量下降超出容差时返回非零退出码；
+基线只在指定 --update-baseline 时写入，基线中没有的条目报告为跳过
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到Python路径
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from bench_nms import make_tray_predictions  # noqa: E402
+from synthetic import make_tray_image, write_split  # noqa: E402
+from src.utils.config_loader import config  # noqa: E402
+
+RESULTS_FILE = PROJECT_ROOT / "data" / "results" / "benchmark_results.json"
+BASELINE_FILE = PROJECT_ROOT / "data" / "results" / "benchmark_baseline.json"
+
+CASES = ('preprocess', 'inference', 'nms', 'write', 'index')
+
+
+def summarize(durations, items):
+    """
+    汇总一组计时
+
+    Args:
+        durations: 每次调用的耗时（秒）
+        items: 每次调用处理的条目数（图片数、行数等）
+
+    Returns:
+        吞吐量（条目/秒，按中位耗时计算，减少偶发抖动的影响）与单次调用延迟的 p50/p95（毫秒）
+    """
+    latencies = np.asarray(durations) * 1000.0
+    return {
+        'throughput': float(items / statistics.median(durations)),
+        'latency_ms_p50': float(np.percentile(latencies, 50)),
+        'latency_ms_p95': float(np.percentile(latencies, 95)),
+    }
+
+
+def timed(func, repeat):
+    """预热一次后调用 repeat 次，返回每次的耗时（秒）"""
+    func()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def make_images(count, size, seed):
+    """生成合成托盘图片（内存中）"""
+    return [make_tray_image(np.random.default_rng([seed, i]), size[0], size[1])[0] for i in range(count)]
+
+
+def bench_preprocess(args, images):
+    """letterbox预处理：批大小 × OpenCV线程数"""
+    from src.data.preprocess import LetterboxPreprocessor
+
+    results = {}
+    input_size = config.model_config['input_size']
+    for threads in args.threads:
+        cv2.setNumThreads(threads)
+        for batch_size in args.batch_sizes:
+            preprocessor = LetterboxPreprocessor(batch_size, input_size)
+            batches = [images[i:i + batch_size] for i in range(0, len(images) - batch_size + 1, batch_size)]
+
+            def run():
+                for batch in batches:
+                    preprocessor(batch)
+
+            durations = [d / len(batches) for d in timed(run, args.repeat)]
+            results[f"batch={batch_size}/threads={threads}"] = summarize(durations, batch_size)
+    return results
+
+
+def bench_inference(args, images):
+    """模型推理（预处理+前向+NMS）：批大小 × torch线程数；缺少torch或本地模型时跳过"""
+    try:
+        import torch
+        import ultralytics  # noqa: F401
+    except ImportError as e:
+        return {'skipped': f"缺少依赖: {e.name}"}
+
+    from src.models.detector import HardwareDetector
+
+    results = {}
+    for batch_size in args.batch_sizes:
+        detector = HardwareDetector(config, batch_size=batch_size)
+        # 离线运行：不允许按名称下载模型
+        if not detector.model_path.exists():
+            return {'skipped': f"模型文件不存在: {detector.model_path}"}
+        detector.load_model()
+        batches = [images[i:i + batch_size] for i in range(0, len(images) - batch_size + 1, batch_size)]
+        for threads in args.threads:
+            torch.set_num_threads(threads)
+
+            def run():
+                for batch in batches:
+                    detector.detect_batch(batch)
+
+            durations = [d / len(batches) for d in timed(run, args.repeat)]
+            results[f"batch={batch_size}/threads={threads}"] = summarize(durations, batch_size)
+    return results
+
+
+def bench_nms(args, images):
+    """向量化NMS：批大小（纯numpy，与线程数无关）"""
+    from src.models.nms import NonMaxSuppression
+
+    nms = NonMaxSuppression(config)
+    results = {}
+    for batch_size in args.batch_sizes:
+        predictions = make_tray_predictions(batch_size, num_parts=args.parts,
+                                            num_classes=len(config.class_names))
+        durations = timed(lambda: nms(predictions), args.repeat * 5)
+        results[f"batch={batch_size}"] = summarize(durations, batch_size)
+    return results
+
+
+def bench_write(args, images):
+    """检测结果写入：缓冲写入器从 write 到 close 的总耗时，吞吐量单位为行/秒"""
+    from src.data.result_writer import DetectionResultWriter
+
+    class_names = config.class_names
+    detections = [{
+        'part_category': class_names[i % len(class_names)], 'confidence': 0.9,
+        'bbox_x': 10.0 * i, 'bbox_y': 20.0, 'bbox_width': 30.0, 'bbox_height': 40.0,
+        'detection_time_ms': 12.5, 'model_version': 'synthetic',
+    } for i in range(args.parts)]
+    num_images = 2000
+
+    results = {}
+    tmp = Path(tempfile.mkdtemp(prefix="bench_write_"))
+    try:
+        for durability in ('flush', 'fsync'):
+            def run():
+                output = tmp / 'detection_results.csv'
+                if output.exists():
+                    output.unlink()
+                writer = DetectionResultWriter(output, config, durability=durability, store=None)
+                for i in range(num_images):
+                    writer.write(f"synthetic_{i:05d}.jpg", detections)
+                writer.close()
+
+            durations = timed(run, args.repeat)
+            results[f"durability={durability}"] = summarize(durations, num_images * len(detections))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return results
+
+
+def bench_index(args, images):
+    """数据集索引：全量建立与无变化时的增量更新 × I/O线程数"""
+    from src.data.dataset_index import DatasetIndexer
+
+    results = {}
+    tmp = Path(tempfile.mkdtemp(prefix="bench_index_"))
+    try:
+        root = tmp / 'val'
+        write_split(root, args.index_images, seed=args.seed, num_classes=len(config.class_names))
+        manifest_file = tmp / 'val_manifest.json'
+        for threads in args.threads:
+            indexer = DatasetIndexer(config, io_workers=threads)
+            full = timed(lambda: indexer.build('val', root, force=True, manifest_file=manifest_file),
+                         args.repeat)
+            incremental = timed(lambda: indexer.build('val', root, manifest_file=manifest_file),
+                                args.repeat)
+            results[f"full/threads={threads}"] = summarize(full, args.index_images)
+            results[f"incremental/threads={threads}"] = summarize(incremental, args.index_images)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return results
+
+
+BENCHMARKS = {
+    'preprocess': bench_preprocess,
+    'inference': bench_inference,
+    'nms': bench_nms,
+    'write': bench_write,
+    'index': bench_index,
+}
+
+
+def compare(results, baseline, tolerance):
+    """
+    与基线对比吞吐量
+
+    Returns:
+        (回退列表, 跳过列表)：吞吐量下降超出容差的条目 [(名称, 当前值, 基线值), ...]，
+        以及基线中没有对应记录、未做对比的条目名称
+    """
+    regressions = []
+    skipped = []
+    for case, entries in results.items():
+        for key, value in entries.items():
+            if not isinstance(value, dict):
+                continue
+            reference = baseline.get(case, {}).get(key)
+            if not isinstance(reference, dict):
+                skipped.append(f"{case}/{key}")
+                continue
+            if value['throughput'] < reference['throughput'] * (1 - tolerance):
+                regressions.append((f"{case}/{key}", value['throughput'], reference['throughput']))
+    return regressions, skipped
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="离线性能基准测试套件")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--images", type=int, default=32, help="合成图片数量")
+    parser.add_argument("--image-size", type=int, nargs=2, default=[1280, 960], metavar=("W", "H"))
+    parser.add_argument("--index-images", type=int, default=500, help="索引测试的数据集图片数量")
+    parser.add_argument("--parts", type=int, default=50, help="NMS/写入测试中每张图片的配件数")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许低于基线吞吐量的比例")
+    parser.add_argument("--update-baseline", action="store_true", help="将本次结果保存为基线")
+    args = parser.parse_args()
+    args.threads = sorted(set(args.threads))
+
+    images = make_images(args.images, args.image_size, args.seed)
+
+    results = {}
+    for case in args.cases:
+        start = time.perf_counter()
+        results[case] = BENCHMARKS[case](args, images)
+        print(f"\n[{case}] ({time.perf_counter() - start:.1f} s)")
+        for key, value in results[case].items():
+            if isinstance(value, dict):
+                print(f"  {key:<28} {value['throughput']:12.1f}/s  "
+                      f"p50 {value['latency_ms_p50']:9.2f} ms  p95 {value['latency_ms_p95']:9.2f} ms")
+            else:
+                print(f"  {key}: {value}")
+
+    report = {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+        },
+        'parameters': {k: v for k, v in vars(args).items() if k != 'update_baseline'},
+        'results': results,
+    }
+    RESULTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(RESULTS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存: {RESULTS_FILE}")
+
+    baseline = {}
+    if BASELINE_FILE.exists():
+        with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+            baseline = json.load(f).get('results', {})
+
+    if args.update_baseline:
+        shutil.copyfile(RESULTS_FILE, BASELINE_FILE)
+        print(f"基线已保存: {BASELINE_FILE}")
+        return 0
+    if not baseline:
+        print(f"⚠️ 基线不存在: {BASELINE_FILE}，使用 --update-baseline 生成")
+
+    regressions, skipped = compare(results, baseline, args.tolerance)
+    for name in skipped:
+        print(f"⚠️ {name}: 基线中没有该条目，已跳过")
+    for name, value, reference in regressions:
+        print(f"❌ {name}: {value:.1f}/s，基线 {reference:.1f}/s ({value / reference - 1:+.0%})")
+    if regressions:
+        print("❌ 性能回退")
+        return 1
+    if skipped:
+        print(f"⚠️ 未发现性能回退，{len(skipped)} 项没有基线、未对比")
+        return 0
+    print("✅ 性能与基线一致")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+HTTP推理服务压力测试
+用 asyncio 长连接客户端以固定并发向 server.py 发送检测请求（合成托盘图片或指定图片），
+统计吞吐量、成功请求的延迟分位数和 503 拒绝率，结果保存到 data/results/load_test.json
+
+先启动服务: python server.py
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到Python路径
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from synthetic import make_tray_image  # noqa: E402
+from src.utils.config_loader import config  # noqa: E402
+
+RESULTS_FILE = PROJECT_ROOT / "data" / "results" / "load_test.json"
+
+
+def load_payload(image_path, stream_images):
+    """
+    构造请求
+
+    Args:
+        image_path: 图片文件，为None时生成一张合成托盘图片
+        stream_images: 大于0时发送 /detect/stream 请求，每个请求包含该数量的图片
+
+    Returns:
+        (路径, 请求体, Content-Type, 每个请求的图片数)
+    """
+    if image_path:
+        data = Path(image_path).read_bytes()
+    else:
+        image, _ = make_tray_image(np.random.default_rng(0))
+        data = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+    if stream_images > 0:
+        encoded = base64.b64encode(data).decode('ascii')
+        body = json.dumps({'images': [encoded] * stream_images}).encode('utf-8')
+        return '/detect/stream', body, 'application/json', stream_images
+    return '/detect', data, 'image/jpeg', 1
+
+
+async def read_response(reader):
+    """读取一个响应，返回 (状态码, 响应头, 响应体)；支持分块传输"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("连接已关闭")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            if size == 0:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        return status, headers, b''.join(chunks)
+    return status, headers, await reader.readexactly(int(headers.get('content-length', 0)))
+
+
+async def client(host, port, request, deadline, remaining, results):
+    """一个长连接客户端：顺序发送请求直到达到时长或总请求数"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline and remaining[0] > 0:
+            remaining[0] -= 1
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            try:
+                status, headers, _ = await read_response(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                results.append((0, time.perf_counter() - start))
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            results.append((status, time.perf_counter() - start))
+            if headers.get('connection', '').lower() == 'close':
+                # 服务繁忙时拒绝后会关闭连接
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+            if status == 503:
+                # 按 Retry-After 的思路稍后重试，避免空转
+                await asyncio.sleep(0.01)
+    finally:
+        writer.close()
+
+
+async def run(args):
+    """按参数运行压力测试，返回统计结果"""
+    parts = urlsplit(args.url)
+    host, port = parts.hostname, parts.port or 80
+    path, body, content_type, images_per_request = load_payload(args.image, args.stream_images)
+    request = (f"POST {path} HTTP/1.1\r\nHost: {host}:{port}\r\nContent-Type: {content_type}\r\n"
+               f"Content-Length: {len(body)}\r\n\r\n").encode('latin-1') + body
+
+    results = []
+    remaining = [args.requests or float('inf')]
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(client(host, port, request, deadline, remaining, results)
+                           for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    statuses = Counter(status for status, _ in results)
+    ok = np.array([latency for status, latency in results if status == 200]) * 1000.0
+    return {
+        'url': args.url,
+        'path': path,
+        'concurrency': args.concurrency,
+        'images_per_request': images_per_request,
+        'elapsed_s': elapsed,
+        'requests': len(results),
+        'status_counts': {str(status): count for status, count in sorted(statuses.items())},
+        'requests_per_second': statuses[200] / elapsed,
+        'images_per_second': statuses[200] * images_per_request / elapsed,
+        'rejected_rate': statuses[503] / len(results) if results else 0.0,
+        'latency_ms_p50': float(np.percentile(ok, 50)) if len(ok) else None,
+        'latency_ms_p95': float(np.percentile(ok, 95)) if len(ok) else None,
+        'latency_ms_p99': float(np.percentile(ok, 99)) if len(ok) else None,
+    }
+
+
+def main():
+    """主函数"""
+    server_config = config.get_config().get('server_config', {})
+    default_url = f"http://{server_config.get('host', '127.0.0.1')}:{server_config.get('port', 8080)}"
+
+    parser = argparse.ArgumentParser(description="HTTP推理服务压力测试")
+    parser.add_argument("--url", default=default_url, help="服务地址")
+    parser.add_argument("--concurrency", type=int, default=16, help="并发连接数")
+    parser.add_argument("--duration", type=float, default=10.0, help="测试时长（秒）")
+    parser.add_argument("--requests", type=int, default=None, help="总请求数上限")
+    parser.add_argument("--image", default=None, help="请求使用的图片，默认生成合成托盘图片")
+    parser.add_argument("--stream-images", type=int, default=0,
+                        help="大于0时测试 /detect/stream，每个请求包含该数量的图片")
+    args = parser.parse_args()
+
+    try:
+        result = asyncio.run(run(args))
+    except OSError as e:
+        print(f"❌ 无法连接服务 {args.url}: {e}（先运行 python server.py）")
+        return 1
+
+    def fmt(value):
+        return "-" if value is None else f"{value:.1f}"
+
+    print(f"\n{result['path']} 并发 {result['concurrency']}, {result['elapsed_s']:.1f}s: "
+          f"{result['requests']} 个请求 {result['status_counts']}")
+    print(f"  吞吐量: {result['requests_per_second']:.1f} 请求/秒, {result['images_per_second']:.1f} 张/秒")
+    print(f"  延迟 p50/p95/p99 = {fmt(result['latency_ms_p50'])}/{fmt(result['latency_ms_p95'])}/"
+          f"{fmt(result['latency_ms_p99'])} ms, 503比例 {result['rejected_rate']:.1%}")
+
+    RESULTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(RESULTS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存: {RESULTS_FILE}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+合成五金配件图片
+在带噪声的托盘背景上绘制 class_names 中的五类配件，并给出精确的YOLO格式标注，
+供基准测试离线使用（不依赖真实数据集和网络）
+"""
+
+from pathlib import Path
+from typing import List, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+# 托盘背景灰度与配件颜色（BGR）
+TRAY_GRAY = 70
+PART_COLORS = ((200, 200, 205), (180, 185, 190), (210, 205, 200), (160, 170, 175), (190, 180, 170))
+
+
+def _hex_nut(image, center, size, color, rng):
+    radius = size / 2
+    angles = rng.uniform(0, np.pi / 3) + np.arange(6) * np.pi / 3
+    points = np.stack([center[0] + radius * np.cos(angles), center[1] + radius * np.sin(angles)], axis=1)
+    cv2.fillPoly(image, [np.round(points).astype(np.int32)], color, cv2.LINE_AA)
+    cv2.circle(image, tuple(np.round(center).astype(int)), int(radius * 0.45), (TRAY_GRAY,) * 3, -1,
+               cv2.LINE_AA)
+    return points.min(axis=0), points.max(axis=0)
+
+
+def _cross_screw(image, center, size, color, rng):
+    radius = size / 2
+    c = tuple(np.round(center).astype(int))
+    cv2.circle(image, c, int(radius), color, -1, cv2.LINE_AA)
+    arm = int(radius * 0.6)
+    thickness = max(int(radius * 0.15), 1)
+    cv2.line(image, (c[0] - arm, c[1]), (c[0] + arm, c[1]), (40, 40, 40), thickness)
+    cv2.line(image, (c[0], c[1] - arm), (c[0], c[1] + arm), (40, 40, 40), thickness)
+    return center - int(radius), center + int(radius)
+
+
+def _flat_washer(image, center, size, color, rng):
+    radius = size / 2
+    c = tuple(np.round(center).astype(int))
+    cv2.circle(image, c, int(radius), color, -1, cv2.LINE_AA)
+    cv2.circle(image, c, int(radius * 0.5), (TRAY_GRAY,) * 3, -1, cv2.LINE_AA)
+    return center - int(radius), center + int(radius)
+
+
+def _l_bracket(image, center, size, color, rng):
+    half = size / 2
+    arm = size * 0.3
+    x0, y0 = center - half
+    points = np.array([[x0, y0], [x0 + arm, y0], [x0 + arm, y0 + size - arm],
+                       [x0 + size, y0 + size - arm], [x0 + size, y0 + size], [x0, y0 + size]])
+    if rng.random() < 0.5:
+        points[:, 0] = 2 * center[0] - points[:, 0]
+    cv2.fillPoly(image, [np.round(points).astype(np.int32)], color, cv2.LINE_AA)
+    return points.min(axis=0), points.max(axis=0)
+
+
+def _eccentric_wheel(image, center, size, color, rng):
+    radius = size / 2
+    c = tuple(np.round(center).astype(int))
+    cv2.circle(image, c, int(radius), color, -1, cv2.LINE_AA)
+    offset = rng.uniform(-0.3, 0.3, 2) * radius
+    hole = tuple(np.round(center + offset).astype(int))
+    cv2.circle(image, hole, int(radius * 0.25), (TRAY_GRAY,) * 3, -1, cv2.LINE_AA)
+    return center - int(radius), center + int(radius)
+
+
+# 类别编号 -> 绘制函数，顺序与 config.json 中的 class_names 一致
+PART_DRAWERS = (_hex_nut, _cross_screw, _flat_washer, _l_bracket, _eccentric_wheel)
+
+
+def make_tray_image(rng: np.random.Generator, width: int = 1280, height: int = 960,
+                    num_parts: int = 12, num_classes: int = len(PART_DRAWERS),
+                    min_size: int = 24, max_size: int = 96) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    生成一张托盘图片及其标注
+
+    配件放在互不重叠的网格单元中，标注框为绘制图形的外接矩形。
+
+    Args:
+        rng: 随机数生成器
+        width: 图片宽度
+        height: 图片高度
+        num_parts: 配件数量（不超过网格单元数）
+        num_classes: 使用前 num_classes 个类别
+        min_size: 配件最小尺寸（像素）
+        max_size: 配件最大尺寸（像素）
+
+    Returns:
+        (BGR uint8 图片, 形状为 (N, 5) 的 float32 标注 [class, cx, cy, w, h]，归一化坐标)
+    """
+    image = rng.normal(TRAY_GRAY, 6, size=(height, width, 3)).clip(0, 255).astype(np.uint8)
+
+    cell = max_size + 8
+    cols, rows = max(width // cell, 1), max(height // cell, 1)
+    cells = rng.permutation(cols * rows)[:num_parts]
+
+    labels: List[Tuple[float, float, float, float, float]] = []
+    for index in cells:
+        cls = int(rng.integers(0, num_classes))
+        size = float(rng.uniform(min_size, max_size))
+        cell_origin = np.array([(index % cols) * cell, (index // cols) * cell], dtype=np.float64)
+        slack = cell - size
+        center = cell_origin + size / 2 + rng.uniform(0, max(slack, 0), 2)
+        color = PART_COLORS[cls % len(PART_COLORS)]
+        top_left, bottom_right = PART_DRAWERS[cls % len(PART_DRAWERS)](image, center, size, color, rng)
+        x1, y1 = np.clip(top_left, 0, [width, height])
+        x2, y2 = np.clip(bottom_right, 0, [width, height])
+        labels.append((cls, (x1 + x2) / 2 / width, (y1 + y2) / 2 / height,
+                       (x2 - x1) / width, (y2 - y1) / height))
+    return image, np.asarray(labels, dtype=np.float32).reshape(-1, 5)
+
+
+def write_split(root: Union[str, Path], num_images: int, seed: int = 0,
+                image_size: Sequence[int] = (1280, 960), num_parts: int = 12,
+                num_classes: int = len(PART_DRAWERS)) -> List[Path]:
+    """
+    生成一个YOLO目录结构的数据集划分（images/*.jpg 与 labels/*.txt）
+
+    Args:
+        root: 划分目录
+        num_images: 图片数量
+        seed: 随机种子，相同参数生成的文件逐字节一致
+        image_size: 图片尺寸 (宽, 高)
+        num_parts: 每张图片的配件数量
+        num_classes: 类别数量
+
+    Returns:
+        图片路径列表
+    """
+    root = Path(root)
+    (root / 'images').mkdir(parents=True, exist_ok=True)
+    (root / 'labels').mkdir(parents=True, exist_ok=True)
+
+    paths = []
+    for index in range(num_images):
+        rng = np.random.default_rng([seed, index])
+        image, labels = make_tray_image(rng, image_size[0], image_size[1], num_parts, num_classes)
+        path = root / 'images' / f"synthetic_{index:05d}.jpg"
+        cv2.imwrite(str(path), image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        with open(root / 'labels' / f"synthetic_{index:05d}.txt", 'w', encoding='utf-8') as f:
+            f.writelines(f"{int(c)} {cx:.6f} {cy:.6f} {w:.6f} {h:.6f}\n" for c, cx, cy, w, h in labels)
+        paths.append(path)
+    return paths
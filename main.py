@@ -6,6 +6,7 @@ Hardware Parts Recognition System
 Main entry point for the application.
 """
 
+import argparse
 import sys
 import os
 from pathlib import Path
@@ -13,8 +14,311 @@ from pathlib import Path
 # Add src directory to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-def main():
+def parse_args(argv=None):
+    """
+    解析命令行参数
+    
+    Args:
+        argv: 参数列表，默认使用 sys.argv
+    
+    Returns:
+        解析后的参数
+    """
+    parser = argparse.ArgumentParser(description="基于YOLOv8的五金配件识别系统")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    detect_parser = subparsers.add_parser("detect", help="单张图片检测")
+    detect_parser.add_argument("images", nargs="+", help="待检测的图片路径")
+    detect_parser.add_argument("--tiled", action="store_true",
+                               help="高分辨率图片分块推理（小零件），参数见 tiling_config")
+    
+    stream_parser = subparsers.add_parser("stream", help="视频文件/相机流实时检测")
+    stream_parser.add_argument("source", help="视频文件、设备编号（如 0）、设备路径（如 /dev/video0）或流地址")
+    stream_parser.add_argument("--duration", type=float, default=None, help="最长运行时间（秒）")
+    stream_parser.add_argument("--max-frames", type=int, default=None, help="最多检测的帧数")
+    stream_parser.add_argument("--no-realtime", action="store_true",
+                               help="视频文件不按原始帧率读取，逐帧检测（不丢帧）")
+    stream_parser.add_argument("--motion-gate", action="store_true",
+                               help="固定机位：画面无变化时沿用上一帧结果，局部变化时只检测变化区域")
+    
+    batch_parser = subparsers.add_parser("batch", help="批量图片处理")
+    batch_parser.add_argument("source", help="图片目录或通配符，如 data/datasets/test")
+    batch_parser.add_argument("--workers", type=int, default=None, help="解码进程数，默认CPU核数")
+    batch_parser.add_argument("--batch-size", type=int, default=None, help="推理批大小")
+    batch_parser.add_argument("--output", default=None, help="结果CSV路径")
+    batch_parser.add_argument("--backend", default=None, choices=["torch", "onnx", "onnx_int8"],
+                              help="推理后端，默认读取 inference_config.backend")
+    
+    report_parser = subparsers.add_parser("report", help="检测结果统计报告")
+    report_parser.add_argument("sources", nargs="*", help="结果CSV或列式存储目录，默认为检测结果CSV")
+    report_parser.add_argument("--start", default=None, help="起始时间，如 '2024-01-01 08:00:00'")
+    report_parser.add_argument("--end", default=None, help="结束时间（不含）")
+    report_parser.add_argument("--workers", type=int, default=1, help="并行统计的进程数")
+    
+    index_parser = subparsers.add_parser("index", help="建立或增量更新数据集清单")
+    index_parser.add_argument("--split", action="append", default=None,
+                              help="数据集划分，可重复指定，默认 train/val/test")
+    index_parser.add_argument("--force", action="store_true", help="忽略旧清单，重新读取所有文件")
+    
+    pack_parser = subparsers.add_parser("pack", help="将数据集划分打包为训练分片")
+    pack_parser.add_argument("--split", action="append", default=None,
+                             help="数据集划分，可重复指定，默认 train/val/test")
+    pack_parser.add_argument("--force", action="store_true", help="源数据未变化时也重新打包")
+    
+    evaluate_parser = subparsers.add_parser("evaluate", help="在带标注的数据集上评估模型")
+    evaluate_parser.add_argument("--split", default="val", help="数据集划分，默认 val")
+    evaluate_parser.add_argument("--batch-size", type=int, default=None, help="推理批大小")
+    evaluate_parser.add_argument("--confidence", type=float, default=0.001,
+                                 help="计算mAP时NMS使用的最低置信度")
+    evaluate_parser.add_argument("--backend", default=None, choices=["torch", "onnx", "onnx_int8"],
+                                 help="推理后端，默认读取 inference_config.backend")
+    
+    export_parser = subparsers.add_parser("export", help="导出ONNX模型，可选INT8量化")
+    export_parser.add_argument("--int8", action="store_true", help="导出后用验证集图片做INT8静态量化")
+    export_parser.add_argument("--calibration-images", type=int, default=None,
+                               help="校准图片数量，默认读取 export_config.calibration_images")
+    
+    return parser.parse_args(argv)
+
+
+def run_detect(args, config, logger):
+    """
+    执行单张图片检测
+    
+    Args:
+        args: 命令行参数
+        config: 配置加载器
+        logger: 日志记录器
+    """
+    from src.data.result_writer import DetectionResultWriter
+    from src.models import CachedDetector, HardwareDetector
+    
+    if args.tiled:
+        from src.models import TiledDetector
+        
+        # 分块结果与整图结果不同，不经过检测缓存
+        detector = TiledDetector(HardwareDetector(config), config)
+        with DetectionResultWriter(config_loader=config) as writer:
+            for image in args.images:
+                detections = detector.detect(image)
+                writer.write(image, detections)
+                logger.info(f"{image}: 分块检测到 {len(detections)} 个配件")
+                print(f"\n📷 {image}: {len(detections)} 个配件")
+                for det in detections:
+                    print(f"   - {det['part_category']} {det['confidence']:.2f} "
+                          f"[{det['bbox_x']:.0f}, {det['bbox_y']:.0f}, "
+                          f"{det['bbox_width']:.0f}, {det['bbox_height']:.0f}]")
+        return 0
+    
+    with HardwareDetector(config) as detector, DetectionResultWriter(config_loader=config) as writer:
+        cached_detector = CachedDetector(detector)
+        futures = [(image, cached_detector.submit(image)) for image in args.images]
+        for image, future in futures:
+            detections = future.result()
+            writer.write(image, detections)
+            logger.info(f"{image}: 检测到 {len(detections)} 个配件")
+            print(f"\n📷 {image}: {len(detections)} 个配件")
+            for det in detections:
+                print(f"   - {det['part_category']} {det['confidence']:.2f} "
+                      f"[{det['bbox_x']:.0f}, {det['bbox_y']:.0f}, "
+                      f"{det['bbox_width']:.0f}, {det['bbox_height']:.0f}]")
+    return 0
+
+
+def run_stream(args, config, logger):
+    """
+    视频文件/相机流实时检测（采集线程只保留最新帧，推理跟不上时丢弃旧帧）
+    
+    Args:
+        args: 命令行参数
+        config: 配置加载器
+        logger: 日志记录器
+    """
+    from src.data.result_writer import DetectionResultWriter
+    from src.models import HardwareDetector, StreamDetector
+    
+    with HardwareDetector(config) as detector, DetectionResultWriter(config_loader=config) as writer:
+        def on_result(frame, detections):
+            writer.write(f"{args.source}#{frame.index}", detections)
+        
+        gated = None
+        if args.motion_gate:
+            from src.models import MotionGatedDetector
+            gated = MotionGatedDetector(detector, config)
+        stream = StreamDetector(gated or detector, args.source, config, on_result=on_result,
+                                realtime=False if args.no_realtime else None)
+        stats = stream.run(max_frames=args.max_frames, duration=args.duration)
+    
+    print(f"\n🎥 {stats['source']}: 采集 {stats['captured']} 帧, 检测 {stats['processed']} 帧, "
+          f"丢弃 {stats['dropped']} 帧 (丢帧率 {stats['drop_rate']:.1%})")
+    print(f"✅ 帧率: 采集 {stats['capture_fps']:.1f} fps, 检测 {stats['processed_fps']:.1f} fps "
+          f"(源 {stats['source_fps']:.1f} fps)")
+    print(f"✅ 端到端延迟 p50/p95 = {stats['latency_p50_ms']:.1f}/{stats['latency_p95_ms']:.1f} ms")
+    print(f"✅ 检测配件: {stats['detections']} 个")
+    if gated is not None:
+        gate = gated.statistics()
+        print(f"✅ 运动门控: 沿用结果 {gate['skipped']} 帧 ({gate['skip_rate']:.1%}), "
+              f"区域推理 {gate['regional']} 帧, 整帧推理 {gate['full']} 帧")
+    return 0
+
+
+def run_batch(args, config, logger):
+    """
+    执行批量图片处理
+    
+    Args:
+        args: 命令行参数
+        config: 配置加载器
+        logger: 日志记录器
+    """
+    from src.models import BatchProcessor, HardwareDetector
+    
+    detector = HardwareDetector(config, batch_size=args.batch_size, backend=args.backend)
+    processor = BatchProcessor(
+        detector, config,
+        output_file=args.output,
+        decode_workers=args.workers,
+    )
+    stats = processor.run(args.source)
+    
+    print(f"\n✅ 处理图片: {stats['images']} 张 (失败 {stats['failed']} 张)")
+    print(f"✅ 检测配件: {stats['detections']} 个")
+    print(f"✅ 吞吐量: {stats['images_per_second']:.1f} 张/秒")
+    
+    from src.utils.metrics import metrics
+    if metrics.enabled:
+        for stage, item in metrics.summary().items():
+            print(f"   {stage:<12} {item['count']:8d} 次  平均 {item['mean_ms']:8.2f} ms  合计 {item['total_ms']:10.1f} ms")
+        print(f"✅ 阶段耗时指标: {metrics.export()}")
+    return 0 if stats['failed'] == 0 else 1
+
+
+def run_report(args, config, logger):
+    """
+    输出检测结果统计报告
+    
+    Args:
+        args: 命令行参数
+        config: 配置加载器
+        logger: 日志记录器
+    """
+    from src.data.result_analytics import compute_stats
+    from src.utils import path_manager
+    
+    sources = args.sources or [path_manager.get_detection_results_file()]
+    summary = compute_stats(sources, args.start, args.end, workers=args.workers).summary()
+    
+    def fmt(value):
+        return "-" if value is None else f"{value:.1f}"
+    
+    print(f"\n📊 检测总数: {summary['total']}")
+    for name, item in summary['categories'].items():
+        latency = item['detection_time_ms']
+        print(f"   - {name}: {item['count']} 个, 耗时 p50/p95/p99 = "
+              f"{fmt(latency['p50'])}/{fmt(latency['p95'])}/{fmt(latency['p99'])} ms")
+    latency = summary['detection_time_ms']
+    print(f"⏱️ 总体耗时 p50/p95/p99 = {fmt(latency['p50'])}/{fmt(latency['p95'])}/{fmt(latency['p99'])} ms")
+    logger.info(f"统计报告生成完成: {summary['total']} 条检测记录")
+    return 0
+
+
+def run_index(args, config, logger):
+    """
+    建立或增量更新数据集清单
+    
+    Args:
+        args: 命令行参数
+        config: 配置加载器
+        logger: 日志记录器
+    """
+    from src.data.dataset_index import SPLITS, DatasetIndexer
+    
+    indexer = DatasetIndexer(config)
+    for split in args.split or SPLITS:
+        stats = indexer.build(split, force=args.force).statistics()
+        print(f"\n📁 {split}: {stats['images']} 张图片, {stats['labeled_images']} 张有标注, "
+              f"{stats['boxes']} 个标注框 (异常 {stats['invalid_boxes']} 个)")
+        for name, count in stats['class_counts'].items():
+            print(f"   - {name}: {count}")
+    return 0
+
+
+def run_pack(args, config, logger):
+    """
+    将数据集划分打包为训练分片（源数据未变化时跳过）
+    
+    Args:
+        args: 命令行参数
+        config: 配置加载器
+        logger: 日志记录器
+    """
+    from src.data.dataset_index import SPLITS
+    from src.data.shard_store import ShardDataset, ShardPacker
+    
+    packer = ShardPacker(config)
+    for split in args.split or SPLITS:
+        dataset = ShardDataset(split, packer.pack(split, force=args.force))
+        print(f"\n📦 {split}: {len(dataset)} 张图片, {len(dataset.meta['shards'])} 个分片, "
+              f"{dataset.meta['bytes'] / 1024 / 1024:.1f} MB -> {dataset.shard_dir}")
+    return 0
+
+
+def run_evaluate(args, config, logger):
+    """
+    在带标注的数据集上评估模型
+    
+    Args:
+        args: 命令行参数
+        config: 配置加载器
+        logger: 日志记录器
+    """
+    import numpy as np
+    from src.models import HardwareDetector
+    from src.models.evaluator import evaluate_detector
+    
+    detector = HardwareDetector(config, batch_size=args.batch_size, backend=args.backend)
+    try:
+        metrics = evaluate_detector(detector, args.split, config, confidence=args.confidence)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    
+    print(f"\n📈 {args.split}: {metrics['images']} 张图片")
+    print(f"   mAP@0.5 = {metrics['map50']:.4f}, mAP@0.5:0.95 = {metrics['map50_95']:.4f}")
+    print(f"   后端 {detector.backend} ({detector.model_version}): {metrics['images_per_second']:.1f} 张/秒")
+    for name, item in metrics['per_class'].items():
+        print(f"   - {name}: P={item['precision']:.3f} R={item['recall']:.3f} F1={item['f1']:.3f} "
+              f"AP50={item['ap50']:.3f} (真值 {item['support']})")
+    print("   混淆矩阵（行: 预测, 列: 真实, 最后一行/列为背景）:")
+    print(np.array(metrics['confusion_matrix']))
+    logger.info(f"评估完成: {args.split} mAP@0.5={metrics['map50']:.4f}")
+    return 0
+
+
+def run_export(args, config, logger):
+    """
+    导出ONNX模型，可选INT8量化
+    
+    Args:
+        args: 命令行参数
+        config: 配置加载器
+        logger: 日志记录器
+    """
+    from src.models.backends import export_onnx, quantize_int8
+    
+    onnx_path = export_onnx(config_loader=config)
+    print(f"\n✅ ONNX模型: {onnx_path}")
+    if args.int8:
+        int8_path = quantize_int8(onnx_path, config, num_images=args.calibration_images)
+        print(f"✅ INT8模型: {int8_path}")
+    print("   对比各后端精度与速度: python benchmarks/bench_backends.py")
+    return 0
+
+
+def main(argv=None):
     """主应用程序入口点"""
+    args = parse_args(argv)
+    
     print("Hardware Parts Recognition System")
     print("基于YOLOv8的五金配件识别系统")
     print("=" * 50)
@@ -26,10 +330,6 @@ def main():
         # 初始化日志
         logger.info("系统启动中...")
         
-        # 确保所有必需目录存在
-        path_manager.create_all_dirs()
-        logger.info("项目目录结构检查完成")
-        
         # 加载配置
         config_data = config.load_config()
         logger.info("配置文件加载成功")
@@ -38,6 +338,27 @@ def main():
         print(f"✅ 支持的配件类别: {', '.join(config.class_names)}")
         print(f"✅ 置信度阈值: {config.model_config['confidence_threshold']}")
         
+        if args.command == "detect":
+            return run_detect(args, config, logger)
+        if args.command == "stream":
+            return run_stream(args, config, logger)
+        if args.command == "batch":
+            return run_batch(args, config, logger)
+        if args.command == "report":
+            return run_report(args, config, logger)
+        if args.command == "index":
+            return run_index(args, config, logger)
+        if args.command == "pack":
+            return run_pack(args, config, logger)
+        if args.command == "evaluate":
+            return run_evaluate(args, config, logger)
+        if args.command == "export":
+            return run_export(args, config, logger)
+        
+        # 确保所有必需目录存在（各命令写入文件时会自行创建所需目录，只在初始化时整体检查）
+        path_manager.create_all_dirs()
+        logger.info("项目目录结构检查完成")
+        
         # TODO: 根据命令行参数初始化GUI或CLI界面
         print("\n🎉 系统初始化成功！")
         print("📋 可用功能:")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Hardware Parts Recognition HTTP Service
+基于YOLOv8的五金配件识别系统 - 本地HTTP推理服务
+
+多个工位共享一个进程和一份模型：并发请求合并成批次推理，繁忙时返回 503。
+接口说明见 src/service/inference_server.py
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+
+def parse_args(argv=None):
+    """
+    解析命令行参数
+
+    Args:
+        argv: 参数列表，默认使用 sys.argv
+
+    Returns:
+        解析后的参数
+    """
+    parser = argparse.ArgumentParser(description="五金配件识别HTTP推理服务")
+    parser.add_argument("--host", default=None, help="监听地址，默认读取 server_config.host")
+    parser.add_argument("--port", type=int, default=None, help="监听端口，默认读取 server_config.port")
+    parser.add_argument("--batch-size", type=int, default=None, help="最大批大小")
+    parser.add_argument("--max-wait-ms", type=float, default=None, help="凑批的延迟预算（毫秒）")
+    parser.add_argument("--max-pending", type=int, default=None, help="排队图片数上限，超出时返回503")
+    parser.add_argument("--workers", type=int, default=None, help="推理线程数，每个线程一个共享权重的检测器副本")
+    parser.add_argument("--backend", default=None, choices=["torch", "onnx", "onnx_int8"],
+                        help="推理后端，默认读取 inference_config.backend")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """服务入口"""
+    args = parse_args(argv)
+
+    try:
+        from src.models import HardwareDetector
+        from src.service import InferenceServer
+        from src.utils import config, logger
+
+        config.load_config()
+        detector = HardwareDetector(config, batch_size=args.batch_size, backend=args.backend)
+        server = InferenceServer(
+            detector, config,
+            host=args.host,
+            port=args.port,
+            max_wait_ms=args.max_wait_ms,
+            max_pending=args.max_pending,
+            workers=args.workers,
+        )
+        asyncio.run(server.serve_forever())
+        return 0
+
+    except KeyboardInterrupt:
+        return 0
+    except Exception as e:
+        print(f"❌ 推理服务启动失败: {e}")
+        if 'logger' in locals():
+            logger.error(f"推理服务启动失败: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,85 @@
-# Data module for data management and processing
\ No newline at end of file
+"""
+数据模块
+提供数据管理和预处理相关功能
+
+子模块按需导入，访问其中的名称时才加载（避免命令行启动时导入OpenCV、pandas等）
+"""
+
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .preprocess import LetterboxPreprocessor, scale_boxes, boxes_to_bbox_columns
+    from .result_writer import DetectionResultWriter, CSV_COLUMNS
+    from .result_store import DetectionResultStore
+    from .video_source import FrameCapture, LatestFrameBuffer
+    from .result_analytics import DetectionStats, LatencySketch, compute_stats
+    from .dataset_index import DatasetIndexer, DatasetManifest, parse_label_file
+    from .shard_store import ShardPacker, ShardDataset
+    from .augmentation import BatchAugmenter, AugmentationPool, transform_boxes
+    from .train_loader import TrainDataLoader
+    from .training_history import TrainingHistoryWriter, TrainingHistory
+
+# 名称 -> 所在子模块
+_LAZY_ATTRS = {
+    'LetterboxPreprocessor': 'preprocess',
+    'scale_boxes': 'preprocess',
+    'boxes_to_bbox_columns': 'preprocess',
+    'DetectionResultWriter': 'result_writer',
+    'CSV_COLUMNS': 'result_writer',
+    'DetectionResultStore': 'result_store',
+    'FrameCapture': 'video_source',
+    'LatestFrameBuffer': 'video_source',
+    'DetectionStats': 'result_analytics',
+    'LatencySketch': 'result_analytics',
+    'compute_stats': 'result_analytics',
+    'DatasetIndexer': 'dataset_index',
+    'DatasetManifest': 'dataset_index',
+    'parse_label_file': 'dataset_index',
+    'ShardPacker': 'shard_store',
+    'ShardDataset': 'shard_store',
+    'BatchAugmenter': 'augmentation',
+    'AugmentationPool': 'augmentation',
+    'transform_boxes': 'augmentation',
+    'TrainDataLoader': 'train_loader',
+    'TrainingHistoryWriter': 'training_history',
+    'TrainingHistory': 'training_history',
+}
+
+__all__ = [
+    'LetterboxPreprocessor',
+    'scale_boxes',
+    'boxes_to_bbox_columns',
+    'DetectionResultWriter',
+    'CSV_COLUMNS',
+    'DetectionResultStore',
+    'FrameCapture',
+    'LatestFrameBuffer',
+    'DetectionStats',
+    'LatencySketch',
+    'compute_stats',
+    'DatasetIndexer',
+    'DatasetManifest',
+    'parse_label_file',
+    'ShardPacker',
+    'ShardDataset',
+    'BatchAugmenter',
+    'AugmentationPool',
+    'transform_boxes',
+    'TrainDataLoader',
+    'TrainingHistoryWriter',
+    'TrainingHistory'
+]
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
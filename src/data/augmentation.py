@@ -0,0 +1,356 @@
+"""
+数据增强
+按 data_augmentation 配置（旋转、亮度、缩放、水平翻转）对整批图片做增强：
+letterbox和所有几何变换合并为每张图片一次仿射变换，亮度和标注框变换对整批向量化计算
+"""
+
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from ..utils.config_loader import ConfigLoader, config as default_config
+from .preprocess import PAD_VALUE
+
+# 变换后保留标注框的条件：宽高至少2像素，且可见面积不低于变换后完整面积的10%
+MIN_BOX_SIZE = 2.0
+MIN_VISIBLE_RATIO = 0.1
+
+
+def batch_rng(seed: int, epoch: int, batch_index: int) -> np.random.Generator:
+    """
+    为一个批次创建随机数生成器
+
+    随机序列只由 (seed, epoch, batch_index) 决定，与批次由哪个工作进程处理无关，
+    因此增强结果在不同进程数下可复现。
+
+    Args:
+        seed: 全局随机种子
+        epoch: 训练轮次
+        batch_index: 批次序号
+
+    Returns:
+        numpy随机数生成器
+    """
+    return np.random.default_rng([seed, epoch, batch_index])
+
+
+def transform_boxes(labels: np.ndarray, shapes: np.ndarray, matrices: np.ndarray,
+                    output_size: Tuple[int, int]) -> np.ndarray:
+    """
+    对整批标注框应用各自图片的仿射变换
+
+    Args:
+        labels: (M, 6) 数组，每行为 [图片序号, class, cx, cy, w, h]，坐标按原图归一化
+        shapes: (B, 2) 原图尺寸 [高, 宽]
+        matrices: (B, 3, 3) 原图到输出图的仿射矩阵（连续坐标）
+        output_size: 输出尺寸 (高, 宽)
+
+    Returns:
+        (K, 6) 数组，坐标按输出图归一化；移出画面或面积过小的框被丢弃
+    """
+    if len(labels) == 0:
+        return np.zeros((0, 6), dtype=np.float32)
+
+    out_h, out_w = output_size
+    index = labels[:, 0].astype(np.int64)
+    src_h = shapes[index, 0].astype(np.float64)
+    src_w = shapes[index, 1].astype(np.float64)
+
+    cx, cy = labels[:, 2] * src_w, labels[:, 3] * src_h
+    half_w, half_h = labels[:, 4] * src_w / 2, labels[:, 5] * src_h / 2
+    x1, y1, x2, y2 = cx - half_w, cy - half_h, cx + half_w, cy + half_h
+
+    # 四个角点 (M, 4, 3) 齐次坐标，一次 einsum 完成全部框的变换
+    corners = np.empty((len(labels), 4, 3), dtype=np.float64)
+    corners[:, :, 0] = np.stack([x1, x2, x2, x1], axis=1)
+    corners[:, :, 1] = np.stack([y1, y1, y2, y2], axis=1)
+    corners[:, :, 2] = 1.0
+    transformed = np.einsum('mij,mkj->mki', matrices[index, :2, :], corners)
+
+    new_x1 = np.clip(transformed[:, :, 0].min(axis=1), 0, out_w)
+    new_y1 = np.clip(transformed[:, :, 1].min(axis=1), 0, out_h)
+    new_x2 = np.clip(transformed[:, :, 0].max(axis=1), 0, out_w)
+    new_y2 = np.clip(transformed[:, :, 1].max(axis=1), 0, out_h)
+    width, height = new_x2 - new_x1, new_y2 - new_y1
+
+    # 仿射变换的面积缩放系数即线性部分的行列式
+    full_area = 4 * half_w * half_h * np.abs(np.linalg.det(matrices[index, :2, :2]))
+    keep = ((width > MIN_BOX_SIZE) & (height > MIN_BOX_SIZE)
+            & (width * height > MIN_VISIBLE_RATIO * full_area))
+
+    result = np.empty((int(keep.sum()), 6), dtype=np.float32)
+    result[:, 0:2] = labels[keep, 0:2]
+    result[:, 2] = (new_x1[keep] + width[keep] / 2) / out_w
+    result[:, 3] = (new_y1[keep] + height[keep] / 2) / out_h
+    result[:, 4] = width[keep] / out_w
+    result[:, 5] = height[keep] / out_h
+    return result
+
+
+class BatchAugmenter:
+    """
+    批量数据增强器类
+
+    每张图片的 letterbox、缩放、旋转和翻转合并为一个仿射矩阵，只做一次 warpAffine；
+    亮度调整对整批图片一次完成，标注框变换对整批框一次完成。
+    """
+
+    def __init__(self, config_loader: Optional[ConfigLoader] = None,
+                 input_size: Optional[Sequence[int]] = None,
+                 augment: bool = True):
+        """
+        初始化增强器
+
+        Args:
+            config_loader: 配置加载器，默认使用全局配置
+            input_size: 输出尺寸 [高, 宽]，默认读取 model_config.input_size
+            augment: 为False时只做letterbox（用于验证集）
+        """
+        config = config_loader or default_config
+        augmentation = config.get_config().get('data_augmentation', {})
+        if input_size is None:
+            input_size = config.model_config['input_size']
+        self.height, self.width = int(input_size[0]), int(input_size[1])
+        self.augment = augment
+
+        self.rotation_range = float(augmentation.get('rotation_range', 0))
+        self.brightness_range = tuple(augmentation.get('brightness_range', [1.0, 1.0]))
+        self.zoom_range = tuple(augmentation.get('zoom_range', [1.0, 1.0]))
+        self.horizontal_flip = bool(augmentation.get('horizontal_flip', False))
+
+        self._scratch: Optional[np.ndarray] = None
+
+    def sample(self, count: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        """
+        为一批图片抽取增强参数
+
+        Args:
+            count: 图片数量
+            rng: 随机数生成器
+
+        Returns:
+            包含 angle、zoom、brightness、flip 的参数字典，每项形状为 (count,)
+        """
+        if not self.augment:
+            return {
+                'angle': np.zeros(count), 'zoom': np.ones(count),
+                'brightness': np.ones(count), 'flip': np.zeros(count, dtype=bool),
+            }
+        return {
+            'angle': rng.uniform(-self.rotation_range, self.rotation_range, count),
+            'zoom': rng.uniform(self.zoom_range[0], self.zoom_range[1], count),
+            'brightness': rng.uniform(self.brightness_range[0], self.brightness_range[1], count),
+            'flip': rng.random(count) < 0.5 if self.horizontal_flip else np.zeros(count, dtype=bool),
+        }
+
+    def matrices(self, shapes: np.ndarray, params: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        计算每张图片从原图到输出图的仿射矩阵（连续坐标，像素 i 覆盖 [i, i+1)）
+
+        变换顺序：letterbox -> 绕输出中心缩放和旋转 -> 水平翻转
+
+        Args:
+            shapes: (B, 2) 原图尺寸 [高, 宽]
+            params: sample 返回的增强参数
+
+        Returns:
+            (B, 3, 3) float64矩阵
+        """
+        count = len(shapes)
+        heights = shapes[:, 0].astype(np.float64)
+        widths = shapes[:, 1].astype(np.float64)
+
+        # letterbox：等比缩放并居中填充，与 LetterboxPreprocessor 一致
+        scale = np.minimum(self.height / heights, self.width / widths)
+        pad_x = (self.width - np.round(widths * scale)) / 2
+        pad_y = (self.height - np.round(heights * scale)) / 2
+
+        # 绕输出中心的旋转+缩放（与 cv2.getRotationMatrix2D 的方向约定相同）
+        radians = np.deg2rad(params['angle'])
+        alpha = params['zoom'] * np.cos(radians)
+        beta = params['zoom'] * np.sin(radians)
+        center_x, center_y = self.width / 2, self.height / 2
+
+        matrices = np.zeros((count, 3, 3), dtype=np.float64)
+        matrices[:, 0, 0] = alpha * scale
+        matrices[:, 0, 1] = beta * scale
+        matrices[:, 1, 0] = -beta * scale
+        matrices[:, 1, 1] = alpha * scale
+        matrices[:, 0, 2] = (alpha * pad_x + beta * pad_y
+                             + (1 - alpha) * center_x - beta * center_y)
+        matrices[:, 1, 2] = (-beta * pad_x + alpha * pad_y
+                             + beta * center_x + (1 - alpha) * center_y)
+        matrices[:, 2, 2] = 1.0
+
+        # 水平翻转 x -> W - x
+        flip = params['flip']
+        matrices[flip, 0, :] *= -1
+        matrices[flip, 0, 2] += self.width
+        return matrices
+
+    def __call__(self, images: Sequence[np.ndarray], labels: np.ndarray,
+                 rng: np.random.Generator,
+                 out: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        增强一批图片及其标注
+
+        Args:
+            images: BGR格式的uint8图片序列，尺寸可以各不相同
+            labels: (M, 6) 数组，每行为 [图片序号, class, cx, cy, w, h]，按原图归一化
+            rng: 随机数生成器，见 batch_rng
+            out: 输出缓冲区 (>=B, H, W, 3) uint8，默认新分配
+
+        Returns:
+            (形状为 (B, H, W, 3) 的输出图片, 按输出图归一化的 (K, 6) 标注)
+        """
+        count = len(images)
+        if out is None:
+            out = np.empty((count, self.height, self.width, 3), dtype=np.uint8)
+        out = out[:count]
+
+        shapes = np.array([image.shape[:2] for image in images], dtype=np.int64).reshape(-1, 2)
+        params = self.sample(count, rng)
+        matrices = self.matrices(shapes, params)
+
+        # warpAffine 以像素中心为坐标，连续坐标矩阵 M 对应的像素矩阵为 T(-0.5)·M·T(0.5)
+        pixel = matrices[:, :2, :].copy()
+        pixel[:, :, 2] += 0.5 * (pixel[:, :, 0] + pixel[:, :, 1]) - 0.5
+        for i, image in enumerate(images):
+            cv2.warpAffine(
+                image, pixel[i], (self.width, self.height),
+                dst=out[i],
+                flags=cv2.INTER_LINEAR,
+                borderMode=cv2.BORDER_CONSTANT,
+                borderValue=(PAD_VALUE, PAD_VALUE, PAD_VALUE),
+            )
+
+        self._adjust_brightness(out, params['brightness'])
+        return out, transform_boxes(np.asarray(labels, dtype=np.float32).reshape(-1, 6),
+                                    shapes, matrices, (self.height, self.width))
+
+    def _adjust_brightness(self, images: np.ndarray, factors: np.ndarray) -> None:
+        """对整批图片原地乘以各自的亮度系数"""
+        changed = np.flatnonzero(factors != 1.0)
+        if len(changed) == 0:
+            return
+        if self._scratch is None or self._scratch.shape[1:] != images.shape[1:] \
+                or len(self._scratch) < len(images):
+            self._scratch = np.empty(images.shape, dtype=np.float32)
+
+        # 连续的整段批次直接使用切片，避免花式索引产生副本
+        if len(changed) == len(images):
+            target, factor = images, factors
+        else:
+            target, factor = images[changed], factors[changed]
+        scratch = self._scratch[:len(target)]
+        np.multiply(target, factor.astype(np.float32)[:, None, None, None], out=scratch)
+        np.add(scratch, 0.5, out=scratch)
+        np.clip(scratch, 0, 255, out=scratch)
+        if len(changed) == len(images):
+            np.copyto(images, scratch, casting='unsafe')
+        else:
+            images[changed] = scratch.astype(np.uint8)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # 临时缓冲区不随对象传给工作进程
+        state = self.__dict__.copy()
+        state['_scratch'] = None
+        return state
+
+
+_worker_augmenter: Optional[BatchAugmenter] = None
+
+
+def _init_augment_worker(augmenter: BatchAugmenter) -> None:
+    """工作进程初始化：每个进程只用一个OpenCV线程，并持有自己的增强器"""
+    global _worker_augmenter
+    cv2.setNumThreads(1)
+    _worker_augmenter = augmenter
+
+
+def _augment_worker(images: Sequence[np.ndarray], labels: np.ndarray,
+                    seed: int, epoch: int, batch_index: int) -> Tuple[np.ndarray, np.ndarray]:
+    """在工作进程中增强一个批次"""
+    return _worker_augmenter(images, labels, batch_rng(seed, epoch, batch_index))
+
+
+class AugmentationPool:
+    """
+    多进程数据增强池类
+
+    进程数默认为 training_config.workers，每个批次整体交给一个工作进程处理，
+    结果按提交顺序返回，同时在途的批次数有上限。
+    """
+
+    def __init__(self, augmenter: Optional[BatchAugmenter] = None,
+                 config_loader: Optional[ConfigLoader] = None,
+                 workers: Optional[int] = None,
+                 seed: Optional[int] = None,
+                 max_in_flight: Optional[int] = None):
+        """
+        初始化增强池
+
+        Args:
+            augmenter: 批量增强器，默认按配置新建
+            config_loader: 配置加载器，默认使用全局配置
+            workers: 工作进程数，默认读取 training_config.workers；为0时在当前进程执行
+            seed: 随机种子，默认读取 training_config.seed
+            max_in_flight: 最多同时在途的批次数，默认为进程数的2倍
+        """
+        config = config_loader or default_config
+        training_config = config.get_config().get('training_config', {})
+        self.augmenter = augmenter or BatchAugmenter(config)
+        if workers is None:
+            workers = training_config.get('workers', os.cpu_count() or 1)
+        self.workers = int(workers)
+        self.seed = int(seed if seed is not None else training_config.get('seed', 0))
+        self.max_in_flight = int(max_in_flight or max(2 * self.workers, 1))
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        if self.workers > 0:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_augment_worker,
+                initargs=(self.augmenter,),
+            )
+
+    def map(self, batches: Iterable[Tuple[Sequence[np.ndarray], np.ndarray]],
+            epoch: int = 0) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        按顺序增强一系列批次
+
+        Args:
+            batches: (图片序列, (M, 6) 标注) 的可迭代对象
+            epoch: 训练轮次，参与随机种子计算
+
+        Yields:
+            (增强后的图片, 标注)
+        """
+        if self._pool is None:
+            for batch_index, (images, labels) in enumerate(batches):
+                yield self.augmenter(images, labels, batch_rng(self.seed, epoch, batch_index))
+            return
+
+        pending: List[Future] = []
+        for batch_index, (images, labels) in enumerate(batches):
+            pending.append(self._pool.submit(
+                _augment_worker, images, labels, self.seed, epoch, batch_index))
+            if len(pending) >= self.max_in_flight:
+                yield pending.pop(0).result()
+        while pending:
+            yield pending.pop(0).result()
+
+    def close(self) -> None:
+        """关闭工作进程"""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self) -> "AugmentationPool":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
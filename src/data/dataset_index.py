@@ -0,0 +1,345 @@
+"""
+数据集索引
+为 data/datasets/{train,val,test} 建立紧凑的清单文件，记录图片尺寸、标注文件、
+框数量和类别编号；重新扫描时按 mtime/size 增量更新，未变化的文件不再打开
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from ..utils.config_loader import ConfigLoader, config as default_config
+from ..utils.logger import logger
+from ..utils.path_manager import path_manager
+from .image_io import is_image_file, read_image_size
+
+MANIFEST_VERSION = 1
+
+# 清单中每条记录的字段，按行存储以减小文件体积
+MANIFEST_FIELDS = [
+    'path', 'width', 'height', 'mtime_ns', 'size',
+    'label', 'label_mtime_ns', 'label_size', 'num_boxes', 'class_ids', 'invalid_boxes',
+]
+
+SPLITS = ('train', 'val', 'test')
+
+
+def label_path_for(image_path: Path) -> Path:
+    """
+    按YOLO约定推导标注文件路径
+
+    images/xxx.jpg 对应 labels/xxx.txt；没有 images 目录时为同目录同名 .txt
+
+    Args:
+        image_path: 图片路径
+
+    Returns:
+        标注文件路径（不保证存在）
+    """
+    parts = list(image_path.parts)
+    if 'images' in parts:
+        index = len(parts) - 1 - parts[::-1].index('images')
+        parts[index] = 'labels'
+        return Path(*parts).with_suffix('.txt')
+    return image_path.with_suffix('.txt')
+
+
+def parse_label_file(label_path: Union[str, Path]) -> np.ndarray:
+    """
+    解析YOLO格式的标注文件
+
+    Args:
+        label_path: 标注文件路径，每行为 "class cx cy w h"（归一化坐标）
+
+    Returns:
+        形状为 (N, 5) 的float32数组
+    """
+    with open(label_path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    if not text.strip():
+        return np.zeros((0, 5), dtype=np.float32)
+    labels = np.array(text.split(), dtype=np.float32)
+    if labels.size % 5 != 0:
+        raise ValueError(f"标注文件格式错误: {label_path}")
+    return labels.reshape(-1, 5)
+
+
+class DatasetManifest:
+    """
+    数据集清单类
+
+    训练、评估和统计都从清单读取图片列表与标注摘要，无需遍历目录或读取图片头。
+    """
+
+    def __init__(self, split: str, root: Path, class_names: List[str],
+                 entries: Optional[List[Dict[str, Any]]] = None):
+        """
+        初始化清单
+
+        Args:
+            split: 数据集划分名称
+            root: 划分目录，清单中的路径相对于该目录
+            class_names: 建立清单时的类别列表
+            entries: 记录列表
+        """
+        self.split = split
+        self.root = Path(root)
+        self.class_names = list(class_names)
+        self.entries: List[Dict[str, Any]] = entries or []
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.entries)
+
+    def image_paths(self) -> List[Path]:
+        """所有图片的绝对路径"""
+        return [self.root / entry['path'] for entry in self.entries]
+
+    def label_paths(self) -> List[Optional[Path]]:
+        """所有标注文件的绝对路径，无标注时为None"""
+        return [self.root / entry['label'] if entry['label'] else None for entry in self.entries]
+
+    def fingerprint(self) -> str:
+        """
+        清单内容指纹，任何图片或标注变化都会改变该值
+
+        Returns:
+            十六进制指纹字符串
+        """
+        import hashlib
+
+        digest = hashlib.blake2b(digest_size=16)
+        for entry in self.entries:
+            digest.update(
+                f"{entry['path']}|{entry['mtime_ns']}|{entry['size']}|"
+                f"{entry['label']}|{entry['label_mtime_ns']}|{entry['label_size']}\n".encode('utf-8')
+            )
+        return digest.hexdigest()
+
+    def statistics(self) -> Dict[str, Any]:
+        """
+        数据集统计（只使用清单内容）
+
+        Returns:
+            图片数、标注数、各类别框数、尺寸范围等统计
+        """
+        class_counts = np.zeros(len(self.class_names), dtype=np.int64)
+        for entry in self.entries:
+            if entry['class_ids']:
+                class_counts += np.bincount(entry['class_ids'], minlength=len(self.class_names))
+
+        widths = np.array([e['width'] or 0 for e in self.entries], dtype=np.int64)
+        heights = np.array([e['height'] or 0 for e in self.entries], dtype=np.int64)
+        return {
+            'split': self.split,
+            'images': len(self.entries),
+            'labeled_images': sum(1 for e in self.entries if e['label']),
+            'boxes': int(sum(e['num_boxes'] for e in self.entries)),
+            'invalid_boxes': int(sum(e['invalid_boxes'] for e in self.entries)),
+            'class_counts': dict(zip(self.class_names, class_counts.tolist())),
+            'min_size': [int(widths.min()), int(heights.min())] if len(widths) else None,
+            'max_size': [int(widths.max()), int(heights.max())] if len(widths) else None,
+        }
+
+    def save(self, manifest_file: Union[str, Path]) -> None:
+        """保存清单（先写临时文件再原子替换）"""
+        manifest_file = Path(manifest_file)
+        data = {
+            'version': MANIFEST_VERSION,
+            'split': self.split,
+            'root': str(self.root),
+            'class_names': self.class_names,
+            'fields': MANIFEST_FIELDS,
+            'rows': [[entry[field] for field in MANIFEST_FIELDS] for entry in self.entries],
+        }
+        tmp = manifest_file.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, manifest_file)
+
+    @classmethod
+    def load(cls, manifest_file: Union[str, Path]) -> "DatasetManifest":
+        """
+        读取清单文件
+
+        Args:
+            manifest_file: 清单文件路径
+
+        Returns:
+            清单对象
+        """
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != MANIFEST_VERSION:
+            raise ValueError(f"不支持的清单版本: {data.get('version')}")
+        fields = data['fields']
+        entries = [dict(zip(fields, row)) for row in data['rows']]
+        return cls(data['split'], Path(data['root']), data['class_names'], entries)
+
+
+class DatasetIndexer:
+    """数据集索引器类"""
+
+    def __init__(self, config_loader: Optional[ConfigLoader] = None, io_workers: Optional[int] = None):
+        """
+        初始化索引器
+
+        Args:
+            config_loader: 配置加载器，默认使用全局配置
+            io_workers: 读取图片头和标注文件的线程数（网络磁盘上I/O延迟占主导），
+                默认读取 dataset_config.io_workers
+        """
+        self.config = config_loader or default_config
+        dataset_config = self.config.get_config().get('dataset_config', {})
+        self.io_workers = int(io_workers or dataset_config.get('io_workers', 8))
+
+    def load(self, split: str, manifest_file: Optional[Union[str, Path]] = None) -> DatasetManifest:
+        """
+        读取已有清单，不存在时先建立
+
+        Args:
+            split: 数据集划分名称
+            manifest_file: 清单文件路径，默认为 PathManager.get_dataset_manifest_file(split)
+
+        Returns:
+            清单对象
+        """
+        manifest_file = Path(manifest_file or path_manager.get_dataset_manifest_file(split))
+        if manifest_file.exists():
+            return DatasetManifest.load(manifest_file)
+        return self.build(split, manifest_file=manifest_file)
+
+    def build(self, split: str, root: Optional[Union[str, Path]] = None,
+              force: bool = False,
+              manifest_file: Optional[Union[str, Path]] = None) -> DatasetManifest:
+        """
+        建立或增量更新清单
+
+        Args:
+            split: 数据集划分名称
+            root: 划分目录，默认为 PathManager.get_split_dir(split)
+            force: 为True时忽略旧清单，重新读取所有文件
+            manifest_file: 清单文件路径，默认为 PathManager.get_dataset_manifest_file(split)
+
+        Returns:
+            更新后的清单对象
+        """
+        root = Path(root or path_manager.get_split_dir(split))
+        class_names = list(self.config.class_names)
+        manifest_file = Path(manifest_file or path_manager.get_dataset_manifest_file(split))
+
+        previous: Dict[str, Dict[str, Any]] = {}
+        if manifest_file.exists() and not force:
+            try:
+                old = DatasetManifest.load(manifest_file)
+                # 类别列表变化会影响类别校验结果，此时全部重新解析
+                if old.class_names == class_names and old.root == root:
+                    previous = {entry['path']: entry for entry in old.entries}
+            except (ValueError, KeyError, json.JSONDecodeError) as e:
+                logger.warning(f"清单文件无法读取，将重新建立: {manifest_file} ({e})")
+
+        reused: List[Dict[str, Any]] = []
+        changed: List[Tuple[str, os.stat_result, Path, Optional[os.stat_result]]] = []
+        for relative, stat, label_path, label_stat in self._scan(root):
+            entry = previous.get(relative)
+            if entry is not None and self._unchanged(entry, stat, label_path, label_stat, root):
+                reused.append(entry)
+            else:
+                changed.append((relative, stat, label_path, label_stat))
+
+        with ThreadPoolExecutor(max_workers=self.io_workers) as pool:
+            updated = list(pool.map(
+                lambda item: self._index_entry(root, class_names, *item), changed))
+
+        entries = sorted(reused + updated, key=lambda e: e['path'])
+        manifest = DatasetManifest(split, root, class_names, entries)
+        if root.exists():
+            manifest.save(manifest_file)
+
+        removed = len(previous) - len(reused) - sum(1 for e in updated if e['path'] in previous)
+        logger.info(
+            f"数据集清单已更新: {split} 共 {len(entries)} 张图片 "
+            f"(复用 {len(reused)}, 更新 {len(updated)}, 删除 {max(removed, 0)})"
+        )
+        return manifest
+
+    def build_all(self, force: bool = False) -> Dict[str, DatasetManifest]:
+        """为 train / val / test 全部建立清单"""
+        return {split: self.build(split, force=force) for split in SPLITS}
+
+    @staticmethod
+    def _scan(root: Path) -> Iterator[Tuple[str, os.stat_result, Path, Optional[os.stat_result]]]:
+        """遍历划分目录，只做 stat，不打开文件"""
+        if not root.exists():
+            return
+        stack = [root]
+        while stack:
+            current = stack.pop()
+            with os.scandir(current) as entries:
+                for item in entries:
+                    if item.is_dir(follow_symlinks=False):
+                        stack.append(Path(item.path))
+                    elif is_image_file(item.name):
+                        image_path = Path(item.path)
+                        label_path = label_path_for(image_path)
+                        try:
+                            label_stat = label_path.stat()
+                        except OSError:
+                            label_stat = None
+                        yield image_path.relative_to(root).as_posix(), item.stat(), label_path, label_stat
+
+    @staticmethod
+    def _unchanged(entry: Dict[str, Any], stat: os.stat_result, label_path: Path,
+                   label_stat: Optional[os.stat_result], root: Path) -> bool:
+        """根据 mtime/size 判断图片和标注是否未变化"""
+        if entry['mtime_ns'] != stat.st_mtime_ns or entry['size'] != stat.st_size:
+            return False
+        if label_stat is None:
+            return entry['label'] is None
+        return (entry['label'] == label_path.relative_to(root).as_posix()
+                and entry['label_mtime_ns'] == label_stat.st_mtime_ns
+                and entry['label_size'] == label_stat.st_size)
+
+    @staticmethod
+    def _index_entry(root: Path, class_names: List[str], relative: str, stat: os.stat_result,
+                     label_path: Path, label_stat: Optional[os.stat_result]) -> Dict[str, Any]:
+        """读取图片头和标注文件，生成一条清单记录"""
+        try:
+            size = read_image_size(root / relative)
+        except OSError:
+            size = None
+        width, height = size if size is not None else (None, None)
+
+        entry = {
+            'path': relative, 'width': width, 'height': height,
+            'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size,
+            'label': None, 'label_mtime_ns': None, 'label_size': None,
+            'num_boxes': 0, 'class_ids': [], 'invalid_boxes': 0,
+        }
+        if label_stat is None:
+            return entry
+
+        entry['label'] = label_path.relative_to(root).as_posix()
+        entry['label_mtime_ns'] = label_stat.st_mtime_ns
+        entry['label_size'] = label_stat.st_size
+        try:
+            labels = parse_label_file(label_path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"标注文件无法解析: {label_path} ({e})")
+            entry['invalid_boxes'] = 1
+            return entry
+
+        class_ids = labels[:, 0].astype(np.int64)
+        valid = (class_ids >= 0) & (class_ids < len(class_names)) & (labels[:, 0] == class_ids)
+        if not valid.all():
+            logger.warning(f"标注文件包含未知类别编号: {label_path}")
+        entry['num_boxes'] = int(valid.sum())
+        entry['class_ids'] = class_ids[valid].tolist()
+        entry['invalid_boxes'] = int((~valid).sum())
+        return entry
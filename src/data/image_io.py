@@ -0,0 +1,151 @@
+"""
+图片读取工具
+提供只读文件头获取图片尺寸、以及面向模型输入尺寸的快速解码
+"""
+
+import io
+import struct
+from pathlib import Path
+from typing import BinaryIO, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+
+# JPEG中携带图片尺寸的SOF标记（排除DHT/JPG/DAC）
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+                     0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# JPEG可在DCT域直接按 1/2、1/4、1/8 缩小解码
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+def is_image_file(path: Union[str, Path]) -> bool:
+    """判断文件扩展名是否为支持的图片格式"""
+    return str(path).lower().endswith(IMAGE_EXTENSIONS)
+
+
+def _jpeg_size(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    """逐段扫描JPEG标记直到SOF，返回 (宽, 高)"""
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        while byte and byte != b'\xff':
+            byte = f.read(1)
+        while byte == b'\xff':
+            byte = f.read(1)
+        if not byte:
+            return None
+
+        marker = byte[0]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            continue
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0]
+        if marker in _JPEG_SOF_MARKERS:
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack('>HH', data[1:5])
+            return width, height
+        f.seek(length - 2, io.SEEK_CUR)
+
+
+def read_image_size_from_stream(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    """
+    从文件头读取图片尺寸，不解码像素数据
+
+    Args:
+        f: 以二进制模式打开、位于起始位置的文件对象
+
+    Returns:
+        (宽, 高)，无法识别的格式返回None
+    """
+    head = f.read(26)
+    if head[:2] == b'\xff\xd8':
+        return _jpeg_size(f)
+    if head[:8] == b'\x89PNG\r\n\x1a\n' and len(head) >= 24:
+        return struct.unpack('>II', head[16:24])
+    if head[:2] == b'BM' and len(head) >= 26:
+        width, height = struct.unpack('<ii', head[18:26])
+        return width, abs(height)
+    return None
+
+
+def read_image_size(path: Union[str, Path]) -> Optional[Tuple[int, int]]:
+    """
+    读取图片文件的尺寸（只读取文件头）
+
+    Args:
+        path: 图片路径
+
+    Returns:
+        (宽, 高)，无法识别的格式返回None
+    """
+    with open(path, 'rb') as f:
+        return read_image_size_from_stream(f)
+
+
+def decode_image(data: bytes, target_size: Optional[Sequence[int]] = None
+                 ) -> Tuple[Optional[np.ndarray], Optional[Tuple[int, int]]]:
+    """
+    解码图片字节
+
+    对于远大于模型输入尺寸的JPEG，直接在DCT域缩小解码，
+    解码耗时和结果体积都随之下降，且不低于letterbox所需的分辨率。
+
+    Args:
+        data: 图片文件的完整字节
+        target_size: 模型输入尺寸 [高, 宽]，为None时按原尺寸解码
+
+    Returns:
+        (BGR图片, 原图尺寸 (高, 宽))，解码失败时图片为None
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    flag = cv2.IMREAD_COLOR
+    original_shape = None
+
+    if target_size is not None and data[:2] == b'\xff\xd8':
+        size = _jpeg_size(io.BytesIO(data))
+        if size is not None:
+            width, height = size
+            original_shape = (height, width)
+            for factor, reduced_flag in _REDUCED_FLAGS:
+                # 缩小后在限制边上仍不小于模型输入，letterbox不会放大
+                if min(target_size[0] * factor / height, target_size[1] * factor / width) <= 1.0:
+                    flag = reduced_flag
+                    break
+
+    image = cv2.imdecode(buffer, flag)
+    if image is None:
+        return None, original_shape
+    if original_shape is None:
+        original_shape = image.shape[:2]
+    elif (image.shape[0] > image.shape[1]) != (original_shape[0] > original_shape[1]):
+        # 解码时已按EXIF方向旋转，文件头中的宽高需要对调
+        original_shape = (original_shape[1], original_shape[0])
+    return image, original_shape
+
+
+def load_image(path: Union[str, Path], target_size: Optional[Sequence[int]] = None
+               ) -> Tuple[Optional[np.ndarray], Optional[Tuple[int, int]]]:
+    """
+    读取并解码图片文件
+
+    Args:
+        path: 图片路径
+        target_size: 模型输入尺寸 [高, 宽]，用于选择缩小解码倍率
+
+    Returns:
+        (BGR图片, 原图尺寸 (高, 宽))，读取失败时图片为None
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    return decode_image(data, target_size)
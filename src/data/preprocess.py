@@ -0,0 +1,171 @@
+"""
+图像预处理
+将图片按 model_config.input_size 进行letterbox缩放并归一化，
+直接写入预分配、可复用的 NCHW float32 批次缓冲区
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from ..utils.config_loader import ConfigLoader, config as default_config
+
+PAD_VALUE = 114
+
+
+class LetterboxPreprocessor:
+    """
+    letterbox预处理器类
+
+    批次缓冲区、缩放画布和元数据数组在初始化时一次性分配，
+    之后每个批次都复用同一块内存。返回的批次和元数据是缓冲区的视图，
+    调用方需在下一次 preprocess 之前使用完毕。
+    """
+
+    def __init__(self, batch_size: int,
+                 input_size: Optional[Sequence[int]] = None,
+                 config_loader: Optional[ConfigLoader] = None):
+        """
+        初始化预处理器
+
+        Args:
+            batch_size: 缓冲区可容纳的最大批大小
+            input_size: 模型输入尺寸 [高, 宽]，默认读取 model_config.input_size
+            config_loader: 配置加载器，默认使用全局配置
+        """
+        if input_size is None:
+            input_size = (config_loader or default_config).model_config['input_size']
+        self.height, self.width = int(input_size[0]), int(input_size[1])
+        self.batch_size = int(batch_size)
+
+        # 预分配：模型输入缓冲区、uint8画布和每张图片的映射元数据
+        self.buffer = np.empty((self.batch_size, 3, self.height, self.width), dtype=np.float32)
+        self._canvas = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self._affine = np.zeros((2, 3), dtype=np.float64)
+        self.scales = np.ones(self.batch_size, dtype=np.float32)
+        self.pads = np.zeros((self.batch_size, 2), dtype=np.float32)
+        self.shapes = np.zeros((self.batch_size, 2), dtype=np.int32)
+
+    def letterbox_params(self, height: int, width: int) -> Tuple[float, float, float]:
+        """
+        计算等比缩放系数和居中填充量
+
+        Args:
+            height: 原图高度
+            width: 原图宽度
+
+        Returns:
+            (缩放系数, 左侧填充, 顶部填充)
+        """
+        scale = min(self.height / height, self.width / width)
+        pad_x = (self.width - round(width * scale)) / 2
+        pad_y = (self.height - round(height * scale)) / 2
+        return scale, pad_x, pad_y
+
+    def preprocess(self, images: Sequence[np.ndarray]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        预处理一批BGR图片
+
+        Args:
+            images: BGR格式的uint8图片序列，数量不超过 batch_size
+
+        Returns:
+            (形状为 (N, 3, H, W) 的批次视图, 元数据字典)
+            元数据包含 scales (N,)、pads (N, 2) 和原图尺寸 shapes (N, 2)=[高, 宽]
+        """
+        count = len(images)
+        if count > self.batch_size:
+            raise ValueError(f"批大小 {count} 超过预分配缓冲区大小 {self.batch_size}")
+
+        for index, image in enumerate(images):
+            self.preprocess_into(image, index)
+
+        meta = {
+            'scales': self.scales[:count],
+            'pads': self.pads[:count],
+            'shapes': self.shapes[:count],
+        }
+        return self.buffer[:count], meta
+
+    def preprocess_into(self, image: np.ndarray, index: int) -> None:
+        """
+        将单张图片letterbox后写入批次缓冲区的指定位置
+
+        Args:
+            image: BGR格式的uint8图片
+            index: 缓冲区中的位置
+        """
+        height, width = image.shape[:2]
+        scale, pad_x, pad_y = self.letterbox_params(height, width)
+
+        # 缩放和平移合并成一次仿射变换，直接写入复用的画布；
+        # warpAffine以像素中心为坐标原点，平移量补偿半像素偏差
+        half_pixel = 0.5 * scale - 0.5
+        self._affine[0, 0] = scale
+        self._affine[1, 1] = scale
+        self._affine[0, 2] = pad_x + half_pixel
+        self._affine[1, 2] = pad_y + half_pixel
+        cv2.warpAffine(
+            image, self._affine, (self.width, self.height),
+            dst=self._canvas,
+            flags=cv2.INTER_LINEAR,
+            borderMode=cv2.BORDER_CONSTANT,
+            borderValue=(PAD_VALUE, PAD_VALUE, PAD_VALUE),
+        )
+
+        # BGR->RGB、HWC->CHW 以步长视图完成，归一化结果直接写入缓冲区
+        np.multiply(
+            self._canvas[:, :, ::-1].transpose(2, 0, 1),
+            np.float32(1.0 / 255.0),
+            out=self.buffer[index],
+            casting='unsafe',
+        )
+
+        self.scales[index] = scale
+        self.pads[index] = (pad_x, pad_y)
+        self.shapes[index] = (height, width)
+
+    def __call__(self, images: Sequence[np.ndarray]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        return self.preprocess(images)
+
+
+def scale_boxes(boxes: np.ndarray, scale: float, pad: Sequence[float],
+                shape: Sequence[int]) -> np.ndarray:
+    """
+    将模型输入坐标系下的角点框映射回原图坐标，并裁剪到图片范围内
+
+    Args:
+        boxes: 形状为 (N, 4) 的角点格式框 (x1, y1, x2, y2)
+        scale: letterbox缩放系数
+        pad: (左侧填充, 顶部填充)
+        shape: 原图尺寸 (高, 宽)
+
+    Returns:
+        原图坐标系下的角点格式框
+    """
+    out = (boxes - np.array([pad[0], pad[1], pad[0], pad[1]], dtype=boxes.dtype)) / scale
+    np.clip(out[:, 0::2], 0, shape[1], out=out[:, 0::2])
+    np.clip(out[:, 1::2], 0, shape[0], out=out[:, 1::2])
+    return out
+
+
+def boxes_to_bbox_columns(boxes: np.ndarray) -> List[Dict[str, float]]:
+    """
+    将角点格式框转换为 detection_results.csv 的 bbox_x/bbox_y/bbox_width/bbox_height 列
+
+    Args:
+        boxes: 形状为 (N, 4) 的原图坐标系角点框
+
+    Returns:
+        每个框对应的bbox列字典
+    """
+    return [
+        {
+            'bbox_x': float(x1),
+            'bbox_y': float(y1),
+            'bbox_width': float(x2 - x1),
+            'bbox_height': float(y2 - y1),
+        }
+        for x1, y1, x2, y2 in boxes
+    ]
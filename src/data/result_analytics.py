@@ -0,0 +1,388 @@
+"""
+检测结果统计分析
+以有界内存分块读取检测结果（CSV或列式存储），计算各类别数量、置信度直方图
+和 detection_time_ms 的 p50/p95/p99；统计结果可跨文件、跨进程合并
+"""
+
+import math
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from ..utils.path_manager import path_manager
+from .result_store import DetectionResultStore, _to_epoch
+from .result_writer import TIMESTAMP_FORMAT
+
+TimeBound = Optional[Union[str, float, datetime]]
+
+
+class LatencySketch:
+    """
+    延迟分位数草图
+
+    对数分桶直方图：第 i 个桶覆盖 (gamma^(i-1), gamma^i]，分位数的相对误差不超过
+    relative_accuracy。桶的范围固定，两个草图逐桶相加即可合并。
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01,
+                 min_value: float = 0.01, max_value: float = 1e6):
+        """
+        初始化草图
+
+        Args:
+            relative_accuracy: 分位数相对误差
+            min_value: 可区分的最小值（毫秒），更小的值计入零桶
+            max_value: 可区分的最大值（毫秒），更大的值计入最后一个桶
+        """
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_value = max_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self._offset = math.ceil(math.log(min_value) / self._log_gamma)
+        num_buckets = math.ceil(math.log(max_value) / self._log_gamma) - self._offset + 2
+        # 第0个桶为零桶
+        self.counts = np.zeros(num_buckets, dtype=np.int64)
+
+    def add(self, values: np.ndarray) -> None:
+        """批量加入数值"""
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+        index = np.zeros(values.shape, dtype=np.int64)
+        positive = values > self.min_value
+        index[positive] = np.ceil(np.log(values[positive]) / self._log_gamma).astype(np.int64) - self._offset + 1
+        np.clip(index, 0, len(self.counts) - 1, out=index)
+        self.counts += np.bincount(index, minlength=len(self.counts))
+
+    def merge(self, other: "LatencySketch") -> "LatencySketch":
+        """合并另一个参数相同的草图"""
+        if other.counts.shape != self.counts.shape or other.gamma != self.gamma:
+            raise ValueError("只能合并参数相同的延迟草图")
+        self.counts += other.counts
+        return self
+
+    @property
+    def count(self) -> int:
+        """样本数"""
+        return int(self.counts.sum())
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        估计分位数
+
+        Args:
+            q: 分位点，0~1
+
+        Returns:
+            分位数估计值，没有样本时返回None
+        """
+        total = self.count
+        if total == 0:
+            return None
+        rank = q * (total - 1)
+        bucket = int(np.searchsorted(np.cumsum(self.counts), rank, side='right'))
+        if bucket == 0:
+            return 0.0
+        upper = self.gamma ** (bucket - 1 + self._offset)
+        return 2 * upper / (self.gamma + 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为可JSON化的字典（只保存非零桶）"""
+        nonzero = np.flatnonzero(self.counts)
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'min_value': self.min_value,
+            'max_value': self.max_value,
+            'buckets': {int(i): int(self.counts[i]) for i in nonzero},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencySketch":
+        """从字典恢复草图"""
+        sketch = cls(data['relative_accuracy'], data['min_value'], data['max_value'])
+        for index, value in data['buckets'].items():
+            sketch.counts[int(index)] = value
+        return sketch
+
+
+class DetectionStats:
+    """
+    可合并的检测结果统计类
+
+    按类别统计数量、置信度直方图（固定分箱）和延迟草图。
+    """
+
+    def __init__(self, confidence_bins: int = 20):
+        """
+        初始化统计
+
+        Args:
+            confidence_bins: 置信度直方图在 [0, 1] 上的分箱数
+        """
+        self.confidence_bins = confidence_bins
+        self.categories: List[str] = []
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.confidence_hist = np.zeros((0, confidence_bins), dtype=np.int64)
+        self.latency: List[LatencySketch] = []
+        self.first_timestamp: Optional[float] = None
+        self.last_timestamp: Optional[float] = None
+
+    def _category_index(self, name: str) -> int:
+        """返回类别的内部编号，新类别扩展各统计数组"""
+        if name in self.categories:
+            return self.categories.index(name)
+        self.categories.append(name)
+        self.counts = np.append(self.counts, 0)
+        self.confidence_hist = np.vstack([self.confidence_hist,
+                                          np.zeros((1, self.confidence_bins), dtype=np.int64)])
+        self.latency.append(LatencySketch())
+        return len(self.categories) - 1
+
+    def update(self, category_codes: np.ndarray, category_names: Sequence[str],
+               confidence: np.ndarray, latency_ms: np.ndarray,
+               timestamps: Optional[np.ndarray] = None) -> None:
+        """
+        用一个数据块更新统计（全部为向量化归约）
+
+        Args:
+            category_codes: 每行的类别编号（对应 category_names）
+            category_names: 编号到类别名称的字典
+            confidence: 置信度
+            latency_ms: detection_time_ms
+            timestamps: epoch秒，用于记录覆盖的时间范围
+        """
+        if len(category_codes) == 0:
+            return
+
+        # 把块内编号映射为统计内部编号
+        mapping = np.array([self._category_index(name) for name in category_names], dtype=np.int64)
+        codes = mapping[np.asarray(category_codes, dtype=np.int64)]
+        num_categories = len(self.categories)
+
+        self.counts += np.bincount(codes, minlength=num_categories)
+
+        bins = np.clip((np.asarray(confidence) * self.confidence_bins).astype(np.int64),
+                       0, self.confidence_bins - 1)
+        flat = np.bincount(codes * self.confidence_bins + bins,
+                           minlength=num_categories * self.confidence_bins)
+        self.confidence_hist += flat.reshape(num_categories, self.confidence_bins)
+
+        latency_ms = np.asarray(latency_ms)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(num_categories + 1))
+        for code in range(num_categories):
+            if bounds[code + 1] > bounds[code]:
+                self.latency[code].add(latency_ms[order[bounds[code]:bounds[code + 1]]])
+
+        if timestamps is not None and len(timestamps):
+            low, high = float(np.min(timestamps)), float(np.max(timestamps))
+            self.first_timestamp = low if self.first_timestamp is None else min(self.first_timestamp, low)
+            self.last_timestamp = high if self.last_timestamp is None else max(self.last_timestamp, high)
+
+    def merge(self, other: "DetectionStats") -> "DetectionStats":
+        """合并另一份统计（可来自其他文件或进程）"""
+        for code, name in enumerate(other.categories):
+            index = self._category_index(name)
+            self.counts[index] += other.counts[code]
+            self.confidence_hist[index] += other.confidence_hist[code]
+            self.latency[index].merge(other.latency[code])
+        for value in (other.first_timestamp, other.last_timestamp):
+            if value is not None:
+                self.first_timestamp = value if self.first_timestamp is None else min(self.first_timestamp, value)
+                self.last_timestamp = value if self.last_timestamp is None else max(self.last_timestamp, value)
+        return self
+
+    def overall_latency(self) -> LatencySketch:
+        """所有类别合并后的延迟草图"""
+        sketch = LatencySketch()
+        for item in self.latency:
+            sketch.merge(item)
+        return sketch
+
+    def summary(self, quantiles: Iterable[float] = (0.5, 0.95, 0.99)) -> Dict[str, Any]:
+        """
+        生成统计摘要
+
+        Returns:
+            包含总数、各类别数量、置信度直方图和延迟分位数的字典
+        """
+        quantiles = list(quantiles)
+
+        def percentiles(sketch: LatencySketch) -> Dict[str, Optional[float]]:
+            return {f"p{round(q * 100)}": sketch.quantile(q) for q in quantiles}
+
+        return {
+            'total': int(self.counts.sum()),
+            'first_timestamp': self.first_timestamp,
+            'last_timestamp': self.last_timestamp,
+            'categories': {
+                name: {
+                    'count': int(self.counts[code]),
+                    'confidence_histogram': self.confidence_hist[code].tolist(),
+                    'detection_time_ms': percentiles(self.latency[code]),
+                }
+                for code, name in enumerate(self.categories)
+            },
+            'detection_time_ms': percentiles(self.overall_latency()),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为可JSON化的字典"""
+        return {
+            'confidence_bins': self.confidence_bins,
+            'categories': list(self.categories),
+            'counts': self.counts.tolist(),
+            'confidence_hist': self.confidence_hist.tolist(),
+            'latency': [sketch.to_dict() for sketch in self.latency],
+            'first_timestamp': self.first_timestamp,
+            'last_timestamp': self.last_timestamp,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DetectionStats":
+        """从字典恢复统计"""
+        stats = cls(data['confidence_bins'])
+        stats.categories = list(data['categories'])
+        stats.counts = np.asarray(data['counts'], dtype=np.int64)
+        stats.confidence_hist = np.asarray(data['confidence_hist'], dtype=np.int64).reshape(
+            len(stats.categories), stats.confidence_bins)
+        stats.latency = [LatencySketch.from_dict(item) for item in data['latency']]
+        stats.first_timestamp = data['first_timestamp']
+        stats.last_timestamp = data['last_timestamp']
+        return stats
+
+
+def _format_bound(bound: TimeBound) -> Optional[str]:
+    """把时间边界转换为CSV时间戳格式字符串（该格式按字典序即按时间排序）"""
+    if bound is None or isinstance(bound, str):
+        return bound
+    if isinstance(bound, (int, float)):
+        bound = datetime.fromtimestamp(bound)
+    return bound.strftime(TIMESTAMP_FORMAT)
+
+
+def stats_from_csv(csv_file: Optional[Union[str, Path]] = None,
+                   start: TimeBound = None, end: TimeBound = None,
+                   chunk_rows: int = 200000,
+                   stats: Optional[DetectionStats] = None) -> DetectionStats:
+    """
+    分块统计 detection_results.csv，内存占用只与 chunk_rows 有关
+
+    Args:
+        csv_file: CSV路径，默认为 PathManager.get_detection_results_file()
+        start: 起始时间（含）
+        end: 结束时间（不含）
+        chunk_rows: 每块行数
+        stats: 累加到已有统计，默认新建
+
+    Returns:
+        统计结果
+    """
+    import pandas as pd
+
+    csv_file = Path(csv_file or path_manager.get_detection_results_file())
+    stats = stats or DetectionStats()
+    start, end = _format_bound(start), _format_bound(end)
+
+    reader = pd.read_csv(
+        csv_file,
+        usecols=['timestamp', 'part_category', 'confidence', 'detection_time_ms'],
+        dtype={'timestamp': str, 'part_category': 'category',
+               'confidence': np.float32, 'detection_time_ms': np.float32},
+        chunksize=chunk_rows,
+    )
+    for chunk in reader:
+        timestamps = chunk['timestamp'].to_numpy(dtype=object)
+        mask = np.ones(len(chunk), dtype=bool)
+        if start is not None:
+            mask &= timestamps >= start
+        if end is not None:
+            mask &= timestamps < end
+        if not mask.any():
+            continue
+
+        chunk = chunk[mask]
+        categories = chunk['part_category'].cat.remove_unused_categories()
+        epoch = pd.to_datetime(chunk['timestamp'], format=TIMESTAMP_FORMAT)
+        stats.update(
+            categories.cat.codes.to_numpy(),
+            list(categories.cat.categories),
+            chunk['confidence'].to_numpy(),
+            chunk['detection_time_ms'].to_numpy(),
+            timestamps=np.array([epoch.min().timestamp(), epoch.max().timestamp()])
+            if len(epoch) else None,
+        )
+    return stats
+
+
+def stats_from_store(store: Optional[DetectionResultStore] = None,
+                     start: TimeBound = None, end: TimeBound = None,
+                     categories: Optional[Sequence[str]] = None,
+                     stats: Optional[DetectionStats] = None) -> DetectionStats:
+    """
+    逐块统计列式存储中的检测结果
+
+    Args:
+        store: 列式存储，默认为 data/results/detection_store
+        start: 起始时间（含）
+        end: 结束时间（不含）
+        categories: 只统计这些类别
+        stats: 累加到已有统计，默认新建
+
+    Returns:
+        统计结果
+    """
+    store = store or DetectionResultStore()
+    stats = stats or DetectionStats()
+    for chunk in store.query(start, end, categories=categories,
+                             columns=['timestamp', 'category', 'confidence', 'detection_time_ms']):
+        stats.update(chunk['category'], chunk['categories'], chunk['confidence'],
+                     chunk['detection_time_ms'], timestamps=chunk['timestamp'])
+    return stats
+
+
+def _stats_worker(source: str, start: TimeBound, end: TimeBound) -> Dict[str, Any]:
+    """进程池任务：统计单个来源并返回可序列化的结果"""
+    if Path(source).is_dir():
+        stats = stats_from_store(DetectionResultStore(source), start, end)
+    else:
+        stats = stats_from_csv(source, start, end)
+    return stats.to_dict()
+
+
+def compute_stats(sources: Sequence[Union[str, Path]],
+                  start: TimeBound = None, end: TimeBound = None,
+                  workers: int = 1) -> DetectionStats:
+    """
+    统计多个来源（CSV文件或列式存储目录）并合并
+
+    Args:
+        sources: CSV文件或列式存储根目录列表
+        start: 起始时间（含）
+        end: 结束时间（不含）
+        workers: 进程数，大于1时每个来源在独立进程中统计
+
+    Returns:
+        合并后的统计结果
+    """
+    if isinstance(start, datetime) or isinstance(end, datetime):
+        # 跨进程传递时统一成epoch秒
+        start = _to_epoch(start) if start is not None else None
+        end = _to_epoch(end) if end is not None else None
+
+    merged = DetectionStats()
+    sources = [str(source) for source in sources]
+    if workers <= 1 or len(sources) <= 1:
+        for source in sources:
+            merged.merge(DetectionStats.from_dict(_stats_worker(source, start, end)))
+        return merged
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(sources))) as pool:
+        futures = [pool.submit(_stats_worker, source, start, end) for source in sources]
+        for future in futures:
+            merged.merge(DetectionStats.from_dict(future.result()))
+    return merged
@@ -0,0 +1,451 @@
+"""
+检测结果列式存储
+按天分区、只追加的二进制列存储，读取时使用内存映射，
+每个分区带有按时间范围和类别统计的块索引
+"""
+
+import csv
+import json
+import os
+import threading
+from datetime import datetime, time, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from ..utils.path_manager import path_manager
+from .result_writer import TIMESTAMP_FORMAT
+
+# 列名 -> (文件名, dtype, 每行元素数)
+COLUMNS = {
+    'timestamp': ('timestamp.f8', np.float64, 1),
+    'image_id': ('image_id.u4', np.uint32, 1),
+    'category': ('category.u2', np.uint16, 1),
+    'confidence': ('confidence.f4', np.float32, 1),
+    'bbox': ('bbox.f4', np.float32, 4),
+    'detection_time_ms': ('detection_time_ms.f4', np.float32, 1),
+    'model_version': ('model_version.u2', np.uint16, 1),
+}
+
+META_FILE = 'meta.json'
+IMAGE_PATHS_FILE = 'image_paths.txt'
+PARTITION_FORMAT = '%Y%m%d'
+
+
+def _to_epoch(timestamp: Union[str, float, datetime]) -> float:
+    """将CSV时间戳字符串、datetime或秒数统一转换为本地时间的epoch秒"""
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    if isinstance(timestamp, str):
+        timestamp = datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+    return timestamp.timestamp()
+
+
+def _partition_bounds(day: str) -> Tuple[float, float]:
+    """分区覆盖的epoch秒范围 [当天本地零点, 次日本地零点)，夏令时切换日不是86400秒"""
+    date = datetime.strptime(day, PARTITION_FORMAT).date()
+    return (datetime.combine(date, time.min).timestamp(),
+            datetime.combine(date + timedelta(days=1), time.min).timestamp())
+
+
+class _Partition:
+    """单个日期分区，负责列文件追加和元数据（索引）维护"""
+
+    def __init__(self, path: Path, block_rows: int):
+        self.path = path
+        self.block_rows = block_rows
+        self.meta = self._load_meta()
+        self._image_ids: Optional[Dict[str, int]] = None
+        self._repaired = False
+
+    def _load_meta(self) -> Dict[str, Any]:
+        meta_file = self.path / META_FILE
+        if meta_file.exists():
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {'rows': 0, 'images': 0, 'categories': [], 'model_versions': [], 'blocks': []}
+
+    def _save_meta(self) -> None:
+        # 先写临时文件再原子替换，读取方永远看到一致的元数据
+        tmp = self.path / (META_FILE + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+        os.replace(tmp, self.path / META_FILE)
+
+    def _truncate_torn_writes(self) -> None:
+        """丢弃上次异常退出时写了一半、未记入元数据的尾部数据（每个分区只检查一次）"""
+        if self._repaired:
+            return
+        self._repaired = True
+
+        paths = self.read_image_paths()
+        path_file = self.path / IMAGE_PATHS_FILE
+        if path_file.exists() and path_file.stat().st_size != sum(len(p.encode('utf-8')) + 1 for p in paths):
+            with open(path_file, 'w', encoding='utf-8') as f:
+                f.write(''.join(path + '\n' for path in paths))
+
+        rows = self.meta['rows']
+        for filename, dtype, width in COLUMNS.values():
+            column_file = self.path / filename
+            expected = rows * width * np.dtype(dtype).itemsize
+            if column_file.exists() and column_file.stat().st_size > expected:
+                os.truncate(column_file, expected)
+
+    def _encode(self, values: Sequence[str], key: str) -> np.ndarray:
+        """把类别型字符串编码为分区内的字典编号，字典只在全部编码成功后更新"""
+        dictionary = self.meta[key]
+        lookup = {value: code for code, value in enumerate(dictionary)}
+        new_values = []
+        codes = np.empty(len(values), dtype=np.int64)
+        for index, value in enumerate(values):
+            code = lookup.get(value)
+            if code is None:
+                code = len(dictionary) + len(new_values)
+                new_values.append(value)
+                lookup[value] = code
+            codes[index] = code
+
+        limit = np.iinfo(COLUMNS['category'][1]).max + 1
+        if len(dictionary) + len(new_values) > limit:
+            raise ValueError(f"分区 {self.path.name} 的 {key} 取值超过{limit}种")
+        dictionary.extend(new_values)
+        return codes
+
+    def _encode_images(self, paths: Sequence[str]) -> np.ndarray:
+        """为图片路径分配分区内编号，新路径追加到路径表"""
+        if self._image_ids is None:
+            self._image_ids = {path: index for index, path in enumerate(self.read_image_paths())}
+        ids = np.empty(len(paths), dtype=np.uint32)
+        new_paths = []
+        for index, path in enumerate(paths):
+            image_id = self._image_ids.get(path)
+            if image_id is None:
+                image_id = len(self._image_ids)
+                self._image_ids[path] = image_id
+                new_paths.append(path)
+            ids[index] = image_id
+        if new_paths:
+            with open(self.path / IMAGE_PATHS_FILE, 'a', encoding='utf-8') as f:
+                f.write(''.join(path + '\n' for path in new_paths))
+        self.meta['images'] = len(self._image_ids)
+        return ids
+
+    def read_image_paths(self) -> List[str]:
+        """读取路径表（只保留元数据中记录的部分）"""
+        path_file = self.path / IMAGE_PATHS_FILE
+        if not path_file.exists():
+            return []
+        with open(path_file, 'r', encoding='utf-8') as f:
+            paths = f.read().split('\n')
+        return paths[:self.meta.get('images', 0)]
+
+    def append(self, columns: Dict[str, Any]) -> None:
+        """
+        追加一批已按时间排序的行
+
+        Args:
+            columns: timestamp/image_path/part_category/confidence/bbox/
+                     detection_time_ms/model_version 列
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._truncate_torn_writes()
+
+        count = len(columns['timestamp'])
+        categories = self._encode(columns['part_category'], 'categories')
+        arrays = {
+            'timestamp': columns['timestamp'],
+            'image_id': self._encode_images(columns['image_path']),
+            'category': categories,
+            'confidence': columns['confidence'],
+            'bbox': columns['bbox'],
+            'detection_time_ms': columns['detection_time_ms'],
+            'model_version': self._encode(columns['model_version'], 'model_versions'),
+        }
+        for name, (filename, dtype, _) in COLUMNS.items():
+            with open(self.path / filename, 'ab') as f:
+                f.write(np.ascontiguousarray(arrays[name], dtype=dtype).tobytes())
+
+        self._update_index(columns['timestamp'], categories)
+        self.meta['rows'] += count
+        self._save_meta()
+
+    def _update_index(self, timestamps: np.ndarray, categories: np.ndarray) -> None:
+        """更新块索引：每块记录行范围、时间范围和各类别行数"""
+        num_categories = len(self.meta['categories'])
+        blocks = self.meta['blocks']
+        offset = 0
+        count = len(timestamps)
+        while offset < count:
+            if not blocks or blocks[-1]['rows'] >= self.block_rows:
+                blocks.append({
+                    'start': self.meta['rows'] + offset, 'rows': 0,
+                    'ts_min': float('inf'), 'ts_max': float('-inf'),
+                    'category_counts': [],
+                })
+            block = blocks[-1]
+            take = min(self.block_rows - block['rows'], count - offset)
+            chunk_ts = timestamps[offset:offset + take]
+            chunk_counts = np.bincount(categories[offset:offset + take], minlength=num_categories)
+
+            counts = block['category_counts'] + [0] * (num_categories - len(block['category_counts']))
+            block['category_counts'] = [int(a + b) for a, b in zip(counts, chunk_counts)]
+            block['ts_min'] = min(block['ts_min'], float(chunk_ts.min()))
+            block['ts_max'] = max(block['ts_max'], float(chunk_ts.max()))
+            block['rows'] += take
+            offset += take
+
+    def open_columns(self, names: Iterable[str]) -> Dict[str, np.ndarray]:
+        """以内存映射方式打开列（只读）"""
+        rows = self.meta['rows']
+        result = {}
+        for name in names:
+            filename, dtype, width = COLUMNS[name]
+            shape = (rows, width) if width > 1 else (rows,)
+            if rows == 0:
+                result[name] = np.empty(shape, dtype=dtype)
+            else:
+                result[name] = np.memmap(self.path / filename, dtype=dtype, mode='r', shape=shape)
+        return result
+
+
+class DetectionResultStore:
+    """
+    检测结果列式存储类
+
+    数据位于 data/results/detection_store/<YYYYMMDD>/，每列一个定长二进制文件:
+    时间戳为float64，框和置信度为float32，part_category 与 model_version
+    以分区内字典编码为uint16。meta.json 记录行数、字典和块索引。
+    仅支持单进程写入；读取与写入可以并发进行。
+    """
+
+    def __init__(self, root: Optional[Union[str, Path]] = None, block_rows: int = 65536):
+        """
+        初始化列式存储
+
+        Args:
+            root: 存储根目录，默认为 data/results/detection_store
+            block_rows: 每个索引块的最大行数
+        """
+        self.root = Path(root or path_manager.results_dir / 'detection_store')
+        self.block_rows = block_rows
+        self._partitions: Dict[str, _Partition] = {}
+        self._lock = threading.Lock()
+
+    def _partition(self, day: str) -> _Partition:
+        partition = self._partitions.get(day)
+        if partition is None:
+            partition = _Partition(self.root / day, self.block_rows)
+            self._partitions[day] = partition
+        return partition
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+    def append(self, records: Sequence[Dict[str, Any]]) -> int:
+        """
+        追加检测记录
+
+        Args:
+            records: 记录字典列表，字段与 detection_results.csv 的列一致，
+                     timestamp 可以是CSV格式字符串、datetime或epoch秒
+
+        Returns:
+            写入的行数
+        """
+        if not records:
+            return 0
+
+        timestamps = np.array([_to_epoch(r['timestamp']) for r in records], dtype=np.float64)
+        order = np.argsort(timestamps, kind='stable')
+        days = [datetime.fromtimestamp(ts).strftime(PARTITION_FORMAT) for ts in timestamps[order]]
+
+        with self._lock:
+            start = 0
+            while start < len(order):
+                end = start
+                while end < len(order) and days[end] == days[start]:
+                    end += 1
+                rows = [records[i] for i in order[start:end]]
+                self._partition(days[start]).append({
+                    'timestamp': timestamps[order[start:end]],
+                    'image_path': [str(r['image_path']) for r in rows],
+                    'part_category': [r['part_category'] for r in rows],
+                    'confidence': np.array([float(r['confidence']) for r in rows], dtype=np.float32),
+                    'bbox': np.array([[float(r['bbox_x']), float(r['bbox_y']),
+                                       float(r['bbox_width']), float(r['bbox_height'])] for r in rows],
+                                     dtype=np.float32).reshape(-1, 4),
+                    'detection_time_ms': np.array([float(r.get('detection_time_ms') or 0.0) for r in rows],
+                                                  dtype=np.float32),
+                    'model_version': [r.get('model_version') or '' for r in rows],
+                })
+                start = end
+        return len(records)
+
+    def append_detections(self, image_path: Union[str, Path], detections: Sequence[Dict[str, Any]],
+                          timestamp: Optional[Union[str, float, datetime]] = None) -> int:
+        """
+        追加一张图片的检测结果
+
+        Args:
+            image_path: 图片路径
+            detections: 检测器输出的结果列表
+            timestamp: 检测时间，默认为当前时间
+
+        Returns:
+            写入的行数
+        """
+        stamp = timestamp if timestamp is not None else datetime.now()
+        return self.append([dict(d, timestamp=stamp, image_path=image_path) for d in detections])
+
+    def import_csv(self, csv_file: Optional[Union[str, Path]] = None, chunk_rows: int = 100000) -> int:
+        """
+        分块导入已有的 detection_results.csv
+
+        Args:
+            csv_file: CSV路径，默认为 PathManager.get_detection_results_file()
+            chunk_rows: 每次导入的行数
+
+        Returns:
+            导入的总行数
+        """
+        csv_file = Path(csv_file or path_manager.get_detection_results_file())
+        total = 0
+        with open(csv_file, 'r', newline='', encoding='utf-8') as f:
+            chunk = []
+            for row in csv.DictReader(f):
+                chunk.append(row)
+                if len(chunk) >= chunk_rows:
+                    total += self.append(chunk)
+                    chunk = []
+            total += self.append(chunk)
+        return total
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+    def partitions(self) -> List[str]:
+        """列出所有日期分区（升序）"""
+        if not self.root.exists():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if (p / META_FILE).exists())
+
+    def read_partition(self, day: str, columns: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        以内存映射方式读取一个分区
+
+        Args:
+            day: 分区日期，格式 YYYYMMDD
+            columns: 需要的列，默认全部
+
+        Returns:
+            列名到数组的字典，另含 categories / model_versions 字典
+        """
+        partition = _Partition(self.root / day, self.block_rows)
+        result = partition.open_columns(columns or COLUMNS.keys())
+        result['categories'] = list(partition.meta['categories'])
+        result['model_versions'] = list(partition.meta['model_versions'])
+        return result
+
+    def query(self, start: Optional[Union[str, float, datetime]] = None,
+              end: Optional[Union[str, float, datetime]] = None,
+              categories: Optional[Sequence[str]] = None,
+              columns: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        按时间范围 [start, end) 和类别查询，逐块返回结果
+
+        先按日期裁剪分区，再用块索引跳过时间范围或类别不匹配的块，
+        只有命中的块才会从内存映射中读取并做向量化过滤。
+
+        Args:
+            start: 起始时间（含）
+            end: 结束时间（不含）
+            categories: 类别名称列表，None表示全部
+            columns: 需要返回的列，默认全部
+
+        Yields:
+            每个命中块的列字典，另含 categories / model_versions / image_paths 字典
+        """
+        start_ts = _to_epoch(start) if start is not None else float('-inf')
+        end_ts = _to_epoch(end) if end is not None else float('inf')
+        columns = list(columns or COLUMNS.keys())
+        needed = set(columns) | {'timestamp', 'category'}
+
+        for day in self.partitions():
+            day_start, day_end = _partition_bounds(day)
+            if day_start >= end_ts or day_end <= start_ts:
+                continue
+
+            partition = _Partition(self.root / day, self.block_rows)
+            meta = partition.meta
+            codes = None
+            if categories is not None:
+                codes = [meta['categories'].index(c) for c in categories if c in meta['categories']]
+                if not codes:
+                    continue
+
+            data = None
+            image_paths = None
+            for block in meta['blocks']:
+                if block['ts_max'] < start_ts or block['ts_min'] >= end_ts:
+                    continue
+                if codes is not None and not any(
+                        c < len(block['category_counts']) and block['category_counts'][c] > 0
+                        for c in codes):
+                    continue
+
+                if data is None:
+                    data = partition.open_columns(needed)
+                lo, hi = block['start'], block['start'] + block['rows']
+                ts = data['timestamp'][lo:hi]
+                mask = (ts >= start_ts) & (ts < end_ts)
+                if codes is not None:
+                    mask &= np.isin(data['category'][lo:hi], codes)
+                if not mask.any():
+                    continue
+
+                if image_paths is None and 'image_id' in columns:
+                    image_paths = partition.read_image_paths()
+                chunk = {name: np.asarray(data[name][lo:hi][mask]) for name in columns}
+                chunk['categories'] = meta['categories']
+                chunk['model_versions'] = meta['model_versions']
+                chunk['image_paths'] = image_paths
+                yield chunk
+
+    def count(self, start=None, end=None, categories: Optional[Sequence[str]] = None) -> Dict[str, int]:
+        """
+        统计时间范围内各类别的检测数
+
+        完整落在时间范围内的块直接使用索引中的类别计数，无需读取数据。
+
+        Returns:
+            类别名称到检测数的字典
+        """
+        start_ts = _to_epoch(start) if start is not None else float('-inf')
+        end_ts = _to_epoch(end) if end is not None else float('inf')
+        totals: Dict[str, int] = {}
+
+        for day in self.partitions():
+            day_start, day_end = _partition_bounds(day)
+            if day_start >= end_ts or day_end <= start_ts:
+                continue
+            partition = _Partition(self.root / day, self.block_rows)
+            names = partition.meta['categories']
+            data = None
+            for block in partition.meta['blocks']:
+                if block['ts_max'] < start_ts or block['ts_min'] >= end_ts:
+                    continue
+                if block['ts_min'] >= start_ts and block['ts_max'] < end_ts:
+                    counts = block['category_counts']
+                else:
+                    if data is None:
+                        data = partition.open_columns(['timestamp', 'category'])
+                    lo, hi = block['start'], block['start'] + block['rows']
+                    ts = data['timestamp'][lo:hi]
+                    selected = data['category'][lo:hi][(ts >= start_ts) & (ts < end_ts)]
+                    counts = np.bincount(selected, minlength=len(names)).tolist()
+                for code, value in enumerate(counts):
+                    name = names[code]
+                    if value and (categories is None or name in categories):
+                        totals[name] = totals.get(name, 0) + int(value)
+        return totals
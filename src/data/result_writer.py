@@ -0,0 +1,249 @@
+"""
+检测结果写入器
+在内存中缓冲 detection_results.csv 的行，由后台线程按数量阈值或时间间隔批量写入
+"""
+
+import atexit
+import csv
+import io
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from ..utils.config_loader import ConfigLoader, config as default_config
+from ..utils.logger import logger
+from ..utils.metrics import metrics
+from ..utils.path_manager import path_manager
+
+CSV_COLUMNS = [
+    'timestamp', 'image_path', 'part_category', 'confidence',
+    'bbox_x', 'bbox_y', 'bbox_width', 'bbox_height',
+    'detection_time_ms', 'model_version',
+]
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# 持久化策略: none-仅写入进程缓冲区, flush-每批刷新到操作系统, fsync-每批落盘
+DURABILITY_MODES = ('none', 'flush', 'fsync')
+
+
+def format_row(timestamp: str, image_path: str, detection: Dict[str, Any]) -> List[str]:
+    """
+    将一个检测结果格式化为CSV行
+
+    Args:
+        timestamp: 时间戳字符串
+        image_path: 图片路径
+        detection: 检测结果字典
+
+    Returns:
+        与 CSV_COLUMNS 对应的字段列表
+    """
+    return [
+        timestamp, image_path, detection['part_category'],
+        f"{detection['confidence']:.4f}",
+        f"{detection['bbox_x']:.1f}", f"{detection['bbox_y']:.1f}",
+        f"{detection['bbox_width']:.1f}", f"{detection['bbox_height']:.1f}",
+        f"{detection.get('detection_time_ms', 0.0):.2f}",
+        detection.get('model_version', ''),
+    ]
+
+
+class DetectionResultWriter:
+    """
+    检测结果写入器类
+
+    调用方线程只把结果追加到内存缓冲区；格式化和磁盘I/O都在后台线程完成。
+    文件只打开一次，关闭时保证缓冲区中的结果全部写出。
+    """
+
+    def __init__(self, output_file: Optional[Union[str, Path]] = None,
+                 config_loader: Optional[ConfigLoader] = None,
+                 flush_rows: Optional[int] = None,
+                 flush_interval: Optional[float] = None,
+                 durability: Optional[str] = None,
+                 max_pending_rows: Optional[int] = None,
+                 store=None):
+        """
+        初始化写入器
+
+        Args:
+            output_file: 结果CSV路径，默认为 data/results/detection_results.csv
+            config_loader: 配置加载器，默认使用全局配置
+            flush_rows: 缓冲行数达到该值时立即写入
+            flush_interval: 最长写入间隔（秒）
+            durability: 持久化策略，none / flush / fsync
+            max_pending_rows: 缓冲区上限，超过时 write 会等待后台线程写出
+            store: 同时写入的 DetectionResultStore，默认按 result_writer_config.columnar_store 创建
+        """
+        writer_config = (config_loader or default_config).get_config().get('result_writer_config', {})
+
+        self.output_file = Path(output_file or path_manager.get_detection_results_file())
+        self.flush_rows = int(flush_rows or writer_config.get('flush_rows', 512))
+        self.flush_interval = float(flush_interval or writer_config.get('flush_interval_s', 1.0))
+        self.durability = durability or writer_config.get('durability', 'flush')
+        self.max_pending_rows = int(max_pending_rows or writer_config.get('max_pending_rows', 100000))
+
+        if self.durability not in DURABILITY_MODES:
+            raise ValueError(f"不支持的持久化策略: {self.durability}，可选 {DURABILITY_MODES}")
+
+        if store is None and writer_config.get('columnar_store', False):
+            from .result_store import DetectionResultStore
+            store = DetectionResultStore()
+        self.store = store
+
+        self._pending: List[Tuple[str, str, Dict[str, Any]]] = []
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self.rows_written = 0
+
+        self._file = None
+        self._thread = threading.Thread(target=self._run, name="result-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, image_path: Union[str, Path], detections: Sequence[Dict[str, Any]],
+              timestamp: Optional[datetime] = None) -> None:
+        """
+        缓冲一张图片的检测结果（不执行磁盘I/O）
+
+        Args:
+            image_path: 图片路径
+            detections: 检测结果列表
+            timestamp: 检测时间，默认为当前时间
+        """
+        if not detections:
+            return
+        stamp = (timestamp or datetime.now()).strftime(TIMESTAMP_FORMAT)
+        path = str(image_path)
+
+        with self._condition:
+            self._check_state()
+            # 缓冲区已满时等待后台线程写出，避免内存无限增长
+            while len(self._pending) >= self.max_pending_rows:
+                self._condition.notify_all()
+                self._condition.wait(0.1)
+                self._check_state()
+
+            self._pending.extend((stamp, path, detection) for detection in detections)
+            if len(self._pending) >= self.flush_rows:
+                self._condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """
+        等待当前缓冲区中的结果全部写出
+
+        Args:
+            timeout: 最长等待时间（秒）
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._condition.notify_all()
+            while ((self._pending or self._in_flight) and self._error is None
+                   and self._thread.is_alive()):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._condition.wait(remaining if remaining is not None else 0.1)
+            self._check_error()
+
+    def close(self) -> None:
+        """写出剩余结果并关闭文件"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        atexit.unregister(self.close)
+        self._check_error()
+
+    def _check_state(self) -> None:
+        """写入前检查写入器状态"""
+        self._check_error()
+        if self._closed:
+            raise RuntimeError("结果写入器已关闭")
+
+    def _check_error(self) -> None:
+        """后台线程出错时在调用方线程抛出"""
+        if self._error is not None:
+            raise RuntimeError(f"检测结果写入失败: {self._error}") from self._error
+
+    def _run(self) -> None:
+        """后台线程：按阈值或时间间隔批量写入"""
+        try:
+            while True:
+                with self._condition:
+                    deadline = time.monotonic() + self.flush_interval
+                    while (not self._closed and len(self._pending) < self.flush_rows):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    batch, self._pending = self._pending, []
+                    self._in_flight = len(batch)
+                    closing = self._closed
+                    # 唤醒因缓冲区已满而等待的调用方
+                    self._condition.notify_all()
+
+                if batch:
+                    self._write_batch(batch)
+                with self._condition:
+                    self._in_flight = 0
+                    self._condition.notify_all()
+                if closing:
+                    break
+        except Exception as e:
+            logger.error(f"检测结果写入失败: {e}")
+            with self._condition:
+                self._error = e
+                self._condition.notify_all()
+        finally:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _open(self):
+        """首次写入时打开文件，必要时写入表头"""
+        path_manager.ensure_dir_exists(self.output_file.parent)
+        write_header = not self.output_file.exists() or self.output_file.stat().st_size == 0
+        self._file = open(self.output_file, 'a', newline='', encoding='utf-8')
+        if write_header:
+            csv.writer(self._file).writerow(CSV_COLUMNS)
+        return self._file
+
+    def _write_batch(self, batch: List[Tuple[str, str, Dict[str, Any]]]) -> None:
+        """格式化一批结果并一次性写入"""
+        with metrics.stage('write'):
+            self._write_rows(batch)
+        self.rows_written += len(batch)
+
+    def _write_rows(self, batch: List[Tuple[str, str, Dict[str, Any]]]) -> None:
+        """写入CSV（以及列式存储）"""
+        text = io.StringIO()
+        writer = csv.writer(text)
+        writer.writerows(format_row(stamp, path, detection) for stamp, path, detection in batch)
+
+        f = self._file or self._open()
+        f.write(text.getvalue())
+        if self.durability in ('flush', 'fsync'):
+            f.flush()
+        if self.durability == 'fsync':
+            os.fsync(f.fileno())
+
+        if self.store is not None:
+            self.store.append([
+                dict(detection, timestamp=stamp, image_path=path)
+                for stamp, path, detection in batch
+            ])
+
+    def __enter__(self) -> "DetectionResultWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
@@ -0,0 +1,359 @@
+"""
+数据集分片存储
+将 data/datasets 下每个划分打包为少量大分片文件（原始编码图片字节 + 标注 + 偏移索引），
+训练时通过内存映射按下标随机读取，避免每个epoch打开大量小文件
+"""
+
+import json
+import os
+import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from ..utils.config_loader import ConfigLoader, config as default_config
+from ..utils.logger import logger
+from ..utils.path_manager import path_manager
+from .dataset_index import SPLITS, DatasetIndexer, DatasetManifest, parse_label_file
+
+SHARD_VERSION = 1
+META_FILE = 'meta.json'
+INDEX_FILE = 'index.npy'
+LABELS_FILE = 'labels.npy'
+SHARD_PATTERN = 'shard-{:05d}.bin'
+
+# 每条记录在索引中的字段：所在分片、分片内偏移、字节数、图片尺寸、标注起始行和行数
+INDEX_DTYPE = np.dtype([
+    ('shard', np.uint32),
+    ('offset', np.uint64),
+    ('length', np.uint32),
+    ('width', np.uint32),
+    ('height', np.uint32),
+    ('label_start', np.uint64),
+    ('label_count', np.uint32),
+])
+
+
+def _read_record(root: Path, entry: Dict[str, Any],
+                 num_classes: int) -> Tuple[Optional[bytes], np.ndarray]:
+    """读取一条记录的图片字节和有效标注"""
+    try:
+        with open(root / entry['path'], 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        logger.warning(f"图片读取失败，跳过: {entry['path']} ({e})")
+        return None, np.zeros((0, 5), dtype=np.float32)
+
+    labels = np.zeros((0, 5), dtype=np.float32)
+    if entry['label']:
+        try:
+            labels = parse_label_file(root / entry['label'])
+        except (OSError, ValueError):
+            pass
+        class_ids = labels[:, 0]
+        labels = labels[(class_ids >= 0) & (class_ids < num_classes) & (class_ids == np.floor(class_ids))]
+    return data, labels
+
+
+def _read_ahead(pool: ThreadPoolExecutor, read, entries: List[Dict[str, Any]],
+                max_inflight: int) -> Iterator[Tuple[Dict[str, Any], Tuple[Optional[bytes], np.ndarray]]]:
+    """
+    按清单顺序产出 (条目, 读取结果)
+
+    最多 max_inflight 条记录已提交而未被消费，避免消费方（写分片）慢于读取时
+    整个划分的图片字节堆积在内存中
+    """
+    inflight = deque()
+    pending = iter(entries)
+    try:
+        while True:
+            while len(inflight) < max_inflight:
+                entry = next(pending, None)
+                if entry is None:
+                    break
+                inflight.append((entry, pool.submit(read, entry)))
+            if not inflight:
+                return
+            entry, future = inflight.popleft()
+            yield entry, future.result()
+    finally:
+        for _, future in inflight:
+            future.cancel()
+
+
+class ShardPacker:
+    """
+    分片打包器类
+
+    分片目录中记录源清单的指纹，源划分未变化时直接复用已有分片。
+    新分片先写入临时目录再整体替换，正在读取旧分片的进程不受影响。
+    """
+
+    def __init__(self, config_loader: Optional[ConfigLoader] = None,
+                 shard_size_mb: Optional[int] = None,
+                 io_workers: Optional[int] = None):
+        """
+        初始化打包器
+
+        Args:
+            config_loader: 配置加载器，默认使用全局配置
+            shard_size_mb: 单个分片文件的目标大小（MB）
+            io_workers: 读取源文件的线程数
+        """
+        self.config = config_loader or default_config
+        dataset_config = self.config.get_config().get('dataset_config', {})
+        self.shard_size = int(shard_size_mb or dataset_config.get('shard_size_mb', 256)) * 1024 * 1024
+        self.io_workers = int(io_workers or dataset_config.get('io_workers', 8))
+        self.indexer = DatasetIndexer(self.config, io_workers=self.io_workers)
+
+    def is_current(self, manifest: DatasetManifest, shard_dir: Union[str, Path]) -> bool:
+        """
+        判断已有分片是否与清单一致
+
+        Args:
+            manifest: 数据集清单
+            shard_dir: 分片目录
+
+        Returns:
+            一致时返回True
+        """
+        meta_file = Path(shard_dir) / META_FILE
+        if not meta_file.exists():
+            return False
+        try:
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return (meta.get('version') == SHARD_VERSION
+                and meta.get('fingerprint') == manifest.fingerprint()
+                and meta.get('class_names') == manifest.class_names)
+
+    def pack(self, split: str, force: bool = False,
+             shard_dir: Optional[Union[str, Path]] = None,
+             manifest: Optional[DatasetManifest] = None) -> Path:
+        """
+        打包一个数据集划分（源数据未变化时跳过）
+
+        Args:
+            split: 数据集划分名称
+            force: 为True时无论是否变化都重新打包
+            shard_dir: 分片目录，默认为 PathManager.get_shard_dir(split)
+            manifest: 数据集清单，默认增量更新 data/datasets 下的清单
+
+        Returns:
+            分片目录路径
+        """
+        shard_dir = Path(shard_dir or path_manager.get_shard_dir(split))
+        manifest = manifest or self.indexer.build(split)
+
+        if not force and self.is_current(manifest, shard_dir):
+            logger.info(f"数据集分片已是最新: {split} ({shard_dir})")
+            return shard_dir
+
+        tmp_dir = shard_dir.with_name(shard_dir.name + '.tmp')
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir(parents=True)
+
+        meta = self._write_shards(manifest, tmp_dir)
+
+        # 旧目录先改名再删除，替换过程中不会出现半成品目录
+        old_dir = shard_dir.with_name(shard_dir.name + '.old')
+        if shard_dir.exists():
+            if old_dir.exists():
+                shutil.rmtree(old_dir)
+            os.replace(shard_dir, old_dir)
+        os.replace(tmp_dir, shard_dir)
+        if old_dir.exists():
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+        logger.info(
+            f"数据集分片已生成: {split} 共 {meta['records']} 张图片, "
+            f"{len(meta['shards'])} 个分片, {meta['bytes'] / 1024 / 1024:.1f} MB"
+        )
+        return shard_dir
+
+    def pack_all(self, force: bool = False) -> Dict[str, Path]:
+        """打包 train / val / test 全部划分"""
+        return {split: self.pack(split, force=force) for split in SPLITS}
+
+    def _write_shards(self, manifest: DatasetManifest, out_dir: Path) -> Dict[str, Any]:
+        """顺序写入分片文件、索引和标注，返回元数据"""
+        num_classes = len(manifest.class_names)
+        index = np.zeros(len(manifest), dtype=INDEX_DTYPE)
+        labels: List[np.ndarray] = []
+        paths: List[str] = []
+        shards: List[Dict[str, Any]] = []
+
+        shard_file = None
+        shard_bytes = 0
+        label_rows = 0
+        count = 0
+
+        def read(entry):
+            return _read_record(manifest.root, entry, num_classes)
+
+        try:
+            # 网络磁盘上读取延迟占主导，用线程池预读；预读窗口限制为线程数的两倍，保持清单顺序
+            with ThreadPoolExecutor(max_workers=self.io_workers) as pool:
+                for entry, (data, boxes) in _read_ahead(pool, read, manifest.entries, self.io_workers * 2):
+                    if data is None:
+                        continue
+                    if shard_file is None or (shard_bytes and shard_bytes + len(data) > self.shard_size):
+                        if shard_file is not None:
+                            shard_file.close()
+                        shards.append({'file': SHARD_PATTERN.format(len(shards)), 'bytes': 0, 'records': 0})
+                        shard_file = open(out_dir / shards[-1]['file'], 'wb')
+                        shard_bytes = 0
+
+                    shard_file.write(data)
+                    record = index[count]
+                    record['shard'] = len(shards) - 1
+                    record['offset'] = shard_bytes
+                    record['length'] = len(data)
+                    record['width'] = entry['width'] or 0
+                    record['height'] = entry['height'] or 0
+                    record['label_start'] = label_rows
+                    record['label_count'] = len(boxes)
+
+                    shard_bytes += len(data)
+                    shards[-1]['bytes'] = shard_bytes
+                    shards[-1]['records'] += 1
+                    label_rows += len(boxes)
+                    labels.append(boxes)
+                    paths.append(entry['path'])
+                    count += 1
+        finally:
+            if shard_file is not None:
+                shard_file.close()
+
+        np.save(out_dir / INDEX_FILE, index[:count])
+        np.save(out_dir / LABELS_FILE,
+                np.concatenate(labels) if labels else np.zeros((0, 5), dtype=np.float32))
+
+        meta = {
+            'version': SHARD_VERSION,
+            'split': manifest.split,
+            'root': str(manifest.root),
+            'fingerprint': manifest.fingerprint(),
+            'class_names': manifest.class_names,
+            'records': count,
+            'bytes': sum(shard['bytes'] for shard in shards),
+            'shards': shards,
+            'paths': paths,
+        }
+        with open(out_dir / META_FILE, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        return meta
+
+
+class ShardDataset:
+    """
+    分片数据集类
+
+    索引、标注和分片文件都以内存映射方式打开，按下标随机读取时只触及对应的页。
+    内存映射在首次访问时按进程打开，可以安全地传给多进程数据加载器。
+    """
+
+    def __init__(self, split: str = 'train', shard_dir: Optional[Union[str, Path]] = None):
+        """
+        打开分片数据集
+
+        Args:
+            split: 数据集划分名称
+            shard_dir: 分片目录，默认为 PathManager.get_shard_dir(split)
+        """
+        self.shard_dir = Path(shard_dir or path_manager.get_shard_dir(split))
+        with open(self.shard_dir / META_FILE, 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != SHARD_VERSION:
+            raise ValueError(f"不支持的分片版本: {self.meta.get('version')}")
+
+        self.split = self.meta['split']
+        self.class_names: List[str] = self.meta['class_names']
+        self.paths: List[str] = self.meta['paths']
+        self._pid: Optional[int] = None
+        self._index: Optional[np.ndarray] = None
+        self._labels: Optional[np.ndarray] = None
+        self._shards: List[np.ndarray] = []
+
+    def _open(self) -> None:
+        """在当前进程中打开内存映射"""
+        self._index = np.load(self.shard_dir / INDEX_FILE, mmap_mode='r')
+        self._labels = np.load(self.shard_dir / LABELS_FILE, mmap_mode='r')
+        self._shards = [
+            np.memmap(self.shard_dir / shard['file'], dtype=np.uint8, mode='r')
+            if shard['bytes'] else np.zeros(0, dtype=np.uint8)
+            for shard in self.meta['shards']
+        ]
+        self._pid = os.getpid()
+
+    @property
+    def index(self) -> np.ndarray:
+        """记录索引（结构化数组）"""
+        if self._pid != os.getpid():
+            self._open()
+        return self._index
+
+    def __len__(self) -> int:
+        return self.meta['records']
+
+    def __getitem__(self, i: int) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """
+        读取并解码一条记录
+
+        Args:
+            i: 记录下标
+
+        Returns:
+            (BGR图片, (N, 5) 标注数组)，图片无法解码时为None
+        """
+        return cv2.imdecode(self.read_bytes(i), cv2.IMREAD_COLOR), self.labels(i)
+
+    def __iter__(self) -> Iterator[Tuple[Optional[np.ndarray], np.ndarray]]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def read_bytes(self, i: int) -> np.ndarray:
+        """
+        读取一条记录的编码图片字节（不复制，直接指向内存映射）
+
+        Args:
+            i: 记录下标
+
+        Returns:
+            uint8数组
+        """
+        record = self.index[i]
+        offset = int(record['offset'])
+        return self._shards[int(record['shard'])][offset:offset + int(record['length'])]
+
+    def labels(self, i: int) -> np.ndarray:
+        """
+        读取一条记录的标注
+
+        Args:
+            i: 记录下标
+
+        Returns:
+            (N, 5) float32数组，每行为 class cx cy w h
+        """
+        record = self.index[i]
+        start = int(record['label_start'])
+        return np.array(self._labels[start:start + int(record['label_count'])])
+
+    def image_size(self, i: int) -> Tuple[int, int]:
+        """返回记录的原图尺寸 (width, height)"""
+        record = self.index[i]
+        return int(record['width']), int(record['height'])
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # 内存映射不随对象序列化，子进程首次访问时重新打开
+        state = self.__dict__.copy()
+        state.update(_pid=None, _index=None, _labels=None, _shards=[])
+        return state
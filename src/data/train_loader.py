@@ -0,0 +1,326 @@
+"""
+训练数据加载器
+工作进程从内存映射的数据集分片读取图片，增强后直接写入共享内存环形缓冲区，
+主进程只交换槽位编号，不再通过pickle复制图片数组；同时记录训练等待数据的时间
+"""
+
+import multiprocessing as mp
+import queue
+import time
+import traceback
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from ..utils.config_loader import ConfigLoader, config as default_config
+from ..utils.logger import logger
+from .augmentation import BatchAugmenter, batch_rng
+from .shard_store import ShardDataset, ShardPacker
+
+# 工作进程心跳检查间隔（秒）
+POLL_INTERVAL = 1.0
+
+
+class _Slot:
+    """环形缓冲区中的一个槽位：一批图片和一批标注的共享内存视图"""
+
+    def __init__(self, image_shape: Tuple[int, ...], label_capacity: int,
+                 names: Optional[Tuple[str, str]] = None):
+        create = names is None
+        image_bytes = int(np.prod(image_shape))
+        label_bytes = label_capacity * 6 * 4
+        self.image_memory = SharedMemory(name=None if create else names[0], create=create,
+                                         size=image_bytes if create else 0)
+        self.label_memory = SharedMemory(name=None if create else names[1], create=create,
+                                         size=max(label_bytes, 1) if create else 0)
+
+        self.images = np.ndarray(image_shape, dtype=np.uint8, buffer=self.image_memory.buf)
+        self.labels = np.ndarray((label_capacity, 6), dtype=np.float32, buffer=self.label_memory.buf)
+
+    @property
+    def names(self) -> Tuple[str, str]:
+        return self.image_memory.name, self.label_memory.name
+
+    def close(self, unlink: bool = False) -> None:
+        del self.images, self.labels
+        for memory in (self.image_memory, self.label_memory):
+            try:
+                memory.close()
+            except BufferError:
+                # 调用方仍持有批次视图时无法解除映射，共享内存在视图释放后回收
+                pass
+        if unlink:
+            self.image_memory.unlink()
+            self.label_memory.unlink()
+
+
+def _load_batch(dataset: ShardDataset, augmenter: BatchAugmenter, indices: List[int],
+                rng: np.random.Generator, images_out: np.ndarray,
+                labels_out: np.ndarray) -> Tuple[int, int]:
+    """解码并增强一批记录，结果写入给定的缓冲区，返回 (图片数, 标注数)"""
+    images, labels = [], []
+    for position, index in enumerate(indices):
+        image = cv2.imdecode(dataset.read_bytes(index), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"分片中的图片无法解码: {dataset.paths[index]}")
+        images.append(image)
+        boxes = dataset.labels(index)
+        labels.append(np.column_stack([np.full(len(boxes), position, dtype=np.float32), boxes]))
+
+    _, boxes = augmenter(images, np.concatenate(labels) if labels else np.zeros((0, 6)), rng,
+                         out=images_out)
+    labels_out[:len(boxes)] = boxes
+    return len(images), len(boxes)
+
+
+def _loader_worker(dataset: ShardDataset, augmenter: BatchAugmenter, seed: int,
+                   slot_names: List[Tuple[str, str]], image_shape: Tuple[int, ...],
+                   label_capacity: int, tasks, results) -> None:
+    """工作进程：领取 (槽位, 轮次, 批次序号, 下标) 任务，把结果写入对应槽位"""
+    cv2.setNumThreads(1)
+    slots = [_Slot(image_shape, label_capacity, names) for names in slot_names]
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            slot_id, epoch, batch_index, indices = task
+            slot = slots[slot_id]
+            try:
+                count, num_labels = _load_batch(
+                    dataset, augmenter, indices, batch_rng(seed, epoch, batch_index),
+                    slot.images, slot.labels)
+                results.put((batch_index, slot_id, count, num_labels, None))
+            except Exception:
+                results.put((batch_index, slot_id, 0, 0, traceback.format_exc()))
+    finally:
+        for slot in slots:
+            slot.close()
+
+
+class TrainDataLoader:
+    """
+    训练数据加载器类
+
+    批大小和工作进程数默认读取 training_config.batch_size / workers，
+    预取深度（环形缓冲区槽位数）读取 training_config.prefetch_batches。
+    迭代返回的图片数组是共享内存的视图，在取下一批之前有效。
+    """
+
+    def __init__(self, dataset: Union[str, ShardDataset] = 'train',
+                 config_loader: Optional[ConfigLoader] = None,
+                 batch_size: Optional[int] = None,
+                 workers: Optional[int] = None,
+                 prefetch_batches: Optional[int] = None,
+                 shuffle: bool = True,
+                 augment: bool = True,
+                 drop_last: bool = False,
+                 seed: Optional[int] = None):
+        """
+        初始化加载器
+
+        Args:
+            dataset: 分片数据集或划分名称；为划分名称时先按需打包分片
+            config_loader: 配置加载器，默认使用全局配置
+            batch_size: 批大小
+            workers: 工作进程数，为0时在当前进程加载
+            prefetch_batches: 预取深度，即环形缓冲区槽位数，默认为进程数的2倍
+            shuffle: 每轮是否打乱顺序
+            augment: 是否做数据增强（验证集只做letterbox）
+            drop_last: 是否丢弃最后不足一批的数据
+            seed: 随机种子，默认读取 training_config.seed
+        """
+        self.config = config_loader or default_config
+        training_config = self.config.get_config().get('training_config', {})
+
+        if isinstance(dataset, str):
+            dataset = ShardDataset(dataset, ShardPacker(self.config).pack(dataset))
+        self.dataset = dataset
+        self.batch_size = int(batch_size or training_config.get('batch_size', 8))
+        self.workers = int(workers if workers is not None else training_config.get('workers', 0))
+        self.prefetch_batches = int(prefetch_batches or training_config.get(
+            'prefetch_batches', max(2 * self.workers, 2)))
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.seed = int(seed if seed is not None else training_config.get('seed', 0))
+        self.augmenter = BatchAugmenter(self.config, augment=augment)
+
+        self.image_shape = (self.batch_size, self.augmenter.height, self.augmenter.width, 3)
+        # 增强只会删除标注框，按单张图片最多标注数估计每批标注容量
+        index = self.dataset.index
+        max_labels = int(index['label_count'].max()) if len(index) else 0
+        self.label_capacity = max(max_labels * self.batch_size, 1)
+
+        self.epoch = 0
+        self.wait_time_s = 0.0
+        self.epoch_time_s = 0.0
+        self.batches_loaded = 0
+
+        self._slots: List[_Slot] = []
+        self._processes: List[mp.process.BaseProcess] = []
+        self._tasks = None
+        self._results = None
+
+    def __len__(self) -> int:
+        if self.drop_last:
+            return len(self.dataset) // self.batch_size
+        return (len(self.dataset) + self.batch_size - 1) // self.batch_size
+
+    def _batches(self, epoch: int) -> List[List[int]]:
+        """按轮次生成每个批次的记录下标"""
+        order = np.arange(len(self.dataset))
+        if self.shuffle:
+            order = np.random.default_rng([self.seed, epoch]).permutation(order)
+        return [order[i:i + self.batch_size].tolist() for i in range(0, len(self) * self.batch_size,
+                                                                     self.batch_size)]
+
+    def _start(self) -> None:
+        """分配共享内存并启动工作进程"""
+        if self._processes:
+            return
+        self._slots = [_Slot(self.image_shape, self.label_capacity)
+                       for _ in range(self.prefetch_batches)]
+        context = mp.get_context()
+        self._tasks = context.Queue()
+        self._results = context.Queue()
+        slot_names = [slot.names for slot in self._slots]
+        for i in range(self.workers):
+            process = context.Process(
+                target=_loader_worker,
+                args=(self.dataset, self.augmenter, self.seed, slot_names, self.image_shape,
+                      self.label_capacity, self._tasks, self._results),
+                name=f"train-loader-{i}",
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+
+    def __iter__(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        迭代一轮数据
+
+        Yields:
+            (形状为 (B, H, W, 3) 的uint8 BGR图片, (M, 6) 标注 [图片序号, class, cx, cy, w, h])
+        """
+        epoch = self.epoch
+        self.epoch += 1
+        self.wait_time_s = 0.0
+        self.batches_loaded = 0
+        batches = self._batches(epoch)
+        start = time.monotonic()
+
+        if self.workers == 0:
+            yield from self._iter_local(batches, epoch)
+        else:
+            yield from self._iter_workers(batches, epoch)
+
+        self.epoch_time_s = time.monotonic() - start
+        logger.info(
+            f"第 {epoch + 1} 轮数据加载: {self.batches_loaded} 批, 等待数据 {self.wait_time_s:.2f}s / "
+            f"{self.epoch_time_s:.2f}s ({100 * self.wait_fraction:.1f}%)"
+        )
+
+    def _iter_local(self, batches: List[List[int]], epoch: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """在当前进程中加载（调试或单核环境）"""
+        images = np.empty(self.image_shape, dtype=np.uint8)
+        labels = np.empty((self.label_capacity, 6), dtype=np.float32)
+        for batch_index, indices in enumerate(batches):
+            wait_start = time.monotonic()
+            count, num_labels = _load_batch(self.dataset, self.augmenter, indices,
+                                            batch_rng(self.seed, epoch, batch_index), images, labels)
+            self.wait_time_s += time.monotonic() - wait_start
+            self.batches_loaded += 1
+            yield images[:count], labels[:num_labels].copy()
+
+    def _iter_workers(self, batches: List[List[int]], epoch: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """由工作进程预取，按批次顺序返回"""
+        self._start()
+        free = list(range(len(self._slots)))
+        ready: Dict[int, Tuple[int, int, int]] = {}
+        submitted = 0
+        in_flight = 0
+        try:
+            for batch_index in range(len(batches)):
+                # 空闲槽位全部用于预取后续批次
+                while free and submitted < len(batches):
+                    self._tasks.put((free.pop(), epoch, submitted, batches[submitted]))
+                    submitted += 1
+                    in_flight += 1
+
+                wait_start = time.monotonic()
+                while batch_index not in ready:
+                    result = self._next_result()
+                    in_flight -= 1
+                    done_index, slot_id, count, num_labels, error = result
+                    if error is not None:
+                        free.append(slot_id)
+                        raise RuntimeError(f"训练数据加载失败 (批次 {done_index}):\n{error}")
+                    ready[done_index] = (slot_id, count, num_labels)
+                self.wait_time_s += time.monotonic() - wait_start
+
+                slot_id, count, num_labels = ready.pop(batch_index)
+                slot = self._slots[slot_id]
+                self.batches_loaded += 1
+                yield slot.images[:count], slot.labels[:num_labels].copy()
+                # 调用方取下一批时，上一批的槽位才可复用
+                free.append(slot_id)
+        finally:
+            # 提前结束时等待在途批次完成，避免旧结果混入下一轮
+            while in_flight > 0:
+                try:
+                    self._next_result()
+                except RuntimeError:
+                    break
+                in_flight -= 1
+
+    def _next_result(self) -> Tuple[int, int, int, int, Optional[str]]:
+        """从结果队列取一条消息，同时检查工作进程是否意外退出"""
+        while True:
+            try:
+                return self._results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                dead = [p.name for p in self._processes if not p.is_alive()]
+                if dead:
+                    raise RuntimeError(f"训练数据加载进程意外退出: {', '.join(dead)}")
+
+    @property
+    def wait_fraction(self) -> float:
+        """本轮训练等待数据的时间占比"""
+        elapsed = self.epoch_time_s
+        return self.wait_time_s / elapsed if elapsed > 0 else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """最近一轮的数据加载统计"""
+        return {
+            'batches': self.batches_loaded,
+            'data_wait_s': self.wait_time_s,
+            'epoch_time_s': self.epoch_time_s,
+            'data_wait_fraction': self.wait_fraction,
+        }
+
+    def close(self) -> None:
+        """停止工作进程并释放共享内存"""
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        for slot in self._slots:
+            slot.close(unlink=True)
+        self._slots = []
+
+    def __enter__(self) -> "TrainDataLoader":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
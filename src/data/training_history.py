@@ -0,0 +1,402 @@
+"""
+训练历史记录
+每个训练会话一个只追加的 JSON Lines 文件（data/results/training_history/<session_id>.jsonl），
+由后台线程批量写入；会话摘要定期压缩写入 training_history.json，
+查询单个会话的指标时只读取该会话的文件
+"""
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from ..utils.config_loader import ConfigLoader, config as default_config
+from ..utils.logger import logger
+from ..utils.path_manager import path_manager
+from .result_writer import TIMESTAMP_FORMAT
+
+# 记录类型：会话开始、训练步、训练轮次、会话结束
+RECORD_TYPES = ('start', 'step', 'epoch', 'end')
+
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def _to_python(value: Any) -> Any:
+    """把 numpy 标量/数组转换为 Python 数值，供 JSON 编码使用"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"无法编码为JSON的类型: {type(value).__name__}")
+
+
+def _encode(record: Dict[str, Any]) -> str:
+    """紧凑编码一条记录，type 固定在最前面，便于读取时按前缀过滤"""
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=_to_python)
+
+
+@contextmanager
+def _file_lock(lock_file: Path) -> Iterator[None]:
+    """跨进程文件锁，保护摘要文件的读-改-写"""
+    with open(lock_file, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _load_summary(summary_file: Path) -> Dict[str, Any]:
+    """读取 training_history.json，不存在或损坏时返回空摘要"""
+    try:
+        with open(summary_file, 'r', encoding='utf-8') as f:
+            summary = json.load(f)
+        if isinstance(summary.get('training_sessions'), list):
+            return summary
+    except (OSError, ValueError):
+        pass
+    return {'training_sessions': []}
+
+
+class _SessionSummary:
+    """增量维护的会话摘要：步数、轮数、最近一轮指标以及各指标的最小/最大值"""
+
+    def __init__(self, session_id: str, log_file: str, params: Dict[str, Any]):
+        self.data: Dict[str, Any] = {
+            'session_id': session_id,
+            'log_file': log_file,
+            'status': 'running',
+            'start_time': datetime.now().strftime(TIMESTAMP_FORMAT),
+            'end_time': None,
+            'params': params,
+            'steps': 0,
+            'epochs': 0,
+            'last_step': None,
+            'last_epoch': None,
+            'best': {},
+        }
+
+    def update(self, record: Dict[str, Any]) -> None:
+        kind = record['type']
+        if kind == 'step':
+            self.data['steps'] += 1
+            self.data['last_step'] = record['step']
+        elif kind == 'epoch':
+            self.data['epochs'] += 1
+            self.data['last_epoch'] = {'epoch': record['epoch'], **record['metrics']}
+            best = self.data['best']
+            for name, value in record['metrics'].items():
+                if isinstance(value, np.generic):
+                    value = value.item()
+                if not isinstance(value, (int, float)):
+                    continue
+                item = best.setdefault(name, {'min': value, 'max': value})
+                item['min'] = min(item['min'], value)
+                item['max'] = max(item['max'], value)
+        elif kind == 'end':
+            self.data['status'] = record['status']
+            self.data['end_time'] = record['time']
+
+
+class TrainingHistoryWriter:
+    """
+    训练历史写入器类
+
+    调用方线程只把记录追加到内存缓冲区；编码和文件写入由后台线程批量完成。
+    后台线程每隔 compact_interval_s 把会话摘要写入 training_history.json，
+    摘要文件只包含各会话的汇总信息，大小与步数无关。
+    """
+
+    def __init__(self, session_id: Optional[str] = None,
+                 params: Optional[Dict[str, Any]] = None,
+                 config_loader: Optional[ConfigLoader] = None,
+                 history_dir: Optional[Union[str, Path]] = None,
+                 summary_file: Optional[Union[str, Path]] = None,
+                 flush_lines: Optional[int] = None,
+                 flush_interval: Optional[float] = None,
+                 compact_interval: Optional[float] = None):
+        """
+        开始一个训练会话
+
+        Args:
+            session_id: 会话编号，默认为 "<日期时间>_<进程号>"
+            params: 会话参数（超参数、数据集等），写入会话开始记录和摘要
+            config_loader: 配置加载器，默认使用全局配置
+            history_dir: 会话日志目录，默认为 data/results/training_history
+            summary_file: 摘要文件，默认为 data/results/training_history.json
+            flush_lines: 缓冲行数达到该值时立即写入
+            flush_interval: 最长写入间隔（秒）
+            compact_interval: 摘要写入间隔（秒）
+        """
+        history_config = (config_loader or default_config).get_config().get('history_config', {})
+
+        self.session_id = session_id or f"{datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}"
+        self.history_dir = Path(history_dir or path_manager.get_training_history_dir())
+        self.summary_file = Path(summary_file or path_manager.get_training_history_file())
+        self.log_file = self.history_dir / f"{self.session_id}.jsonl"
+        self.flush_lines = int(flush_lines or history_config.get('flush_lines', 1000))
+        self.flush_interval = float(flush_interval or history_config.get('flush_interval_s', 1.0))
+        self.compact_interval = float(compact_interval or history_config.get('compact_interval_s', 60))
+
+        params = dict(params or {})
+        self._summary = _SessionSummary(self.session_id, self.log_file.name, params)
+        self._pending: List[Dict[str, Any]] = []
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._last_compact = time.monotonic()
+        self._file = None
+
+        self._append({'type': 'start', 'session_id': self.session_id,
+                      'time': self._summary.data['start_time'], 'params': params})
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close, 'interrupted')
+
+    def log_step(self, step: int, epoch: Optional[int] = None, **metrics: Any) -> None:
+        """
+        记录一个训练步的指标
+
+        Args:
+            step: 全局步数
+            epoch: 所在轮次
+            **metrics: 指标，如 loss=0.5, lr=1e-3
+        """
+        self._append({'type': 'step', 'step': int(step), 'epoch': epoch, 'metrics': metrics})
+
+    def log_epoch(self, epoch: int, **metrics: Any) -> None:
+        """
+        记录一个训练轮次的指标
+
+        Args:
+            epoch: 轮次
+            **metrics: 指标，如 val_map50=0.8, data_wait_fraction=0.1
+        """
+        self._append({'type': 'epoch', 'epoch': int(epoch), 'metrics': metrics})
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        with self._condition:
+            self._check_error()
+            if self._closed:
+                raise RuntimeError("训练历史写入器已关闭")
+            self._pending.append(record)
+            if len(self._pending) >= self.flush_lines:
+                self._condition.notify_all()
+
+    def flush(self) -> None:
+        """等待缓冲区中的记录全部写出"""
+        with self._condition:
+            self._condition.notify_all()
+            while ((self._pending or self._in_flight) and self._error is None
+                   and self._thread.is_alive()):
+                self._condition.wait(0.1)
+            self._check_error()
+
+    def close(self, status: str = 'completed') -> None:
+        """
+        结束会话：写出剩余记录并更新摘要
+
+        Args:
+            status: 会话状态，如 completed / failed / interrupted
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._pending.append({'type': 'end', 'status': status,
+                                  'time': datetime.now().strftime(TIMESTAMP_FORMAT)})
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        atexit.unregister(self.close)
+        self._check_error()
+
+    def _check_error(self) -> None:
+        """后台线程出错时在调用方线程抛出"""
+        if self._error is not None:
+            raise RuntimeError(f"训练历史写入失败: {self._error}") from self._error
+
+    def _run(self) -> None:
+        """后台线程：批量写入会话日志，并定期压缩摘要"""
+        try:
+            while True:
+                with self._condition:
+                    deadline = time.monotonic() + self.flush_interval
+                    while not self._closed and len(self._pending) < self.flush_lines:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    batch, self._pending = self._pending, []
+                    self._in_flight = len(batch)
+                    closing = self._closed
+
+                if batch:
+                    self._write_batch(batch)
+                if closing or time.monotonic() - self._last_compact >= self.compact_interval:
+                    self.compact()
+                with self._condition:
+                    self._in_flight = 0
+                    self._condition.notify_all()
+                if closing:
+                    break
+        except Exception as e:
+            logger.error(f"训练历史写入失败: {e}")
+            with self._condition:
+                self._error = e
+                self._condition.notify_all()
+        finally:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """编码一批记录并一次性追加到会话日志"""
+        if self._file is None:
+            path_manager.ensure_dir_exists(self.history_dir)
+            self._file = open(self.log_file, 'a', encoding='utf-8')
+        self._file.write(''.join(_encode(record) + '\n' for record in batch))
+        self._file.flush()
+        for record in batch:
+            self._summary.update(record)
+
+    def compact(self) -> None:
+        """
+        将本会话的摘要写入 training_history.json
+
+        多个训练进程共享摘要文件：读-改-写在文件锁内完成，
+        每次写入使用同目录下的独立临时文件再原子替换
+        """
+        path_manager.ensure_dir_exists(self.summary_file.parent)
+        with _file_lock(self.summary_file.with_name(self.summary_file.name + '.lock')):
+            summary = _load_summary(self.summary_file)
+            sessions = [s for s in summary['training_sessions']
+                        if s.get('session_id') != self.session_id]
+            sessions.append(self._summary.data)
+            summary['training_sessions'] = sessions
+
+            fd, tmp = tempfile.mkstemp(prefix=self.summary_file.name + '.',
+                                       suffix='.tmp', dir=self.summary_file.parent)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(summary, f, ensure_ascii=False, indent=2, default=_to_python)
+                os.replace(tmp, self.summary_file)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+        self._last_compact = time.monotonic()
+
+    def __enter__(self) -> "TrainingHistoryWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close('failed' if exc_type is not None else 'completed')
+
+
+class TrainingHistory:
+    """
+    训练历史读取类
+
+    会话列表来自 training_history.json；尚未压缩进摘要的会话（如异常退出的会话）
+    从会话日志目录中补充。查询指标时只流式读取一个会话的日志文件。
+    """
+
+    def __init__(self, history_dir: Optional[Union[str, Path]] = None,
+                 summary_file: Optional[Union[str, Path]] = None):
+        """
+        初始化
+
+        Args:
+            history_dir: 会话日志目录，默认为 data/results/training_history
+            summary_file: 摘要文件，默认为 data/results/training_history.json
+        """
+        self.history_dir = Path(history_dir or path_manager.get_training_history_dir())
+        self.summary_file = Path(summary_file or path_manager.get_training_history_file())
+
+    def sessions(self) -> List[Dict[str, Any]]:
+        """
+        列出所有会话摘要
+
+        Returns:
+            会话摘要列表，按会话编号排序
+        """
+        sessions = {s['session_id']: s for s in _load_summary(self.summary_file)['training_sessions']
+                    if 'session_id' in s}
+        if self.history_dir.exists():
+            for log_file in self.history_dir.glob('*.jsonl'):
+                if log_file.stem not in sessions:
+                    sessions[log_file.stem] = {'session_id': log_file.stem, 'log_file': log_file.name,
+                                               'status': 'unknown'}
+        return [sessions[key] for key in sorted(sessions)]
+
+    def records(self, session_id: str, kind: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        流式读取一个会话的记录
+
+        Args:
+            session_id: 会话编号
+            kind: 只返回该类型的记录（start / step / epoch / end）
+
+        Yields:
+            记录字典
+        """
+        if kind is not None and kind not in RECORD_TYPES:
+            raise ValueError(f"不支持的记录类型: {kind}，可选 {RECORD_TYPES}")
+        prefix = f'{{"type":"{kind}"' if kind else None
+        with open(self.history_dir / f"{session_id}.jsonl", 'r', encoding='utf-8') as f:
+            for line in f:
+                # 按前缀过滤，跳过的行无需JSON解析
+                if prefix is not None and not line.startswith(prefix):
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # 进程中断时最后一行可能不完整
+                    continue
+
+    def metrics(self, session_id: str, names: Sequence[str],
+                kind: str = 'epoch') -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        读取一个会话中若干指标的序列
+
+        Args:
+            session_id: 会话编号
+            names: 指标名称列表
+            kind: step 或 epoch
+
+        Returns:
+            (步数或轮次数组, {指标名: 数值数组})，缺失的值为NaN
+        """
+        key = 'step' if kind == 'step' else 'epoch'
+        positions: List[int] = []
+        values: Dict[str, List[float]] = {name: [] for name in names}
+        for record in self.records(session_id, kind):
+            positions.append(record[key])
+            metrics = record['metrics']
+            for name in names:
+                value = metrics.get(name)
+                values[name].append(float(value) if value is not None else np.nan)
+        return (np.asarray(positions, dtype=np.int64),
+                {name: np.asarray(series, dtype=np.float64) for name, series in values.items()})
@@ -0,0 +1,225 @@
+"""
+视频/相机帧采集
+采集线程独立于推理持续读取视频文件、V4L2 设备或网络流，
+最新帧写入单槽缓冲区：推理慢于相机时旧帧直接被覆盖丢弃，而不是排队积压，
+端到端延迟始终不超过一次推理的时间
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from ..utils.config_loader import ConfigLoader, config as default_config
+from ..utils.logger import logger
+
+
+class Frame:
+    """一帧图像及其采集信息"""
+
+    __slots__ = ('image', 'index', 'timestamp')
+
+    def __init__(self, image: np.ndarray, index: int, timestamp: float):
+        """
+        Args:
+            image: BGR图像
+            index: 帧序号（从0开始，包含被丢弃的帧）
+            timestamp: 采集完成时的 time.perf_counter()
+        """
+        self.image = image
+        self.index = index
+        self.timestamp = timestamp
+
+
+class LatestFrameBuffer:
+    """
+    单槽"最新帧优先"缓冲区
+
+    put 总是覆盖槽位；上一帧还没被取走时计为丢帧。
+    get 只返回比上次取到的更新的帧。
+    """
+
+    def __init__(self):
+        self._frame: Optional[Frame] = None
+        self._condition = threading.Condition()
+        self._closed = False
+        self.put_count = 0
+        self.dropped = 0
+
+    def put(self, frame: Frame, block: bool = False) -> None:
+        """
+        放入最新帧
+
+        Args:
+            frame: 帧
+            block: 为True时等待上一帧被取走（逐帧处理视频文件），否则覆盖未被取走的旧帧
+        """
+        with self._condition:
+            while block and self._frame is not None and not self._closed:
+                self._condition.wait()
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+            self.put_count += 1
+            self._condition.notify_all()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Frame]:
+        """
+        取走最新帧
+
+        Args:
+            timeout: 最长等待时间（秒），None表示一直等待
+
+        Returns:
+            最新帧；超时或缓冲区已关闭且没有剩余帧时返回None
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._frame is None and not self._closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            frame, self._frame = self._frame, None
+            self._condition.notify_all()
+            return frame
+
+    def close(self) -> None:
+        """关闭缓冲区，唤醒等待中的 get"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+
+def parse_source(source: Union[str, int]) -> Tuple[Union[str, int], bool]:
+    """
+    解析视频源
+
+    Args:
+        source: 视频文件路径、设备编号（如 0）、设备路径（如 /dev/video0）或流地址
+
+    Returns:
+        (传给 cv2.VideoCapture 的参数, 是否为本地视频文件)
+    """
+    if isinstance(source, int):
+        return source, False
+    if source.isdigit():
+        return int(source), False
+    if '://' in source or source.startswith('/dev/'):
+        return source, False
+    return source, Path(source).is_file()
+
+
+class FrameCapture:
+    """
+    帧采集线程类
+
+    本地视频文件默认按文件帧率读取（模拟相机），关闭 realtime 时逐帧等待检测、不丢帧；
+    实时源断开后按间隔重连。
+    """
+
+    def __init__(self, source: Union[str, int], buffer: Optional[LatestFrameBuffer] = None,
+                 config_loader: Optional[ConfigLoader] = None,
+                 realtime: Optional[bool] = None):
+        """
+        初始化
+
+        Args:
+            source: 视频文件路径、设备编号、设备路径或流地址
+            buffer: 帧缓冲区，默认新建
+            config_loader: 配置加载器，默认使用全局配置
+            realtime: 视频文件是否按原始帧率读取（否则逐帧检测），默认读取 stream_config.realtime_files
+        """
+        stream_config = (config_loader or default_config).get_config().get('stream_config', {})
+
+        self.source, self.is_file = parse_source(source)
+        self.buffer = buffer or LatestFrameBuffer()
+        if realtime is None:
+            realtime = stream_config.get('realtime_files', True)
+        self.realtime = bool(realtime)
+        self.reconnect_interval = float(stream_config.get('reconnect_interval_s', 2.0))
+        self.reconnect_attempts = int(stream_config.get('reconnect_attempts', 5))
+
+        self.fps = 0.0
+        self.frames = 0
+        self.error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "FrameCapture":
+        """打开视频源并启动采集线程"""
+        capture = self._open()
+        self.fps = float(capture.get(cv2.CAP_PROP_FPS) or 0.0)
+        self._thread = threading.Thread(target=self._run, args=(capture,), name="frame-capture",
+                                        daemon=True)
+        self._thread.start()
+        logger.info(f"视频采集已启动: {self.source} (帧率 {self.fps:.1f})")
+        return self
+
+    def stop(self) -> None:
+        """停止采集线程"""
+        self._stop.set()
+        # 先关闭缓冲区，唤醒阻塞在 put 上的采集线程
+        self.buffer.close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _open(self) -> "cv2.VideoCapture":
+        capture = cv2.VideoCapture(self.source)
+        if not capture.isOpened():
+            raise ValueError(f"无法打开视频源: {self.source}")
+        if not self.is_file:
+            # 让驱动只保留最新一帧，避免在驱动层积压
+            capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return capture
+
+    def _run(self, capture: "cv2.VideoCapture") -> None:
+        """采集线程：持续读取并覆盖缓冲区中的帧"""
+        interval = 1.0 / self.fps if self.is_file and self.realtime and self.fps > 0 else 0.0
+        lossless = self.is_file and not self.realtime
+        next_due = time.perf_counter()
+        failures = 0
+        try:
+            while not self._stop.is_set():
+                ok, image = capture.read()
+                if not ok:
+                    if self.is_file or failures >= self.reconnect_attempts:
+                        break
+                    failures += 1
+                    logger.warning(f"视频源读取失败，{self.reconnect_interval:.1f}s 后重连 "
+                                   f"({failures}/{self.reconnect_attempts}): {self.source}")
+                    capture.release()
+                    if self._stop.wait(self.reconnect_interval):
+                        break
+                    capture = cv2.VideoCapture(self.source)
+                    continue
+                failures = 0
+
+                if interval:
+                    # 按文件帧率放出帧，模拟相机的到达节奏
+                    next_due += interval
+                    delay = next_due - time.perf_counter()
+                    if delay > 0 and self._stop.wait(delay):
+                        break
+                self.buffer.put(Frame(image, self.frames, time.perf_counter()), block=lossless)
+                self.frames += 1
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"视频采集失败: {e}")
+        finally:
+            capture.release()
+            self.buffer.close()
+
+    def __enter__(self) -> "FrameCapture":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
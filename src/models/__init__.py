@@ -1 +1,83 @@
-# Models module for YOLO detector and model trainer
\ No newline at end of file
+"""
+模型模块
+提供YOLO检测器和模型训练相关功能
+
+子模块按需导入，访问其中的名称时才加载（避免命令行启动时导入OpenCV、pandas等）
+"""
+
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .detector import HardwareDetector
+    from .model_registry import ModelRegistry
+    from .backends import load_backend, export_onnx, quantize_int8
+    from .tiling import TiledDetector, tile_grid
+    from .stream_detector import StreamDetector
+    from .motion_gate import MotionGatedDetector
+    from .nms import NonMaxSuppression, non_max_suppression, batched_nms, box_iou
+    from .batch_processor import BatchProcessor, iter_image_files
+    from .detection_cache import DetectionCache, CachedDetector, content_hash
+    from .evaluator import DetectionEvaluator, evaluate_parallel
+
+# 名称 -> 所在子模块
+_LAZY_ATTRS = {
+    'HardwareDetector': 'detector',
+    # 全局注册表与子模块同名，子模块导入后包属性即为子模块，因此不在包级导出；
+    # 使用 from src.models.model_registry import model_registry
+    'ModelRegistry': 'model_registry',
+    'load_backend': 'backends',
+    'export_onnx': 'backends',
+    'quantize_int8': 'backends',
+    'TiledDetector': 'tiling',
+    'tile_grid': 'tiling',
+    'StreamDetector': 'stream_detector',
+    'MotionGatedDetector': 'motion_gate',
+    'NonMaxSuppression': 'nms',
+    'non_max_suppression': 'nms',
+    'batched_nms': 'nms',
+    'box_iou': 'nms',
+    'BatchProcessor': 'batch_processor',
+    'iter_image_files': 'batch_processor',
+    'DetectionCache': 'detection_cache',
+    'CachedDetector': 'detection_cache',
+    'content_hash': 'detection_cache',
+    'DetectionEvaluator': 'evaluator',
+    'evaluate_parallel': 'evaluator',
+}
+
+__all__ = [
+    'HardwareDetector',
+    'ModelRegistry',
+    'load_backend',
+    'export_onnx',
+    'quantize_int8',
+    'TiledDetector',
+    'tile_grid',
+    'StreamDetector',
+    'MotionGatedDetector',
+    'NonMaxSuppression',
+    'non_max_suppression',
+    'batched_nms',
+    'box_iou',
+    'BatchProcessor',
+    'iter_image_files',
+    'DetectionCache',
+    'CachedDetector',
+    'content_hash',
+    'DetectionEvaluator',
+    'evaluate_parallel'
+]
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
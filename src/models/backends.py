@@ -0,0 +1,264 @@
+"""
+CPU推理后端
+torch: ultralytics 加载的 PyTorch 模型（FP32 eager）
+onnx: 导出到 data/models 的 ONNX 图，由 ONNX Runtime CPU 执行
+onnx_int8: 用 data/datasets/val 图片校准的 INT8 静态量化 ONNX 图
+
+所有后端的输入都是 LetterboxPreprocessor 输出的 (N, 3, H, W) float32 批次，
+输出都是 YOLOv8 原始预测 (N, 4 + 类别数, 锚点数) 的 float32 数组，NMS 与后端无关
+"""
+
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Union
+
+import numpy as np
+
+from ..utils.config_loader import ConfigLoader, config as default_config
+from ..utils.logger import logger
+from ..utils.path_manager import path_manager
+
+BACKENDS = ('torch', 'onnx', 'onnx_int8')
+
+# 量化模型文件名后缀，如 yolov8n_int8.onnx
+INT8_SUFFIX = '_int8'
+
+
+def backend_model_path(model_path: Union[str, Path], backend: str) -> Path:
+    """
+    后端对应的模型文件
+
+    Args:
+        model_path: PyTorch 权重路径，如 data/models/yolov8n.pt
+        backend: 后端名称，见 BACKENDS
+
+    Returns:
+        torch 为权重本身；onnx 为同名 .onnx；onnx_int8 为 <文件名>_int8.onnx
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"不支持的推理后端: {backend}，可选 {BACKENDS}")
+    model_path = Path(model_path)
+    if backend == 'onnx':
+        return model_path.with_suffix('.onnx')
+    if backend == 'onnx_int8':
+        return model_path.with_name(model_path.stem + INT8_SUFFIX + '.onnx')
+    return model_path
+
+
+def backend_for_path(model_path: Union[str, Path]) -> str:
+    """根据模型文件推断后端名称"""
+    model_path = Path(model_path)
+    if model_path.suffix != '.onnx':
+        return 'torch'
+    return 'onnx_int8' if model_path.stem.endswith(INT8_SUFFIX) else 'onnx'
+
+
+class TorchBackend:
+    """PyTorch 推理后端"""
+
+    name = 'torch'
+
+    def __init__(self, model: Any, device: str = 'cpu'):
+        """
+        Args:
+            model: 已融合、处于推理模式的检测网络
+            device: 推理设备
+        """
+        self.model = model
+        self.device = device
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        import torch
+
+        # from_numpy 与缓冲区共享内存，不额外拷贝
+        with torch.inference_mode():
+            output = self.model(torch.from_numpy(batch).to(self.device))
+            if isinstance(output, (list, tuple)):
+                output = output[0]
+            return output.float().cpu().numpy()
+
+
+class OnnxBackend:
+    """ONNX Runtime CPU 推理后端"""
+
+    def __init__(self, model_path: Union[str, Path], num_threads: int = 0):
+        """
+        Args:
+            model_path: ONNX 模型文件
+            num_threads: 算子内并行线程数，0表示由 ONNX Runtime 决定
+        """
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        self.name = backend_for_path(model_path)
+        self.session = ort.InferenceSession(str(model_path), options,
+                                            providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        # ONNX Runtime 要求连续内存；预处理缓冲区的前 N 张本身就是连续的
+        return self.session.run(None, {self.input_name: np.ascontiguousarray(batch)})[0]
+
+
+def load_backend(model_path: Union[str, Path], device: str = 'cpu',
+                 num_threads: int = 0) -> Any:
+    """
+    按模型文件类型创建后端
+
+    Args:
+        model_path: .pt 权重或 .onnx 模型
+        device: 推理设备（ONNX 后端只支持CPU）
+        num_threads: 推理线程数，0表示使用库的默认值
+
+    Returns:
+        可调用的后端对象，输入预处理批次，输出原始预测
+    """
+    model_path = Path(model_path)
+    if backend_for_path(model_path) != 'torch':
+        if not model_path.exists():
+            raise FileNotFoundError(f"ONNX模型不存在，请先运行 python main.py export: {model_path}")
+        return OnnxBackend(model_path, num_threads)
+
+    # 延迟导入，避免仅使用配置/工具模块时加载torch
+    import torch
+    from ultralytics import YOLO
+
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+    # 本地模型不存在时交给ultralytics按名称下载
+    source = model_path if model_path.exists() else model_path.name
+    yolo = YOLO(str(source))
+    yolo.fuse()
+    return TorchBackend(yolo.model.to(device).float().eval(), device)
+
+
+def export_onnx(model_path: Optional[Union[str, Path]] = None,
+                config_loader: Optional[ConfigLoader] = None,
+                input_size: Optional[Sequence[int]] = None,
+                opset: Optional[int] = None) -> Path:
+    """
+    将 PyTorch 权重导出为 ONNX（批大小维度可变），写入权重所在目录
+
+    Args:
+        model_path: 权重路径，默认为 data/models/<model_config.model_name>
+        config_loader: 配置加载器，默认使用全局配置
+        input_size: 导出的输入尺寸 [高, 宽]，默认读取 model_config.input_size
+        opset: ONNX 算子集版本，默认读取 export_config.opset
+
+    Returns:
+        ONNX 模型路径
+    """
+    from ultralytics import YOLO
+
+    config = config_loader or default_config
+    export_config = config.get_config().get('export_config', {})
+    model_path = Path(model_path or path_manager.get_model_file(config.model_config['model_name']))
+    input_size = list(input_size or config.model_config['input_size'])
+    opset = int(opset or export_config.get('opset', 12))
+    if not model_path.exists():
+        raise FileNotFoundError(f"模型文件不存在: {model_path}")
+
+    output = backend_model_path(model_path, 'onnx')
+    logger.info(f"导出ONNX模型: {model_path} -> {output} (input_size={input_size}, opset={opset})")
+    exported = Path(YOLO(str(model_path)).export(format='onnx', imgsz=input_size, dynamic=True,
+                                                 opset=opset, simplify=True))
+    if exported.resolve() != output.resolve():
+        exported.replace(output)
+    return output
+
+
+class CalibrationReader:
+    """
+    INT8 校准数据读取器（实现 onnxruntime.quantization.CalibrationDataReader 接口）
+
+    逐张读取校准图片，按推理时相同的 letterbox 预处理后交给量化工具统计激活范围。
+    """
+
+    def __init__(self, image_paths: Sequence[Path], input_name: str,
+                 input_size: Sequence[int]):
+        from ..data.preprocess import LetterboxPreprocessor
+
+        self.image_paths = list(image_paths)
+        self.input_name = input_name
+        self.preprocessor = LetterboxPreprocessor(1, input_size)
+        self._index = 0
+
+    def get_next(self) -> Optional[dict]:
+        import cv2
+
+        while self._index < len(self.image_paths):
+            path = self.image_paths[self._index]
+            self._index += 1
+            image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+            if image is None:
+                logger.warning(f"校准图片无法读取，已跳过: {path}")
+                continue
+            batch, _ = self.preprocessor([image])
+            # 预处理缓冲区会被下一张图片覆盖，交给量化工具前复制
+            return {self.input_name: batch.copy()}
+        return None
+
+    def rewind(self) -> None:
+        self._index = 0
+
+
+def quantize_int8(onnx_path: Optional[Union[str, Path]] = None,
+                  config_loader: Optional[ConfigLoader] = None,
+                  calibration_dir: Optional[Union[str, Path]] = None,
+                  num_images: Optional[int] = None) -> Path:
+    """
+    INT8 静态量化（QDQ格式，权重按通道量化），用验证集图片校准激活范围
+
+    Args:
+        onnx_path: FP32 ONNX 模型，默认为 data/models/<模型名>.onnx
+        config_loader: 配置加载器，默认使用全局配置
+        calibration_dir: 校准图片目录，默认为 data/datasets/val
+        num_images: 最多使用的校准图片数，默认读取 export_config.calibration_images
+
+    Returns:
+        量化模型路径 <模型名>_int8.onnx
+    """
+    import onnx
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+
+    from .batch_processor import iter_image_files
+
+    config = config_loader or default_config
+    export_config = config.get_config().get('export_config', {})
+    model_path = path_manager.get_model_file(config.model_config['model_name'])
+    onnx_path = Path(onnx_path or backend_model_path(model_path, 'onnx'))
+    calibration_dir = Path(calibration_dir or path_manager.get_split_dir('val'))
+    num_images = int(num_images or export_config.get('calibration_images', 200))
+    if not onnx_path.exists():
+        raise FileNotFoundError(f"ONNX模型不存在，请先导出: {onnx_path}")
+
+    image_paths: List[Path] = []
+    for path in iter_image_files(calibration_dir):
+        image_paths.append(path)
+        if len(image_paths) >= num_images:
+            break
+    if not image_paths:
+        raise ValueError(f"校准目录中没有图片: {calibration_dir}")
+
+    # 检测头（坐标解码、拼接）对量化误差敏感，保留为FP32
+    graph = onnx.load(str(onnx_path)).graph
+    exclude_prefixes = tuple(export_config.get('int8_exclude_prefixes', []))
+    nodes_to_exclude = [node.name for node in graph.node
+                        if exclude_prefixes and node.name.startswith(exclude_prefixes)]
+
+    output = onnx_path.with_name(onnx_path.stem + INT8_SUFFIX + '.onnx')
+    reader = CalibrationReader(image_paths, graph.input[0].name, config.model_config['input_size'])
+    logger.info(f"INT8量化: {onnx_path} -> {output} (校准图片 {len(image_paths)} 张, "
+                f"保留FP32节点 {len(nodes_to_exclude)} 个)")
+    quantize_static(
+        str(onnx_path), str(output), reader,
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        calibrate_method=CalibrationMethod.MinMax,
+        nodes_to_exclude=nodes_to_exclude,
+    )
+    return output
@@ -0,0 +1,365 @@
+"""
+批量图片处理
+以流水线方式处理目录或通配符下的大量图片:
+文件枚举 -> 多进程解码 -> 批量推理 -> 结果写入，各阶段通过有界队列连接
+"""
+
+import glob
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+from ..data.image_io import decode_image, is_image_file
+from ..data.result_writer import DetectionResultWriter
+from ..utils.config_loader import ConfigLoader, config as default_config
+from ..utils.logger import logger
+from ..utils.metrics import metrics
+from ..utils.path_manager import path_manager
+from .detection_cache import DetectionCache, content_hash
+from .detector import HardwareDetector
+
+# 队列结束标记
+_DONE = object()
+
+
+class _StageFailure:
+    """上游阶段异常退出时放入队列，由推理阶段在调用 run 的线程抛出"""
+
+    __slots__ = ('error',)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def iter_image_files(source: Union[str, Path]) -> Iterator[Path]:
+    """
+    惰性枚举图片文件，不会一次性生成完整列表
+
+    Args:
+        source: 目录路径（递归遍历）或通配符模式，如 data/datasets/test/*.jpg
+
+    Yields:
+        图片文件路径
+    """
+    source = str(source)
+    if os.path.isdir(source):
+        stack = [source]
+        while stack:
+            current = stack.pop()
+            with os.scandir(current) as entries:
+                for entry in sorted(entries, key=lambda e: e.name):
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif is_image_file(entry.name):
+                        yield Path(entry.path)
+    else:
+        for path in glob.iglob(source, recursive=True):
+            if is_image_file(path) and os.path.isfile(path):
+                yield Path(path)
+
+
+def _init_decode_worker() -> None:
+    """解码进程初始化：每个进程只用一个OpenCV线程，由进程数提供并行度"""
+    cv2.setNumThreads(1)
+
+
+def _decode_worker(path: str, target_size: Sequence[int]) -> Tuple[
+        str, Optional[np.ndarray], Optional[Tuple[int, int]], Optional[str], Optional[str],
+        Tuple[float, float]]:
+    """
+    解码进程任务，同时计算内容哈希供结果缓存使用
+
+    Args:
+        path: 图片路径
+        target_size: 模型输入尺寸，用于缩小解码
+
+    Returns:
+        (路径, 图片, 原图尺寸, 内容哈希, 错误信息, (读取耗时, 解码耗时))，耗时单位为秒
+    """
+    start = time.perf_counter()
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        return path, None, None, None, str(e), (time.perf_counter() - start, 0.0)
+    read_done = time.perf_counter()
+    image, original_shape = decode_image(data, target_size)
+    timings = (read_done - start, time.perf_counter() - read_done)
+    if image is None:
+        return path, None, None, None, "无法解码图片", timings
+    return path, image, original_shape, content_hash(data), None, timings
+
+
+class BatchProcessor:
+    """
+    批量图片处理器类
+
+    各阶段之间的队列都有容量上限，图片总数再多，
+    内存中同时存在的图片数也不超过队列容量与解码中的任务数之和。
+    """
+
+    def __init__(self, detector: Optional[HardwareDetector] = None,
+                 config_loader: Optional[ConfigLoader] = None,
+                 output_file: Optional[Union[str, Path]] = None,
+                 decode_workers: Optional[int] = None,
+                 queue_size: Optional[int] = None,
+                 progress_interval: float = 5.0,
+                 cache: Optional[DetectionCache] = None):
+        """
+        初始化批量处理器
+
+        Args:
+            detector: 检测器，默认按配置新建
+            config_loader: 配置加载器，默认使用全局配置
+            output_file: 结果CSV路径，默认为 data/results/detection_results.csv
+            decode_workers: 解码进程数，默认读取 inference_config.decode_workers，0表示CPU核数
+            queue_size: 各阶段队列容量，默认读取 inference_config.queue_size
+            progress_interval: 进度报告间隔（秒）
+            cache: 检测结果缓存，默认在 cache_config.enabled 时按检测器的模型版本创建
+        """
+        self.config = config_loader or default_config
+        self.detector = detector or HardwareDetector(self.config)
+
+        inference_config = self.config.get_config().get('inference_config', {})
+        if decode_workers is None:
+            decode_workers = inference_config.get('decode_workers', 0)
+        self.decode_workers = int(decode_workers) or os.cpu_count() or 1
+        self.queue_size = int(queue_size or inference_config.get('queue_size', 64))
+        self.progress_interval = progress_interval
+
+        self.output_file = Path(output_file or path_manager.get_detection_results_file())
+
+        if cache is None and self.config.get_config().get('cache_config', {}).get('enabled', False):
+            cache = DetectionCache(self.detector.model_version, self.config)
+        self.cache = cache
+
+        self._stop = threading.Event()
+        self._writer: Optional[DetectionResultWriter] = None
+        self._reset_stats()
+
+    def _reset_stats(self) -> None:
+        """重置统计信息"""
+        self.stats = {
+            'images': 0,
+            'detections': 0,
+            'failed': 0,
+            'cache_hits': 0,
+            'elapsed_s': 0.0,
+            'images_per_second': 0.0,
+        }
+
+    def run(self, source: Union[str, Path]) -> Dict[str, Any]:
+        """
+        处理目录或通配符下的全部图片
+
+        Args:
+            source: 目录路径或通配符模式
+
+        Returns:
+            统计信息字典
+        """
+        self._reset_stats()
+        self._stop.clear()
+        self.detector.load_model()
+
+        path_queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        decoded_queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        # 结果写入阶段：缓冲写入器在后台线程批量落盘
+        self._writer = DetectionResultWriter(self.output_file, self.config)
+
+        threads = [
+            threading.Thread(target=self._enumerate_stage, args=(source, path_queue),
+                             name="batch-enumerate", daemon=True),
+            threading.Thread(target=self._decode_stage, args=(path_queue, decoded_queue),
+                             name="batch-decode", daemon=True),
+        ]
+
+        logger.info(f"批量处理开始: {source} (解码进程: {self.decode_workers})")
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        try:
+            self._inference_stage(decoded_queue, start)
+        except BaseException:
+            # 通知上游阶段退出，避免阻塞在已满的队列上
+            self._stop.set()
+            raise
+        finally:
+            for thread in threads:
+                thread.join()
+            self._writer.close()
+            if self.cache is not None:
+                self.cache.flush()
+
+        elapsed = time.perf_counter() - start
+        self.stats['elapsed_s'] = elapsed
+        self.stats['images_per_second'] = self.stats['images'] / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            f"批量处理完成: {self.stats['images']} 张图片, {self.stats['detections']} 个检测, "
+            f"{self.stats['failed']} 张失败, {self.stats['images_per_second']:.1f} 张/秒"
+        )
+        return dict(self.stats)
+
+    def _put(self, target: "queue.Queue", item: Any) -> bool:
+        """
+        向有界队列放入数据，下游异常退出时放弃等待
+
+        Returns:
+            是否成功放入
+        """
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _enumerate_stage(self, source: Union[str, Path], path_queue: "queue.Queue") -> None:
+        """阶段一：枚举文件"""
+        try:
+            for path in iter_image_files(source):
+                if not self._put(path_queue, str(path)):
+                    return
+        except Exception as e:
+            logger.error(f"图片枚举失败: {e}")
+            self._put(path_queue, _StageFailure(e))
+        finally:
+            self._put(path_queue, _DONE)
+
+    def _decode_stage(self, path_queue: "queue.Queue", decoded_queue: "queue.Queue") -> None:
+        """
+        阶段二：多进程解码，进行中的任务数有上限
+
+        单张图片的解码异常计为失败；进程池本身损坏（如解码进程被系统杀死）
+        或上游阶段出错时，把异常交给推理阶段，由 run 抛出
+        """
+        target_size = list(self.detector.input_size)
+        max_inflight = self.decode_workers * 2
+        # 进行中的任务 -> 图片路径
+        inflight: Dict[Any, str] = {}
+        exhausted = False
+
+        try:
+            with ProcessPoolExecutor(max_workers=self.decode_workers,
+                                     initializer=_init_decode_worker) as pool:
+                while (not exhausted or inflight) and not self._stop.is_set():
+                    while not exhausted and len(inflight) < max_inflight:
+                        try:
+                            path = path_queue.get(timeout=0.1)
+                        except queue.Empty:
+                            if self._stop.is_set():
+                                break
+                            continue
+                        if path is _DONE:
+                            exhausted = True
+                            break
+                        if isinstance(path, _StageFailure):
+                            raise path.error
+                        inflight[pool.submit(_decode_worker, path, target_size)] = path
+
+                    if not inflight:
+                        continue
+                    done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        path = inflight.pop(future)
+                        try:
+                            item = future.result()
+                        except BrokenProcessPool:
+                            raise
+                        except Exception as e:
+                            item = (path, None, None, None, str(e), (0.0, 0.0))
+                        self._put(decoded_queue, item)
+                if self._stop.is_set():
+                    for future in inflight:
+                        future.cancel()
+        except Exception as e:
+            logger.error(f"图片解码阶段失败: {e}")
+            self._put(decoded_queue, _StageFailure(e))
+        finally:
+            self._put(decoded_queue, _DONE)
+
+    def _inference_stage(self, decoded_queue: "queue.Queue", start: float) -> None:
+        """阶段三：凑满批次后推理"""
+        batch: List[Tuple[str, np.ndarray, Tuple[int, int], str]] = []
+        last_report = start
+
+        while True:
+            item = decoded_queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _StageFailure):
+                raise RuntimeError(f"批量处理中止: {item.error}") from item.error
+
+            path, image, original_shape, digest, error, (read_s, decode_s) = item
+            # 解码进程中测得的耗时在主进程记入统计
+            metrics.observe('read', read_s)
+            if decode_s:
+                metrics.observe('decode', decode_s)
+            if error is not None:
+                self.stats['failed'] += 1
+                logger.warning(f"图片读取失败: {path} ({error})")
+                continue
+
+            # 相同字节的图片直接复用缓存结果，不进入推理批次；
+            # 这里按模型输入尺寸缩小解码，与按原尺寸解码的结果分开缓存
+            cached = self.cache.get(digest, 'reduced') if self.cache is not None else None
+            if cached is not None:
+                for detection in cached:
+                    detection['detection_time_ms'] = 0.0
+                self._writer.write(path, cached)
+                self.stats['images'] += 1
+                self.stats['detections'] += len(cached)
+                self.stats['cache_hits'] += 1
+                continue
+
+            batch.append((path, image, original_shape, digest))
+            if len(batch) >= self.detector.batch_size:
+                self._process_batch(batch)
+                batch = []
+
+            now = time.perf_counter()
+            if now - last_report >= self.progress_interval:
+                self._report_progress(now - start)
+                last_report = now
+
+        if batch:
+            self._process_batch(batch)
+
+    def _process_batch(self, batch: List[Tuple[str, np.ndarray, Tuple[int, int], str]]) -> None:
+        """推理一个批次并把结果交给写入阶段"""
+        results = self.detector.detect_batch([item[1] for item in batch])
+
+        for (path, image, original_shape, digest), detections in zip(batch, results):
+            # 缩小解码的图片需要把框换算回原图坐标
+            ratio_y = original_shape[0] / image.shape[0]
+            ratio_x = original_shape[1] / image.shape[1]
+            if ratio_x != 1.0 or ratio_y != 1.0:
+                for detection in detections:
+                    detection['bbox_x'] *= ratio_x
+                    detection['bbox_y'] *= ratio_y
+                    detection['bbox_width'] *= ratio_x
+                    detection['bbox_height'] *= ratio_y
+            if self.cache is not None:
+                self.cache.put(digest, detections, 'reduced')
+            self._writer.write(path, detections)
+            self.stats['detections'] += len(detections)
+
+        self.stats['images'] += len(batch)
+
+    def _report_progress(self, elapsed: float) -> None:
+        """输出处理进度"""
+        rate = self.stats['images'] / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            f"已处理 {self.stats['images']} 张图片 ({rate:.1f} 张/秒), "
+            f"检测 {self.stats['detections']} 个, 失败 {self.stats['failed']} 张"
+        )
@@ -0,0 +1,363 @@
+"""
+检测结果缓存
+以图片内容哈希、模型版本、推理设置和解码方式为键，缓存检测结果；
+内存LRU为一级缓存，data/results 下的磁盘目录为二级缓存（由后台线程写入）
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from ..utils.config_loader import ConfigLoader, config as default_config
+from ..utils.logger import logger
+from ..utils.path_manager import path_manager
+
+
+def content_hash(data: bytes) -> str:
+    """
+    计算图片字节的内容哈希
+
+    Args:
+        data: 图片文件的完整字节
+
+    Returns:
+        32位十六进制哈希
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+# 解码方式：按原尺寸解码，或按模型输入尺寸在DCT域缩小解码（BatchProcessor）。
+# 两种方式得到的检测结果不完全相同，分别缓存
+DECODE_MODES = ('full', 'reduced')
+
+
+class DetectionCache:
+    """
+    检测结果缓存类
+
+    缓存键 = 内容哈希 + 解码方式 + model_version + confidence_threshold + iou_threshold
+    + max_detections + input_size，模型或推理设置变化后旧结果自然失效。
+    put 只更新内存层，磁盘写入交给后台线程批量完成；磁盘层超过容量时按最近访问时间淘汰。
+    disk_max_mb 为0时不使用磁盘层。
+    """
+
+    def __init__(self, model_version: str,
+                 config_loader: Optional[ConfigLoader] = None,
+                 cache_dir: Optional[Union[str, Path]] = None,
+                 memory_entries: Optional[int] = None,
+                 disk_max_bytes: Optional[int] = None,
+                 disk_queue_entries: Optional[int] = None):
+        """
+        初始化缓存
+
+        Args:
+            model_version: 模型版本，与 detection_results.csv 的 model_version 一致
+            config_loader: 配置加载器，默认使用全局配置
+            cache_dir: 磁盘缓存目录，默认为 data/results/detection_cache
+            memory_entries: 内存层最多缓存的图片数
+            disk_max_bytes: 磁盘层容量上限（字节），为0时不使用磁盘层
+            disk_queue_entries: 等待写入磁盘层的条目上限，积压超过时新条目只进入内存层
+        """
+        self.config = config_loader or default_config
+        cache_config = self.config.get_config().get('cache_config', {})
+
+        self.model_version = model_version
+        self.cache_dir = Path(cache_dir or path_manager.results_dir / 'detection_cache')
+        self.memory_entries = int(memory_entries or cache_config.get('memory_entries', 1024))
+        if disk_max_bytes is None:
+            disk_max_bytes = int(cache_config.get('disk_max_mb', 256)) * 1024 * 1024
+        self.disk_max_bytes = int(disk_max_bytes)
+        self.disk_queue_entries = int(disk_queue_entries or cache_config.get('disk_queue_entries', 4096))
+
+        self._memory: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_index: Optional["OrderedDict[str, int]"] = None
+        self._disk_bytes = 0
+        # 等待后台线程写入磁盘的条目；积压超过上限时丢弃新条目（只影响磁盘层）
+        self._disk_pending: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._disk_condition = threading.Condition(self._lock)
+        self._disk_writing = False
+        self._closed = False
+        self._disk_thread: Optional[threading.Thread] = None
+        if self.disk_max_bytes > 0:
+            self._disk_thread = threading.Thread(target=self._disk_writer, name="cache-writer",
+                                                 daemon=True)
+            self._disk_thread.start()
+            atexit.register(self.close)
+
+        self.hits = 0
+        self.misses = 0
+        self._settings = self._settings_fingerprint(self.config.snapshot())
+        # 阈值变化后缓存键随之变化，旧结果不会再被命中
+        self.config.subscribe(self._on_config_change)
+
+    def _on_config_change(self, snapshot) -> None:
+        self._settings = self._settings_fingerprint(snapshot)
+
+    def _settings_fingerprint(self, snapshot) -> str:
+        """当前模型版本与推理设置的指纹"""
+        model_config = snapshot.model_config
+        settings = (
+            self.model_version,
+            float(model_config['confidence_threshold']),
+            float(model_config['iou_threshold']),
+            int(model_config['max_detections']),
+            tuple(model_config['input_size']),
+        )
+        return hashlib.blake2b(repr(settings).encode('utf-8'), digest_size=8).hexdigest()
+
+    def make_key(self, digest: str, decode_mode: str = 'full') -> str:
+        """
+        组合内容哈希、解码方式与推理设置得到缓存键
+
+        Args:
+            digest: 图片内容哈希
+            decode_mode: 解码方式，full 或 reduced
+
+        Returns:
+            缓存键
+        """
+        if decode_mode not in DECODE_MODES:
+            raise ValueError(f"不支持的解码方式: {decode_mode}，可选 {DECODE_MODES}")
+        return f"{digest}-{decode_mode}-{self._settings}"
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _load_disk_index(self) -> "OrderedDict[str, int]":
+        """首次访问磁盘层时扫描目录，按访问时间从旧到新建立索引"""
+        if self._disk_index is None:
+            entries = []
+            if self.cache_dir.exists():
+                for path in self.cache_dir.glob('*/*.json'):
+                    stat = path.stat()
+                    entries.append((stat.st_mtime, path.stem, stat.st_size))
+            entries.sort()
+            self._disk_index = OrderedDict((key, size) for _, key, size in entries)
+            self._disk_bytes = sum(size for _, _, size in entries)
+        return self._disk_index
+
+    def get(self, digest: str, decode_mode: str = 'full') -> Optional[List[Dict[str, Any]]]:
+        """
+        查询缓存
+
+        Args:
+            digest: 图片内容哈希
+            decode_mode: 解码方式，full 或 reduced
+
+        Returns:
+            检测结果列表的副本，未命中时返回None
+        """
+        key = self.make_key(digest, decode_mode)
+        with self._lock:
+            detections = self._memory.get(key)
+            if detections is None:
+                detections = self._disk_pending.get(key)
+            if detections is not None:
+                self._remember(key, detections)
+                self.hits += 1
+                return [dict(d) for d in detections]
+
+            index = self._load_disk_index() if self._disk_thread is not None else {}
+            if key in index:
+                path = self._disk_path(key)
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        detections = json.load(f)
+                    os.utime(path)
+                    index.move_to_end(key)
+                except (OSError, ValueError):
+                    self._disk_bytes -= index.pop(key)
+                    detections = None
+
+            if detections is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._remember(key, detections)
+            return [dict(d) for d in detections]
+
+    def put(self, digest: str, detections: List[Dict[str, Any]], decode_mode: str = 'full') -> None:
+        """
+        写入缓存：立即更新内存层，磁盘层由后台线程写入（不执行磁盘I/O）
+
+        Args:
+            digest: 图片内容哈希
+            detections: 检测结果列表
+            decode_mode: 解码方式，full 或 reduced
+        """
+        key = self.make_key(digest, decode_mode)
+        # 耗时与具体一次推理有关，不进入缓存
+        stored = [{k: v for k, v in d.items() if k != 'detection_time_ms'} for d in detections]
+
+        with self._lock:
+            self._remember(key, stored)
+            if self._disk_thread is None or self._closed:
+                return
+            if key not in self._disk_pending and len(self._disk_pending) >= self.disk_queue_entries:
+                return
+            self._disk_pending[key] = stored
+            self._disk_condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """
+        等待已写入内存层的条目全部写入磁盘层
+
+        Args:
+            timeout: 最长等待时间（秒）
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._disk_condition:
+            while ((self._disk_pending or self._disk_writing) and self._disk_thread is not None
+                   and self._disk_thread.is_alive()):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._disk_condition.wait(remaining if remaining is not None else 0.1)
+
+    def close(self) -> None:
+        """写出剩余条目并停止后台线程"""
+        with self._disk_condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._disk_condition.notify_all()
+        if self._disk_thread is not None:
+            self._disk_thread.join()
+            atexit.unregister(self.close)
+
+    def _disk_writer(self) -> None:
+        """后台线程：编码并写入磁盘层，编码和文件I/O都在锁外进行"""
+        while True:
+            with self._disk_condition:
+                while not self._disk_pending and not self._closed:
+                    self._disk_condition.wait()
+                if not self._disk_pending:
+                    return
+                batch: List[Tuple[str, List[Dict[str, Any]]]] = list(self._disk_pending.items())
+                self._disk_pending.clear()
+                self._disk_writing = True
+                index = self._load_disk_index()
+
+            written = []
+            for key, stored in batch:
+                payload = json.dumps(stored, ensure_ascii=False).encode('utf-8')
+                path = self._disk_path(key)
+                try:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    tmp = path.with_suffix('.tmp')
+                    with open(tmp, 'wb') as f:
+                        f.write(payload)
+                    os.replace(tmp, path)
+                except OSError as e:
+                    logger.warning(f"检测缓存写入失败: {e}")
+                    continue
+                written.append((key, len(payload)))
+
+            with self._disk_condition:
+                for key, size in written:
+                    self._disk_bytes += size - index.pop(key, 0)
+                    index[key] = size
+                self._evict_disk(index)
+                self._disk_writing = False
+                self._disk_condition.notify_all()
+
+    def _remember(self, key: str, detections: List[Dict[str, Any]]) -> None:
+        """写入内存LRU"""
+        self._memory[key] = detections
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, index: "OrderedDict[str, int]") -> None:
+        """磁盘层超出容量时淘汰最久未访问的条目"""
+        while self._disk_bytes > self.disk_max_bytes and index:
+            key, size = index.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                self._disk_path(key).unlink()
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        """清空内存层（磁盘层保留）"""
+        with self._lock:
+            self._memory.clear()
+
+
+class CachedDetector:
+    """
+    带缓存的检测器包装类
+
+    相同字节的图片只推理一次，之后直接返回缓存结果。
+    """
+
+    def __init__(self, detector, cache: Optional[DetectionCache] = None):
+        """
+        初始化
+
+        Args:
+            detector: HardwareDetector 实例
+            cache: 检测缓存，默认按检测器的模型版本新建
+        """
+        self.detector = detector
+        self.cache = cache or DetectionCache(detector.model_version, detector.config)
+
+    def submit(self, image_path: Union[str, Path]) -> "Future[List[Dict[str, Any]]]":
+        """
+        提交图片文件检测，命中缓存时返回已完成的Future
+
+        Args:
+            image_path: 图片路径
+
+        Returns:
+            检测结果的Future
+        """
+        from ..data.image_io import decode_image
+
+        start = time.perf_counter()
+        with open(image_path, 'rb') as f:
+            data = f.read()
+        digest = content_hash(data)
+
+        detections = self.cache.get(digest)
+        if detections is not None:
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+            for detection in detections:
+                detection['detection_time_ms'] = elapsed_ms
+            future: "Future[List[Dict[str, Any]]]" = Future()
+            future.set_result(detections)
+            return future
+
+        image, _ = decode_image(data)
+        if image is None:
+            raise ValueError(f"无法读取图片: {image_path}")
+        inner = self.detector.submit(image)
+
+        def _store(done: Future) -> None:
+            if done.exception() is None:
+                self.cache.put(digest, done.result(), 'full')
+
+        inner.add_done_callback(_store)
+        return inner
+
+    def detect(self, image_path: Union[str, Path], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        检测图片文件（命中缓存时不推理）
+
+        Args:
+            image_path: 图片路径
+            timeout: 等待结果的超时时间（秒）
+
+        Returns:
+            检测结果列表
+        """
+        return self.submit(image_path).result(timeout)
@@ -0,0 +1,426 @@
+"""
+五金配件检测器
+基于YOLOv8的CPU批量推理，支持微批处理（micro-batching）
+
+推理流程: letterbox预处理（复用批次缓冲区） -> 网络前向（torch / onnx / onnx_int8 后端）
+-> 向量化NMS -> 映射回原图坐标
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import cv2
+import numpy as np
+
+from ..data.preprocess import LetterboxPreprocessor, scale_boxes
+from ..utils.config_loader import ConfigLoader, config as default_config
+from ..utils.logger import logger
+from ..utils.metrics import metrics
+from ..utils.path_manager import path_manager
+from .backends import backend_model_path
+from .model_registry import ModelRegistry, model_registry
+from .nms import NonMaxSuppression
+
+ImageInput = Union[str, Path, np.ndarray]
+
+
+class HardwareDetector:
+    """
+    五金配件检测器类
+
+    模型由注册表加载并预热，同一权重文件的模型实例在检测器之间共享；
+    逐张提交的图片在后台线程中等待几毫秒，凑成一个批次后统一执行一次前向推理。
+    """
+
+    def __init__(self, config_loader: Optional[ConfigLoader] = None,
+                 model_path: Optional[Union[str, Path]] = None,
+                 batch_size: Optional[int] = None,
+                 max_wait_ms: Optional[float] = None,
+                 registry: Optional[ModelRegistry] = None,
+                 backend: Optional[str] = None):
+        """
+        初始化检测器
+
+        Args:
+            config_loader: 配置加载器，默认使用全局配置
+            model_path: 模型文件路径，默认为 data/models/<model_config.model_name>
+            batch_size: 微批处理的最大批大小，默认读取 inference_config.batch_size
+            max_wait_ms: 凑批的最长等待时间（毫秒），默认读取 inference_config.max_wait_ms
+            registry: 模型注册表，默认使用全局注册表
+            backend: 推理后端 torch / onnx / onnx_int8，默认读取 inference_config.backend；
+                     未指定 model_path 时按后端选择 data/models 下对应的模型文件
+        """
+        self.config = config_loader or default_config
+
+        model_config = self.config.model_config
+        inference_config = self.config.get_config().get('inference_config', {})
+
+        self.model_name = model_config['model_name']
+        self.input_size = tuple(model_config['input_size'])
+        self.confidence_threshold = float(model_config['confidence_threshold'])
+        self.iou_threshold = float(model_config['iou_threshold'])
+        self.max_detections = int(model_config['max_detections'])
+        self.class_names = list(self.config.class_names)
+        self.config_reload_interval = float(inference_config.get('config_reload_interval_s', 1.0))
+
+        self.device = inference_config.get('device', 'cpu')
+        self.num_threads = int(inference_config.get('num_threads', 0))
+        self.batch_size = int(batch_size or inference_config.get('batch_size', 8))
+        if max_wait_ms is None:
+            max_wait_ms = inference_config.get('max_wait_ms', 5)
+        self.max_wait_ms = float(max_wait_ms)
+
+        self.backend = backend or inference_config.get('backend', 'torch')
+        if model_path is None:
+            model_path = backend_model_path(path_manager.get_model_file(self.model_name), self.backend)
+        self.model_path = Path(model_path)
+        self.registry = registry or model_registry
+        # 版本标签只需要文件哈希，不必等模型加载
+        self.model_version = self.registry.version(self.model_path)
+
+        self._model = None
+        self._model_lock = threading.Lock()
+
+        # 预处理缓冲区按最大批大小预分配，推理锁保证同一时刻只有一个批次使用它
+        self.preprocessor = LetterboxPreprocessor(self.batch_size, self.input_size)
+        self.nms = NonMaxSuppression(self.config)
+        self._infer_lock = threading.Lock()
+
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.RLock()
+
+        self.config.subscribe(self._on_config_change)
+
+    def _on_config_change(self, snapshot) -> None:
+        """
+        config.json 重新加载后更新阈值、类别和输入尺寸（NMS自行订阅配置）
+
+        Args:
+            snapshot: 新的配置快照
+        """
+        model_config = snapshot.model_config
+        self.confidence_threshold = float(model_config['confidence_threshold'])
+        self.iou_threshold = float(model_config['iou_threshold'])
+        self.max_detections = int(model_config['max_detections'])
+        self.class_names = list(snapshot.class_names)
+
+        input_size = tuple(model_config['input_size'])
+        if input_size != self.input_size:
+            # 新的输入尺寸需要重新分配预处理缓冲区，等当前批次结束后替换
+            with self._infer_lock:
+                self.preprocessor = LetterboxPreprocessor(self.batch_size, input_size)
+                self.input_size = input_size
+        if model_config['model_name'] != self.model_name:
+            logger.warning(f"模型文件变更为 {model_config['model_name']}，需要重启服务后生效")
+
+    # ------------------------------------------------------------------
+    # 模型加载
+    # ------------------------------------------------------------------
+    def load_model(self):
+        """
+        从注册表获取已预热的推理后端（其他检测器已加载过时直接共享）
+
+        Returns:
+            推理后端，输入预处理批次，输出原始预测数组
+        """
+        if self._model is not None:
+            return self._model
+
+        with self._model_lock:
+            if self._model is None:
+                entry = self.registry.get(self.model_path, device=self.device,
+                                          input_size=self.input_size, batch_size=self.batch_size)
+                self._model = entry.model
+        return self._model
+
+    def replica(self) -> "HardwareDetector":
+        """
+        创建共享模型权重的检测器副本
+
+        副本有独立的预处理缓冲区和推理锁，多个副本可以在不同线程中同时前向推理
+        （两种后端的推理调用都是线程安全的）
+
+        Returns:
+            使用相同配置、模型文件和后端的检测器
+        """
+        replica = type(self)(self.config, model_path=self.model_path, batch_size=self.batch_size,
+                             max_wait_ms=self.max_wait_ms, registry=self.registry, backend=self.backend)
+        replica._model = self._model
+        return replica
+
+    # ------------------------------------------------------------------
+    # 微批处理
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        """启动后台微批处理线程"""
+        with self._worker_lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self.load_model()
+            if self.config_reload_interval > 0:
+                self.config.watch(self.config_reload_interval)
+            self._worker = threading.Thread(
+                target=self._batch_loop, name="detector-batcher", daemon=True
+            )
+            self._worker.start()
+            logger.info(
+                f"检测器微批处理已启动: backend={self.backend}, batch_size={self.batch_size}, "
+                f"max_wait_ms={self.max_wait_ms}"
+            )
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        停止后台线程，已提交的请求会在停止前处理完毕
+
+        线程在超时内未退出时保持运行状态，可以再次调用 stop 等待；
+        线程退出后仍留在队列中的请求以异常结束，调用方不会永远等待
+
+        Args:
+            timeout: 等待线程退出的超时时间（秒）
+        """
+        with self._worker_lock:
+            if self._worker is None:
+                return
+            self._queue.put(None)
+            self._worker.join(timeout)
+            if self._worker.is_alive():
+                logger.warning(f"检测器后台线程未在 {timeout} 秒内退出")
+                return
+            self._worker = None
+
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None and item[1].set_running_or_notify_cancel():
+                    item[1].set_exception(RuntimeError("检测器已停止"))
+
+    def submit(self, image: ImageInput) -> "Future[List[Dict[str, Any]]]":
+        """
+        提交单张图片，返回检测结果的Future
+
+        Args:
+            image: 图片路径或BGR格式的numpy数组
+
+        Returns:
+            Future对象，结果为该图片的检测列表
+        """
+        future: "Future[List[Dict[str, Any]]]" = Future()
+        # 与 stop 互斥，请求不会在后台线程退出后才进入队列
+        with self._worker_lock:
+            if self._worker is None:
+                self.start()
+            self._queue.put((image, future, time.perf_counter()))
+        return future
+
+    def detect(self, image: ImageInput, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        检测单张图片（与其他并发请求合并成批次推理）
+
+        Args:
+            image: 图片路径或BGR格式的numpy数组
+            timeout: 等待结果的超时时间（秒）
+
+        Returns:
+            检测结果列表
+        """
+        return self.submit(image).result(timeout)
+
+    def _batch_loop(self) -> None:
+        """后台线程：收集请求，凑批后推理"""
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            # 跳过已被取消的请求；读取失败的图片只影响自身的请求
+            pending = []
+            for image, future, submitted in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    pending.append((self._read_image(image), future, submitted))
+                except Exception as e:
+                    future.set_exception(e)
+            batch = pending
+            if not batch:
+                continue
+
+            images = [entry[0] for entry in batch]
+            try:
+                results = self._infer(images)
+            except Exception as e:
+                logger.error(f"批量推理失败: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            finished = time.perf_counter()
+            for (_, future, submitted), detections in zip(batch, results):
+                metrics.observe('detection', finished - submitted)
+                elapsed_ms = (finished - submitted) * 1000.0
+                for detection in detections:
+                    detection['detection_time_ms'] = elapsed_ms
+                future.set_result(detections)
+
+    # ------------------------------------------------------------------
+    # 推理
+    # ------------------------------------------------------------------
+    def detect_batch(self, images: Sequence[ImageInput]) -> List[List[Dict[str, Any]]]:
+        """
+        直接对一批图片执行一次前向推理（不经过微批队列）
+
+        Args:
+            images: 图片路径或BGR格式numpy数组的序列
+
+        Returns:
+            与输入顺序一致的检测结果列表
+        """
+        if not images:
+            return []
+
+        start = time.perf_counter()
+        results = self._infer(list(images))
+        elapsed = time.perf_counter() - start
+        elapsed_ms = elapsed * 1000.0
+        for detections in results:
+            metrics.observe('detection', elapsed)
+            for detection in detections:
+                detection['detection_time_ms'] = elapsed_ms
+        return results
+
+    def _infer(self, images: List[ImageInput]) -> List[List[Dict[str, Any]]]:
+        """
+        执行一次批量推理
+
+        Args:
+            images: 图片列表
+
+        Returns:
+            每张图片的检测结果列表
+        """
+        model = self.load_model()
+        arrays = [self._read_image(image) for image in images]
+
+        results = []
+        with self._infer_lock:
+            # 超过预分配批大小时分段推理
+            for start in range(0, len(arrays), self.batch_size):
+                chunk = arrays[start:start + self.batch_size]
+                with metrics.stage('preprocess'):
+                    batch, meta = self.preprocessor(chunk)
+
+                with metrics.stage('forward'):
+                    output = model(batch)
+
+                with metrics.stage('nms'):
+                    predictions = self.nms(output)
+                for index, detections in enumerate(predictions):
+                    results.append(self._to_detections(
+                        detections,
+                        meta['scales'][index],
+                        meta['pads'][index],
+                        meta['shapes'][index],
+                    ))
+        return results
+
+    @staticmethod
+    def _read_image(image: ImageInput) -> np.ndarray:
+        """
+        读取图片为BGR格式的numpy数组
+
+        Args:
+            image: 图片路径或numpy数组
+
+        Returns:
+            BGR格式的uint8数组
+        """
+        if isinstance(image, np.ndarray):
+            return image
+        # 读取与解码分开计时，区分磁盘瓶颈和CPU瓶颈
+        try:
+            with metrics.stage('read'):
+                data = np.fromfile(str(image), dtype=np.uint8)
+        except OSError as e:
+            raise ValueError(f"无法读取图片: {image}") from e
+        with metrics.stage('decode'):
+            array = cv2.imdecode(data, cv2.IMREAD_COLOR)
+        if array is None:
+            raise ValueError(f"无法读取图片: {image}")
+        return array
+
+    def _to_detections(self, detections: np.ndarray, scale: float,
+                       pad: np.ndarray, shape: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        将NMS输出转换为检测结果字典列表
+
+        Args:
+            detections: 形状为 (K, 6) 的数组: x1, y1, x2, y2, confidence, class_id
+            scale: letterbox缩放系数
+            pad: letterbox填充 (左, 上)
+            shape: 原图尺寸 (高, 宽)
+
+        Returns:
+            检测结果列表，字段与 detection_results.csv 对应
+        """
+        if len(detections) == 0:
+            return []
+
+        boxes = scale_boxes(detections[:, :4], scale, pad, shape)
+        results = []
+        for (x1, y1, x2, y2), confidence, class_id in zip(
+                boxes, detections[:, 4], detections[:, 5].astype(int)):
+            results.append({
+                'class_id': int(class_id),
+                'part_category': self.get_class_name(class_id),
+                'confidence': float(confidence),
+                'bbox_x': float(x1),
+                'bbox_y': float(y1),
+                'bbox_width': float(x2 - x1),
+                'bbox_height': float(y2 - y1),
+                'model_version': self.model_version,
+            })
+        return results
+
+    def get_class_name(self, class_id: int) -> str:
+        """
+        获取类别名称
+
+        Args:
+            class_id: 类别编号
+
+        Returns:
+            配置中的类别名称，超出范围时返回编号字符串
+        """
+        if 0 <= class_id < len(self.class_names):
+            return self.class_names[class_id]
+        return str(class_id)
+
+    def __enter__(self) -> "HardwareDetector":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
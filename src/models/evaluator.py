@@ -0,0 +1,430 @@
+"""
+检测性能评估
+为所有类别同时计算 mAP@0.5、mAP@0.5:0.95、各类别精确率/召回率/F1 和混淆矩阵；
+匹配使用批量IoU矩阵，AP使用排序后的累计和，评估状态可分块计算后合并
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..utils.config_loader import ConfigLoader, config as default_config
+from .nms import NonMaxSuppression, box_iou, xywh_to_xyxy
+
+# COCO 约定：IoU阈值 0.50:0.05:0.95，101点插值
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+RECALL_POINTS = np.linspace(0.0, 1.0, 101)
+
+
+def detections_to_array(detections: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """
+    将 HardwareDetector 的检测结果转换为评估使用的数组
+
+    Args:
+        detections: 检测结果字典列表（bbox_x/bbox_y 为左上角，单位像素）
+
+    Returns:
+        (K, 6) float32数组，每行为 [x1, y1, x2, y2, confidence, class_id]
+    """
+    out = np.zeros((len(detections), 6), dtype=np.float32)
+    for i, det in enumerate(detections):
+        out[i] = (det['bbox_x'], det['bbox_y'],
+                  det['bbox_x'] + det['bbox_width'], det['bbox_y'] + det['bbox_height'],
+                  det['confidence'], det['class_id'])
+    return out
+
+
+def labels_to_targets(labels: np.ndarray, width: int, height: int) -> np.ndarray:
+    """
+    将YOLO格式标注转换为评估使用的真值数组
+
+    Args:
+        labels: (M, 5) 数组，每行为 class cx cy w h（归一化坐标）
+        width: 图片宽度
+        height: 图片高度
+
+    Returns:
+        (M, 5) float32数组，每行为 [class_id, x1, y1, x2, y2]（像素坐标）
+    """
+    labels = np.asarray(labels, dtype=np.float32).reshape(-1, 5)
+    out = np.empty_like(labels)
+    out[:, 0] = labels[:, 0]
+    out[:, 1:] = xywh_to_xyxy(labels[:, 1:] * np.array([width, height, width, height], dtype=np.float32))
+    return out
+
+
+def _priority_order(pair_pred: np.ndarray, pair_iou: np.ndarray, confidence: np.ndarray) -> np.ndarray:
+    """候选对的匹配优先级排序：置信度降序, 预测框下标, IoU降序"""
+    return np.lexsort((-pair_iou, pair_pred, -confidence[pair_pred]))
+
+
+def _greedy_matches(pair_pred: np.ndarray, pair_gt: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    COCO 贪心一对一匹配：按置信度从高到低处理预测框，每个预测框取IoU最高且尚未被匹配的真值
+
+    候选对已按阈值过滤并按 _priority_order 排序。逐轮向量化求解：每个预测框剩余的第一个候选对
+    是它当前的最佳真值，每个真值剩余的第一个候选对属于仍可能选它的优先级最高的预测框；
+    同时满足两者的候选对与顺序处理的结果相同，本轮一并确定，
+    再删除涉及已匹配预测框或真值的候选对。每轮至少确定全局优先级最高的预测框。
+
+    Args:
+        pair_pred: 候选对的预测框下标
+        pair_gt: 候选对的真值下标
+
+    Returns:
+        (被匹配的预测框下标, 对应的真值下标)
+    """
+    matched_pred, matched_gt = [], []
+    if len(pair_pred):
+        pred_done = np.zeros(int(pair_pred.max()) + 1, dtype=bool)
+        gt_done = np.zeros(int(pair_gt.max()) + 1, dtype=bool)
+    while len(pair_pred):
+        # 同一预测框的候选对在排序中连续，首个候选对即各段的起点
+        pred_first = np.flatnonzero(np.concatenate(([True], pair_pred[1:] != pair_pred[:-1])))
+        _, gt_first = np.unique(pair_gt, return_index=True)
+        accepted = np.intersect1d(pred_first, gt_first, assume_unique=True)
+        matched_pred.append(pair_pred[accepted])
+        matched_gt.append(pair_gt[accepted])
+        pred_done[matched_pred[-1]] = True
+        gt_done[matched_gt[-1]] = True
+        keep = ~(pred_done[pair_pred] | gt_done[pair_gt])
+        pair_pred, pair_gt = pair_pred[keep], pair_gt[keep]
+    if not matched_pred:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    return (np.concatenate(matched_pred).astype(np.int64, copy=False),
+            np.concatenate(matched_gt).astype(np.int64, copy=False))
+
+
+class DetectionEvaluator:
+    """
+    检测评估器类
+
+    update 只做匹配并累积紧凑的中间结果（每个预测框在各IoU阈值下是否为TP、置信度、类别，
+    以及各类别真值数量和混淆矩阵），compute 时再统一排序计算指标。
+    多个评估器的中间结果可以用 merge 合并，因此可以把测试集分块交给多个进程评估。
+    """
+
+    def __init__(self, config_loader: Optional[ConfigLoader] = None,
+                 class_names: Optional[Sequence[str]] = None,
+                 confidence_threshold: Optional[float] = None,
+                 iou_thresholds: Optional[Sequence[float]] = None):
+        """
+        初始化评估器
+
+        Args:
+            config_loader: 配置加载器，默认使用全局配置
+            class_names: 类别列表，默认读取 class_names
+            confidence_threshold: 计算P/R/F1和混淆矩阵时的置信度阈值，默认读取 model_config
+            iou_thresholds: IoU阈值列表，默认为 0.50:0.05:0.95
+        """
+        config = config_loader or default_config
+        self.class_names = list(class_names or config.class_names)
+        if confidence_threshold is None:
+            confidence_threshold = config.model_config['confidence_threshold']
+        self.confidence_threshold = float(confidence_threshold)
+        self.iou_thresholds = np.asarray(
+            IOU_THRESHOLDS if iou_thresholds is None else iou_thresholds, dtype=np.float64)
+
+        num_classes = len(self.class_names)
+        self._tp: List[np.ndarray] = []
+        self._conf: List[np.ndarray] = []
+        self._pred_cls: List[np.ndarray] = []
+        self.gt_counts = np.zeros(num_classes, dtype=np.int64)
+        # 行为预测类别、列为真实类别，最后一行/列为背景（漏检/误检）
+        self.confusion = np.zeros((num_classes + 1, num_classes + 1), dtype=np.int64)
+        self.images = 0
+
+    def update(self, predictions: Sequence[np.ndarray], targets: Sequence[np.ndarray]) -> None:
+        """
+        累积一批图片的匹配结果
+
+        Args:
+            predictions: 每张图片的 (K, 6) 预测 [x1, y1, x2, y2, confidence, class_id]，
+                         与 non_max_suppression 的输出格式一致
+            targets: 每张图片的 (M, 5) 真值 [class_id, x1, y1, x2, y2]
+        """
+        if len(predictions) != len(targets):
+            raise ValueError("预测和真值的图片数量不一致")
+        num_classes = len(self.class_names)
+
+        preds = [np.asarray(p, dtype=np.float32).reshape(-1, 6) for p in predictions]
+        gts = [np.asarray(t, dtype=np.float32).reshape(-1, 5) for t in targets]
+        pred_offsets = np.cumsum([0] + [len(p) for p in preds])
+        gt_offsets = np.cumsum([0] + [len(t) for t in gts])
+        all_preds = np.concatenate(preds) if preds else np.zeros((0, 6), dtype=np.float32)
+        all_gts = np.concatenate(gts) if gts else np.zeros((0, 5), dtype=np.float32)
+        pred_cls = all_preds[:, 5].astype(np.int64)
+        gt_cls = all_gts[:, 0].astype(np.int64)
+
+        # 逐图片只计算一次IoU矩阵，候选对使用整批的全局下标，之后的匹配对整批一次完成
+        pair_pred, pair_gt, pair_iou = [], [], []
+        for i, (pred, gt) in enumerate(zip(preds, gts)):
+            if len(pred) == 0 or len(gt) == 0:
+                continue
+            iou = box_iou(pred[:, :4], gt[:, 1:5])
+            p, g = np.nonzero(iou >= min(self.iou_thresholds.min(), 0.5))
+            pair_pred.append(p + pred_offsets[i])
+            pair_gt.append(g + gt_offsets[i])
+            pair_iou.append(iou[p, g])
+
+        confidence = all_preds[:, 4]
+        if pair_pred:
+            pair_pred = np.concatenate(pair_pred)
+            pair_gt = np.concatenate(pair_gt)
+            pair_iou = np.concatenate(pair_iou)
+            # 只排序一次，按阈值过滤后的子序列仍保持匹配优先级
+            order = _priority_order(pair_pred, pair_iou, confidence)
+            pair_pred, pair_gt, pair_iou = pair_pred[order], pair_gt[order], pair_iou[order]
+        else:
+            pair_pred = pair_gt = np.zeros(0, dtype=np.int64)
+            pair_iou = np.zeros(0, dtype=np.float32)
+
+        # TP：同类别且IoU达到阈值，每个真值最多匹配一个预测框
+        same_class = pred_cls[pair_pred] == gt_cls[pair_gt]
+        tp = np.zeros((len(all_preds), len(self.iou_thresholds)), dtype=bool)
+        for j, threshold in enumerate(self.iou_thresholds):
+            valid = same_class & (pair_iou >= threshold)
+            matched, _ = _greedy_matches(pair_pred[valid], pair_gt[valid])
+            tp[matched, j] = True
+
+        self._tp.append(tp)
+        self._conf.append(all_preds[:, 4].copy())
+        self._pred_cls.append(pred_cls)
+        self.gt_counts += np.bincount(gt_cls, minlength=num_classes)[:num_classes]
+        self._update_confusion(all_preds, pred_cls, gt_cls, pair_pred, pair_gt, pair_iou)
+        self.images += len(preds)
+
+    def _update_confusion(self, preds: np.ndarray, pred_cls: np.ndarray, gt_cls: np.ndarray,
+                          pair_pred: np.ndarray, pair_gt: np.ndarray, pair_iou: np.ndarray) -> None:
+        """按置信度阈值和IoU 0.5做类别无关的一对一匹配，更新混淆矩阵"""
+        background = len(self.class_names)
+        confident = preds[:, 4] >= self.confidence_threshold
+        valid = confident[pair_pred] & (pair_iou >= 0.5)
+        matched_pred, matched_gt = _greedy_matches(pair_pred[valid], pair_gt[valid])
+
+        np.add.at(self.confusion, (pred_cls[matched_pred], gt_cls[matched_gt]), 1)
+
+        missed = np.ones(len(gt_cls), dtype=bool)
+        missed[matched_gt] = False
+        np.add.at(self.confusion, (background, gt_cls[missed]), 1)
+
+        false_alarm = confident.copy()
+        false_alarm[matched_pred] = False
+        np.add.at(self.confusion, (pred_cls[false_alarm], background), 1)
+
+    def merge(self, other: "DetectionEvaluator") -> "DetectionEvaluator":
+        """
+        合并另一个评估器（如其他进程计算的分块）的中间结果
+
+        Args:
+            other: 类别和阈值相同的评估器
+
+        Returns:
+            self
+        """
+        if other.class_names != self.class_names or \
+                not np.array_equal(other.iou_thresholds, self.iou_thresholds):
+            raise ValueError("只能合并类别和IoU阈值相同的评估结果")
+        self._tp.extend(other._tp)
+        self._conf.extend(other._conf)
+        self._pred_cls.extend(other._pred_cls)
+        self.gt_counts += other.gt_counts
+        self.confusion += other.confusion
+        self.images += other.images
+        return self
+
+    def _compact(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """把累积的分块拼接为单个数组（同时减少进程间传输的对象数）"""
+        num_thresholds = len(self.iou_thresholds)
+        tp = np.concatenate(self._tp) if self._tp else np.zeros((0, num_thresholds), dtype=bool)
+        conf = np.concatenate(self._conf) if self._conf else np.zeros(0, dtype=np.float32)
+        pred_cls = np.concatenate(self._pred_cls) if self._pred_cls else np.zeros(0, dtype=np.int64)
+        self._tp, self._conf, self._pred_cls = [tp], [conf], [pred_cls]
+        return tp, conf, pred_cls
+
+    def compute(self) -> Dict[str, Any]:
+        """
+        计算评估指标
+
+        Returns:
+            指标字典：map50、map50_95、各类别 ap50 / ap50_95 / precision / recall / f1 / support，
+            以及 confusion_matrix（行为预测类别、列为真实类别，最后一行/列为背景）
+        """
+        tp, conf, pred_cls = self._compact()
+        num_classes = len(self.class_names)
+        ap = np.full((num_classes, len(self.iou_thresholds)), np.nan)
+        precision = np.zeros(num_classes)
+        recall = np.zeros(num_classes)
+
+        # 所有预测框按置信度一次排序，各类别取子序列后用累计和得到PR曲线
+        order = np.argsort(-conf, kind='stable')
+        tp, conf, pred_cls = tp[order], conf[order], pred_cls[order]
+        for c in range(num_classes):
+            num_gt = self.gt_counts[c]
+            if num_gt == 0:
+                continue
+            mask = pred_cls == c
+            tp_c = tp[mask]
+            if len(tp_c) == 0:
+                ap[c] = 0.0
+                continue
+
+            tp_cum = np.cumsum(tp_c, axis=0)
+            fp_cum = np.cumsum(~tp_c, axis=0)
+            rec = tp_cum / num_gt
+            prec = tp_cum / (tp_cum + fp_cum)
+            ap[c] = self._average_precision(rec, prec)
+
+            # 工作点：置信度阈值、IoU 0.5
+            count = int(np.searchsorted(-conf[mask], -self.confidence_threshold, side='right'))
+            if count:
+                precision[c] = prec[count - 1, 0]
+                recall[c] = rec[count - 1, 0]
+
+        f1 = np.divide(2 * precision * recall, precision + recall,
+                       out=np.zeros(num_classes), where=(precision + recall) > 0)
+        ap50 = ap[:, 0]
+        ap50_95 = ap.mean(axis=1)
+        has_gt = self.gt_counts > 0
+
+        per_class = {
+            name: {
+                'ap50': float(ap50[c]), 'ap50_95': float(ap50_95[c]),
+                'precision': float(precision[c]), 'recall': float(recall[c]), 'f1': float(f1[c]),
+                'support': int(self.gt_counts[c]),
+            }
+            for c, name in enumerate(self.class_names)
+        }
+        return {
+            'images': self.images,
+            'map50': float(np.mean(ap50[has_gt])) if has_gt.any() else 0.0,
+            'map50_95': float(np.mean(ap50_95[has_gt])) if has_gt.any() else 0.0,
+            'precision': float(np.mean(precision[has_gt])) if has_gt.any() else 0.0,
+            'recall': float(np.mean(recall[has_gt])) if has_gt.any() else 0.0,
+            'f1': float(np.mean(f1[has_gt])) if has_gt.any() else 0.0,
+            'per_class': per_class,
+            'confusion_matrix': self.confusion.tolist(),
+        }
+
+    @staticmethod
+    def _average_precision(recall: np.ndarray, precision: np.ndarray) -> np.ndarray:
+        """
+        101点插值AP，对所有IoU阈值同时计算
+
+        Args:
+            recall: (N, T) 累计召回率（每列单调不减）
+            precision: (N, T) 累计精确率
+
+        Returns:
+            (T,) AP
+        """
+        # 精确率包络：从后往前取最大值
+        envelope = np.flip(np.maximum.accumulate(np.flip(precision, axis=0), axis=0), axis=0)
+        envelope = np.vstack([envelope, np.zeros((1, envelope.shape[1]))])
+        ap = np.empty(recall.shape[1])
+        for j in range(recall.shape[1]):
+            index = np.searchsorted(recall[:, j], RECALL_POINTS, side='left')
+            ap[j] = envelope[index, j].mean()
+        return ap
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # 跨进程传输前先拼接分块
+        self._compact()
+        return self.__dict__.copy()
+
+
+def _evaluate_chunk(chunk: Sequence[Tuple[np.ndarray, np.ndarray]], class_names: List[str],
+                    confidence_threshold: float, iou_thresholds: np.ndarray) -> DetectionEvaluator:
+    """工作进程：评估一个分块"""
+    evaluator = DetectionEvaluator(class_names=class_names,
+                                   confidence_threshold=confidence_threshold,
+                                   iou_thresholds=iou_thresholds)
+    predictions, targets = zip(*chunk) if chunk else ((), ())
+    evaluator.update(predictions, targets)
+    return evaluator
+
+
+def evaluate_parallel(chunks: Iterable[Sequence[Tuple[np.ndarray, np.ndarray]]],
+                      config_loader: Optional[ConfigLoader] = None,
+                      workers: int = 1,
+                      **kwargs: Any) -> DetectionEvaluator:
+    """
+    分块并行评估
+
+    Args:
+        chunks: 分块的可迭代对象，每个分块为 [(预测, 真值), ...]
+        config_loader: 配置加载器，默认使用全局配置
+        workers: 进程数，为1时在当前进程计算
+        **kwargs: 传给 DetectionEvaluator 的其他参数
+
+    Returns:
+        合并后的评估器，调用 compute() 得到指标
+    """
+    result = DetectionEvaluator(config_loader, **kwargs)
+    args = (result.class_names, result.confidence_threshold, result.iou_thresholds)
+    if workers <= 1:
+        for chunk in chunks:
+            result.merge(_evaluate_chunk(chunk, *args))
+        return result
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_evaluate_chunk, chunk, *args) for chunk in chunks]
+        for future in futures:
+            result.merge(future.result())
+    return result
+
+
+def evaluate_detector(detector, split: str = 'val',
+                      config_loader: Optional[ConfigLoader] = None,
+                      confidence: float = 0.001) -> Dict[str, Any]:
+    """
+    在带标注的数据集划分上评估检测器
+
+    Args:
+        detector: HardwareDetector（任意推理后端）
+        split: 数据集划分名称
+        config_loader: 配置加载器，默认使用全局配置
+        confidence: 计算mAP时NMS使用的最低置信度；P/R/F1仍按配置的阈值计算
+
+    Returns:
+        compute() 的指标字典，另含推理总耗时 inference_s 和 images_per_second
+    """
+    import time
+
+    from ..data.dataset_index import DatasetIndexer, parse_label_file
+
+    config = config_loader or default_config
+    manifest = DatasetIndexer(config).build(split)
+    entries = [entry for entry in manifest if entry['label'] and entry['width']]
+    if not entries:
+        raise ValueError(f"{split} 中没有带标注的图片")
+
+    num_classes = len(config.class_names)
+    evaluator = DetectionEvaluator(config)
+    # mAP需要完整的PR曲线，推理时换用固定低置信度阈值的NMS（不受配置重新加载影响），结束后恢复
+    original_nms = detector.nms
+    detector.nms = NonMaxSuppression(config, confidence_threshold=confidence)
+
+    inference_s = 0.0
+    chunk_size = detector.batch_size * 8
+    try:
+        for start in range(0, len(entries), chunk_size):
+            chunk = entries[start:start + chunk_size]
+            began = time.perf_counter()
+            results = detector.detect_batch([str(manifest.root / entry['path']) for entry in chunk])
+            inference_s += time.perf_counter() - began
+            targets = []
+            for entry in chunk:
+                labels = parse_label_file(manifest.root / entry['label'])
+                labels = labels[(labels[:, 0] >= 0) & (labels[:, 0] < num_classes)]
+                targets.append(labels_to_targets(labels, entry['width'], entry['height']))
+            evaluator.update([detections_to_array(r) for r in results], targets)
+    finally:
+        detector.nms = original_nms
+
+    metrics = evaluator.compute()
+    metrics['inference_s'] = inference_s
+    metrics['images_per_second'] = len(entries) / inference_s if inference_s > 0 else 0.0
+    return metrics
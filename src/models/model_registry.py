@@ -0,0 +1,273 @@
+"""
+模型注册表
+管理 data/models 下的模型文件（.pt 权重或导出的 .onnx）：每个文件按内容哈希只加载一次，
+加载后用 model_config.input_size 的空批次预热，同一推理后端实例在所有检测器和线程之间共享；
+多个版本可以同时驻留内存，超过上限时按最近使用顺序卸载
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from ..utils.config_loader import ConfigLoader, config as default_config
+from ..utils.logger import logger
+from ..utils.path_manager import path_manager
+from .backends import load_backend
+
+# 计算文件哈希时每次读取的字节数
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_hash(path: Union[str, Path]) -> str:
+    """
+    流式计算权重文件的内容哈希
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        32位十六进制哈希
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelEntry:
+    """注册表中的一个已加载模型"""
+
+    def __init__(self, path: Path, digest: Optional[str], version: str, device: str,
+                 model: Any, load_time_s: float, warmup_time_s: float):
+        self.path = path
+        self.digest = digest
+        self.version = version
+        self.device = device
+        # 推理后端（见 backends.py），输入预处理批次，输出原始预测
+        self.model = model
+        self.load_time_s = load_time_s
+        self.warmup_time_s = warmup_time_s
+        self.last_used = time.time()
+
+    def info(self) -> Dict[str, Any]:
+        """用于日志和状态查询的摘要信息"""
+        return {
+            'version': self.version,
+            'path': str(self.path),
+            'device': self.device,
+            'load_time_s': round(self.load_time_s, 3),
+            'warmup_time_s': round(self.warmup_time_s, 3),
+        }
+
+
+class ModelRegistry:
+    """
+    模型注册表类
+
+    缓存键为 (内容哈希, 设备)：文件改名或复制不会重复加载，
+    同名文件被覆盖后按新内容重新加载。model_version 为 "<文件名>-<哈希前8位>"，
+    与 detection_results.csv 的 model_version 列和检测结果缓存键一致。
+    卸载只是从注册表移除引用，仍在使用该模型的检测器不受影响。
+    """
+
+    def __init__(self, config_loader: Optional[ConfigLoader] = None,
+                 models_dir: Optional[Union[str, Path]] = None,
+                 max_resident: Optional[int] = None,
+                 warmup_iterations: Optional[int] = None):
+        """
+        初始化注册表
+
+        Args:
+            config_loader: 配置加载器，默认使用全局配置
+            models_dir: 模型目录，默认为 data/models
+            max_resident: 同时驻留内存的模型数上限，默认读取 model_registry_config.max_resident
+            warmup_iterations: 加载后预热的前向次数，默认读取 model_registry_config.warmup_iterations
+        """
+        self.config = config_loader or default_config
+        registry_config = self.config.get_config().get('model_registry_config', {})
+
+        self.models_dir = Path(models_dir or path_manager.models_dir)
+        self.max_resident = max(int(max_resident or registry_config.get('max_resident', 2)), 1)
+        if warmup_iterations is None:
+            warmup_iterations = registry_config.get('warmup_iterations', 2)
+        self.warmup_iterations = int(warmup_iterations)
+
+        self._entries: "OrderedDict[Tuple[str, str], ModelEntry]" = OrderedDict()
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, model: Optional[Union[str, Path]] = None) -> Path:
+        """
+        将模型名称解析为文件路径
+
+        Args:
+            model: 模型文件名（相对于模型目录）或路径，默认为 model_config.model_name
+
+        Returns:
+            模型文件路径
+        """
+        if model is None:
+            model = self.config.model_config['model_name']
+        path = Path(model)
+        if path.is_absolute() or path.exists():
+            return path
+        return self.models_dir / path
+
+    def digest(self, model: Optional[Union[str, Path]] = None) -> Optional[str]:
+        """
+        模型文件的内容哈希（按 mtime 和大小缓存，文件未变化时不重新读取）
+
+        Args:
+            model: 模型文件名或路径
+
+        Returns:
+            内容哈希，文件不存在时为None
+        """
+        path = self.resolve(model)
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        key = str(path.resolve())
+        with self._lock:
+            cached = self._hashes.get(key)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        digest = file_hash(path)
+        with self._lock:
+            self._hashes[key] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def version(self, model: Optional[Union[str, Path]] = None) -> str:
+        """
+        模型版本标签
+
+        Args:
+            model: 模型文件名或路径
+
+        Returns:
+            "<文件名>-<哈希前8位>"；文件不存在（将按名称下载）时只有文件名
+        """
+        path = self.resolve(model)
+        digest = self.digest(path)
+        return f"{path.stem}-{digest[:8]}" if digest else path.stem
+
+    def get(self, model: Optional[Union[str, Path]] = None, device: str = 'cpu',
+            input_size: Optional[Sequence[int]] = None,
+            batch_size: int = 1) -> ModelEntry:
+        """
+        获取已加载并预热的推理后端，首次请求时加载
+
+        同一模型被多个线程同时请求时只加载一次，其余线程等待加载完成；
+        不同模型的加载互不阻塞。
+
+        Args:
+            model: 模型文件名或路径，默认为 model_config.model_name
+            device: 推理设备
+            input_size: 预热使用的输入尺寸 [高, 宽]，默认读取 model_config.input_size
+            batch_size: 预热使用的批大小
+
+        Returns:
+            模型条目
+        """
+        path = self.resolve(model)
+        digest = self.digest(path)
+        key = (digest or f"name:{path.name}", device)
+
+        with self._lock:
+            entry = self._touch(key)
+            if entry is not None:
+                return entry
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                entry = self._touch(key)
+                if entry is not None:
+                    return entry
+
+            entry = self._load(path, digest, device, input_size, batch_size)
+            with self._lock:
+                self._entries[key] = entry
+                self._key_locks.pop(key, None)
+                while len(self._entries) > self.max_resident:
+                    _, evicted = self._entries.popitem(last=False)
+                    logger.info(f"卸载模型: {evicted.version} ({evicted.device})")
+        return entry
+
+    def _touch(self, key: Tuple[str, str]) -> Optional[ModelEntry]:
+        """命中时移到LRU末尾（调用方持有 self._lock）"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            entry.last_used = time.time()
+        return entry
+
+    def _load(self, path: Path, digest: Optional[str], device: str,
+              input_size: Optional[Sequence[int]], batch_size: int) -> ModelEntry:
+        """按文件类型创建推理后端并预热"""
+        inference_config = self.config.get_config().get('inference_config', {})
+        num_threads = int(inference_config.get('num_threads', 0))
+
+        version = f"{path.stem}-{digest[:8]}" if digest else path.stem
+        logger.info(f"加载检测模型: {path} (version={version}, device={device})")
+
+        start = time.perf_counter()
+        backend = load_backend(path, device, num_threads)
+        load_time = time.perf_counter() - start
+
+        # 预热：首次前向会触发内存分配和算子选择，放在加载阶段而不是第一个请求上
+        start = time.perf_counter()
+        if self.warmup_iterations > 0:
+            height, width = input_size or self.config.model_config['input_size']
+            dummy = np.zeros((max(int(batch_size), 1), 3, int(height), int(width)), dtype=np.float32)
+            for _ in range(self.warmup_iterations):
+                backend(dummy)
+        warmup_time = time.perf_counter() - start
+
+        logger.info(f"模型已就绪: {version} (加载 {load_time:.2f}s, 预热 {warmup_time:.2f}s)")
+        return ModelEntry(path, digest, version, device, backend, load_time, warmup_time)
+
+    def resident(self) -> List[Dict[str, Any]]:
+        """
+        当前驻留内存的模型，按最近使用顺序从旧到新排列
+
+        Returns:
+            模型摘要信息列表
+        """
+        with self._lock:
+            return [entry.info() for entry in self._entries.values()]
+
+    def unload(self, model: Optional[Union[str, Path]] = None) -> int:
+        """
+        从注册表卸载一个模型的所有设备实例
+
+        Args:
+            model: 模型文件名或路径
+
+        Returns:
+            卸载的实例数
+        """
+        path = self.resolve(model)
+        digest = self.digest(path) or f"name:{path.name}"
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == digest]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        """卸载所有模型"""
+        with self._lock:
+            self._entries.clear()
+
+
+# 全局注册表实例
+model_registry = ModelRegistry()
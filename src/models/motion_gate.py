@@ -0,0 +1,346 @@
+"""
+运动门控推理
+固定机位的工位上，托盘在两次放件之间基本静止。每帧先与参考帧比较缩小后的灰度图：
+没有变化时直接沿用上一帧的检测结果；只有局部变化时，只对变化区域推理，
+未变化区域的检测框保持不变；大面积变化（或沿用次数达到上限）时才做整帧推理
+
+区域推理使用与整帧推理相同的缩放比例，输入尺寸按区域大小取 32 的倍数
+（导出的 ONNX 为动态尺寸），前向计算量随变化面积而不是画面面积增长
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from ..data.preprocess import LetterboxPreprocessor
+from ..utils.config_loader import ConfigLoader
+from ..utils.metrics import metrics
+from .nms import batched_nms
+
+# YOLOv8 的最大下采样步长，区域输入尺寸需为其整数倍
+MODEL_STRIDE = 32
+
+
+def changed_regions(mask: np.ndarray, min_pixels: int, dilate: int = 3) -> np.ndarray:
+    """
+    变化掩码中的连通区域
+
+    先膨胀让同一零件的零散变化像素连成一片，再按区域内原始变化像素数过滤噪声点
+
+    Args:
+        mask: 缩小图上的布尔变化掩码
+        min_pixels: 区域内变化像素少于该值时视为噪声
+        dilate: 膨胀核尺寸（像素）
+
+    Returns:
+        形状为 (R, 4) 的int64数组，每行为缩小图坐标下的 [x0, y0, x1, y1]
+    """
+    binary = mask.astype(np.uint8)
+    if dilate > 1:
+        binary = cv2.dilate(binary, np.ones((dilate, dilate), dtype=np.uint8))
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    # 每个连通区域内原始（未膨胀）变化像素数，标签0为背景
+    changed = np.bincount(labels[mask], minlength=count)
+    keep = np.flatnonzero(changed >= min_pixels)
+    keep = keep[keep > 0]
+    x, y, w, h = (stats[keep, i].astype(np.int64) for i in range(4))
+    return np.stack([x, y, x + w, y + h], axis=1) if len(keep) else np.zeros((0, 4), dtype=np.int64)
+
+
+def merge_regions(regions: np.ndarray) -> np.ndarray:
+    """
+    合并互相重叠的矩形，直到没有重叠
+
+    Args:
+        regions: 形状为 (R, 4) 的 [x0, y0, x1, y1]
+
+    Returns:
+        合并后的矩形
+    """
+    boxes = [box for box in regions]
+    merged = True
+    while merged and len(boxes) > 1:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                a, b = boxes[i], boxes[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    boxes[i] = np.concatenate([np.minimum(a[:2], b[:2]), np.maximum(a[2:], b[2:])])
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return np.array(boxes, dtype=np.int64).reshape(-1, 4)
+
+
+class MotionGatedDetector:
+    """
+    运动门控检测器包装类
+
+    按帧顺序处理同一机位的画面（有状态，每路相机一个实例）。参考帧只在推理过的位置更新：
+    缓慢漂移的零件在累积到阈值之前沿用旧结果，累积到阈值后一定会被重新检测。
+    """
+
+    def __init__(self, detector, config_loader: Optional[ConfigLoader] = None,
+                 side: Optional[int] = None,
+                 pixel_threshold: Optional[int] = None,
+                 min_changed_pixels: Optional[int] = None,
+                 full_frame_fraction: Optional[float] = None,
+                 max_reuse_frames: Optional[int] = None):
+        """
+        初始化
+
+        Args:
+            detector: HardwareDetector 实例
+            config_loader: 配置加载器，默认使用检测器的配置
+            side: 比较时缩小到的长边尺寸，默认读取 motion_gate_config.side
+            pixel_threshold: 灰度差超过该值的像素计为变化，默认读取 motion_gate_config.pixel_threshold
+            min_changed_pixels: 变化像素少于该值的区域视为噪声，默认读取 motion_gate_config.min_changed_pixels
+            full_frame_fraction: 变化区域面积超过画面该比例时整帧推理
+            max_reuse_frames: 连续沿用结果的最大帧数，达到后强制整帧推理，0表示不限制
+        """
+        self.detector = detector
+        self.config = config_loader or detector.config
+        gate_config = self.config.get_config().get('motion_gate_config', {})
+
+        self.side = int(side or gate_config.get('side', 320))
+        self.pixel_threshold = int(pixel_threshold or gate_config.get('pixel_threshold', 15))
+        self.min_changed_pixels = int(min_changed_pixels or gate_config.get('min_changed_pixels', 6))
+        self.full_frame_fraction = float(full_frame_fraction or gate_config.get('full_frame_fraction', 0.5))
+        if max_reuse_frames is None:
+            max_reuse_frames = gate_config.get('max_reuse_frames', 150)
+        self.max_reuse_frames = int(max_reuse_frames)
+        self.region_margin = int(gate_config.get('region_margin', 16))
+
+        self._reference: Optional[np.ndarray] = None
+        self._shape: Optional[Tuple[int, int]] = None
+        self._boxes = np.zeros((0, 6), dtype=np.float64)
+        self._reused = 0
+        # 区域输入尺寸 -> 预分配的单张预处理器
+        self._preprocessors: Dict[Tuple[int, int], LetterboxPreprocessor] = {}
+
+        self.frames = 0
+        self.skipped = 0
+        self.regional = 0
+        self.full = 0
+
+    def reset(self) -> None:
+        """丢弃参考帧，下一帧整帧推理（切换相机或工位时调用）"""
+        self._reference = None
+        self._shape = None
+        self._boxes = np.zeros((0, 6), dtype=np.float64)
+        self._reused = 0
+
+    def detect(self, image: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        检测一帧
+
+        Args:
+            image: BGR格式的numpy数组（或图片路径）
+
+        Returns:
+            原图坐标下的检测结果列表
+        """
+        return self.detect_batch([image])[0]
+
+    def detect_batch(self, images: Sequence[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        """
+        按顺序检测一组连续帧
+
+        Args:
+            images: 同一机位按时间顺序排列的帧
+
+        Returns:
+            与输入顺序一致的检测结果列表
+        """
+        results = []
+        for image in images:
+            start = time.perf_counter()
+            boxes = self._step(self.detector._read_image(image))
+            elapsed = time.perf_counter() - start
+            metrics.observe('detection', elapsed)
+            results.append(self._to_detections(boxes, elapsed * 1000.0))
+        return results
+
+    def _step(self, image: np.ndarray) -> np.ndarray:
+        """处理一帧，返回 (K, 6) 的检测框 [x1, y1, x2, y2, confidence, class_id]"""
+        self.frames += 1
+        height, width = image.shape[:2]
+
+        with metrics.stage('motion'):
+            scale = min(self.side / max(height, width), 1.0)
+            size = (max(int(round(width * scale)), 1), max(int(round(height * scale)), 1))
+            small = cv2.cvtColor(cv2.resize(image, size, interpolation=cv2.INTER_AREA),
+                                 cv2.COLOR_BGR2GRAY)
+            if self._reference is None or self._shape != (height, width) or (
+                    self.max_reuse_frames > 0 and self._reused >= self.max_reuse_frames):
+                regions = None
+            else:
+                mask = cv2.absdiff(small, self._reference) > self.pixel_threshold
+                # 静止画面的快速路径：变化像素总数不足一个区域时不做连通域分析
+                if np.count_nonzero(mask) < self.min_changed_pixels:
+                    regions = np.zeros((0, 4), dtype=np.int64)
+                else:
+                    regions = changed_regions(mask, self.min_changed_pixels)
+
+        if regions is not None and len(regions) == 0:
+            self.skipped += 1
+            self._reused += 1
+            return self._boxes
+
+        if regions is not None:
+            regions = self._expand(regions / scale, height, width)
+            area = float(np.prod(regions[:, 2:] - regions[:, :2], axis=1).sum())
+            if area <= self.full_frame_fraction * height * width:
+                self._update_regions(image, regions)
+                # 只更新推理过的区域的参考帧
+                for x0, y0, x1, y1 in np.round(regions * scale).astype(np.int64):
+                    self._reference[y0:y1, x0:x1] = small[y0:y1, x0:x1]
+                self.regional += 1
+                self._reused = 0
+                return self._boxes
+
+        self._boxes = self._infer_full(image)
+        self._reference = small
+        self._shape = (height, width)
+        self.full += 1
+        self._reused = 0
+        return self._boxes
+
+    def _expand(self, regions: np.ndarray, height: int, width: int) -> np.ndarray:
+        """
+        区域加边距，并扩展到完整覆盖与之相交的旧检测框（该零件整体重新检测），
+        合并重叠区域后按步长对齐
+
+        Args:
+            regions: 原图坐标下的变化区域
+            height: 原图高度
+            width: 原图宽度
+
+        Returns:
+            形状为 (R, 4) 的int64区域
+        """
+        margin = self.region_margin
+        regions = regions.astype(np.float64) + np.array([-margin, -margin, margin, margin])
+        old = self._boxes[:, :4]
+        for _ in range(4):
+            hit = ((old[None, :, 0] < regions[:, None, 2]) & (regions[:, None, 0] < old[None, :, 2]) &
+                   (old[None, :, 1] < regions[:, None, 3]) & (regions[:, None, 1] < old[None, :, 3]))
+            grown = regions.copy()
+            for i, row in enumerate(hit):
+                if row.any():
+                    grown[i, :2] = np.minimum(grown[i, :2], old[row, :2].min(axis=0) - margin)
+                    grown[i, 2:] = np.maximum(grown[i, 2:], old[row, 2:].max(axis=0) + margin)
+            grown = merge_regions(np.round(grown).astype(np.int64)).astype(np.float64)
+            if grown.shape == regions.shape and np.array_equal(grown, regions):
+                break
+            regions = grown
+        regions = np.round(regions).astype(np.int64)
+        regions[:, [0, 2]] = np.clip(regions[:, [0, 2]], 0, width)
+        regions[:, [1, 3]] = np.clip(regions[:, [1, 3]], 0, height)
+        return merge_regions(regions)
+
+    def _infer_full(self, image: np.ndarray) -> np.ndarray:
+        """整帧推理"""
+        return self._to_array(self.detector._infer([image])[0])
+
+    def _update_regions(self, image: np.ndarray, regions: np.ndarray) -> None:
+        """
+        对变化区域推理：删除落在区域内的旧框，加入区域内新检出且未被区域边界切断的框
+
+        Args:
+            image: 当前帧
+            regions: 原图坐标下的区域（已覆盖相交的旧框）
+        """
+        height, width = image.shape[:2]
+        input_h, input_w = self.detector.input_size
+        # 与整帧推理相同的缩放比例，零件在区域输入中的像素尺寸与整帧推理一致
+        scale = min(input_h / height, input_w / width)
+        model = self.detector.load_model()
+
+        old = self._boxes
+        inside = np.zeros(len(old), dtype=bool)
+        found = []
+        for x0, y0, x1, y1 in regions:
+            inside |= ((old[:, 0] >= x0) & (old[:, 1] >= y0) & (old[:, 2] <= x1) & (old[:, 3] <= y1))
+            crop = image[y0:y1, x0:x1]
+            size = (max(int(np.ceil((y1 - y0) * scale / MODEL_STRIDE)), 1) * MODEL_STRIDE,
+                    max(int(np.ceil((x1 - x0) * scale / MODEL_STRIDE)), 1) * MODEL_STRIDE)
+            preprocessor = self._preprocessors.get(size)
+            if preprocessor is None:
+                preprocessor = self._preprocessors[size] = LetterboxPreprocessor(1, size)
+
+            with metrics.stage('preprocess'):
+                batch, meta = preprocessor([crop])
+            with metrics.stage('forward'):
+                output = model(batch)
+            with metrics.stage('nms'):
+                detections = self.detector.nms(output)[0]
+            boxes = self._to_array(self.detector._to_detections(
+                detections, meta['scales'][0], meta['pads'][0], meta['shapes'][0]))
+            boxes[:, [0, 2]] += x0
+            boxes[:, [1, 3]] += y0
+            found.append(self._drop_cut_boxes(boxes, (x0, y0, x1, y1), height, width))
+
+        boxes = np.concatenate([old[~inside]] + found)
+        keep = batched_nms(boxes[:, :4], boxes[:, 4], self.detector.iou_threshold,
+                           class_ids=boxes[:, 5].astype(np.int64),
+                           max_detections=self.detector.max_detections)
+        self._boxes = boxes[keep]
+
+    def _drop_cut_boxes(self, boxes: np.ndarray, region: Tuple[int, int, int, int],
+                        height: int, width: int) -> np.ndarray:
+        """丢弃接触区域内部边界（不是画面边界）的框：这些零件没有完整落在区域内"""
+        x0, y0, x1, y1 = region
+        cut = np.zeros(len(boxes), dtype=bool)
+        if x0 > 0:
+            cut |= boxes[:, 0] <= x0 + 1
+        if y0 > 0:
+            cut |= boxes[:, 1] <= y0 + 1
+        if x1 < width:
+            cut |= boxes[:, 2] >= x1 - 1
+        if y1 < height:
+            cut |= boxes[:, 3] >= y1 - 1
+        return boxes[~cut]
+
+    @staticmethod
+    def _to_array(detections: List[Dict[str, Any]]) -> np.ndarray:
+        """检测结果转换为 (K, 6) 数组"""
+        out = np.zeros((len(detections), 6), dtype=np.float64)
+        for i, det in enumerate(detections):
+            out[i] = (det['bbox_x'], det['bbox_y'],
+                      det['bbox_x'] + det['bbox_width'], det['bbox_y'] + det['bbox_height'],
+                      det['confidence'], det['class_id'])
+        return out
+
+    def _to_detections(self, boxes: np.ndarray, elapsed_ms: float) -> List[Dict[str, Any]]:
+        """(K, 6) 数组转换为检测结果字典列表"""
+        return [{
+            'class_id': int(class_id),
+            'part_category': self.detector.get_class_name(int(class_id)),
+            'confidence': float(confidence),
+            'bbox_x': float(x1),
+            'bbox_y': float(y1),
+            'bbox_width': float(x2 - x1),
+            'bbox_height': float(y2 - y1),
+            'model_version': self.detector.model_version,
+            'detection_time_ms': elapsed_ms,
+        } for x1, y1, x2, y2, confidence, class_id in boxes]
+
+    def statistics(self) -> Dict[str, Any]:
+        """
+        门控统计
+
+        Returns:
+            frames、skipped（沿用结果）、regional（区域推理）、full（整帧推理）帧数及跳过比例
+        """
+        return {
+            'frames': self.frames,
+            'skipped': self.skipped,
+            'regional': self.regional,
+            'full': self.full,
+            'skip_rate': self.skipped / self.frames if self.frames else 0.0,
+        }
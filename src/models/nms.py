@@ -0,0 +1,250 @@
+"""
+非极大值抑制（NMS）
+基于NumPy的向量化实现，支持整批图片、按类别（偏移技巧）和类别无关两种模式
+"""
+
+from typing import List, Optional
+
+import numpy as np
+
+from ..utils.config_loader import ConfigLoader, config as default_config
+
+
+def xywh_to_xyxy(boxes: np.ndarray) -> np.ndarray:
+    """
+    将中心点格式 (cx, cy, w, h) 转换为角点格式 (x1, y1, x2, y2)
+
+    Args:
+        boxes: 形状为 (..., 4) 的数组
+
+    Returns:
+        同形状的角点格式数组
+    """
+    out = np.empty_like(boxes)
+    half_w = boxes[..., 2] / 2
+    half_h = boxes[..., 3] / 2
+    out[..., 0] = boxes[..., 0] - half_w
+    out[..., 1] = boxes[..., 1] - half_h
+    out[..., 2] = boxes[..., 0] + half_w
+    out[..., 3] = boxes[..., 1] + half_h
+    return out
+
+
+def box_iou(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """
+    计算两组框两两之间的IoU矩阵
+
+    Args:
+        boxes1: 形状为 (N, 4) 的角点格式框
+        boxes2: 形状为 (M, 4) 的角点格式框
+
+    Returns:
+        形状为 (N, M) 的IoU矩阵
+    """
+    area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+
+    lt = np.maximum(boxes1[:, None, :2], boxes2[None, :, :2])
+    rb = np.minimum(boxes1[:, None, 2:], boxes2[None, :, 2:])
+    wh = np.clip(rb - lt, 0, None)
+    inter = wh[..., 0] * wh[..., 1]
+
+    union = area1[:, None] + area2[None, :] - inter
+    return inter / np.maximum(union, np.finfo(np.float32).eps)
+
+
+def _greedy_nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float,
+                max_detections: Optional[int]) -> np.ndarray:
+    """
+    单组框的贪心NMS，每轮只对剩余候选框做一次向量化IoU计算
+
+    Args:
+        boxes: 形状为 (N, 4) 的角点格式框（float64）
+        scores: 形状为 (N,) 的置信度
+        iou_threshold: IoU阈值
+        max_detections: 最多保留的框数
+
+    Returns:
+        保留框的索引，按置信度降序排列
+    """
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    eps = np.finfo(np.float32).eps
+
+    order = np.argsort(-scores, kind='stable')
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        if max_detections is not None and len(keep) >= max_detections:
+            break
+        rest = order[1:]
+
+        xx1 = np.maximum(x1[i], x1[rest])
+        yy1 = np.maximum(y1[i], y1[rest])
+        xx2 = np.minimum(x2[i], x2[rest])
+        yy2 = np.minimum(y2[i], y2[rest])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, eps)
+        order = rest[iou <= iou_threshold]
+
+    return np.asarray(keep, dtype=np.int64)
+
+
+def batched_nms(boxes: np.ndarray, scores: np.ndarray,
+                iou_threshold: float,
+                class_ids: Optional[np.ndarray] = None,
+                batch_index: Optional[np.ndarray] = None,
+                max_detections: Optional[int] = None) -> np.ndarray:
+    """
+    对一组框执行贪心NMS，不同图片/类别之间互不抑制
+
+    通过给每个类别的框加上互不重叠的坐标偏移（偏移技巧），同一张图片的
+    所有类别只需一次NMS；整批框一次排序后按图片切片，避免每轮IoU计算
+    扫描其他图片的候选框。
+
+    Args:
+        boxes: 形状为 (N, 4) 的角点格式框
+        scores: 形状为 (N,) 的置信度
+        iou_threshold: IoU阈值，超过该值的低分框被抑制
+        class_ids: 形状为 (N,) 的类别编号，为None时类别无关
+        batch_index: 形状为 (N,) 的图片编号，为None时视为同一张图片
+        max_detections: 每张图片最多保留的框数
+
+    Returns:
+        保留框的索引，按图片编号、置信度降序排列
+    """
+    if boxes.shape[0] == 0:
+        return np.empty((0,), dtype=np.int64)
+
+    # 使用float64避免大偏移量下的精度损失
+    shifted = boxes.astype(np.float64)
+    if class_ids is not None:
+        span = float(boxes.max()) - float(boxes.min()) + 1.0
+        shifted += (class_ids.astype(np.float64) * span)[:, None]
+
+    if batch_index is None:
+        return _greedy_nms(shifted, scores, iou_threshold, max_detections)
+
+    # 按图片编号分组，每张图片的候选框是一段连续切片
+    by_image = np.argsort(batch_index, kind='stable')
+    bounds = np.flatnonzero(np.diff(batch_index[by_image])) + 1
+    keep = []
+    for group in np.split(by_image, bounds):
+        kept = _greedy_nms(shifted[group], scores[group], iou_threshold, max_detections)
+        keep.append(group[kept])
+    return np.concatenate(keep)
+
+
+def non_max_suppression(predictions: np.ndarray,
+                        confidence_threshold: float,
+                        iou_threshold: float,
+                        max_detections: int,
+                        class_agnostic: bool = False,
+                        max_candidates: int = 30000) -> List[np.ndarray]:
+    """
+    对YOLOv8原始输出执行整批NMS
+
+    Args:
+        predictions: 形状为 (B, 4 + num_classes, N) 的模型输出，框为 (cx, cy, w, h)
+        confidence_threshold: 置信度阈值，在构建IoU之前先过滤
+        iou_threshold: IoU阈值
+        max_detections: 每张图片最多保留的框数
+        class_agnostic: 为True时不同类别之间也相互抑制
+        max_candidates: 每张图片进入NMS的候选框上限（按置信度截断）
+
+    Returns:
+        长度为B的列表，每项为形状 (K, 6) 的数组: x1, y1, x2, y2, confidence, class_id
+    """
+    batch_size = predictions.shape[0]
+    class_scores = predictions[:, 4:, :]
+
+    # 每个候选框取最高分类别，并先按置信度过滤
+    class_ids = class_scores.argmax(axis=1)
+    confidences = np.take_along_axis(class_scores, class_ids[:, None, :], axis=1)[:, 0, :]
+    batch_index, anchor_index = np.nonzero(confidences > confidence_threshold)
+
+    empty = np.zeros((0, 6), dtype=np.float32)
+    if batch_index.size == 0:
+        return [empty.copy() for _ in range(batch_size)]
+
+    scores = confidences[batch_index, anchor_index]
+    counts = np.bincount(batch_index, minlength=batch_size)
+    if counts.max() > max_candidates:
+        # 每张图片只保留置信度最高的 max_candidates 个候选框
+        order = np.lexsort((-scores, batch_index))
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        rank = np.arange(order.size) - np.repeat(starts, counts)
+        top = order[rank < max_candidates]
+        batch_index, anchor_index, scores = batch_index[top], anchor_index[top], scores[top]
+
+    boxes = xywh_to_xyxy(predictions[batch_index, :4, anchor_index])
+    labels = class_ids[batch_index, anchor_index]
+
+    keep = batched_nms(
+        boxes, scores, iou_threshold,
+        class_ids=None if class_agnostic else labels,
+        batch_index=batch_index,
+        max_detections=max_detections,
+    )
+
+    detections = np.concatenate([
+        boxes[keep],
+        scores[keep, None],
+        labels[keep, None].astype(boxes.dtype),
+    ], axis=1).astype(np.float32, copy=False)
+
+    # keep 已按图片编号排序，直接按边界切分
+    splits = np.searchsorted(batch_index[keep], np.arange(1, batch_size))
+    return np.split(detections, splits)
+
+
+class NonMaxSuppression:
+    """按 model_config 配置执行NMS的后处理器"""
+
+    def __init__(self, config_loader: Optional[ConfigLoader] = None,
+                 class_agnostic: bool = False,
+                 confidence_threshold: Optional[float] = None):
+        """
+        初始化NMS后处理器
+
+        Args:
+            config_loader: 配置加载器，默认使用全局配置
+            class_agnostic: 是否类别无关
+            confidence_threshold: 固定的置信度阈值（如评估时的0.001），不随配置重新加载改变；
+                                  默认读取 model_config.confidence_threshold
+        """
+        config = config_loader or default_config
+        self.class_agnostic = class_agnostic
+        self._fixed_confidence = confidence_threshold
+        self._apply_config(config.snapshot())
+        # config.json 重新加载后阈值立即生效
+        config.subscribe(self._apply_config)
+
+    def _apply_config(self, snapshot) -> None:
+        """从配置快照读取阈值"""
+        model_config = snapshot.model_config
+        confidence = self._fixed_confidence
+        if confidence is None:
+            confidence = model_config['confidence_threshold']
+        self.confidence_threshold = float(confidence)
+        self.iou_threshold = float(model_config['iou_threshold'])
+        self.max_detections = int(model_config['max_detections'])
+
+    def __call__(self, predictions: np.ndarray) -> List[np.ndarray]:
+        """
+        对一批模型输出执行NMS
+
+        Args:
+            predictions: 形状为 (B, 4 + num_classes, N) 的模型输出
+
+        Returns:
+            每张图片的检测数组列表
+        """
+        return non_max_suppression(
+            predictions,
+            self.confidence_threshold,
+            self.iou_threshold,
+            self.max_detections,
+            class_agnostic=self.class_agnostic,
+        )
@@ -0,0 +1,142 @@
+"""
+视频流检测
+采集线程（见 data/video_source.py）只保留最新一帧，检测循环每次取走最新帧推理；
+推理慢于相机时中间的帧被丢弃，检测结果始终对应传送带上的当前画面，
+而不是越积越多、落后数秒的旧帧
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from ..data.result_analytics import LatencySketch
+from ..data.video_source import Frame, FrameCapture, LatestFrameBuffer
+from ..utils.config_loader import ConfigLoader
+from ..utils.logger import logger
+
+# 检测结果回调: (帧, 检测结果列表)
+ResultCallback = Callable[[Frame, List[Dict[str, Any]]], None]
+
+
+class StreamDetector:
+    """
+    视频流检测器类
+
+    统计采集帧率、检测帧率、丢帧率，以及从采集完成到检测完成的端到端延迟。
+    """
+
+    def __init__(self, detector, source: Union[str, int],
+                 config_loader: Optional[ConfigLoader] = None,
+                 on_result: Optional[ResultCallback] = None,
+                 realtime: Optional[bool] = None):
+        """
+        初始化
+
+        Args:
+            detector: HardwareDetector（或提供 detect_batch 的包装，如 TiledDetector）
+            source: 视频文件路径、设备编号、设备路径或流地址
+            config_loader: 配置加载器，默认使用检测器的配置
+            on_result: 每帧检测完成后的回调
+            realtime: 视频文件是否按原始帧率读取（否则逐帧检测），默认读取 stream_config.realtime_files
+        """
+        self.detector = detector
+        self.config = config_loader or detector.config
+        stream_config = self.config.get_config().get('stream_config', {})
+
+        self.on_result = on_result
+        self.log_interval = float(stream_config.get('log_interval_s', 5.0))
+        self.buffer = LatestFrameBuffer()
+        self.capture = FrameCapture(source, self.buffer, self.config, realtime=realtime)
+
+        self.processed = 0
+        self.detections = 0
+        # 端到端延迟（毫秒）的分位数草图，长时间运行内存占用不变
+        self._latency = LatencySketch()
+        self._started = 0.0
+        self._elapsed = 0.0
+
+    def run(self, max_frames: Optional[int] = None,
+            duration: Optional[float] = None) -> Dict[str, Any]:
+        """
+        运行检测循环，直到视频结束、达到帧数/时长上限或 KeyboardInterrupt
+
+        Args:
+            max_frames: 最多检测的帧数
+            duration: 最长运行时间（秒）
+
+        Returns:
+            统计信息，见 statistics()
+        """
+        self._started = time.perf_counter()
+        deadline = None if duration is None else self._started + duration
+        next_log = self._started + self.log_interval
+
+        self.capture.start()
+        try:
+            while max_frames is None or self.processed < max_frames:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+                frame = self.buffer.get(timeout=0.5)
+                if frame is None:
+                    if self.buffer.closed:
+                        break
+                    continue
+                self._process(frame)
+
+                now = time.perf_counter()
+                if now >= next_log:
+                    next_log = now + self.log_interval
+                    self._log_progress()
+        except KeyboardInterrupt:
+            logger.info("视频流检测被中断")
+        finally:
+            self.capture.stop()
+            self._elapsed = time.perf_counter() - self._started
+
+        stats = self.statistics()
+        logger.info(f"视频流检测结束: 采集 {stats['captured']} 帧, 检测 {stats['processed']} 帧, "
+                    f"丢帧率 {stats['drop_rate']:.1%}, 检测帧率 {stats['processed_fps']:.1f}")
+        if self.capture.error:
+            raise RuntimeError(f"视频采集失败: {self.capture.error}")
+        return stats
+
+    def _process(self, frame: Frame) -> None:
+        """检测一帧并记录端到端延迟"""
+        detections = self.detector.detect_batch([frame.image])[0]
+        self._latency.add([(time.perf_counter() - frame.timestamp) * 1000.0])
+        self.processed += 1
+        self.detections += len(detections)
+        if self.on_result is not None:
+            self.on_result(frame, detections)
+
+    def _log_progress(self) -> None:
+        stats = self.statistics()
+        logger.info(f"视频流: 采集 {stats['capture_fps']:.1f} fps, 检测 {stats['processed_fps']:.1f} fps, "
+                    f"丢帧率 {stats['drop_rate']:.1%}, 延迟 p95 {stats['latency_p95_ms']:.0f} ms")
+
+    def statistics(self) -> Dict[str, Any]:
+        """
+        当前统计信息
+
+        Returns:
+            captured/processed/dropped 帧数、drop_rate、capture_fps、processed_fps、
+            detections，以及端到端延迟 latency_p50_ms/latency_p95_ms
+        """
+        elapsed = self._elapsed or (time.perf_counter() - self._started)
+        elapsed = max(elapsed, 1e-9)
+        captured = self.capture.frames
+        # 采集结束时留在槽位里、没有被取走的最后一帧同样计为丢帧
+        dropped = max(captured - self.processed, 0)
+        return {
+            'source': str(self.capture.source),
+            'captured': captured,
+            'processed': self.processed,
+            'dropped': dropped,
+            'drop_rate': dropped / captured if captured else 0.0,
+            'capture_fps': captured / elapsed,
+            'processed_fps': self.processed / elapsed,
+            'source_fps': self.capture.fps,
+            'detections': self.detections,
+            'latency_p50_ms': self._latency.quantile(0.5) or 0.0,
+            'latency_p95_ms': self._latency.quantile(0.95) or 0.0,
+            'elapsed_s': elapsed,
+        }
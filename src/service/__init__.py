@@ -0,0 +1,36 @@
+"""
+服务模块
+提供本地HTTP推理服务
+
+子模块按需导入，访问其中的名称时才加载（避免命令行启动时导入OpenCV等）
+"""
+
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .inference_server import InferenceServer, HttpError
+
+# 名称 -> 所在子模块
+_LAZY_ATTRS = {
+    'InferenceServer': 'inference_server',
+    'HttpError': 'inference_server',
+}
+
+__all__ = [
+    'InferenceServer',
+    'HttpError',
+]
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,492 @@
+"""
+HTTP推理服务
+基于 asyncio 的本地HTTP服务：一个进程、一份模型权重，供多个工位共享。
+并发请求在延迟预算（max_wait_ms）内合并成批次，解码和推理在线程池中执行，事件循环从不阻塞；
+每个工作线程使用自己的检测器副本（共享权重），多个批次的前向推理可以同时进行；
+排队中和推理中的图片数达到上限时直接返回 503，而不是无限排队
+
+接口:
+    POST /detect          请求体为图片文件字节，返回一个JSON对象
+    POST /detect/stream   请求体为 {"images": [base64, ...]}，按完成顺序逐行返回JSON（分块传输）
+    GET  /health          服务状态
+    GET  /metrics         Prometheus 文本格式的阶段耗时
+"""
+
+import asyncio
+import base64
+import binascii
+import json
+import queue
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import cv2
+import numpy as np
+
+from ..utils.config_loader import ConfigLoader
+from ..utils.logger import logger
+from ..utils.metrics import metrics
+
+
+class HttpError(Exception):
+    """返回给客户端的HTTP错误"""
+
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class _Request:
+    """一个待推理的图片"""
+
+    __slots__ = ('data', 'future', 'submitted')
+
+    def __init__(self, data: bytes, future: "asyncio.Future", submitted: float):
+        self.data = data
+        self.future = future
+        self.submitted = submitted
+
+
+def decode_image(data: bytes) -> np.ndarray:
+    """
+    解码图片字节
+
+    Args:
+        data: JPEG/PNG等编码的图片
+
+    Returns:
+        BGR格式的uint8数组
+    """
+    with metrics.stage('decode'):
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("无法解码图片")
+    return image
+
+
+class InferenceServer:
+    """
+    HTTP推理服务类
+
+    凑批由事件循环中的一个协程完成：第一张图片到达后最多等待 max_wait_ms，
+    期间到达的图片合并成一个批次；所有工作线程都在推理时，新到的图片继续排队，
+    拿到空闲线程时一次取走（负载越高批次越大）。
+    """
+
+    def __init__(self, detector, config_loader: Optional[ConfigLoader] = None,
+                 host: Optional[str] = None,
+                 port: Optional[int] = None,
+                 batch_size: Optional[int] = None,
+                 max_wait_ms: Optional[float] = None,
+                 max_pending: Optional[int] = None,
+                 workers: Optional[int] = None):
+        """
+        初始化
+
+        Args:
+            detector: HardwareDetector 实例
+            config_loader: 配置加载器，默认使用检测器的配置
+            host: 监听地址，默认读取 server_config.host
+            port: 监听端口，默认读取 server_config.port
+            batch_size: 最大批大小，默认为检测器的批大小
+            max_wait_ms: 凑批的延迟预算（毫秒），默认读取 server_config.max_wait_ms
+            max_pending: 排队中和推理中的图片数上限，超出时返回503，默认读取 server_config.max_pending
+            workers: 推理线程数（同时执行的批次数，每个线程一个共享权重的检测器副本），
+                     默认读取 server_config.workers
+        """
+        self.detector = detector
+        self.config = config_loader or detector.config
+        server_config = self.config.get_config().get('server_config', {})
+
+        self.host = host or server_config.get('host', '127.0.0.1')
+        self.port = int(port if port is not None else server_config.get('port', 8080))
+        self.batch_size = int(batch_size or detector.batch_size)
+        if max_wait_ms is None:
+            max_wait_ms = server_config.get('max_wait_ms', 10)
+        self.max_wait = float(max_wait_ms) / 1000.0
+        self.max_pending = int(max_pending or server_config.get('max_pending', 64))
+        self.workers = max(int(workers or server_config.get('workers', 2)), 1)
+        self.max_body_bytes = int(float(server_config.get('max_body_mb', 32)) * 1024 * 1024)
+        self.drain_timeout = float(server_config.get('drain_timeout_s', 10.0))
+
+        self.pending = 0
+        self.requests = 0
+        self.rejected = 0
+        self.batches = 0
+        self.images = 0
+
+        self._queue: Optional["asyncio.Queue[_Request]"] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # 空闲的检测器副本，工作线程推理时取出、结束后放回
+        self._detectors: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._tasks: set = set()
+        self._connections: set = set()
+        self._started = 0.0
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+    async def start(self) -> None:
+        """加载模型并开始监听"""
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        # 模型加载和预热放在监听之前，第一个请求不承担加载耗时
+        await loop.run_in_executor(self._executor, self.detector.load_model)
+        # 检测器的推理锁保护其预处理缓冲区，同一个检测器上的批次只能串行执行；
+        # 每个工作线程一个副本，副本共享已加载的模型
+        self._detectors = queue.SimpleQueue()
+        self._detectors.put(self.detector)
+        for _ in range(self.workers - 1):
+            self._detectors.put(self.detector.replica())
+
+        self._batcher = loop.create_task(self._batch_loop())
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started = time.perf_counter()
+        logger.info(f"推理服务已启动: http://{self.host}:{self.port} (batch_size={self.batch_size}, "
+                    f"max_wait_ms={self.max_wait * 1000:.0f}, max_pending={self.max_pending}, "
+                    f"workers={self.workers})")
+
+    async def close(self) -> None:
+        """停止监听，等待已接收的请求处理完毕后退出"""
+        if self._server is not None:
+            self._server.close()
+
+        deadline = time.perf_counter() + self.drain_timeout
+        while self.pending and time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
+        # 空闲的长连接不会自行关闭，主动断开
+        for writer in list(self._connections):
+            writer.close()
+        if self._server is not None:
+            await self._server.wait_closed()
+            self._server = None
+        if self._batcher is not None:
+            self._batcher.cancel()
+            await asyncio.gather(self._batcher, return_exceptions=True)
+            self._batcher = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        logger.info(f"推理服务已停止: 请求 {self.requests} 个, 拒绝 {self.rejected} 个, "
+                    f"批次 {self.batches} 个, 图片 {self.images} 张")
+
+    async def serve_forever(self) -> None:
+        """运行服务直到收到 SIGINT/SIGTERM"""
+        await self.start()
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                # Windows 的事件循环不支持信号处理，由 KeyboardInterrupt 结束
+                pass
+        try:
+            await stop.wait()
+        finally:
+            await self.close()
+
+    # ------------------------------------------------------------------
+    # 凑批与推理
+    # ------------------------------------------------------------------
+    def _admit(self, count: int) -> None:
+        """准入控制：超过上限时整个请求被拒绝"""
+        if self.pending + count > self.max_pending:
+            self.rejected += 1
+            raise HttpError(HTTPStatus.SERVICE_UNAVAILABLE, "服务繁忙，请稍后重试",
+                            {'Retry-After': '1'})
+        self.pending += count
+
+    def _submit(self, data: bytes) -> "asyncio.Future":
+        """放入凑批队列（调用方已通过准入）"""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_Request(data, future, time.perf_counter()))
+        return future
+
+    async def _batch_loop(self) -> None:
+        """凑批协程"""
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            batch = [first]
+            # 延迟预算从第一张图片提交时算起
+            deadline = first.submitted + self.max_wait
+            while len(batch) < self.batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._slots.acquire()
+            # 等待空闲线程期间到达的图片一并带走
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            task = loop.create_task(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[_Request]) -> None:
+        """在线程池中推理一个批次并完成各请求的Future"""
+        loop = asyncio.get_running_loop()
+        # 客户端已断开的请求不再推理
+        live = [request for request in batch if not request.future.cancelled()]
+        try:
+            outcomes = await loop.run_in_executor(
+                self._executor, self._infer, [request.data for request in live])
+        except Exception as e:
+            logger.error(f"批量推理失败: {e}")
+            outcomes = [e] * len(live)
+        finally:
+            self._slots.release()
+            self.pending -= len(batch)
+
+        self.batches += 1
+        self.images += len(live)
+        finished = time.perf_counter()
+        for request, outcome in zip(live, outcomes):
+            if request.future.done():
+                continue
+            if isinstance(outcome, Exception):
+                request.future.set_exception(outcome)
+                continue
+            elapsed_ms = (finished - request.submitted) * 1000.0
+            for detection in outcome:
+                detection['detection_time_ms'] = elapsed_ms
+            request.future.set_result(outcome)
+
+    def _infer(self, payloads: List[bytes]) -> List[Any]:
+        """
+        工作线程：解码并批量推理
+
+        Returns:
+            与输入顺序一致的检测结果列表；解码失败的图片对应异常对象，不影响同批其他图片
+        """
+        outcomes: List[Any] = [None] * len(payloads)
+        images, indices = [], []
+        for index, data in enumerate(payloads):
+            try:
+                images.append(decode_image(data))
+                indices.append(index)
+            except ValueError as e:
+                outcomes[index] = e
+        if images:
+            detector = self._detectors.get()
+            try:
+                results = detector.detect_batch(images)
+            finally:
+                self._detectors.put(detector)
+            for index, detections in zip(indices, results):
+                outcomes[index] = detections
+        return outcomes
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """处理一个连接（HTTP/1.1 长连接，逐个处理请求）"""
+        self._connections.add(writer)
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HttpError as e:
+                    await self._send_json(writer, e.status, {'error': e.message}, e.headers,
+                                          keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                self.requests += 1
+                try:
+                    await self._dispatch(method, path, body, writer, keep_alive)
+                except HttpError as e:
+                    await self._send_json(writer, e.status, {'error': e.message}, e.headers, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader
+                            ) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        """读取一个请求，连接关闭时返回None"""
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "无效的请求行")
+
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "无效的 Content-Length")
+        if length > self.max_body_bytes:
+            raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                            f"请求体超过 {self.max_body_bytes // 1024 // 1024} MB")
+        path = urlsplit(target).path
+        if method.upper() == 'POST' and self.pending >= self.max_pending:
+            # 已饱和时不读取请求体（图片可能有数MB），直接拒绝并关闭连接
+            self.rejected += 1
+            raise HttpError(HTTPStatus.SERVICE_UNAVAILABLE, "服务繁忙，请稍后重试",
+                            {'Retry-After': '1'})
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), path, headers, body
+
+    async def _dispatch(self, method: str, path: str, body: bytes,
+                        writer: asyncio.StreamWriter, keep_alive: bool) -> None:
+        """按路径分发请求"""
+        routes = {
+            '/detect': ('POST', self._detect),
+            '/detect/stream': ('POST', self._detect_stream),
+            '/health': ('GET', self._health),
+            '/metrics': ('GET', self._metrics),
+        }
+        route = routes.get(path.rstrip('/') or '/')
+        if route is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, f"未知路径: {path}")
+        if method != route[0]:
+            raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, f"{path} 只支持 {route[0]}",
+                            {'Allow': route[0]})
+        await route[1](body, writer, keep_alive)
+
+    async def _detect(self, body: bytes, writer: asyncio.StreamWriter, keep_alive: bool) -> None:
+        """POST /detect：单张图片"""
+        if not body:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "请求体为空，应为图片文件字节")
+        self._admit(1)
+        start = time.perf_counter()
+        try:
+            detections = await self._submit(body)
+        except ValueError as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, str(e))
+        except Exception as e:
+            raise HttpError(HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+        await self._send_json(writer, HTTPStatus.OK, {
+            'detections': detections,
+            'model_version': self.detector.model_version,
+            'elapsed_ms': (time.perf_counter() - start) * 1000.0,
+        }, keep_alive=keep_alive)
+
+    async def _detect_stream(self, body: bytes, writer: asyncio.StreamWriter,
+                             keep_alive: bool) -> None:
+        """POST /detect/stream：多张图片，每张完成后立即输出一行JSON"""
+        try:
+            images = [base64.b64decode(item, validate=True) for item in json.loads(body)['images']]
+        except (ValueError, KeyError, TypeError, binascii.Error):
+            raise HttpError(HTTPStatus.BAD_REQUEST, '请求体应为 {"images": [base64编码的图片, ...]}')
+        if not images:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "images 为空")
+        self._admit(len(images))
+
+        start = time.perf_counter()
+        pending = [self._indexed(index, self._submit(data)) for index, data in enumerate(images)]
+        writer.write(self._head(HTTPStatus.OK, 'application/x-ndjson',
+                                {'Transfer-Encoding': 'chunked'}, keep_alive))
+        failed = 0
+        for next_result in asyncio.as_completed(pending):
+            index, detections, error = await next_result
+            if error is None:
+                line = {'index': index, 'detections': detections}
+            else:
+                failed += 1
+                line = {'index': index, 'error': str(error)}
+            await self._write_chunk(writer, line)
+        await self._write_chunk(writer, {
+            'done': True,
+            'images': len(images),
+            'failed': failed,
+            'model_version': self.detector.model_version,
+            'elapsed_ms': (time.perf_counter() - start) * 1000.0,
+        })
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+    async def _health(self, body: bytes, writer: asyncio.StreamWriter, keep_alive: bool) -> None:
+        """GET /health"""
+        await self._send_json(writer, HTTPStatus.OK, {
+            'status': 'ok',
+            'model_version': self.detector.model_version,
+            'backend': getattr(self.detector, 'backend', None),
+            'pending': self.pending,
+            'max_pending': self.max_pending,
+            'requests': self.requests,
+            'rejected': self.rejected,
+            'batches': self.batches,
+            'images': self.images,
+            'mean_batch_size': self.images / self.batches if self.batches else 0.0,
+            'uptime_s': time.perf_counter() - self._started,
+        }, keep_alive=keep_alive)
+
+    async def _metrics(self, body: bytes, writer: asyncio.StreamWriter, keep_alive: bool) -> None:
+        """GET /metrics"""
+        await self._send(writer, HTTPStatus.OK, metrics.render().encode('utf-8'),
+                         'text/plain; version=0.0.4; charset=utf-8', keep_alive=keep_alive)
+
+    @staticmethod
+    async def _indexed(index: int, future: "asyncio.Future") -> Tuple[int, Any, Optional[Exception]]:
+        """等待一张图片的结果，附带其在请求中的序号"""
+        try:
+            return index, await future, None
+        except Exception as e:
+            return index, None, e
+
+    @staticmethod
+    def _head(status: int, content_type: str, headers: Optional[Dict[str, str]],
+              keep_alive: bool) -> bytes:
+        status = HTTPStatus(status)
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}",
+                 f"Content-Type: {content_type}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    async def _send(self, writer: asyncio.StreamWriter, status: int, body: bytes,
+                    content_type: str, headers: Optional[Dict[str, str]] = None,
+                    keep_alive: bool = True) -> None:
+        headers = dict(headers or {}, **{'Content-Length': str(len(body))})
+        writer.write(self._head(status, content_type, headers, keep_alive) + body)
+        await writer.drain()
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any],
+                         headers: Optional[Dict[str, str]] = None, keep_alive: bool = True) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        await self._send(writer, status, body, 'application/json; charset=utf-8', headers, keep_alive)
+
+    @staticmethod
+    async def _write_chunk(writer: asyncio.StreamWriter, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8') + b'\n'
+        writer.write(f"{len(data):x}\r\n".encode('latin-1') + data + b'\r\n')
+        await writer.drain()
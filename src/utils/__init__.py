@@ -1,17 +1,70 @@
 """
 工具模块
 提供配置管理、日志记录、路径管理等通用功能
+
+模块级对象通过 __getattr__ 从子模块中解析，第一次访问后缓存在包的命名空间里
 """
 
-from .config_loader import ConfigLoader, config
-from .logger import Logger, logger
-from .path_manager import PathManager, path_manager
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .config_loader import ConfigLoader, config
+    from .logger import Logger, logger
+    from .metrics import PipelineMetrics, metrics
+    from .path_manager import PathManager, path_manager
+
+# logger / metrics / path_manager 与所在子模块同名：子模块第一次导入时导入系统会把子模块对象绑定到包上，
+# 遮住同名对象，__getattr__ 也就不会再被调用。这几个子模块都很轻（不导入numpy、logging.handlers），
+# 这里先以私有名导入再删掉导入系统的绑定；子模块已在 sys.modules 中，之后其他地方再导入也不会重新绑定
+from . import (
+    config_loader as _config_loader_module,
+    logger as _logger_module,
+    metrics as _metrics_module,
+    path_manager as _path_manager_module,
+)
+
+del config_loader, logger, metrics, path_manager
+
+_SUBMODULES = {
+    'config_loader': _config_loader_module,
+    'logger': _logger_module,
+    'metrics': _metrics_module,
+    'path_manager': _path_manager_module,
+}
+
+# 名称 -> 所在子模块
+_LAZY_ATTRS = {
+    'ConfigLoader': 'config_loader',
+    'config': 'config_loader',
+    'Logger': 'logger',
+    'logger': 'logger',
+    'PipelineMetrics': 'metrics',
+    'metrics': 'metrics',
+    'PathManager': 'path_manager',
+    'path_manager': 'path_manager',
+}
 
 __all__ = [
     'ConfigLoader',
     'config',
     'Logger', 
     'logger',
+    'PipelineMetrics',
+    'metrics',
     'PathManager',
     'path_manager'
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(_SUBMODULES[module_name], name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
@@ -1,16 +1,116 @@
 """
 配置文件加载器
 用于加载和管理系统配置
+
+每次加载都会生成一个不可变的配置快照（ConfigSnapshot），点分隔键预先展开，
+读取任意字段都是一次字典查找；config.json 在磁盘上变化时按 mtime 自动重新加载，
+原子替换快照并通知订阅者
 """
 
+import copy
+import inspect
 import json
 import os
-from typing import Dict, Any, Optional
+import threading
+import weakref
+from types import MappingProxyType
+from typing import Dict, Any, Callable, List, Mapping, Optional
 from pathlib import Path
 
 
+def _freeze(value: Any) -> Any:
+    """将字典和列表递归转换为只读的 MappingProxyType 和 tuple"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _flatten(value: Any, prefix: str, out: Dict[str, Any]) -> Dict[str, Any]:
+    """把嵌套字典展开为 点分隔键 -> 值 的索引"""
+    for k, v in value.items():
+        key = f"{prefix}.{k}" if prefix else k
+        out[key] = v
+        if isinstance(v, (dict, MappingProxyType)):
+            _flatten(v, key, out)
+    return out
+
+
+class ConfigSnapshot:
+    """
+    不可变的配置快照类
+
+    所有字段在创建时解析完毕，点分隔键通过预先展开的索引以O(1)读取。
+    快照一经创建不再变化，持有快照的线程不会读到重新加载过程中的中间状态。
+    """
+
+    __slots__ = ('version', 'mtime_ns', 'data', '_index')
+
+    def __init__(self, config: Dict[str, Any], version: int = 0, mtime_ns: Optional[int] = None):
+        """
+        创建快照
+
+        Args:
+            config: 配置字典（会被深拷贝为只读结构）
+            version: 快照版本号，每次重新加载加1
+            mtime_ns: 配置文件的修改时间
+        """
+        data = _freeze(config)
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'mtime_ns', mtime_ns)
+        object.__setattr__(self, 'data', data)
+        object.__setattr__(self, '_index', _flatten(data, '', {}))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("配置快照是只读的")
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self._index[key]
+        except KeyError:
+            raise KeyError(f"配置键不存在: {key}") from None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        读取配置项
+
+        Args:
+            key: 点分隔的配置键，如 'model_config.confidence_threshold'
+            default: 不存在时的默认值
+
+        Returns:
+            配置值（字典为只读映射，列表为元组）
+        """
+        return self._index.get(key, default)
+
+    @property
+    def model_config(self) -> MappingProxyType:
+        """模型配置"""
+        return self._index['model_config']
+
+    @property
+    def class_names(self) -> tuple:
+        """类别名称"""
+        return self._index['class_names']
+
+    @property
+    def inference_config(self) -> MappingProxyType:
+        """推理配置"""
+        return self._index.get('inference_config', MappingProxyType({}))
+
+
 class ConfigLoader:
-    """配置文件加载器类"""
+    """
+    配置文件加载器类
+
+    get_config 和各属性从当前快照读取（只读映射，列表为元组）；snapshot 返回当前的不可变快照。
+    配置变化时（load_config、update_config 或文件修改）总是整体替换配置并发布新快照，
+    不会原地修改已发布的数据。调用 watch 后由后台线程检查文件修改时间，变化时重新加载并通知 subscribe 注册的回调。
+    """
     
     def __init__(self, config_path: Optional[str] = None):
         """
@@ -26,6 +126,14 @@ class ConfigLoader:
         
         self.config_path = Path(config_path)
         self._config = None
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._mtime_ns: Optional[int] = None
+        self._failed_mtime_ns: Optional[int] = None
+        self._version = 0
+        self._lock = threading.RLock()
+        self._subscribers: List[Callable[[], Optional[Callable[[ConfigSnapshot], None]]]] = []
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
     
     def load_config(self) -> Dict[str, Any]:
         """
@@ -42,11 +150,37 @@ class ConfigLoader:
             raise FileNotFoundError(f"配置文件不存在: {self.config_path}")
         
         try:
+            mtime_ns = self.config_path.stat().st_mtime_ns
             with open(self.config_path, 'r', encoding='utf-8') as f:
-                self._config = json.load(f)
-            return self._config
+                config = json.load(f)
         except json.JSONDecodeError as e:
-            raise json.JSONDecodeError(f"配置文件格式错误: {e}")
+            raise json.JSONDecodeError(f"配置文件格式错误: {e.msg}", e.doc, e.pos)
+        
+        with self._lock:
+            self._config = config
+            self._mtime_ns = mtime_ns
+            snapshot = self._publish()
+        self._notify(snapshot)
+        return config
+    
+    def _publish(self) -> ConfigSnapshot:
+        """根据当前配置原子替换快照（调用方持有锁）"""
+        self._version += 1
+        self._snapshot = ConfigSnapshot(self._config, self._version, self._mtime_ns)
+        return self._snapshot
+    
+    def snapshot(self) -> ConfigSnapshot:
+        """
+        获取当前配置快照
+        
+        Returns:
+            不可变的配置快照
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.load_config()
+            snapshot = self._snapshot
+        return snapshot
     
     def get_config(self, key: Optional[str] = None) -> Any:
         """
@@ -57,25 +191,13 @@ class ConfigLoader:
                 如果为None，返回整个配置
         
         Returns:
-            配置值
+            配置值（字典为只读映射，列表为元组）；修改配置请使用 update_config
         """
-        if self._config is None:
-            self.load_config()
-        
+        snapshot = self.snapshot()
         if key is None:
-            return self._config
-        
-        # 支持嵌套键访问
-        keys = key.split('.')
-        value = self._config
-        
-        for k in keys:
-            if isinstance(value, dict) and k in value:
-                value = value[k]
-            else:
-                raise KeyError(f"配置键不存在: {key}")
-        
-        return value
+            return snapshot.data
+        # 嵌套键在快照创建时已展开为索引
+        return snapshot[key]
     
     def update_config(self, key: str, value: Any) -> None:
         """
@@ -89,48 +211,174 @@ class ConfigLoader:
             self.load_config()
         
         keys = key.split('.')
-        config = self._config
-        
-        # 导航到目标位置
-        for k in keys[:-1]:
-            if k not in config:
-                config[k] = {}
-            config = config[k]
-        
-        # 设置值
-        config[keys[-1]] = value
+        with self._lock:
+            # 在副本上修改，已发布的配置和快照保持不变
+            updated = copy.deepcopy(self._config)
+            config = updated
+            
+            # 导航到目标位置
+            for k in keys[:-1]:
+                if not isinstance(config.get(k), dict):
+                    config[k] = {}
+                config = config[k]
+            
+            # 设置值
+            config[keys[-1]] = copy.deepcopy(value)
+            
+            self._config = updated
+            snapshot = self._publish()
+        self._notify(snapshot)
     
     def save_config(self) -> None:
         """保存配置到文件"""
-        if self._config is None:
+        config = self._config
+        if config is None:
             return
         
         # 确保目录存在
         self.config_path.parent.mkdir(parents=True, exist_ok=True)
         
         with open(self.config_path, 'w', encoding='utf-8') as f:
-            json.dump(self._config, f, ensure_ascii=False, indent=2)
+            json.dump(config, f, ensure_ascii=False, indent=2)
+        
+        # 自己写入的文件不再触发重新加载
+        with self._lock:
+            self._mtime_ns = self.config_path.stat().st_mtime_ns
+    
+    def reload_if_changed(self) -> bool:
+        """
+        配置文件修改时间变化时重新加载
+        
+        文件正在被编辑器写入、暂时无法解析时保留旧配置，文件再次修改后重试。
+        
+        Returns:
+            是否重新加载
+        """
+        try:
+            mtime_ns = self.config_path.stat().st_mtime_ns
+        except OSError:
+            return False
+        if mtime_ns == self._mtime_ns or mtime_ns == self._failed_mtime_ns:
+            return False
+        
+        try:
+            with open(self.config_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except (OSError, ValueError) as e:
+            # 同一版本的文件只报告一次，文件再次修改后重试
+            self._failed_mtime_ns = mtime_ns
+            from .logger import logger
+            logger.warning(f"配置文件重新加载失败，继续使用旧配置: {e}")
+            return False
+        
+        with self._lock:
+            self._config = config
+            self._mtime_ns = mtime_ns
+            snapshot = self._publish()
+        
+        from .logger import logger
+        logger.info(f"配置文件已重新加载 (版本 {snapshot.version})")
+        self._notify(snapshot)
+        return True
+    
+    def subscribe(self, callback: Callable[[ConfigSnapshot], None]) -> Callable[[], None]:
+        """
+        注册配置变化回调
+        
+        绑定方法以弱引用保存，订阅对象被回收后自动失效。
+        
+        Args:
+            callback: 接收新快照的回调函数
+            
+        Returns:
+            取消订阅的函数
+        """
+        if inspect.ismethod(callback):
+            ref = weakref.WeakMethod(callback)
+        else:
+            ref = lambda: callback  # noqa: E731
+        with self._lock:
+            self._subscribers.append(ref)
+        
+        def unsubscribe() -> None:
+            with self._lock:
+                if ref in self._subscribers:
+                    self._subscribers.remove(ref)
+        return unsubscribe
+    
+    def _notify(self, snapshot: ConfigSnapshot) -> None:
+        """在锁外依次调用订阅者，单个回调出错不影响其他订阅者"""
+        with self._lock:
+            self._subscribers = [ref for ref in self._subscribers if ref() is not None]
+            callbacks = [ref() for ref in self._subscribers]
+        for callback in callbacks:
+            if callback is None:
+                continue
+            try:
+                callback(snapshot)
+            except Exception as e:
+                from .logger import logger
+                logger.error(f"配置变更回调执行失败: {e}")
+    
+    def watch(self, interval: float = 1.0) -> None:
+        """
+        启动后台线程，按间隔检查配置文件是否变化（重复调用只启动一个线程）
+        
+        Args:
+            interval: 检查间隔（秒）
+        """
+        with self._lock:
+            if self._watcher is not None and self._watcher.is_alive():
+                return
+            if self._config is None:
+                self.load_config()
+            self._stop_watching.clear()
+            self._watcher = threading.Thread(
+                target=self._watch_loop, args=(interval,), name="config-watcher", daemon=True
+            )
+            self._watcher.start()
+    
+    def stop_watching(self) -> None:
+        """停止后台检查线程"""
+        self._stop_watching.set()
+        watcher = self._watcher
+        if watcher is not None:
+            watcher.join()
+        self._watcher = None
+    
+    def _watch_loop(self, interval: float) -> None:
+        while not self._stop_watching.wait(interval):
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                from .logger import logger
+                logger.error(f"配置文件检查失败: {e}")
     
     @property
-    def model_config(self) -> Dict[str, Any]:
+    def model_config(self) -> Mapping[str, Any]:
         """获取模型配置"""
         return self.get_config('model_config')
     
     @property
-    def class_names(self) -> list:
-        """获取类别名称列表"""
+    def class_names(self) -> tuple:
+        """获取类别名称"""
         return self.get_config('class_names')
     
     @property
-    def training_config(self) -> Dict[str, Any]:
+    def training_config(self) -> Mapping[str, Any]:
         """获取训练配置"""
         return self.get_config('training_config')
     
     @property
-    def data_augmentation_config(self) -> Dict[str, Any]:
+    def data_augmentation_config(self) -> Mapping[str, Any]:
         """获取数据增强配置"""
         return self.get_config('data_augmentation')
 
+    @property
+    def inference_config(self) -> Mapping[str, Any]:
+        """获取推理配置"""
+        return self.get_config('inference_config')
+
 
 # 全局配置实例
 config = ConfigLoader()
\ No newline at end of file
@@ -1,94 +1,245 @@
 """
 日志配置模块
 提供统一的日志记录功能
+
+默认使用队列模式：调用方线程只把日志记录放入队列，格式化和文件写入由监听线程完成；
+日志文件每天零点轮转并按天数保留，可选 JSON Lines 格式，同一调用位置的重复日志按时间窗口限流
 """
 
+import atexit
+import json
 import logging
-import os
+import queue
+import re
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
+
+# logging_config 缺省值
+DEFAULT_LOGGING_CONFIG = {
+    'queue': True,
+    'json': False,
+    'when': 'midnight',
+    'backup_count': 14,
+    'rate_limit_messages': 20,
+    'rate_limit_period_s': 60.0,
+}
+
+# 轮转后的文件名后缀，如 hardware_recognition.log.20240101
+ROTATION_SUFFIX = '%Y%m%d'
+ROTATION_SUFFIX_PATTERN = re.compile(r'^\d{8}$', re.ASCII)
+
+
+class JsonFormatter(logging.Formatter):
+    """将日志记录格式化为单行JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'thread': record.threadName,
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            data.update(fields)
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    按调用位置限流
+
+    同一位置（文件+行号）在一个时间窗口内最多输出 max_messages 条，
+    超出的记录被丢弃，窗口结束后的第一条记录附带被抑制的条数。
+    """
+
+    def __init__(self, max_messages: int, period: float):
+        super().__init__()
+        self.max_messages = max_messages
+        self.period = period
+        self._windows: Dict[Tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.max_messages <= 0:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            # [窗口开始时间, 窗口内已输出条数, 被抑制条数]
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.period:
+                suppressed = window[2] if window is not None else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f"{record.msg} (已抑制 {suppressed} 条重复日志)"
+                return True
+            if window[1] < self.max_messages:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
 
 
 class Logger:
     """日志管理器类"""
-    
-    def __init__(self, name: str = "hardware_recognition", log_dir: Optional[str] = None):
+
+    def __init__(self, name: str = "hardware_recognition", log_dir: Optional[str] = None,
+                 options: Optional[Dict[str, Any]] = None):
         """
         初始化日志管理器
-        
+
         Args:
             name: 日志器名称
             log_dir: 日志目录，默认为项目根目录下的logs文件夹
+            options: 日志选项，默认读取 config.json 的 logging_config
         """
         self.name = name
-        
+
         if log_dir is None:
             # 获取项目根目录
             project_root = Path(__file__).parent.parent.parent
             log_dir = project_root / "logs"
-        
+
         self.log_dir = Path(log_dir)
-        self.log_dir.mkdir(exist_ok=True)
-        
-        # 创建日志器
+        self.options = options
+
+        # 创建日志器；日志目录和文件处理器在第一次记录日志时才创建，
+        # 只导入模块的短命令不会产生任何文件操作
         self.logger = logging.getLogger(name)
         self.logger.setLevel(logging.DEBUG)
-        
-        # 避免重复添加处理器
-        if not self.logger.handlers:
-            self._setup_handlers()
-    
+        self._handlers_ready = bool(self.logger.handlers)
+        self._lock = threading.Lock()
+        self._listener: "Optional[logging.handlers.QueueListener]" = None
+
+    def _ensure_handlers(self):
+        """首次记录日志时设置处理器"""
+        if self._handlers_ready:
+            return
+        with self._lock:
+            if not self._handlers_ready:
+                # 避免重复添加处理器
+                if not self.logger.handlers:
+                    self.log_dir.mkdir(exist_ok=True)
+                    self._setup_handlers()
+                self._handlers_ready = True
+
+    def _load_options(self) -> Dict[str, Any]:
+        """合并缺省值与 logging_config"""
+        options = dict(DEFAULT_LOGGING_CONFIG)
+        if self.options is not None:
+            options.update(self.options)
+            return options
+        try:
+            from .config_loader import config
+            options.update(config.get_config().get('logging_config', {}))
+        except (OSError, ValueError, KeyError):
+            pass
+        return options
+
     def _setup_handlers(self):
         """设置日志处理器"""
+        # logging.handlers 的导入开销是 logging 本身的数倍，只在真正记录日志时导入
+        import logging.handlers
+
+        options = self._load_options()
+
         # 创建格式器
-        formatter = logging.Formatter(
+        text_formatter = logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
         )
-        
+        file_formatter = JsonFormatter() if options['json'] else text_formatter
+
         # 控制台处理器
         console_handler = logging.StreamHandler()
         console_handler.setLevel(logging.INFO)
-        console_handler.setFormatter(formatter)
-        self.logger.addHandler(console_handler)
-        
-        # 文件处理器 - 所有日志
-        today = datetime.now().strftime('%Y%m%d')
-        log_file = self.log_dir / f"{self.name}_{today}.log"
-        
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        console_handler.setFormatter(text_formatter)
+
+        # 文件处理器 - 所有日志，按时间轮转
+        file_handler = self._rotating_handler(self.log_dir / f"{self.name}.log", options)
         file_handler.setLevel(logging.DEBUG)
-        file_handler.setFormatter(formatter)
-        self.logger.addHandler(file_handler)
-        
+        file_handler.setFormatter(file_formatter)
+
         # 错误日志文件处理器
-        error_log_file = self.log_dir / f"{self.name}_error_{today}.log"
-        error_handler = logging.FileHandler(error_log_file, encoding='utf-8')
+        error_handler = self._rotating_handler(self.log_dir / f"{self.name}_error.log", options)
         error_handler.setLevel(logging.ERROR)
-        error_handler.setFormatter(formatter)
-        self.logger.addHandler(error_handler)
-    
-    def debug(self, message: str):
+        error_handler.setFormatter(file_formatter)
+
+        handlers = [console_handler, file_handler, error_handler]
+        if options['queue']:
+            # 调用方线程只入队，处理器在监听线程中执行
+            log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+            self.logger.addHandler(logging.handlers.QueueHandler(log_queue))
+            self._listener = logging.handlers.QueueListener(
+                log_queue, *handlers, respect_handler_level=True
+            )
+            self._listener.start()
+            atexit.register(self.shutdown)
+        else:
+            for handler in handlers:
+                self.logger.addHandler(handler)
+
+        # 限流在调用方线程执行，被丢弃的记录不会进入队列
+        self.logger.addFilter(RateLimitFilter(
+            int(options['rate_limit_messages']), float(options['rate_limit_period_s'])
+        ))
+
+    @staticmethod
+    def _rotating_handler(log_file: Path, options: Dict[str, Any]) -> logging.Handler:
+        """创建按时间轮转、保留 backup_count 份的文件处理器"""
+        import logging.handlers
+
+        handler = logging.handlers.TimedRotatingFileHandler(
+            log_file, when=options['when'], backupCount=int(options['backup_count']),
+            encoding='utf-8', delay=True,
+        )
+        handler.suffix = ROTATION_SUFFIX
+        handler.extMatch = ROTATION_SUFFIX_PATTERN
+        return handler
+
+    def shutdown(self):
+        """停止监听线程，写出队列中剩余的日志"""
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.stop()
+            atexit.unregister(self.shutdown)
+            for handler in listener.handlers:
+                handler.close()
+
+    def _log(self, level: int, message: str, fields: Dict[str, Any]):
+        self._ensure_handlers()
+        # stacklevel=3 使记录中的文件和行号指向调用方，而不是本模块
+        self.logger.log(level, message, stacklevel=3, extra={'fields': fields} if fields else None)
+
+    def debug(self, message: str, **fields: Any):
         """记录调试信息"""
-        self.logger.debug(message)
-    
-    def info(self, message: str):
+        self._log(logging.DEBUG, message, fields)
+
+    def info(self, message: str, **fields: Any):
         """记录一般信息"""
-        self.logger.info(message)
-    
-    def warning(self, message: str):
+        self._log(logging.INFO, message, fields)
+
+    def warning(self, message: str, **fields: Any):
         """记录警告信息"""
-        self.logger.warning(message)
-    
-    def error(self, message: str):
+        self._log(logging.WARNING, message, fields)
+
+    def error(self, message: str, **fields: Any):
         """记录错误信息"""
-        self.logger.error(message)
-    
-    def critical(self, message: str):
+        self._log(logging.ERROR, message, fields)
+
+    def critical(self, message: str, **fields: Any):
         """记录严重错误信息"""
-        self.logger.critical(message)
+        self._log(logging.CRITICAL, message, fields)
 
 
 # 全局日志实例
-logger = Logger()
\ No newline at end of file
+logger = Logger()
@@ -0,0 +1,266 @@
+"""
+流水线阶段耗时统计
+按阶段（读取、解码、变化检测、预处理、前向推理、NMS、结果写入）记录单调时钟耗时，
+累积到固定分桶的直方图中，并定期以 Prometheus 文本格式导出到 logs/ 目录
+
+未启用时 stage() 返回共享的空上下文，热路径上只多一次属性判断
+"""
+
+import atexit
+import bisect
+import contextlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from .config_loader import ConfigLoader, config as default_config
+from .path_manager import path_manager
+
+# 流水线阶段；detection 为单张图片从提交到得到结果的总耗时，与 detection_time_ms 一致
+STAGES = ('read', 'decode', 'motion', 'preprocess', 'forward', 'nms', 'write', 'detection')
+
+# 分桶上限（秒），覆盖从亚毫秒级的NMS到秒级的大批次前向推理
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_NAME = 'hardware_recognition_stage_duration_seconds'
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class StageHistogram:
+    """固定分桶的耗时直方图"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # 最后一个桶对应 +Inf
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        """记录一次耗时（秒）"""
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        获取直方图的一致快照
+
+        Returns:
+            包含 count、sum 和累积分桶计数 buckets 的字典
+        """
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        cumulative: List[int] = []
+        running = 0
+        for value in counts:
+            running += value
+            cumulative.append(running)
+        return {'count': count, 'sum': total, 'buckets': cumulative}
+
+
+class _StageTimer:
+    """一次阶段计时，退出时把耗时记入直方图"""
+
+    __slots__ = ('_histogram', '_start')
+
+    def __init__(self, histogram: StageHistogram):
+        self._histogram = histogram
+
+    def __enter__(self) -> "_StageTimer":
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._histogram.observe((time.perf_counter_ns() - self._start) / 1e9)
+
+
+class PipelineMetrics:
+    """
+    流水线阶段耗时统计类
+
+    用法:
+        with metrics.stage('forward'):
+            output = model(batch)
+
+    在其他进程中测得的耗时（如解码进程）可通过 observe 直接记入。
+    首次记录时启动后台导出线程，进程退出时再导出一次。
+    """
+
+    def __init__(self, config_loader: Optional[ConfigLoader] = None,
+                 enabled: Optional[bool] = None,
+                 export_file: Optional[Union[str, Path]] = None,
+                 export_interval: Optional[float] = None):
+        """
+        初始化
+
+        Args:
+            config_loader: 配置加载器，默认使用全局配置
+            enabled: 是否启用，默认读取 metrics_config.enabled
+            export_file: 导出文件，默认为 logs/<metrics_config.export_file>
+            export_interval: 导出间隔（秒），0表示只在进程退出时导出
+        """
+        self.config = config_loader or default_config
+        metrics_config = self.config.get_config().get('metrics_config', {})
+
+        self.enabled = bool(metrics_config.get('enabled', False) if enabled is None else enabled)
+        self.export_file = Path(export_file or path_manager.get_log_file(
+            metrics_config.get('export_file', 'metrics.prom')))
+        if export_interval is None:
+            export_interval = metrics_config.get('export_interval_s', 10.0)
+        self.export_interval = float(export_interval)
+
+        self.histograms: Dict[str, StageHistogram] = {name: StageHistogram() for name in STAGES}
+        self._exporter: Optional[threading.Thread] = None
+        self._exporter_lock = threading.Lock()
+        self._stop = threading.Event()
+
+        # 构造时显式传入 enabled 的实例不随配置变化
+        if enabled is None:
+            self.config.subscribe(self._on_config_change)
+
+    def _on_config_change(self, snapshot) -> None:
+        """config.json 重新加载后更新启用状态"""
+        self.enabled = bool(snapshot.get('metrics_config', {}).get('enabled', False))
+
+    def stage(self, name: str):
+        """
+        为一个阶段计时的上下文管理器
+
+        Args:
+            name: 阶段名称，见 STAGES
+
+        Returns:
+            上下文管理器；未启用时为共享的空上下文
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        if self._exporter is None:
+            self._start_exporter()
+        return _StageTimer(self.histograms[name])
+
+    def observe(self, name: str, seconds: float) -> None:
+        """
+        直接记录一次阶段耗时
+
+        Args:
+            name: 阶段名称，见 STAGES
+            seconds: 耗时（秒）
+        """
+        if not self.enabled:
+            return
+        if self._exporter is None:
+            self._start_exporter()
+        self.histograms[name].observe(seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各阶段直方图的快照
+
+        Returns:
+            {阶段名: {'count', 'sum', 'buckets'}}
+        """
+        return {name: histogram.snapshot() for name, histogram in self.histograms.items()}
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        各阶段的调用次数、总耗时和平均耗时（毫秒），只包含有记录的阶段
+
+        Returns:
+            {阶段名: {'count', 'total_ms', 'mean_ms'}}
+        """
+        result = {}
+        for name, data in self.snapshot().items():
+            if data['count']:
+                result[name] = {
+                    'count': data['count'],
+                    'total_ms': data['sum'] * 1000.0,
+                    'mean_ms': data['sum'] * 1000.0 / data['count'],
+                }
+        return result
+
+    def render(self) -> str:
+        """
+        生成 Prometheus 文本格式的直方图
+
+        Returns:
+            文本内容
+        """
+        lines = [
+            f"# HELP {METRIC_NAME} 流水线各阶段耗时（秒）",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        bounds = [f"{bound:g}" for bound in LATENCY_BUCKETS] + ['+Inf']
+        for name, data in self.snapshot().items():
+            for bound, count in zip(bounds, data['buckets']):
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{name}"}} {data["sum"]:.6f}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{name}"}} {data["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, export_file: Optional[Union[str, Path]] = None) -> Path:
+        """
+        导出到文本文件（先写临时文件再原子替换，采集程序不会读到写了一半的文件）
+
+        Args:
+            export_file: 导出文件，默认为初始化时的 export_file
+
+        Returns:
+            导出文件路径
+        """
+        export_file = Path(export_file or self.export_file)
+        path_manager.ensure_dir_exists(export_file.parent)
+        tmp = export_file.with_name(export_file.name + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp, export_file)
+        return export_file
+
+    def _start_exporter(self) -> None:
+        """首次记录时启动后台导出线程"""
+        with self._exporter_lock:
+            if self._exporter is not None:
+                return
+            self._exporter = threading.Thread(target=self._export_loop, name="metrics-exporter",
+                                              daemon=True)
+            self._exporter.start()
+            atexit.register(self.close)
+
+    def _export_loop(self) -> None:
+        """后台线程：定期导出"""
+        if self.export_interval <= 0:
+            return
+        while not self._stop.wait(self.export_interval):
+            try:
+                self.export()
+            except OSError as e:
+                from .logger import logger
+                logger.warning(f"阶段耗时指标导出失败: {e}")
+
+    def close(self) -> None:
+        """停止导出线程并做最后一次导出"""
+        with self._exporter_lock:
+            exporter, self._exporter = self._exporter, None
+        if exporter is None:
+            return
+        self._stop.set()
+        exporter.join()
+        self._stop.clear()
+        atexit.unregister(self.close)
+        try:
+            self.export()
+        except OSError as e:
+            from .logger import logger
+            logger.warning(f"阶段耗时指标导出失败: {e}")
+
+
+# 全局统计实例
+metrics = PipelineMetrics()
@@ -71,6 +71,46 @@ class PathManager:
         """获取训练历史文件路径"""
         return self.results_dir / "training_history.json"
     
+    def get_training_history_dir(self) -> Path:
+        """获取按会话分文件的训练历史目录"""
+        return self.results_dir / "training_history"
+    
+    def get_split_dir(self, split: str) -> Path:
+        """
+        获取数据集划分目录
+        
+        Args:
+            split: 数据集划分名称，train / val / test
+            
+        Returns:
+            划分目录路径
+        """
+        return self.datasets_dir / split
+    
+    def get_dataset_manifest_file(self, split: str) -> Path:
+        """
+        获取数据集清单文件路径
+        
+        Args:
+            split: 数据集划分名称，train / val / test
+            
+        Returns:
+            清单文件路径
+        """
+        return self.datasets_dir / f"{split}_manifest.json"
+    
+    def get_shard_dir(self, split: str) -> Path:
+        """
+        获取数据集分片目录
+        
+        Args:
+            split: 数据集划分名称，train / val / test
+            
+        Returns:
+            分片目录路径
+        """
+        return self.datasets_dir / "shards" / split
+    
     def get_model_file(self, model_name: str) -> Path:
         """
         获取模型文件路径
@@ -0,0 +1,89 @@
+"""
+测试公共夹具
+
+推理相关的测试不依赖 ultralytics/onnxruntime：检测器注入一个离线的桩模型，
+把输入中的亮色方块当作零件检出
+"""
+
+import shutil
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from src.utils.config_loader import ConfigLoader
+from src.utils.metrics import metrics
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# 桩模型每张图片输出的候选框数
+STUB_ANCHORS = 64
+
+
+class BrightSpotModel:
+    """
+    桩模型：输入为 (N, 3, H, W) 的预处理批次，亮度高于阈值的连通区域输出为类别0的检测框，
+    输出格式与 YOLOv8 原始输出相同 (N, 4 + 类别数, 候选框数)
+    """
+
+    def __init__(self, num_classes: int, threshold: float = 0.8):
+        self.num_classes = num_classes
+        self.threshold = threshold
+        self.calls = []
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        self.calls.append(batch.shape)
+        output = np.zeros((batch.shape[0], 4 + self.num_classes, STUB_ANCHORS), dtype=np.float32)
+        for index, image in enumerate(batch):
+            mask = (image.min(axis=0) > self.threshold).astype(np.uint8)
+            count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+            for anchor, (x, y, w, h, _) in enumerate(stats[1:count][:STUB_ANCHORS]):
+                output[index, :4, anchor] = (x + w / 2, y + h / 2, w, h)
+                output[index, 4, anchor] = 0.9
+        return output
+
+
+@pytest.fixture(autouse=True)
+def isolated_metrics(tmp_path, monkeypatch):
+    """全局阶段耗时统计在测试中不启用，即使被启用也只导出到临时目录"""
+    monkeypatch.setattr(metrics, 'enabled', False)
+    monkeypatch.setattr(metrics, 'export_file', tmp_path / "metrics.prom")
+
+
+@pytest.fixture
+def config_loader(tmp_path):
+    """基于项目 config.json 副本的配置加载器，测试中修改配置不影响项目文件"""
+    config_file = tmp_path / "config.json"
+    shutil.copy(PROJECT_ROOT / "data" / "config" / "config.json", config_file)
+    loader = ConfigLoader(str(config_file))
+    loader.load_config()
+    return loader
+
+
+@pytest.fixture
+def stub_detector(config_loader, tmp_path):
+    """注入桩模型的 HardwareDetector"""
+    from src.models.detector import HardwareDetector
+
+    detector = HardwareDetector(config_loader, model_path=tmp_path / "stub.pt", batch_size=8)
+    detector._model = BrightSpotModel(len(detector.class_names))
+    return detector
+
+
+def draw_parts(image: np.ndarray, boxes) -> np.ndarray:
+    """在图片上画白色实心方块作为零件，boxes 为 [x0, y0, x1, y1]（不含右下边界）"""
+    for x0, y0, x1, y1 in boxes:
+        image[y0:y1, x0:x1] = 255
+    return image
+
+
+def assert_same_boxes(detections, expected, atol):
+    """检测结果的框与期望的 [x0, y0, x1, y1] 集合一致（与顺序无关）"""
+    found = np.array([[d['bbox_x'], d['bbox_y'], d['bbox_x'] + d['bbox_width'],
+                       d['bbox_y'] + d['bbox_height']] for d in detections]).reshape(-1, 4)
+    expected = np.array(expected, dtype=np.float64).reshape(-1, 4)
+    found = found[np.lexsort((found[:, 1], found[:, 0]))]
+    expected = expected[np.lexsort((expected[:, 1], expected[:, 0]))]
+    assert found.shape == expected.shape
+    np.testing.assert_allclose(found, expected, atol=atol)
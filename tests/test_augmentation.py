@@ -0,0 +1,114 @@
+"""
+批量数据增强测试
+"""
+
+import numpy as np
+import pytest
+
+from src.data.augmentation import AugmentationPool, BatchAugmenter, batch_rng, transform_boxes
+
+from .conftest import draw_parts
+
+OUTPUT_SIZE = (192, 256)
+
+
+def make_batch():
+    """两张尺寸不同的黑色图片，各有一个白色方块及其归一化标注"""
+    wide = draw_parts(np.zeros((200, 300, 3), dtype=np.uint8), [(60, 50, 140, 110)])
+    tall = draw_parts(np.zeros((240, 160, 3), dtype=np.uint8), [(40, 120, 100, 200)])
+    labels = np.array([
+        [0, 1, 100 / 300, 80 / 200, 80 / 300, 60 / 200],
+        [1, 2, 70 / 160, 160 / 240, 60 / 160, 80 / 240],
+    ], dtype=np.float32)
+    return [wide, tall], labels
+
+
+def fixed_params(angle, zoom, flip):
+    """两张图片使用相同的增强参数，亮度不变"""
+    return {
+        'angle': np.full(2, angle, dtype=np.float64),
+        'zoom': np.full(2, zoom, dtype=np.float64),
+        'brightness': np.ones(2),
+        'flip': np.full(2, flip),
+    }
+
+
+def white_box(image):
+    """白色像素的外接框 [x1, y1, x2, y2]（连续坐标）"""
+    ys, xs = np.nonzero(image[..., 0] > 127)
+    return np.array([xs.min(), ys.min(), xs.max() + 1, ys.max() + 1], dtype=np.float64)
+
+
+def label_box(label):
+    """归一化标注行转换为输出图上的 [x1, y1, x2, y2]"""
+    height, width = OUTPUT_SIZE
+    cx, cy, w, h = label[2] * width, label[3] * height, label[4] * width, label[5] * height
+    return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+
+
+@pytest.mark.parametrize('angle, zoom, flip', [
+    (0.0, 1.0, False),
+    (0.0, 1.0, True),
+    (0.0, 0.7, False),
+    (0.0, 1.3, True),
+    (30.0, 1.0, False),
+    (-20.0, 0.8, True),
+])
+def test_boxes_follow_pixels(config_loader, monkeypatch, angle, zoom, flip):
+    """翻转、缩放、旋转后，标注框与白色方块像素的外接框一致"""
+    augmenter = BatchAugmenter(config_loader, input_size=OUTPUT_SIZE)
+    monkeypatch.setattr(augmenter, 'sample', lambda count, rng: fixed_params(angle, zoom, flip))
+    images, labels = make_batch()
+
+    out, boxes = augmenter(images, labels, batch_rng(0, 0, 0))
+
+    assert out.shape == (2, *OUTPUT_SIZE, 3)
+    np.testing.assert_array_equal(boxes[:, :2], labels[:, :2])
+    for index in range(2):
+        np.testing.assert_allclose(label_box(boxes[index]), white_box(out[index]), atol=1.5)
+
+
+def test_boxes_moved_out_of_frame_are_dropped():
+    """移出画面的框被丢弃，部分可见的框裁剪到画面内"""
+    labels = np.array([
+        [0, 0, 0.5, 0.5, 0.2, 0.2],
+        [0, 1, 0.95, 0.5, 0.2, 0.2],
+    ], dtype=np.float32)
+    shapes = np.array([[100, 100]])
+    # 向右平移50像素：第一个框部分移出画面，第二个框完全移出
+    matrices = np.eye(3)[None].copy()
+    matrices[0, 0, 2] = 50.0
+
+    boxes = transform_boxes(labels, shapes, matrices, (100, 100))
+
+    np.testing.assert_allclose(boxes, [[0, 0, 0.95, 0.5, 0.1, 0.2]], atol=1e-6)
+
+
+def test_fixed_seed_is_reproducible(config_loader):
+    """相同的 (seed, epoch, batch_index) 得到相同的图片和标注，不同批次序号得到不同结果"""
+    augmenter = BatchAugmenter(config_loader, input_size=OUTPUT_SIZE)
+    images, labels = make_batch()
+
+    first_images, first_boxes = augmenter(images, labels, batch_rng(42, 3, 5))
+    second_images, second_boxes = augmenter(images, labels, batch_rng(42, 3, 5))
+    other_images, _ = augmenter(images, labels, batch_rng(42, 3, 6))
+
+    np.testing.assert_array_equal(first_images, second_images)
+    np.testing.assert_array_equal(first_boxes, second_boxes)
+    assert not np.array_equal(first_images, other_images)
+
+
+def test_pool_results_do_not_depend_on_worker_count(config_loader):
+    """多进程增强池的结果与单进程一致"""
+    augmenter = BatchAugmenter(config_loader, input_size=OUTPUT_SIZE)
+    batches = [make_batch() for _ in range(4)]
+
+    with AugmentationPool(augmenter, workers=0, seed=7) as pool:
+        serial = list(pool.map(batches, epoch=2))
+    with AugmentationPool(augmenter, workers=2, seed=7) as pool:
+        parallel = list(pool.map(batches, epoch=2))
+
+    assert len(parallel) == len(batches)
+    for (serial_images, serial_boxes), (parallel_images, parallel_boxes) in zip(serial, parallel):
+        np.testing.assert_array_equal(serial_images, parallel_images)
+        np.testing.assert_array_equal(serial_boxes, parallel_boxes)
@@ -0,0 +1,89 @@
+"""
+推理后端选择测试：后端与模型文件的对应关系，以及按文件类型创建后端
+不依赖 torch/onnxruntime：ONNX 后端替换为记录参数的桩类
+"""
+
+from pathlib import Path
+
+import pytest
+
+import src.models.backends as backends
+from src.models.backends import backend_for_path, backend_model_path, load_backend
+from src.models.model_registry import ModelRegistry
+from src.utils.path_manager import path_manager
+
+
+class StubOnnxBackend:
+    """记录构造参数的 ONNX 后端桩"""
+
+    def __init__(self, model_path, num_threads=0):
+        self.model_path = Path(model_path)
+        self.num_threads = num_threads
+        self.name = backend_for_path(model_path)
+
+    def __call__(self, batch):
+        return batch
+
+
+@pytest.fixture
+def stub_onnx(monkeypatch):
+    monkeypatch.setattr(backends, 'OnnxBackend', StubOnnxBackend)
+
+
+@pytest.mark.parametrize('backend, expected', [
+    ('torch', 'yolov8n.pt'),
+    ('onnx', 'yolov8n.onnx'),
+    ('onnx_int8', 'yolov8n_int8.onnx'),
+])
+def test_backend_model_path_round_trip(tmp_path, backend, expected):
+    """每个后端对应权重目录下的固定文件名，从文件名可以反推后端"""
+    path = backend_model_path(tmp_path / "yolov8n.pt", backend)
+    assert path == tmp_path / expected
+    assert backend_for_path(path) == backend
+
+
+def test_unknown_backend_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        backend_model_path(tmp_path / "yolov8n.pt", 'tensorrt')
+
+
+def test_load_backend_selects_onnx_by_file(tmp_path, stub_onnx):
+    """.onnx 文件由 ONNX 后端加载，_int8 后缀识别为量化模型；文件不存在时提示先导出"""
+    for name, expected in (("yolov8n.onnx", 'onnx'), ("yolov8n_int8.onnx", 'onnx_int8')):
+        (tmp_path / name).write_bytes(b"onnx")
+        backend = load_backend(tmp_path / name, num_threads=3)
+        assert isinstance(backend, StubOnnxBackend)
+        assert backend.name == expected and backend.num_threads == 3
+
+    with pytest.raises(FileNotFoundError, match="export"):
+        load_backend(tmp_path / "missing.onnx")
+
+
+def test_detector_model_path_follows_backend(config_loader, tmp_path):
+    """未指定模型路径时按 inference_config.backend 选择模型文件，参数优先于配置"""
+    from src.models.detector import HardwareDetector
+
+    registry = ModelRegistry(config_loader, models_dir=tmp_path)
+    weights = path_manager.get_model_file(config_loader.model_config['model_name'])
+
+    config_loader.update_config('inference_config.backend', 'onnx_int8')
+    detector = HardwareDetector(config_loader, registry=registry)
+    assert detector.backend == 'onnx_int8'
+    assert detector.model_path == backend_model_path(weights, 'onnx_int8')
+
+    detector = HardwareDetector(config_loader, registry=registry, backend='onnx')
+    assert detector.model_path == backend_model_path(weights, 'onnx')
+
+
+def test_registry_loads_selected_backend(config_loader, tmp_path, stub_onnx):
+    """注册表按文件类型创建后端，预热批次交给所选后端"""
+    onnx_file = tmp_path / "yolov8n_int8.onnx"
+    onnx_file.write_bytes(b"int8 graph")
+    config_loader.update_config('inference_config.num_threads', 2)
+    registry = ModelRegistry(config_loader, models_dir=tmp_path, warmup_iterations=1)
+
+    entry = registry.get("yolov8n_int8.onnx", input_size=(32, 32))
+
+    assert isinstance(entry.model, StubOnnxBackend)
+    assert entry.model.name == 'onnx_int8' and entry.model.num_threads == 2
+    assert entry.version.startswith("yolov8n_int8-")
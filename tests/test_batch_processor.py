@@ -0,0 +1,68 @@
+"""
+批量处理流水线测试（桩模型）
+"""
+
+import csv
+import multiprocessing
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from src.models import batch_processor
+from src.models.batch_processor import BatchProcessor
+
+from .conftest import draw_parts
+
+pytestmark = pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                                reason="解码进程需要继承测试中替换的解码函数")
+
+
+def faulty_decode(decode):
+    """内容以 RAISE 开头的文件解码时抛出异常，以 KILL 开头的文件使解码进程退出"""
+    def wrapper(data, target_size=None):
+        if data.startswith(b'RAISE'):
+            raise MemoryError("decode failed")
+        if data.startswith(b'KILL'):
+            os._exit(1)
+        return decode(data, target_size)
+    return wrapper
+
+
+@pytest.fixture
+def processor(stub_detector, config_loader, tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_processor, 'decode_image', faulty_decode(batch_processor.decode_image))
+    config_loader.update_config('cache_config.enabled', False)
+    return BatchProcessor(stub_detector, config_loader, output_file=tmp_path / "results.csv",
+                          decode_workers=2, queue_size=4)
+
+
+def write_images(directory, count):
+    directory.mkdir()
+    for index in range(count):
+        image = draw_parts(np.zeros((240, 320, 3), dtype=np.uint8), [(20 + index, 30, 60 + index, 70)])
+        cv2.imwrite(str(directory / f"{index:03d}.jpg"), image)
+
+
+def test_per_image_decode_errors_are_counted(processor, tmp_path):
+    """单张图片的解码异常计为失败，其余图片照常处理"""
+    write_images(tmp_path / "images", 10)
+    (tmp_path / "images" / "bad.jpg").write_bytes(b"RAISE")
+    (tmp_path / "images" / "broken.jpg").write_bytes(b"not an image")
+
+    stats = processor.run(tmp_path / "images")
+
+    assert stats['images'] == 10
+    assert stats['failed'] == 2
+    with open(tmp_path / "results.csv", newline='', encoding='utf-8') as f:
+        assert len(list(csv.reader(f))) == 11
+
+
+def test_broken_process_pool_raises_from_run(processor, tmp_path):
+    """解码进程意外退出时 run 抛出异常，而不是把剩余图片当作处理完毕"""
+    write_images(tmp_path / "images", 10)
+    (tmp_path / "images" / "005_kill.jpg").write_bytes(b"KILL")
+
+    with pytest.raises(RuntimeError, match="批量处理中止"):
+        processor.run(tmp_path / "images")
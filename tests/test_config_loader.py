@@ -0,0 +1,129 @@
+"""
+配置加载器测试：不可变快照、按修改时间重新加载与订阅通知
+"""
+
+import gc
+import json
+import os
+
+import pytest
+
+from src.utils.config_loader import ConfigSnapshot
+
+
+def rewrite(loader, **model_config):
+    """修改配置文件并推进修改时间（避免文件系统时间精度导致 mtime 不变）"""
+    data = json.loads(loader.config_path.read_text(encoding='utf-8'))
+    data['model_config'].update(model_config)
+    loader.config_path.write_text(json.dumps(data), encoding='utf-8')
+    stat = loader.config_path.stat()
+    os.utime(loader.config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_snapshot_is_read_only():
+    snapshot = ConfigSnapshot({'model_config': {'input_size': [640, 640]}, 'class_names': ['a']})
+
+    assert snapshot['model_config.input_size'] == (640, 640)
+    assert snapshot.get('missing', 1) == 1
+    with pytest.raises(AttributeError):
+        snapshot.version = 2
+    with pytest.raises(TypeError):
+        snapshot.model_config['input_size'] = (320, 320)
+    with pytest.raises(KeyError):
+        snapshot['model_config.missing']
+
+
+def test_reload_if_changed_publishes_and_notifies(config_loader):
+    """文件变化后重新加载：新快照版本号加1，订阅者收到新快照，旧快照保持不变"""
+    received = []
+
+    def on_change(snapshot):
+        received.append(snapshot)
+
+    config_loader.subscribe(on_change)
+    old = config_loader.snapshot()
+
+    assert config_loader.reload_if_changed() is False
+    rewrite(config_loader, confidence_threshold=0.3)
+    assert config_loader.reload_if_changed() is True
+
+    new = config_loader.snapshot()
+    assert new.version == old.version + 1
+    assert new['model_config.confidence_threshold'] == 0.3
+    assert old['model_config.confidence_threshold'] == 0.5
+    assert received == [new]
+    assert config_loader.get_config('model_config.confidence_threshold') == 0.3
+
+
+def test_invalid_file_keeps_old_config(config_loader):
+    config_loader.config_path.write_text("{", encoding='utf-8')
+    os.utime(config_loader.config_path, ns=(0, 10 ** 18))
+
+    assert config_loader.reload_if_changed() is False
+    assert config_loader.get_config('model_config.confidence_threshold') == 0.5
+
+
+def test_update_config_notifies_and_unsubscribe(config_loader):
+    received = []
+
+    def on_change(snapshot):
+        received.append(snapshot)
+
+    unsubscribe = config_loader.subscribe(on_change)
+    config_loader.update_config('model_config.iou_threshold', 0.6)
+    unsubscribe()
+    config_loader.update_config('model_config.iou_threshold', 0.7)
+
+    assert [s['model_config.iou_threshold'] for s in received] == [0.6]
+
+
+def test_bound_method_subscribers_are_weak(config_loader):
+    """订阅对象被回收后不再回调"""
+    calls = []
+
+    class Subscriber:
+        def on_change(self, snapshot):
+            calls.append(snapshot)
+
+    subscriber = Subscriber()
+    config_loader.subscribe(subscriber.on_change)
+    config_loader.update_config('model_config.iou_threshold', 0.6)
+    del subscriber
+    gc.collect()
+    config_loader.update_config('model_config.iou_threshold', 0.7)
+
+    assert len(calls) == 1
+
+
+def test_load_config_notifies_subscribers(config_loader):
+    """显式重新加载也通知订阅者（支持内置函数的绑定方法作为回调）"""
+    received = []
+    config_loader.subscribe(received.append)
+    rewrite(config_loader, max_detections=10)
+    config_loader.load_config()
+
+    assert len(received) == 1
+    assert received[0]['model_config.max_detections'] == 10
+
+
+def test_get_config_is_read_only(config_loader):
+    whole = config_loader.get_config()
+
+    with pytest.raises(TypeError):
+        whole['model_config'] = {}
+    with pytest.raises(TypeError):
+        config_loader.get_config('model_config')['confidence_threshold'] = 0.1
+    assert config_loader.get_config('model_config.input_size') == (640, 640)
+
+
+def test_update_config_does_not_mutate_published_config(config_loader):
+    """update_config 在副本上修改，之前取得的配置和快照保持不变"""
+    before = config_loader.get_config()
+    snapshot = config_loader.snapshot()
+    value = {'enabled': True}
+    config_loader.update_config('new_block.options', value)
+    value['enabled'] = False
+
+    assert 'new_block' not in before
+    assert 'new_block.options' not in snapshot
+    assert config_loader.get_config('new_block.options.enabled') is True
@@ -0,0 +1,41 @@
+"""
+数据集清单测试
+"""
+
+import cv2
+import numpy as np
+
+from src.data.dataset_index import DatasetIndexer
+
+
+def write_image(root, name, rows):
+    """写入一张图片和对应的标注文件"""
+    (root / "images").mkdir(parents=True, exist_ok=True)
+    (root / "labels").mkdir(exist_ok=True)
+    cv2.imwrite(str(root / "images" / f"{name}.png"), np.zeros((16, 16, 3), dtype=np.uint8))
+    (root / "labels" / f"{name}.txt").write_text("\n".join(rows), encoding='utf-8')
+
+
+def test_invalid_rows_are_not_counted_as_boxes(config_loader, tmp_path):
+    """未知类别和非整数类别的行计入 invalid_boxes，num_boxes 与 class_ids 一致"""
+    root = tmp_path / "train"
+    write_image(root, "a", ["0 0.5 0.5 0.1 0.1", "999 0.5 0.5 0.1 0.1", "0.5 0.5 0.5 0.1 0.1"])
+    write_image(root, "b", ["1 0.5 0.5 0.1 0.1"])
+
+    manifest = DatasetIndexer(config_loader).build('train', root=root, manifest_file=tmp_path / "manifest.json")
+
+    entry = manifest.entries[0]
+    assert entry['num_boxes'] == len(entry['class_ids']) == 1
+    assert entry['invalid_boxes'] == 2
+    stats = manifest.statistics()
+    assert stats['boxes'] == sum(stats['class_counts'].values()) == 2
+    assert stats['invalid_boxes'] == 2
+
+
+
+def test_io_workers_default_from_config(config_loader):
+    """未指定线程数时读取 dataset_config.io_workers"""
+    config_loader.update_config('dataset_config.io_workers', 3)
+
+    assert DatasetIndexer(config_loader).io_workers == 3
+    assert DatasetIndexer(config_loader, io_workers=5).io_workers == 5
@@ -0,0 +1,93 @@
+"""
+检测结果缓存测试
+"""
+
+import pytest
+
+from src.models.detection_cache import DetectionCache, content_hash
+
+DETECTIONS = [{'class_id': 0, 'part_category': 'hex_nut', 'confidence': 0.9, 'bbox_x': 1.0,
+               'bbox_y': 2.0, 'bbox_width': 3.0, 'bbox_height': 4.0, 'model_version': 'v1',
+               'detection_time_ms': 12.0}]
+
+
+@pytest.fixture
+def cache(config_loader, tmp_path):
+    cache = DetectionCache('v1', config_loader, cache_dir=tmp_path / "cache", memory_entries=4)
+    yield cache
+    cache.close()
+
+
+def test_memory_hit_returns_copy_without_timing(cache):
+    """命中时返回副本，推理耗时不进入缓存"""
+    digest = content_hash(b"image")
+    assert cache.get(digest) is None
+    cache.put(digest, DETECTIONS)
+
+    first = cache.get(digest)
+    assert 'detection_time_ms' not in first[0]
+    first[0]['confidence'] = 0.0
+    assert cache.get(digest)[0]['confidence'] == 0.9
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_decode_modes_are_cached_separately(cache):
+    digest = content_hash(b"image")
+    cache.put(digest, DETECTIONS, 'reduced')
+
+    assert cache.get(digest, 'full') is None
+    assert cache.get(digest, 'reduced') is not None
+    with pytest.raises(ValueError):
+        cache.get(digest, 'thumbnail')
+
+
+def test_settings_change_invalidates_keys(cache, config_loader):
+    """阈值或 max_detections 变化后旧结果不再命中"""
+    digest = content_hash(b"image")
+    cache.put(digest, DETECTIONS)
+
+    config_loader.update_config('model_config.max_detections', 10)
+    assert cache.get(digest) is None
+    config_loader.update_config('model_config.max_detections', 100)
+    assert cache.get(digest) is not None
+    config_loader.update_config('model_config.confidence_threshold', 0.25)
+    assert cache.get(digest) is None
+
+
+def test_disk_tier_survives_restart(config_loader, tmp_path):
+    """磁盘层由后台线程写入，flush 后新建的缓存实例可以读到；内存层淘汰后从磁盘层读回"""
+    first = DetectionCache('v1', config_loader, cache_dir=tmp_path / "cache", memory_entries=2)
+    digests = [content_hash(bytes([i])) for i in range(5)]
+    for digest in digests:
+        first.put(digest, DETECTIONS)
+    first.flush()
+    first.close()
+
+    second = DetectionCache('v1', config_loader, cache_dir=tmp_path / "cache", memory_entries=2)
+    try:
+        assert all(second.get(digest) is not None for digest in digests)
+        assert DetectionCache('v2', config_loader, cache_dir=tmp_path / "cache",
+                              disk_max_bytes=0).get(digests[0]) is None
+    finally:
+        second.close()
+
+
+def test_disk_tier_evicts_to_capacity(config_loader, tmp_path):
+    cache = DetectionCache('v1', config_loader, cache_dir=tmp_path / "cache", disk_max_bytes=1000)
+    try:
+        for i in range(20):
+            cache.put(content_hash(bytes([i])), DETECTIONS)
+            cache.flush()
+        size = sum(path.stat().st_size for path in (tmp_path / "cache").glob('*/*.json'))
+        assert 0 < size <= 1000
+    finally:
+        cache.close()
+
+
+def test_disabled_disk_tier_writes_nothing(config_loader, tmp_path):
+    cache = DetectionCache('v1', config_loader, cache_dir=tmp_path / "cache", disk_max_bytes=0)
+    cache.put(content_hash(b"image"), DETECTIONS)
+    cache.flush()
+    cache.close()
+
+    assert not (tmp_path / "cache").exists()
@@ -0,0 +1,125 @@
+"""
+检测评估测试
+"""
+
+import numpy as np
+import pytest
+
+from src.models.evaluator import DetectionEvaluator, _greedy_matches, _priority_order, labels_to_targets
+
+
+def make_evaluator(num_classes=1, confidence_threshold=0.5):
+    return DetectionEvaluator(class_names=[f"c{i}" for i in range(num_classes)],
+                              confidence_threshold=confidence_threshold)
+
+
+def test_dense_matching_uses_alternative_prediction():
+    """一个预测框同时是两个真值的最佳匹配时，第二个真值应匹配另一个预测框（COCO贪心匹配）"""
+    evaluator = make_evaluator()
+    predictions = np.array([[1, 0, 11, 10, 0.9, 0],
+                            [4, 0, 14, 10, 0.8, 0]], dtype=np.float32)
+    targets = np.array([[0, 0, 0, 10, 10],
+                        [0, 2, 0, 12, 10]], dtype=np.float32)
+    evaluator.update([predictions], [targets])
+    metrics = evaluator.compute()
+
+    assert metrics['recall'] == pytest.approx(1.0)
+    assert metrics['map50'] == pytest.approx(1.0)
+    assert metrics['confusion_matrix'] == [[2, 0], [0, 0]]
+
+
+def test_higher_confidence_prediction_matches_first():
+    """两个预测框争同一个真值时，置信度高的为TP"""
+    evaluator = make_evaluator()
+    predictions = np.array([[0, 0, 10, 10, 0.6, 0],
+                            [0, 0, 10, 10, 0.9, 0]], dtype=np.float32)
+    targets = np.array([[0, 0, 0, 10, 10]], dtype=np.float32)
+    evaluator.update([predictions], targets[None])
+    tp = evaluator._compact()[0]
+
+    assert tp[:, 0].tolist() == [False, True]
+
+
+def test_average_precision_with_false_positive_ranked_first():
+    """误检排在最前时，101点插值AP为 TP 在第二位的精确率 0.5"""
+    evaluator = make_evaluator()
+    predictions = np.array([[50, 50, 60, 60, 0.9, 0],
+                            [0, 0, 10, 10, 0.8, 0]], dtype=np.float32)
+    targets = np.array([[0, 0, 0, 10, 10]], dtype=np.float32)
+    evaluator.update([predictions], [targets])
+    metrics = evaluator.compute()
+
+    assert metrics['map50'] == pytest.approx(0.5)
+    assert metrics['per_class']['c0']['support'] == 1
+
+
+def test_class_mismatch_is_not_true_positive():
+    """类别不同的预测框不计为TP，在混淆矩阵中记为类别混淆"""
+    evaluator = make_evaluator(num_classes=2)
+    predictions = np.array([[0, 0, 10, 10, 0.9, 1]], dtype=np.float32)
+    targets = np.array([[0, 0, 0, 10, 10]], dtype=np.float32)
+    evaluator.update([predictions], [targets])
+    metrics = evaluator.compute()
+
+    assert metrics['map50'] == pytest.approx(0.0)
+    assert metrics['confusion_matrix'][1][0] == 1
+
+
+def test_merge_matches_single_pass():
+    """分块评估合并后与一次性评估结果相同"""
+    rng = np.random.default_rng(0)
+    images = []
+    for _ in range(6):
+        gt = np.concatenate([rng.integers(0, 3, (5, 1)), rng.uniform(0, 80, (5, 2))], axis=1)
+        gt = np.concatenate([gt, gt[:, 1:3] + 20], axis=1).astype(np.float32)
+        pred = np.concatenate([gt[:, 1:5] + rng.normal(0, 2, (5, 4)),
+                               rng.uniform(0.1, 1, (5, 1)), gt[:, :1]], axis=1).astype(np.float32)
+        images.append((pred, gt))
+
+    single = make_evaluator(num_classes=3)
+    single.update([p for p, _ in images], [t for _, t in images])
+    merged = make_evaluator(num_classes=3)
+    for chunk in (images[:2], images[2:]):
+        part = make_evaluator(num_classes=3)
+        part.update([p for p, _ in chunk], [t for _, t in chunk])
+        merged.merge(part)
+
+    assert merged.compute()['map50_95'] == pytest.approx(single.compute()['map50_95'])
+
+
+def sequential_matches(pair_pred, pair_gt, pair_iou, confidence):
+    """参考实现：按置信度逐个处理预测框，取IoU最高的未匹配真值"""
+    matches = {}
+    used_gt = set()
+    for p in sorted(set(pair_pred.tolist()), key=lambda p: (-confidence[p], p)):
+        candidates = [(-iou, i, g) for i, (q, g, iou) in enumerate(zip(pair_pred, pair_gt, pair_iou))
+                      if q == p and g not in used_gt]
+        if candidates:
+            g = min(candidates)[2]
+            matches[p] = g
+            used_gt.add(g)
+    return matches
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_vectorized_greedy_matches_sequential_reference(seed):
+    """逐轮向量化匹配与逐个预测框顺序处理的结果一致（包括置信度和IoU相同的情况）"""
+    rng = np.random.default_rng(seed)
+    num_pred, num_gt = 40, 30
+    mask = rng.random((num_pred, num_gt)) < 0.15
+    pair_pred, pair_gt = np.nonzero(mask)
+    pair_iou = rng.choice([0.5, 0.6, 0.7, 0.8, 0.9], len(pair_pred)).astype(np.float32)
+    confidence = rng.choice([0.3, 0.5, 0.7, 0.9], num_pred).astype(np.float32)
+
+    order = _priority_order(pair_pred, pair_iou, confidence)
+    matched_pred, matched_gt = _greedy_matches(pair_pred[order], pair_gt[order])
+
+    expected = sequential_matches(pair_pred, pair_gt, pair_iou, confidence)
+    assert dict(zip(matched_pred.tolist(), matched_gt.tolist())) == expected
+
+
+def test_labels_to_targets_converts_to_pixels():
+    """YOLO归一化标注转换为像素角点坐标"""
+    targets = labels_to_targets(np.array([[2, 0.5, 0.5, 0.2, 0.4]]), width=100, height=50)
+
+    np.testing.assert_allclose(targets, [[2, 40, 15, 60, 35]])
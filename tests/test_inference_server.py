@@ -0,0 +1,69 @@
+"""
+HTTP推理服务测试（桩模型）
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from src.service.inference_server import InferenceServer
+
+from .conftest import BrightSpotModel, draw_parts
+
+
+class SlowModel(BrightSpotModel):
+    """记录同时进行的前向推理数"""
+
+    def __init__(self, num_classes):
+        super().__init__(num_classes)
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, batch):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(0.2)
+            return super().__call__(batch)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+async def post(port, path, body):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n"
+                 f"Connection: close\r\n\r\n".encode('latin-1') + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(payload)
+
+
+def test_workers_run_forward_passes_concurrently(stub_detector):
+    """每个工作线程使用自己的检测器副本，多个批次的前向推理同时进行"""
+    model = SlowModel(len(stub_detector.class_names))
+    stub_detector._model = model
+    image = draw_parts(np.zeros((240, 320, 3), dtype=np.uint8), [(20, 30, 60, 70)])
+    body = cv2.imencode('.png', image)[1].tobytes()
+
+    async def scenario():
+        server = InferenceServer(stub_detector, port=0, batch_size=1, max_wait_ms=0, workers=2)
+        await server.start()
+        try:
+            return await asyncio.gather(*(post(server.port, '/detect', body) for _ in range(4)))
+        finally:
+            await server.close()
+
+    responses = asyncio.run(scenario())
+
+    assert [status for status, _ in responses] == [200] * 4
+    assert all(len(payload['detections']) == 1 for _, payload in responses)
+    assert model.max_active == 2
@@ -0,0 +1,93 @@
+"""
+日志模块测试：限流、JSON格式和队列模式的关闭
+"""
+
+import inspect
+import json
+import logging.handlers
+import time
+
+import pytest
+
+from src.utils.logger import Logger
+
+
+@pytest.fixture
+def make_logger(tmp_path, request):
+    """在临时目录中创建独立名称的日志器，测试结束后停止监听线程并移除处理器"""
+    created = []
+
+    def factory(**options):
+        log = Logger(f"test_{request.node.name}_{len(created)}", log_dir=tmp_path, options=options)
+        created.append(log)
+        return log
+
+    yield factory
+    for log in created:
+        log.shutdown()
+        for handler in list(log.logger.handlers):
+            log.logger.removeHandler(handler)
+            handler.close()
+        for log_filter in list(log.logger.filters):
+            log.logger.removeFilter(log_filter)
+
+
+def read_lines(log):
+    return (log.log_dir / f"{log.name}.log").read_text(encoding='utf-8').splitlines()
+
+
+def test_rate_limit_reports_suppressed_count_in_next_window(make_logger):
+    """同一位置超出限额的日志被丢弃，下一个窗口的第一条附带被抑制的条数"""
+    log = make_logger(queue=False, rate_limit_messages=2, rate_limit_period_s=0.3)
+
+    def burst(count):
+        for i in range(count):
+            log.info(f"零件 {i}")
+
+    burst(5)
+    log.info("其他位置")
+    time.sleep(0.35)
+    burst(3)
+
+    messages = [line.rsplit(' - ', 1)[1] for line in read_lines(log)]
+    assert messages == [
+        "零件 0", "零件 1", "其他位置",
+        "零件 0 (已抑制 3 条重复日志)", "零件 1",
+    ]
+
+
+def test_json_formatter_includes_fields(make_logger):
+    """JSON格式的每行是一条记录，附加字段与标准字段合并，文件和行号指向调用方"""
+    log = make_logger(queue=False, json=True)
+
+    line_number = inspect.currentframe().f_lineno + 1
+    log.info("检测完成", part="M6螺栓", count=3)
+    log.error("相机断开", camera=0)
+
+    lines = read_lines(log)
+    assert len(lines) == 2
+    record = json.loads(lines[0])
+    assert record['message'] == "检测完成"
+    assert record['level'] == 'INFO'
+    assert record['part'] == "M6螺栓" and record['count'] == 3
+    assert record['module'] == 'test_logger' and record['line'] == line_number
+    assert 'time' in record and 'thread' in record
+
+    errors = (log.log_dir / f"{log.name}_error.log").read_text(encoding='utf-8').splitlines()
+    assert [json.loads(line)['camera'] for line in errors] == [0]
+
+
+def test_shutdown_flushes_queue(make_logger):
+    """队列模式下 shutdown 写出队列中剩余的全部日志并停止监听线程"""
+    log = make_logger(queue=True, rate_limit_messages=0)
+    for i in range(500):
+        log.debug(f"记录 {i}")
+
+    assert isinstance(log.logger.handlers[0], logging.handlers.QueueHandler)
+    listener = log._listener
+    log.shutdown()
+
+    lines = read_lines(log)
+    assert len(lines) == 500 and lines[-1].endswith("记录 499")
+    assert log._listener is None and listener._thread is None
+    log.shutdown()
@@ -0,0 +1,48 @@
+"""
+流水线阶段耗时统计测试
+"""
+
+from src.utils.metrics import LATENCY_BUCKETS, METRIC_NAME, PipelineMetrics
+
+
+def test_disabled_metrics_record_and_write_nothing(config_loader, tmp_path):
+    """未启用时 stage 返回共享的空上下文，不启动导出线程，不写文件"""
+    metrics = PipelineMetrics(config_loader, enabled=False, export_file=tmp_path / "metrics.prom")
+
+    assert metrics.stage('forward') is metrics.stage('nms')
+    with metrics.stage('forward'):
+        pass
+    metrics.observe('decode', 0.01)
+    metrics.close()
+
+    assert metrics._exporter is None
+    assert metrics.summary() == {}
+    assert not (tmp_path / "metrics.prom").exists()
+
+
+def test_enabled_metrics_export_histograms_on_close(config_loader, tmp_path):
+    """启用时记录到直方图，close 时导出 Prometheus 文本格式"""
+    export_file = tmp_path / "metrics.prom"
+    metrics = PipelineMetrics(config_loader, enabled=True, export_file=export_file, export_interval=0)
+    with metrics.stage('forward'):
+        pass
+    metrics.observe('decode', 0.003)
+    metrics.observe('decode', 100.0)
+    metrics.close()
+
+    assert metrics.summary()['decode']['count'] == 2
+    decode = metrics.snapshot()['decode']['buckets']
+    assert decode[LATENCY_BUCKETS.index(0.005)] == 1 and decode[-1] == 2
+    text = export_file.read_text(encoding='utf-8')
+    assert f'{METRIC_NAME}_count{{stage="decode"}} 2' in text
+    assert f'{METRIC_NAME}_bucket{{stage="decode",le="+Inf"}} 2' in text
+    assert f'{METRIC_NAME}_count{{stage="forward"}} 1' in text
+
+
+def test_default_config_disables_metrics(config_loader):
+    """项目配置默认不启用，启用状态随配置热更新"""
+    metrics = PipelineMetrics(config_loader)
+    assert metrics.enabled is False
+
+    config_loader.update_config('metrics_config.enabled', True)
+    assert metrics.enabled is True
@@ -0,0 +1,108 @@
+"""
+模型注册表测试：按内容哈希共享、预热以及 max_resident 的LRU卸载
+"""
+
+import threading
+
+import pytest
+
+import src.models.model_registry as registry_module
+from src.models.model_registry import ModelRegistry
+
+from .conftest import BrightSpotModel
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """用桩模型代替推理后端，记录每次加载的 (文件名, 设备)"""
+    calls = []
+
+    def fake_load_backend(path, device='cpu', num_threads=0):
+        calls.append((path.name, device))
+        return BrightSpotModel(num_classes=5)
+
+    monkeypatch.setattr(registry_module, 'load_backend', fake_load_backend)
+    return calls
+
+
+@pytest.fixture
+def models_dir(tmp_path):
+    """内容各不相同的三个权重文件"""
+    directory = tmp_path / "models"
+    directory.mkdir()
+    for name in ("a", "b", "c"):
+        (directory / f"{name}.pt").write_bytes(name.encode() * 64)
+    return directory
+
+
+def resident_names(registry):
+    return [info['version'].split('-')[0] for info in registry.resident()]
+
+
+def test_lru_eviction_respects_max_resident(config_loader, models_dir, loads):
+    """超过 max_resident 时卸载最久未使用的模型；被卸载的模型再次请求时重新加载"""
+    registry = ModelRegistry(config_loader, models_dir=models_dir, max_resident=2, warmup_iterations=0)
+
+    entry_a = registry.get("a.pt")
+    registry.get("b.pt")
+    assert registry.get("a.pt") is entry_a
+    assert resident_names(registry) == ["b", "a"]
+
+    registry.get("c.pt")
+    assert resident_names(registry) == ["a", "c"]
+    assert loads == [("a.pt", "cpu"), ("b.pt", "cpu"), ("c.pt", "cpu")]
+
+    registry.get("b.pt")
+    assert resident_names(registry) == ["c", "b"]
+    assert loads[-1] == ("b.pt", "cpu")
+    # 卸载只移除注册表中的引用，已取得的模型仍可使用
+    assert entry_a.model.num_classes == 5
+
+
+def test_max_resident_from_config(config_loader, models_dir, loads):
+    """max_resident 默认读取 model_registry_config，每个设备各占一个位置"""
+    config_loader.update_config('model_registry_config.max_resident', 1)
+    registry = ModelRegistry(config_loader, models_dir=models_dir, warmup_iterations=0)
+    assert registry.max_resident == 1
+
+    registry.get("a.pt", device='cpu')
+    registry.get("a.pt", device='cuda:0')
+    assert len(registry.resident()) == 1
+    assert registry.resident()[0]['device'] == 'cuda:0'
+    assert loads == [("a.pt", "cpu"), ("a.pt", "cuda:0")]
+
+
+def test_same_content_is_loaded_once_and_warmed_up(config_loader, models_dir, loads):
+    """内容相同的文件只加载一次并共享；加载后按输入尺寸预热 warmup_iterations 次"""
+    (models_dir / "a_copy.pt").write_bytes((models_dir / "a.pt").read_bytes())
+    registry = ModelRegistry(config_loader, models_dir=models_dir, warmup_iterations=2)
+
+    entry = registry.get("a.pt", input_size=(32, 48), batch_size=4)
+    assert registry.get("a_copy.pt") is entry
+    assert loads == [("a.pt", "cpu")]
+    assert entry.model.calls == [(4, 3, 32, 48), (4, 3, 32, 48)]
+    assert entry.version == f"a-{registry.digest('a.pt')[:8]}"
+    assert registry.version("a_copy.pt") != entry.version
+
+    assert registry.unload("a_copy.pt") == 1
+    assert registry.resident() == []
+
+
+def test_concurrent_requests_load_once(config_loader, models_dir, loads):
+    """多个线程同时请求同一模型时只加载一次"""
+    registry = ModelRegistry(config_loader, models_dir=models_dir, warmup_iterations=1)
+    barrier = threading.Barrier(8)
+    entries = []
+
+    def request():
+        barrier.wait()
+        entries.append(registry.get("b.pt", input_size=(16, 16)))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loads == [("b.pt", "cpu")]
+    assert len({id(entry) for entry in entries}) == 1
@@ -0,0 +1,70 @@
+"""
+运动门控推理测试（桩模型）
+"""
+
+import numpy as np
+
+from src.models.motion_gate import MotionGatedDetector, changed_regions, merge_regions
+
+from .conftest import assert_same_boxes, draw_parts
+
+
+def test_merge_regions_merges_chains_and_keeps_disjoint():
+    regions = np.array([[0, 0, 10, 10], [8, 8, 20, 20], [18, 0, 30, 9], [50, 50, 60, 60]])
+
+    merged = merge_regions(regions)
+
+    assert sorted(merged.tolist()) == [[0, 0, 30, 20], [50, 50, 60, 60]]
+    assert merge_regions(np.zeros((0, 4), dtype=np.int64)).shape == (0, 4)
+
+
+def test_changed_regions_filters_noise():
+    mask = np.zeros((100, 100), dtype=bool)
+    mask[10:20, 10:20] = True
+    mask[50, 50] = True
+
+    regions = changed_regions(mask, min_pixels=6)
+
+    assert regions.tolist() == [[9, 9, 21, 21]]
+
+
+def test_static_local_and_global_changes(stub_detector):
+    """静止帧沿用结果，局部变化只推理变化区域，新增和移走的零件都能反映在结果中"""
+    gate = MotionGatedDetector(stub_detector, max_reuse_frames=0)
+    frame = np.full((720, 1280, 3), 40, dtype=np.uint8)
+    parts = [(100, 100, 160, 150), (600, 400, 660, 470)]
+    draw_parts(frame, parts)
+
+    assert_same_boxes(gate.detect(frame), parts, atol=3.0)
+    assert_same_boxes(gate.detect(frame.copy()), parts, atol=3.0)
+    assert_same_boxes(gate.detect(frame.copy()), parts, atol=3.0)
+    assert gate.statistics()['skipped'] == 2
+
+    added = draw_parts(frame.copy(), [(1000, 200, 1040, 240)])
+    calls = len(stub_detector._model.calls)
+    assert_same_boxes(gate.detect(added), parts + [(1000, 200, 1040, 240)], atol=3.0)
+    # 区域推理的输入小于整帧输入
+    region_shape = stub_detector._model.calls[calls]
+    assert region_shape[2] * region_shape[3] < 640 * 640
+
+    removed = added.copy()
+    removed[100:150, 100:160] = 40
+    assert_same_boxes(gate.detect(removed), parts[1:] + [(1000, 200, 1040, 240)], atol=3.0)
+
+    stats = gate.statistics()
+    assert (stats['full'], stats['regional'], stats['skipped']) == (1, 2, 2)
+
+    moved = np.full((720, 1280, 3), 200, dtype=np.uint8)
+    gate.detect(moved)
+    assert gate.statistics()['full'] == 2
+
+
+def test_max_reuse_frames_forces_full_inference(stub_detector):
+    gate = MotionGatedDetector(stub_detector, max_reuse_frames=2)
+    frame = draw_parts(np.zeros((480, 640, 3), dtype=np.uint8), [(10, 10, 50, 50)])
+
+    for _ in range(4):
+        gate.detect(frame)
+
+    stats = gate.statistics()
+    assert (stats['full'], stats['skipped']) == (2, 2)
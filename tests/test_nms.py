@@ -0,0 +1,93 @@
+"""
+NMS测试：与逐框循环的参考实现对比
+"""
+
+import numpy as np
+import pytest
+
+from src.models.nms import batched_nms, box_iou, non_max_suppression, xywh_to_xyxy
+
+
+def reference_nms(boxes, scores, iou_threshold, class_ids=None, batch_index=None, max_detections=None):
+    """参考实现：每个（图片, 类别）组内按置信度逐个保留，与已保留的框逐一比较IoU"""
+    n = len(boxes)
+    class_ids = np.zeros(n, dtype=np.int64) if class_ids is None else class_ids
+    batch_index = np.zeros(n, dtype=np.int64) if batch_index is None else batch_index
+    keep = []
+    for image in np.unique(batch_index):
+        kept = []
+        for i in sorted(np.flatnonzero(batch_index == image), key=lambda i: -scores[i]):
+            suppressed = any(class_ids[j] == class_ids[i]
+                             and box_iou(boxes[i:i + 1], boxes[j:j + 1])[0, 0] > iou_threshold
+                             for j in kept)
+            if not suppressed:
+                kept.append(i)
+        keep.extend(kept[:max_detections] if max_detections else kept)
+    return keep
+
+
+def random_boxes(rng, n, extent=200.0):
+    xy = rng.uniform(0, extent, (n, 2))
+    wh = rng.uniform(5, 60, (n, 2))
+    return np.concatenate([xy, xy + wh], axis=1).astype(np.float32)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_batched_nms_matches_reference(seed):
+    """按类别、按图片分组的NMS与参考实现保留相同的框"""
+    rng = np.random.default_rng(seed)
+    n = 300
+    boxes = random_boxes(rng, n)
+    scores = rng.permutation(n).astype(np.float32) / n
+    class_ids = rng.integers(0, 3, n)
+    batch_index = rng.integers(0, 4, n)
+
+    keep = batched_nms(boxes, scores, 0.45, class_ids=class_ids, batch_index=batch_index)
+    expected = reference_nms(boxes, scores, 0.45, class_ids, batch_index)
+
+    assert sorted(keep.tolist()) == sorted(expected)
+
+
+def test_batched_nms_class_agnostic_and_max_detections():
+    """类别无关模式下不同类别也互相抑制，每张图片最多保留 max_detections 个框"""
+    rng = np.random.default_rng(10)
+    boxes = random_boxes(rng, 200, extent=100.0)
+    scores = rng.permutation(200).astype(np.float32) / 200
+    batch_index = rng.integers(0, 2, 200)
+
+    keep = batched_nms(boxes, scores, 0.3, batch_index=batch_index, max_detections=5)
+    expected = reference_nms(boxes, scores, 0.3, batch_index=batch_index, max_detections=5)
+
+    assert sorted(keep.tolist()) == sorted(expected)
+    assert np.bincount(batch_index[keep]).max() <= 5
+
+
+def test_batched_nms_empty():
+    keep = batched_nms(np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32), 0.5)
+    assert keep.shape == (0,)
+
+
+def test_non_max_suppression_on_raw_output():
+    """整批原始输出：先按置信度过滤，每张图片的结果按置信度降序、坐标为角点格式"""
+    rng = np.random.default_rng(3)
+    batch, num_classes, anchors = 3, 4, 500
+    predictions = np.zeros((batch, 4 + num_classes, anchors), dtype=np.float32)
+    predictions[:, :2] = rng.uniform(20, 300, (batch, 2, anchors))
+    predictions[:, 2:4] = rng.uniform(5, 50, (batch, 2, anchors))
+    predictions[:, 4:] = rng.uniform(0, 1, (batch, num_classes, anchors))
+
+    results = non_max_suppression(predictions, 0.6, 0.45, max_detections=300)
+
+    assert len(results) == batch
+    for image, detections in enumerate(results):
+        scores = predictions[image, 4:]
+        class_ids = scores.argmax(axis=0)
+        confidence = scores.max(axis=0)
+        candidates = np.flatnonzero(confidence > 0.6)
+        boxes = xywh_to_xyxy(predictions[image, :4, candidates].astype(np.float64))
+        expected = reference_nms(boxes, confidence[candidates], 0.45, class_ids[candidates],
+                                 max_detections=300)
+
+        np.testing.assert_allclose(detections[:, :4], boxes[expected], rtol=1e-5)
+        assert np.all(np.diff(detections[:, 4]) <= 0)
+        assert np.all(detections[:, 4] > 0.6)
@@ -0,0 +1,60 @@
+"""
+letterbox预处理与坐标还原测试
+"""
+
+import numpy as np
+import pytest
+
+from src.data.preprocess import PAD_VALUE, LetterboxPreprocessor, boxes_to_bbox_columns, scale_boxes
+
+
+@pytest.mark.parametrize("shape", [(480, 1000), (1000, 480), (640, 640), (123, 77)])
+def test_letterbox_scale_boxes_round_trip(shape):
+    """原图中的方块经letterbox后在模型输入中定位，再用 scale_boxes 还原，误差在一个原图像素以内"""
+    height, width = shape
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+    box = np.array([width * 0.3, height * 0.4, width * 0.7, height * 0.8]).round().astype(int)
+    image[box[1]:box[3], box[0]:box[2]] = 255
+
+    preprocessor = LetterboxPreprocessor(2, (640, 640))
+    batch, meta = preprocessor([image])
+
+    assert batch.shape == (1, 3, 640, 640)
+    bright = np.argwhere(batch[0].min(axis=0) > 0.5)
+    found = np.array([[bright[:, 1].min(), bright[:, 0].min(),
+                       bright[:, 1].max() + 1, bright[:, 0].max() + 1]], dtype=np.float32)
+    restored = scale_boxes(found, meta['scales'][0], meta['pads'][0], meta['shapes'][0])
+
+    tolerance = max(1.0, 1.0 / meta['scales'][0])
+    np.testing.assert_allclose(restored[0], box, atol=tolerance)
+    assert meta['shapes'][0].tolist() == [height, width]
+
+
+def test_letterbox_pads_with_constant_and_centers():
+    """宽图上下填充，填充量左右/上下对称"""
+    preprocessor = LetterboxPreprocessor(1, (640, 640))
+    scale, pad_x, pad_y = preprocessor.letterbox_params(320, 1280)
+
+    assert scale == pytest.approx(0.5)
+    assert (pad_x, pad_y) == (0.0, 240.0)
+
+    batch, _ = preprocessor([np.zeros((320, 1280, 3), dtype=np.uint8)])
+    assert batch[0, :, :240].max() == pytest.approx(PAD_VALUE / 255.0)
+    assert batch[0, :, 240:400].max() == pytest.approx(0.0)
+
+
+def test_scale_boxes_clips_to_image():
+    """还原后的框裁剪到原图范围内"""
+    boxes = np.array([[-20.0, -20.0, 700.0, 700.0]], dtype=np.float32)
+    out = scale_boxes(boxes, 0.5, (0.0, 240.0), (320, 1280))
+
+    np.testing.assert_allclose(out, [[0, 0, 1280, 320]])
+    assert boxes_to_bbox_columns(out) == [
+        {'bbox_x': 0.0, 'bbox_y': 0.0, 'bbox_width': 1280.0, 'bbox_height': 320.0}]
+
+
+def test_preprocess_rejects_oversized_batch():
+    preprocessor = LetterboxPreprocessor(1, (64, 64))
+    image = np.zeros((10, 10, 3), dtype=np.uint8)
+    with pytest.raises(ValueError):
+        preprocessor([image, image])
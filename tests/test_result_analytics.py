@@ -0,0 +1,53 @@
+"""
+延迟分位数草图测试
+"""
+
+import numpy as np
+import pytest
+
+from src.data.result_analytics import LatencySketch
+
+
+@pytest.mark.parametrize("q", [0.0, 0.5, 0.9, 0.95, 0.99, 1.0])
+def test_quantile_within_relative_accuracy(q):
+    """分位数估计与精确值的相对误差不超过 relative_accuracy"""
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(mean=3.0, sigma=1.0, size=20000)
+    sketch = LatencySketch(relative_accuracy=0.01)
+    sketch.add(values)
+
+    exact = float(np.quantile(values, q, method='lower'))
+    assert sketch.quantile(q) == pytest.approx(exact, rel=0.01)
+
+
+def test_merge_equals_single_sketch():
+    rng = np.random.default_rng(1)
+    values = rng.exponential(50.0, size=5000)
+    whole = LatencySketch()
+    whole.add(values)
+    parts = [LatencySketch() for _ in range(3)]
+    for part, chunk in zip(parts, np.array_split(values, 3)):
+        part.add(chunk)
+    merged = parts[0].merge(parts[1]).merge(parts[2])
+
+    assert merged.count == 5000
+    np.testing.assert_array_equal(merged.counts, whole.counts)
+    with pytest.raises(ValueError):
+        merged.merge(LatencySketch(relative_accuracy=0.05))
+
+
+def test_small_values_and_empty_sketch():
+    """不大于 min_value 的值计入零桶；空草图没有分位数"""
+    sketch = LatencySketch(min_value=0.01)
+    assert sketch.quantile(0.5) is None
+    sketch.add(np.array([0.0, 0.001, 0.005]))
+    assert sketch.quantile(0.99) == 0.0
+
+
+def test_dict_round_trip():
+    sketch = LatencySketch()
+    sketch.add(np.array([1.0, 2.0, 3.0, 250.0]))
+    restored = LatencySketch.from_dict(sketch.to_dict())
+
+    np.testing.assert_array_equal(restored.counts, sketch.counts)
+    assert restored.quantile(0.5) == sketch.quantile(0.5)
@@ -0,0 +1,55 @@
+"""
+检测结果列式存储测试
+"""
+
+from datetime import datetime
+
+from src.data.result_store import DetectionResultStore, _Partition
+
+DAY = datetime(2026, 3, 2, 8, 0, 0)
+
+
+def records(categories, versions=('v1',), offset=0):
+    return [{'timestamp': DAY.timestamp() + offset + i, 'image_path': f"{i % 7}.jpg",
+             'part_category': category, 'confidence': 0.5, 'bbox_x': 1.0, 'bbox_y': 2.0,
+             'bbox_width': 3.0, 'bbox_height': 4.0, 'detection_time_ms': 5.0,
+             'model_version': versions[i % len(versions)]}
+            for i, category in enumerate(categories)]
+
+
+def test_more_than_256_categories_and_versions(tmp_path):
+    """字典编码为uint16，第257种类别和模型版本可以正常写入和查询"""
+    store = DetectionResultStore(tmp_path, block_rows=100)
+    names = [f"part_{i}" for i in range(300)]
+    versions = [f"model-{i}" for i in range(300)]
+    assert store.append(records(names, versions)) == 300
+
+    assert store.count() == {name: 1 for name in names}
+    chunks = list(store.query(categories=["part_299"]))
+    assert len(chunks) == 1
+    chunk = chunks[0]
+    assert chunk['categories'][chunk['category'][0]] == "part_299"
+    assert chunk['model_versions'][chunk['model_version'][0]] == "model-299"
+
+
+
+def test_query_skips_partitions_that_end_before_start(tmp_path, monkeypatch):
+    """分区在次日零点结束：起始时间晚于该时刻的查询不打开前一天的分区，零点前后的记录归属正确"""
+    store = DetectionResultStore(tmp_path)
+    midnight = datetime(2026, 3, 3).timestamp()
+    store.append([dict(record, timestamp=midnight + offset)
+                  for record, offset in zip(records(["hex_nut", "flat_washer"]), (-1.0, 0.0))])
+    assert store.partitions() == ["20260302", "20260303"]
+
+    opened = []
+    original = _Partition.__init__
+
+    def tracking(self, path, block_rows):
+        opened.append(path.name)
+        original(self, path, block_rows)
+
+    monkeypatch.setattr(_Partition, '__init__', tracking)
+    chunks = list(store.query(start=midnight + 6 * 3600))
+    assert opened == ["20260303"] and chunks == []
+    assert store.count(start=midnight - 1.0, end=midnight) == {"hex_nut": 1}
+    assert store.count(start=midnight) == {"flat_washer": 1}
@@ -0,0 +1,76 @@
+"""
+检测结果后台写入器测试：DetectionResultWriter 的 flush/close 语义
+"""
+
+import csv
+import time
+
+import pytest
+
+from src.data.result_writer import CSV_COLUMNS, DetectionResultWriter
+
+
+def detection(index=0):
+    return {'part_category': 'hex_nut', 'confidence': 0.9, 'bbox_x': float(index), 'bbox_y': 2.0,
+            'bbox_width': 3.0, 'bbox_height': 4.0, 'detection_time_ms': 5.0, 'model_version': 'v1'}
+
+
+def slow(monkeypatch, cls, name, delay=0.2):
+    """让后台线程的写入变慢，flush 必须等待正在写出的批次"""
+    original = getattr(cls, name)
+
+    def wrapper(self, *args, **kwargs):
+        time.sleep(delay)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(cls, name, wrapper)
+
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+def test_result_writer_flush_waits_for_in_flight_batch(config_loader, tmp_path, monkeypatch):
+    """后台线程已取走但尚未写完的批次，flush 也要等待"""
+    slow(monkeypatch, DetectionResultWriter, '_write_batch')
+    output = tmp_path / "results.csv"
+    writer = DetectionResultWriter(output, config_loader, flush_rows=1, flush_interval=60)
+    try:
+        writer.write("a.jpg", [detection(0), detection(1)])
+        time.sleep(0.05)
+        writer.flush()
+        rows = read_rows(output)
+        assert rows[0] == CSV_COLUMNS
+        assert len(rows) == 3
+        assert writer.rows_written == 2
+    finally:
+        writer.close()
+
+
+def test_result_writer_close_writes_remaining_rows(config_loader, tmp_path):
+    """close 写出缓冲区中的全部结果，之后不能再写入；重复 close 无副作用"""
+    output = tmp_path / "results.csv"
+    writer = DetectionResultWriter(output, config_loader, flush_rows=10000, flush_interval=60)
+    for index in range(100):
+        writer.write(f"{index}.jpg", [detection(index)])
+    writer.write("empty.jpg", [])
+    writer.close()
+    writer.close()
+
+    rows = read_rows(output)
+    assert len(rows) == 101
+    assert rows[-1][1] == "99.jpg"
+    with pytest.raises(RuntimeError):
+        writer.write("late.jpg", [detection()])
+
+
+def test_result_writer_appends_header_once(config_loader, tmp_path):
+    output = tmp_path / "results.csv"
+    for _ in range(2):
+        with DetectionResultWriter(output, config_loader) as writer:
+            writer.write("a.jpg", [detection()])
+
+    rows = read_rows(output)
+    assert rows.count(CSV_COLUMNS) == 1
+    assert len(rows) == 3
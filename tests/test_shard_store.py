@@ -0,0 +1,67 @@
+"""
+数据集分片存储测试
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from src.data.dataset_index import DatasetIndexer
+from src.data.shard_store import ShardDataset, ShardPacker, _read_ahead
+
+
+def write_split(root, count):
+    """生成 images/labels 目录结构的数据集划分，第 i 张图片有 i % 3 个类别0的标注框"""
+    (root / "images").mkdir(parents=True)
+    (root / "labels").mkdir()
+    for index in range(count):
+        image = np.full((32, 48, 3), index, dtype=np.uint8)
+        cv2.imwrite(str(root / "images" / f"{index:03d}.png"), image)
+        rows = [f"0 0.5 0.5 {0.1 * (k + 1):.1f} 0.2" for k in range(index % 3)]
+        (root / "labels" / f"{index:03d}.txt").write_text("\n".join(rows), encoding='utf-8')
+
+
+def test_read_ahead_is_bounded_and_ordered():
+    """消费方慢于读取时，已提交未消费的记录数不超过窗口，产出顺序与输入一致"""
+    lock = threading.Lock()
+    submitted = []
+    consumed = []
+    peak = 0
+
+    def read(entry):
+        nonlocal peak
+        with lock:
+            submitted.append(entry)
+            peak = max(peak, len(submitted) - len(consumed))
+        time.sleep(0.001 * (entry % 3))
+        return entry * 10
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        for entry, result in _read_ahead(pool, read, list(range(50)), max_inflight=8):
+            assert result == entry * 10
+            time.sleep(0.002)
+            with lock:
+                consumed.append(entry)
+
+    assert consumed == list(range(50))
+    assert peak <= 8
+
+
+def test_pack_round_trip(config_loader, tmp_path):
+    """打包后的分片按清单顺序读回图片和标注"""
+    root = tmp_path / "train"
+    write_split(root, 12)
+    manifest = DatasetIndexer(config_loader).build('train', root=root, manifest_file=tmp_path / "manifest.json")
+
+    packer = ShardPacker(config_loader, shard_size_mb=1, io_workers=2)
+    shard_dir = packer.pack('train', shard_dir=tmp_path / "shards", manifest=manifest)
+    dataset = ShardDataset(shard_dir=shard_dir)
+
+    assert len(dataset) == 12
+    assert dataset.paths == [entry['path'] for entry in manifest.entries]
+    for index, (image, labels) in enumerate(dataset):
+        assert image.shape == (32, 48, 3) and int(image[0, 0, 0]) == index
+        assert len(labels) == index % 3
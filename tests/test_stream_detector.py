@@ -0,0 +1,36 @@
+"""
+视频流检测测试（桩模型）
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from src.models.stream_detector import StreamDetector
+
+from .conftest import draw_parts
+
+
+@pytest.fixture
+def video_file(tmp_path):
+    path = tmp_path / "stream.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 25, (320, 240))
+    if not writer.isOpened():
+        pytest.skip("OpenCV 不支持写入 MJPG 视频")
+    for index in range(30):
+        writer.write(draw_parts(np.zeros((240, 320, 3), dtype=np.uint8), [(20 + index, 30, 60 + index, 70)]))
+    writer.release()
+    return path
+
+
+def test_latency_statistics_use_fixed_size_sketch(stub_detector, video_file):
+    """逐帧检测视频文件，延迟分位数来自草图，检测帧数增加时不保存逐帧延迟"""
+    stream = StreamDetector(stub_detector, str(video_file), realtime=False)
+    buckets = stream._latency.counts.size
+
+    stats = stream.run()
+
+    assert stats['processed'] > 0
+    assert stats['detections'] == stats['processed']
+    assert 0.0 < stats['latency_p50_ms'] <= stats['latency_p95_ms']
+    assert stream._latency.counts.size == buckets
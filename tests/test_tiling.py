@@ -0,0 +1,52 @@
+"""
+分块推理测试（桩模型）
+"""
+
+import numpy as np
+
+from src.models.tiling import TiledDetector, tile_grid
+
+from .conftest import assert_same_boxes, draw_parts
+
+
+def test_tile_grid_covers_image_with_overlap():
+    tiles = tile_grid(3000, 4000, (1280, 1280), 0.2)
+
+    assert tiles[:, [0, 1]].min() == 0
+    assert tiles[:, 2].max() == 4000 and tiles[:, 3].max() == 3000
+    assert np.all(tiles[:, 2] - tiles[:, 0] == 1280)
+    xs = np.unique(tiles[:, 0])
+    assert np.all(np.diff(xs) <= 1280 - 256)
+
+
+def test_small_image_is_single_tile(stub_detector):
+    tiled = TiledDetector(stub_detector)
+    image = draw_parts(np.zeros((600, 800, 3), dtype=np.uint8), [(100, 100, 140, 150)])
+
+    assert tiled.plan(image).tolist() == [[0, 0, 800, 600]]
+    assert_same_boxes(tiled.detect(image), [(100, 100, 140, 150)], atol=2.0)
+
+
+def test_parts_on_tile_seams_are_detected_once(stub_detector):
+    """跨切线的零件被切断的部分丢弃，重叠区和整图推理的重复框由全局NMS合并"""
+    tiled = TiledDetector(stub_detector)
+    image = np.zeros((2400, 3600, 3), dtype=np.uint8)
+    tiles = tile_grid(2400, 3600, (1280, 1280), tiled.overlap)
+    seam_x = int(tiles[0, 2]) - 10
+    parts = [(200, 200, 230, 224), (seam_x - 20, 900, seam_x + 20, 930), (3000, 2000, 3024, 2030)]
+    draw_parts(image, parts)
+
+    detections = tiled.detect(image)
+
+    assert_same_boxes(detections, parts, atol=3.0)
+    assert {d['part_category'] for d in detections} == {stub_detector.class_names[0]}
+
+
+def test_blank_tiles_are_skipped(stub_detector):
+    """只有一个角落有零件时，其余空白块不推理"""
+    tiled = TiledDetector(stub_detector, include_full_image=False)
+    image = draw_parts(np.zeros((2400, 3600, 3), dtype=np.uint8), [(100, 100, 140, 150)])
+
+    tiles = tiled.plan(image)
+    assert 0 < len(tiles) < len(tile_grid(2400, 3600, (1280, 1280), tiled.overlap))
+    assert_same_boxes(tiled.detect(image), [(100, 100, 140, 150)], atol=3.0)
@@ -0,0 +1,104 @@
+"""
+训练数据加载器测试
+"""
+
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pytest
+
+from src.data.dataset_index import DatasetIndexer
+from src.data.shard_store import ShardDataset, ShardPacker
+from src.data.train_loader import TrainDataLoader
+
+from .test_shard_store import write_split
+
+NUM_RECORDS = 14
+BATCH_SIZE = 4
+
+
+@pytest.fixture
+def dataset(config_loader, tmp_path):
+    """14 条记录的分片数据集，第 i 条记录的图片像素值为 i；输出尺寸改为 64x64"""
+    config_loader.update_config('model_config.input_size', [64, 64])
+    root = tmp_path / "train"
+    write_split(root, NUM_RECORDS)
+    manifest = DatasetIndexer(config_loader).build('train', root=root, manifest_file=tmp_path / "manifest.json")
+    shard_dir = ShardPacker(config_loader).pack('train', shard_dir=tmp_path / "shards", manifest=manifest)
+    return ShardDataset(shard_dir=shard_dir)
+
+
+def make_loader(dataset, config_loader, workers, prefetch_batches=2):
+    return TrainDataLoader(dataset, config_loader, batch_size=BATCH_SIZE, workers=workers,
+                           prefetch_batches=prefetch_batches, augment=False, seed=3)
+
+
+def collect(loader):
+    """迭代一轮，复制每批的图片和标注（图片是共享内存视图，取下一批后失效）"""
+    return [(images.copy(), labels) for images, labels in loader]
+
+
+def assert_batch_matches(images, labels, indices):
+    """图片像素值即记录下标；第 i 条记录有 i % 3 个标注框，第0列为批内图片序号"""
+    assert [int(image[32, 32, 0]) for image in images] == indices
+    positions = labels[:, 0].astype(int).tolist()
+    assert positions == [p for p, index in enumerate(indices) for _ in range(index % 3)]
+
+
+def test_workers_return_batches_in_order(dataset, config_loader):
+    """多进程加载按批次顺序返回，内容与当前进程加载一致"""
+    local = make_loader(dataset, config_loader, workers=0)
+    with make_loader(dataset, config_loader, workers=2) as loader:
+        for epoch in range(2):
+            expected = local._batches(epoch)
+            batches = collect(loader)
+            reference = collect(local)
+
+            assert len(batches) == len(loader) == 4
+            assert [len(images) for images, _ in batches] == [4, 4, 4, 2]
+            for (images, labels), indices, (local_images, local_labels) in zip(batches, expected, reference):
+                assert_batch_matches(images, labels, indices)
+                np.testing.assert_array_equal(images, local_images)
+                np.testing.assert_array_equal(labels, local_labels)
+            assert loader.stats()['batches'] == 4
+        # 每轮打乱顺序不同
+        assert local._batches(0) != local._batches(1)
+
+
+def test_slots_are_reused_and_released(dataset, config_loader):
+    """两个槽位轮流复用；提前结束一轮后在途批次被回收，下一轮不混入旧结果"""
+    with make_loader(dataset, config_loader, workers=2, prefetch_batches=2) as loader:
+        slot_ids = []
+        for images, _ in loader:
+            matches = [i for i, slot in enumerate(loader._slots) if np.shares_memory(images, slot.images)]
+            assert len(matches) == 1
+            slot_ids.append(matches[0])
+        assert len(slot_ids) == 4 and set(slot_ids) == {0, 1}
+        assert all(a != b for a, b in zip(slot_ids, slot_ids[1:]))
+
+        # 只取第一批就结束第二轮
+        for images, _ in loader:
+            break
+        del images
+
+        batches = collect(loader)
+        assert len(batches) == 4
+        for (images, labels), indices in zip(batches, loader._batches(2)):
+            assert_batch_matches(images, labels, indices)
+
+
+def test_close_unlinks_shared_memory(dataset, config_loader):
+    """close 停止工作进程并删除所有共享内存段"""
+    loader = make_loader(dataset, config_loader, workers=2, prefetch_batches=3)
+    collect(loader)
+    names = [name for slot in loader._slots for name in slot.names]
+    processes = list(loader._processes)
+    assert len(names) == 6 and len(processes) == 2
+
+    loader.close()
+
+    assert loader._slots == [] and loader._processes == []
+    assert not any(process.is_alive() for process in processes)
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name=name)
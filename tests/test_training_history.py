@@ -0,0 +1,166 @@
+"""
+训练历史记录测试：TrainingHistoryWriter 的 flush/close 语义与摘要压缩
+"""
+
+import json
+import time
+
+import numpy as np
+import pytest
+
+from src.data.training_history import TrainingHistory, TrainingHistoryWriter
+
+
+def slow(monkeypatch, cls, name, delay=0.2):
+    """让后台线程的写入变慢，flush 必须等待正在写出的批次"""
+    original = getattr(cls, name)
+
+    def wrapper(self, *args, **kwargs):
+        time.sleep(delay)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(cls, name, wrapper)
+
+
+def history_writer(config_loader, tmp_path, **kwargs):
+    return TrainingHistoryWriter(session_id="s1", config_loader=config_loader,
+                                 history_dir=tmp_path / "history",
+                                 summary_file=tmp_path / "training_history.json", **kwargs)
+
+
+def test_history_writer_flush_waits_for_in_flight_batch(config_loader, tmp_path, monkeypatch):
+    slow(monkeypatch, TrainingHistoryWriter, '_write_batch')
+    writer = history_writer(config_loader, tmp_path, flush_lines=1, flush_interval=60)
+    try:
+        writer.log_step(1, epoch=0, loss=0.5)
+        time.sleep(0.05)
+        writer.flush()
+        records = list(TrainingHistory(tmp_path / "history").records("s1"))
+        assert [r['type'] for r in records] == ['start', 'step']
+    finally:
+        writer.close()
+
+
+def test_history_writer_close_updates_summary(config_loader, tmp_path):
+    """close 写出剩余记录和结束记录，摘要包含最终状态；numpy 标量按 Python 数值编码"""
+    with history_writer(config_loader, tmp_path, flush_interval=60, compact_interval=3600) as writer:
+        for epoch in range(3):
+            writer.log_epoch(epoch, val_map50=np.float32(0.5 + epoch / 10), images=np.int64(100))
+
+    history = TrainingHistory(tmp_path / "history", tmp_path / "training_history.json")
+    epochs, values = history.metrics("s1", ["val_map50"])
+    assert epochs.tolist() == [0, 1, 2]
+    np.testing.assert_allclose(values["val_map50"], [0.5, 0.6, 0.7], rtol=1e-6)
+
+    summary = json.loads((tmp_path / "training_history.json").read_text(encoding='utf-8'))
+    session = summary['training_sessions'][0]
+    assert session['status'] == 'completed'
+    assert session['epochs'] == 3
+    assert session['best']['val_map50']['max'] == pytest.approx(0.7)
+    assert session['best']['images'] == {'min': 100, 'max': 100}
+    with pytest.raises(RuntimeError):
+        writer.log_step(1)
+
+
+def test_history_compact_keeps_other_sessions(config_loader, tmp_path):
+    """多个会话共享摘要文件，各自压缩时不覆盖其他会话"""
+    writers = [TrainingHistoryWriter(session_id=f"s{i}", config_loader=config_loader,
+                                     history_dir=tmp_path / "history",
+                                     summary_file=tmp_path / "training_history.json",
+                                     compact_interval=0.001)
+               for i in range(3)]
+    for writer in writers:
+        writer.log_epoch(0, loss=1.0)
+    for writer in writers:
+        writer.close()
+
+    sessions = TrainingHistory(tmp_path / "history", tmp_path / "training_history.json").sessions()
+    assert [s['session_id'] for s in sessions] == ['s0', 's1', 's2']
+    assert all(s['status'] == 'completed' for s in sessions)
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_history_writer_appends_records_in_order(config_loader, tmp_path):
+    """记录按调用顺序追加；同一会话编号再次打开时追加到原文件，不覆盖已有记录"""
+    with history_writer(config_loader, tmp_path, flush_lines=4, flush_interval=60) as writer:
+        for step in range(10):
+            writer.log_step(step, epoch=step // 5, loss=1.0 / (step + 1), lr=1e-3 if step % 2 else None)
+        writer.log_epoch(0, val_map50=0.4)
+    with history_writer(config_loader, tmp_path, flush_interval=60) as writer:
+        writer.log_step(10, epoch=2, loss=0.05)
+
+    history = TrainingHistory(tmp_path / "history", tmp_path / "training_history.json")
+    kinds = [r['type'] for r in history.records("s1")]
+    assert kinds == ['start'] + ['step'] * 10 + ['epoch', 'end', 'start', 'step', 'end']
+
+    steps, values = history.metrics("s1", ["loss", "lr"], kind='step')
+    assert steps.tolist() == list(range(11))
+    np.testing.assert_allclose(values["loss"][:10], [1.0 / (s + 1) for s in range(10)])
+    assert np.isnan(values["lr"][0]) and values["lr"][1] == pytest.approx(1e-3)
+    assert [r['epoch'] for r in history.records("s1", 'epoch')] == [0]
+    with pytest.raises(ValueError):
+        list(history.records("s1", 'unknown'))
+
+
+def test_history_compaction_summarizes_running_session(config_loader, tmp_path):
+    """定期压缩把运行中会话的摘要写入摘要文件，摘要只有汇总信息，不随步数增长"""
+    summary_file = tmp_path / "training_history.json"
+    writer = history_writer(config_loader, tmp_path, flush_lines=100, flush_interval=0.01,
+                            compact_interval=0.01)
+    try:
+        for step in range(500):
+            writer.log_step(step, loss=1.0)
+        writer.log_epoch(0, val_map50=0.3)
+        writer.log_epoch(1, val_map50=0.6)
+        writer.flush()
+
+        deadline = time.monotonic() + 5
+        session = None
+        while time.monotonic() < deadline:
+            sessions = TrainingHistory(tmp_path / "history", summary_file).sessions()
+            if sessions and sessions[0].get('steps') == 500 and sessions[0].get('epochs') == 2:
+                session = sessions[0]
+                break
+            time.sleep(0.02)
+
+        assert session is not None
+        assert session['status'] == 'running' and session['end_time'] is None
+        assert session['last_step'] == 499
+        assert session['last_epoch'] == {'epoch': 1, 'val_map50': 0.6}
+        assert session['best']['val_map50'] == {'min': 0.3, 'max': 0.6}
+        assert summary_file.stat().st_size < 2048
+    finally:
+        writer.close()
+
+    session = TrainingHistory(tmp_path / "history", summary_file).sessions()[0]
+    assert session['status'] == 'completed' and session['end_time'] is not None
+
+
+def test_history_reads_compacted_and_uncompacted_sessions(config_loader, tmp_path):
+    """摘要中没有的会话（异常退出，未压缩）从日志目录补充，不完整的最后一行被跳过"""
+    history_dir = tmp_path / "history"
+    summary_file = tmp_path / "training_history.json"
+    with TrainingHistoryWriter(session_id="s1", config_loader=config_loader, history_dir=history_dir,
+                               summary_file=summary_file) as writer:
+        writer.log_epoch(0, loss=0.8)
+        writer.log_epoch(1, loss=0.6)
+
+    # 模拟写到一半被中断的会话：没有结束记录，最后一行不完整
+    (history_dir / "s0.jsonl").write_text(
+        '{"type":"start","session_id":"s0","time":"2024-01-01 00:00:00","params":{}}\n'
+        '{"type":"epoch","epoch":0,"metrics":{"loss":0.9}}\n'
+        '{"type":"epoch","epoch":1,"metr',
+        encoding='utf-8')
+
+    history = TrainingHistory(history_dir, summary_file)
+    sessions = history.sessions()
+    assert [s['session_id'] for s in sessions] == ['s0', 's1']
+    assert sessions[0] == {'session_id': 's0', 'log_file': 's0.jsonl', 'status': 'unknown'}
+    assert sessions[1]['status'] == 'completed' and sessions[1]['epochs'] == 2
+
+    epochs, values = history.metrics("s0", ["loss"])
+    assert epochs.tolist() == [0]
+    np.testing.assert_allclose(values["loss"], [0.9])
+    epochs, values = history.metrics("s1", ["loss"])
+    assert epochs.tolist() == [0, 1]
+    np.testing.assert_allclose(values["loss"], [0.8, 0.6])
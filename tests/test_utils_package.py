@@ -0,0 +1,48 @@
+"""
+工具包导出测试
+在子进程中运行，保证导入顺序不受其他测试已加载模块的影响
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def run_python(code):
+    """在项目根目录下用新解释器执行代码，返回标准输出"""
+    result = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip()
+
+
+@pytest.mark.parametrize('first_import', [
+    'pass',
+    'import src.utils.logger, src.utils.metrics, src.utils.path_manager',
+    'from src.utils.logger import logger as _',
+])
+def test_package_objects_are_not_shadowed_by_submodules(first_import):
+    """先直接导入同名子模块，再从包中导入时拿到的仍是对象而不是子模块"""
+    output = run_python(
+        f"{first_import}\n"
+        "import src.utils\n"
+        "from src.utils import Logger, PathManager, PipelineMetrics, logger, metrics, path_manager\n"
+        "import src.utils.logger\n"
+        "print(isinstance(logger, Logger), isinstance(metrics, PipelineMetrics),\n"
+        "      isinstance(path_manager, PathManager), src.utils.logger is logger)\n"
+    )
+    assert output == 'True True True True'
+
+
+def test_import_stays_light():
+    """导入工具包不加载 numpy 和 logging.handlers"""
+    output = run_python(
+        "import sys\n"
+        "from src.utils import config, logger\n"
+        "print('numpy' in sys.modules, 'logging.handlers' in sys.modules)\n"
+    )
+    assert output == 'False False'